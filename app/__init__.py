@@ -1,14 +1,28 @@
+import os
 from flask import Flask, render_template
 from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
 from .config import Config
 
 db = SQLAlchemy()
-migrate = Migrate()
+migrate = None
 
-def create_app():
+def init_migrate(app):
+    """註冊 Flask-Migrate 與 `flask db` 指令"""
+    global migrate
+    from flask_migrate import Migrate
+    
+    if migrate is None:
+        migrate = Migrate()
+    migrate.init_app(app, db)
+    
+    # `flask db backfill`：執行 migration 登記的線上回填工作
+    from flask_migrate.cli import db as db_cli
+    from .cli import db_backfill_command
+    db_cli.add_command(db_backfill_command)
+
+def create_app(config_class=Config):
     app = Flask(__name__)
-    app.config.from_object(Config)
+    app.config.from_object(config_class)
     
     # 驗證 LINE 設定
     try:
@@ -18,15 +32,62 @@ def create_app():
         print(f"錯誤: {e}")
         print("請檢查 .env 檔案中的 LINE OAuth 設定")
 
+    # 模板位元組碼快取（部署時以 `flask precompile-templates` 預先產生）
+    if app.config.get('TEMPLATE_CACHE_DIR'):
+        from jinja2 import FileSystemBytecodeCache
+        os.makedirs(app.config['TEMPLATE_CACHE_DIR'], exist_ok=True)
+        app.jinja_options = {
+            **app.jinja_options,
+            'bytecode_cache': FileSystemBytecodeCache(app.config['TEMPLATE_CACHE_DIR'])
+        }
+
+    # 冷封存資料表使用獨立的 bind，可指向另一個資料庫檔案；背景工作佇列預設為本機 SQLite 檔案
+    app.config['SQLALCHEMY_BINDS'] = {
+        **app.config.get('SQLALCHEMY_BINDS', {}),
+        'archive': app.config.get('ARCHIVE_DATABASE_URL') or app.config['SQLALCHEMY_DATABASE_URI'],
+        'tasks': app.config['TASK_QUEUE_URL'],
+    }
     db.init_app(app)
-    migrate.init_app(app, db)
+
+    from .tasks import init_tasks
+    init_tasks(app)
+    # 一律註冊（成本不高）：任何環境都要能執行 `flask db upgrade` / `flask db backfill`
+    init_migrate(app)
 
     # 註冊藍圖
     from .routes.auth import auth_bp
     from .routes.main import main_bp
+    from .routes.api_v1 import api_v1_bp
     
     app.register_blueprint(auth_bp, url_prefix="/auth")
     app.register_blueprint(main_bp)
+    app.register_blueprint(api_v1_bp, url_prefix="/api/v1")
+
+    # 靜態資源（雜湊檔名 + 預先壓縮）
+    from .assets import init_assets
+    init_assets(app)
+
+    # 論述修改時清除已結束輪次的分頁快取
+    from .services.debate_service import init_timeline_cache
+    init_timeline_cache()
+
+    # 已完成辯論的靜態快照
+    if app.config.get('SNAPSHOTS_ENABLED'):
+        from .snapshots import init_snapshots
+        init_snapshots(app)
+
+    # 回應壓縮
+    if app.config.get('COMPRESSION_ENABLED'):
+        from .compression import CompressionMiddleware
+        app.wsgi_app = CompressionMiddleware(
+            app.wsgi_app,
+            min_size=app.config['COMPRESSION_MIN_SIZE'],
+            cache_bytes=app.config['COMPRESSION_CACHE_MB'] * 1024 * 1024
+        )
+
+    # CLI 指令
+    from .cli import register_commands
+    register_commands(app)
 
     # 模板全局變量
     @app.context_processor
@@ -44,4 +105,4 @@ def create_app():
     def internal_error(error):
         return render_template('errors/500.html'), 500
 
-    return app
\ No newline at end of file
+    return app
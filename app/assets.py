@@ -0,0 +1,393 @@
+"""
+靜態資源管線 - 自行託管、去除未使用樣式並加上內容雜湊的 CSS 套件
+
+建置（部署時執行 `flask assets build`）：
+    1. 下載（或從本機 vendor 目錄讀取）上游 CSS 與其引用的字型
+    2. 掃描 app/templates/**/*.html 收集實際使用的 class / icon
+    3. 移除沒有被使用的規則，合併為單一套件
+    4. 以內容雜湊命名，並產生 .gz / .br 預先壓縮版本與 manifest.json
+
+執行期：
+    - 模板使用 asset_url('app.css') 取得雜湊後的網址；未建置時 asset_built() 為 False，
+      模板退回原本的 CDN 連結
+    - /static/dist/ 依 Accept-Encoding 回傳預先壓縮檔，並設定 immutable 長效快取
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import time
+import urllib.parse
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+from flask import abort, current_app, request, send_from_directory, url_for
+
+try:
+    import brotli
+except ImportError:  # brotli 為選用套件，沒有安裝時只產生 gzip
+    brotli = None
+
+# 套件名稱 -> 上游來源（順序即合併順序）
+BUNDLES = {
+    'app.css': [
+        'https://cdn.jsdelivr.net/npm/tailwindcss@2.2.19/dist/tailwind.min.css',
+        'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0/css/all.min.css',
+    ],
+    'index.css': [
+        'https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.min.css',
+        'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0/css/all.min.css',
+    ],
+}
+
+# 動態組合、無法從模板靜態判斷的 class（正規表示式）
+SAFELIST = [
+    r'^hidden$',
+    r'^flex$',
+    r'^show$',
+    r'^active$',
+    r'^fade$',
+    r'^collapse',
+    r'^collapsing$',
+    r'^dropdown-menu',
+]
+
+DIST_DIR = 'dist'
+MANIFEST_NAME = 'manifest.json'
+REPORT_NAME = 'report.json'
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+_FINGERPRINT_RE = re.compile(r'\.[0-9a-f]{10}\.\w+$')
+
+# 網路環境估算（頻寬 bytes/s、往返延遲秒）
+NETWORK_PROFILES = {
+    '3g': (1.6e6 / 8, 0.300),
+    '4g': (9e6 / 8, 0.170),
+    'cable': (50e6 / 8, 0.028),
+}
+
+
+# ---------------------------------------------------------------------------
+# 模板掃描
+# ---------------------------------------------------------------------------
+
+# 與 Tailwind 預設 extractor 相同的規則
+_TOKEN_RE = re.compile(r'[^<>"\'`\s]*[^<>"\'`\s:]')
+# 例如 text-{{ 'green' if x else 'red' }}-500、fa-{{ 'check' if x else 'times' }}
+_DYNAMIC_RE = re.compile(r'([\w:-]*-)\{\{(.*?)\}\}([\w-]*)')
+_LITERAL_RE = re.compile(r'\'([^\']*)\'|"([^"]*)"')
+
+
+def scan_templates(template_dir: str) -> Set[str]:
+    """收集模板中所有可能是 class 名稱的字詞"""
+    tokens = set()
+    for root, _dirs, files in os.walk(template_dir):
+        for name in files:
+            if not name.endswith('.html'):
+                continue
+            with open(os.path.join(root, name), encoding='utf-8') as f:
+                source = f.read()
+            tokens.update(_TOKEN_RE.findall(source))
+            for prefix, expression, suffix in _DYNAMIC_RE.findall(source):
+                for match in _LITERAL_RE.finditer(expression):
+                    tokens.add(prefix + (match.group(1) or match.group(2) or '') + suffix)
+    return tokens
+
+
+# ---------------------------------------------------------------------------
+# CSS 去除未使用規則
+# ---------------------------------------------------------------------------
+
+_COMMENT_RE = re.compile(r'/\*.*?\*/', re.S)
+_CLASS_RE = re.compile(r'\.((?:\\[0-9a-fA-F]{1,6}\s?|\\.|[\w-])+)')
+_NOT_RE = re.compile(r':not\([^)]*\)')
+_ESCAPE_RE = re.compile(r'\\([0-9a-fA-F]{1,6}\s?|.)')
+_URL_RE = re.compile(r'url\(\s*([\'"]?)([^\'")]+)\1\s*\)')
+_NESTED_AT_RULES = ('@media', '@supports', '@document', '@layer')
+
+
+def _unescape(name: str) -> str:
+    def replace(match):
+        value = match.group(1)
+        if re.fullmatch(r'[0-9a-fA-F]{1,6}\s?', value):
+            return chr(int(value.strip(), 16))
+        return value
+    return _ESCAPE_RE.sub(replace, name)
+
+
+def _skip_string(css: str, i: int) -> int:
+    quote = css[i]
+    i += 1
+    while i < len(css) and css[i] != quote:
+        i += 2 if css[i] == '\\' else 1
+    return i
+
+
+def _split_rules(css: str):
+    """將 CSS 切成 (prelude, body)；body 為 None 表示 @charset 這類敘述型 at-rule"""
+    i, start, n = 0, 0, len(css)
+    while i < n:
+        c = css[i]
+        if c in '"\'':
+            i = _skip_string(css, i)
+        elif c == ';':
+            prelude = css[start:i].strip()
+            if prelude:
+                yield prelude, None
+            start = i + 1
+        elif c == '{':
+            depth, j = 1, i + 1
+            while j < n and depth:
+                if css[j] in '"\'':
+                    j = _skip_string(css, j)
+                elif css[j] == '{':
+                    depth += 1
+                elif css[j] == '}':
+                    depth -= 1
+                j += 1
+            yield css[start:i].strip(), css[i + 1:j - 1]
+            i = start = j
+            continue
+        i += 1
+
+
+def _split_selectors(prelude: str) -> List[str]:
+    selectors, depth, start = [], 0, 0
+    for i, c in enumerate(prelude):
+        if c in '([':
+            depth += 1
+        elif c in ')]':
+            depth -= 1
+        elif c == ',' and depth == 0:
+            selectors.append(prelude[start:i].strip())
+            start = i + 1
+    selectors.append(prelude[start:].strip())
+    return selectors
+
+
+def _selector_used(selector: str, is_used: Callable[[str], bool]) -> bool:
+    classes = _CLASS_RE.findall(_NOT_RE.sub('', selector))
+    return all(is_used(_unescape(name)) for name in classes)
+
+
+def purge_css(css: str, is_used: Callable[[str], bool]) -> str:
+    """移除選擇器中含有未使用 class 的規則"""
+    out = []
+    for prelude, body in _split_rules(_COMMENT_RE.sub('', css)):
+        if body is None:
+            out.append(prelude + ';')
+        elif prelude.startswith(_NESTED_AT_RULES):
+            inner = purge_css(body, is_used)
+            if inner:
+                out.append(f'{prelude}{{{inner}}}')
+        elif prelude.startswith('@'):
+            # @font-face、@keyframes 等保持原樣
+            out.append(f'{prelude}{{{body}}}')
+        else:
+            selectors = [s for s in _split_selectors(prelude) if _selector_used(s, is_used)]
+            if selectors:
+                out.append(','.join(selectors) + '{' + body + '}')
+    return ''.join(out)
+
+
+def license_comments(css: str) -> List[str]:
+    """保留 /*! ... */ 授權聲明"""
+    return list(dict.fromkeys(c for c in _COMMENT_RE.findall(css) if c.startswith('/*!')))
+
+
+def make_matcher(tokens: Set[str], safelist: Iterable[str] = SAFELIST) -> Callable[[str], bool]:
+    patterns = [re.compile(p) for p in safelist]
+    return lambda name: name in tokens or any(p.search(name) for p in patterns)
+
+
+# ---------------------------------------------------------------------------
+# 建置
+# ---------------------------------------------------------------------------
+
+def fingerprint(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:10]
+
+
+def fingerprinted_name(name: str, data: bytes) -> str:
+    stem, ext = os.path.splitext(name)
+    return f'{stem}.{fingerprint(data)}{ext}'
+
+
+def compressed_sizes(data: bytes) -> Dict[str, int]:
+    sizes = {'raw': len(data), 'gzip': len(gzip.compress(data, 9))}
+    if brotli is not None:
+        sizes['br'] = len(brotli.compress(data, quality=11))
+    return sizes
+
+
+def _write_with_variants(path: str, data: bytes):
+    """寫入檔案與 .gz / .br 預先壓縮版本"""
+    with open(path, 'wb') as f:
+        f.write(data)
+    with open(path + '.gz', 'wb') as f:
+        f.write(gzip.compress(data, 9, mtime=0))
+    if brotli is not None:
+        with open(path + '.br', 'wb') as f:
+            f.write(brotli.compress(data, quality=11))
+
+
+def make_fetcher(vendor_dir: Optional[str] = None) -> Callable[[str], bytes]:
+    """
+    取得上游檔案；指定 vendor_dir 時改從 <vendor_dir>/<host>/<path> 讀取，可離線建置
+    """
+    cache = {}
+
+    def fetch(url: str) -> bytes:
+        if url in cache:
+            return cache[url]
+        if vendor_dir:
+            parts = urllib.parse.urlsplit(url)
+            with open(os.path.join(vendor_dir, parts.netloc, parts.path.lstrip('/')), 'rb') as f:
+                data = f.read()
+        else:
+            import requests
+            response = requests.get(url, timeout=30)
+            response.raise_for_status()
+            data = response.content
+        cache[url] = data
+        return data
+
+    return fetch
+
+
+def _rehost_urls(css: str, source_url: str, fetch: Callable[[str], bytes],
+                 output_dir: str, manifest: Dict[str, str]) -> str:
+    """下載 CSS 引用的字型等檔案並改寫為雜湊後的相對路徑"""
+    def replace(match):
+        ref = match.group(2).strip()
+        if ref.startswith(('data:', '#')):
+            return match.group(0)
+        absolute = urllib.parse.urljoin(source_url, ref)
+        path, _, fragment = absolute.partition('#')
+        data = fetch(path.split('?')[0])
+        name = 'files/' + fingerprinted_name(os.path.basename(urllib.parse.urlsplit(path).path), data)
+        target = os.path.join(output_dir, name)
+        if not os.path.exists(target):
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            _write_with_variants(target, data)
+        manifest[os.path.basename(urllib.parse.urlsplit(path).path)] = name
+        return f'url({name}{"#" + fragment if fragment else ""})'
+    return _URL_RE.sub(replace, css)
+
+
+def build_assets(template_dir: str, output_dir: str, vendor_dir: Optional[str] = None,
+                 bundles: Dict[str, List[str]] = None) -> Dict:
+    """建置所有套件，回傳大小報告"""
+    bundles = bundles or BUNDLES
+    fetch = make_fetcher(vendor_dir)
+    os.makedirs(output_dir, exist_ok=True)
+
+    started = time.perf_counter()
+    tokens = scan_templates(template_dir)
+    is_used = make_matcher(tokens)
+    manifest, report = {}, {'bundles': {}, 'tokens': len(tokens)}
+
+    for bundle, sources in bundles.items():
+        parts, original = [], {}
+        for url in sources:
+            source = fetch(url).decode('utf-8')
+            original[url] = compressed_sizes(source.encode('utf-8'))
+            purged = purge_css(source, is_used)
+            parts.append('\n'.join(license_comments(source) + [_rehost_urls(purged, url, fetch, output_dir, manifest)]))
+
+        data = '\n'.join(parts).encode('utf-8')
+        name = fingerprinted_name(bundle, data)
+        _write_with_variants(os.path.join(output_dir, name), data)
+        manifest[bundle] = name
+        report['bundles'][bundle] = {
+            'file': name,
+            'original': original,
+            'original_total': {k: sum(s[k] for s in original.values()) for k in next(iter(original.values()))},
+            'purged': compressed_sizes(data),
+        }
+
+    report['build_seconds'] = round(time.perf_counter() - started, 3)
+    report['latency_estimate_ms'] = estimate_latency(report)
+    with open(os.path.join(output_dir, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    with open(os.path.join(output_dir, REPORT_NAME), 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    return report
+
+
+def estimate_latency(report: Dict) -> Dict[str, Dict[str, float]]:
+    """
+    估算各網路環境下下載 CSS 的時間：
+        CDN：每個來源各一次連線（DNS + TCP + TLS 約 3 RTT）+ gzip 傳輸
+        自行託管：同源連線重用（1 RTT）+ brotli（沒有則 gzip）傳輸
+    """
+    estimates = {}
+    for bundle, stats in report['bundles'].items():
+        purged = stats['purged'].get('br', stats['purged']['gzip'])
+        estimates[bundle] = {}
+        for profile, (bandwidth, rtt) in NETWORK_PROFILES.items():
+            cdn = max(3 * rtt + s['gzip'] / bandwidth for s in stats['original'].values())
+            self_hosted = rtt + purged / bandwidth
+            estimates[bundle][profile] = {
+                'cdn_ms': round(cdn * 1000, 1),
+                'self_hosted_ms': round(self_hosted * 1000, 1),
+            }
+    return estimates
+
+
+# ---------------------------------------------------------------------------
+# 執行期
+# ---------------------------------------------------------------------------
+
+def _dist_dir(app) -> str:
+    return os.path.join(app.static_folder, DIST_DIR)
+
+
+def load_manifest(app) -> Dict[str, str]:
+    path = os.path.join(_dist_dir(app), MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def send_asset(filename):
+    """回傳預先壓縮的雜湊資源"""
+    directory = _dist_dir(current_app)
+    if not os.path.isfile(os.path.join(directory, filename)):
+        abort(404)
+
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    available = [enc for enc, suffix in (('br', '.br'), ('gzip', '.gz'))
+                 if os.path.isfile(os.path.join(directory, filename + suffix))]
+    encoding = request.accept_encodings.best_match(available + ['identity'], default='identity')
+    suffix = {'br': '.br', 'gzip': '.gz'}.get(encoding, '')
+
+    immutable = bool(_FINGERPRINT_RE.search(filename))
+    response = send_from_directory(directory, filename + suffix, mimetype=mimetype, conditional=True,
+                                   max_age=IMMUTABLE_MAX_AGE if immutable else None)
+    if suffix:
+        response.headers['Content-Encoding'] = encoding
+    if available:
+        response.vary.add('Accept-Encoding')
+    if immutable:
+        response.cache_control.immutable = True
+    return response
+
+
+def init_assets(app):
+    """註冊資源路由與模板輔助函式"""
+    manifest = load_manifest(app)
+
+    app.add_url_rule(f'{app.static_url_path}/{DIST_DIR}/<path:filename>',
+                     endpoint='assets', view_func=send_asset)
+
+    def asset_url(name: str) -> str:
+        return url_for('assets', filename=manifest.get(name, name))
+
+    @app.context_processor
+    def inject_assets():
+        return {
+            'asset_url': asset_url,
+            'asset_built': lambda name: name in manifest,
+        }
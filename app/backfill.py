@@ -0,0 +1,287 @@
+"""
+線上分批回填 - 大型資料表的 schema 變更不在 migration 的交易內一次做完
+
+migration 只做 schema 變更（例如新增可為 NULL 的欄位），需要逐列計算的值交給回填工作：
+
+    # app 內註冊回填函式：處理 id ∈ [start, end) 的列，回傳處理列數
+    @backfill('arguments_word_count', Argument.__table__)
+    def _word_count(connection, start, end):
+        ...
+
+    # migration 中登記：不匯入 app，直接以 SQL 寫入 backfill_jobs / backfill_ranges
+    # （範例見 b6e1d4a8c359_schedule_argument_sources_backfill.py）
+
+登記時記下資料表目前的 id 範圍並切成 BACKFILL_RANGES 段（backfill_jobs / backfill_ranges），
+部署後以 `flask db backfill` 執行（應用程式內以 schedule() 登記時，範圍不超過
+BACKFILL_INLINE_MAX_ROWS 個 id 會直接做完）：
+
+    分批      每批 BACKFILL_BATCH_SIZE 個 id 一個交易，回填與 checkpoint（next_id）在同一個交易內提交
+    節流      每批之間暫停 BACKFILL_SLEEP 秒，讓線上流量優先取得鎖
+    續跑      中斷後重新執行，從各段的 next_id 繼續
+    平行      --workers N 以多個行程各自處理不相交的範圍（SQLite 的寫入仍會排隊，PostgreSQL 可同時進行）
+    收尾      所有範圍完成後執行一次 finalize（例如重算彙總），工作標記為 done
+
+登記之後新增的列（id 大於登記時的最大值）應由應用程式在寫入時直接計算。
+回填函式只能依該範圍內的資料計算，重跑同一範圍的結果必須相同。
+"""
+import importlib
+import time
+from concurrent.futures import FIRST_EXCEPTION, ProcessPoolExecutor, wait
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional
+
+from flask import current_app
+from sqlalchemy import delete, func, select, update
+
+from app import db
+from app.models.backfill import BackfillJob, BackfillRange
+
+jobs = BackfillJob.__table__
+ranges = BackfillRange.__table__
+
+# 載入後以 @backfill 註冊回填函式的模組
+JOB_MODULES = (
+    'app.services.citation_service',
+)
+
+
+class BackfillSpec(NamedTuple):
+    name: str
+    table: Any
+    fn: Callable[[Any, int, int], int]
+    finalize: Optional[Callable[[Any], None]]
+
+
+_specs: Dict[str, BackfillSpec] = {}
+
+
+def backfill(name: str, table, finalize: Optional[Callable[[Any], None]] = None):
+    """註冊回填函式 fn(connection, start, end) -> 處理列數；finalize(connection) 在所有範圍完成後執行一次"""
+    def decorator(fn):
+        _specs[name] = BackfillSpec(name, table, fn, finalize)
+        return fn
+    return decorator
+
+
+def load_jobs(modules: Iterable[str] = ()):
+    for module in (*JOB_MODULES, *modules):
+        importlib.import_module(module)
+
+
+def get_spec(name: str) -> BackfillSpec:
+    load_jobs()
+    if name not in _specs:
+        raise ValueError(f'未知的回填工作：{name}（可用：{", ".join(sorted(_specs))}）')
+    return _specs[name]
+
+
+# -- 登記 --------------------------------------------------------------------
+
+def schedule(name: str, connection=None, parts: Optional[int] = None, inline_max_rows: Optional[int] = None,
+             replace: bool = False) -> Dict[str, Any]:
+    """
+    登記回填工作（可傳入 connection 在呼叫端的交易中登記）
+
+    已登記過的工作不重複登記（migration 可重跑），replace=True 時清除進度重新登記。
+    id 範圍不超過 inline_max_rows（預設 BACKFILL_INLINE_MAX_ROWS）時立即在同一個連線上做完。
+    """
+    spec = get_spec(name)
+    connection = connection or db.session.connection()
+    config = current_app.config
+    if connection.execute(select(jobs.c.name).where(jobs.c.name == name)).first() is not None:
+        if not replace:
+            return status(name, connection)[0]
+        connection.execute(delete(ranges).where(ranges.c.job == name))
+        connection.execute(delete(jobs).where(jobs.c.name == name))
+
+    low, high = connection.execute(select(func.min(spec.table.c.id), func.max(spec.table.c.id))).one()
+    low, high = (low, high) if low is not None else (0, -1)
+    now = datetime.utcnow()
+    connection.execute(jobs.insert(), [{'name': name, 'table_name': spec.table.name, 'id_min': low, 'id_max': high,
+                                        'status': 'pending', 'rows': 0, 'created_at': now}])
+    span = high - low + 1
+    parts = max(1, min(parts or config['BACKFILL_RANGES'], span)) if span > 0 else 0
+    bounds = [low + span * i // parts for i in range(parts + 1)] if parts else []
+    if parts:
+        connection.execute(ranges.insert(), [
+            {'job': name, 'range_start': start, 'range_end': end, 'next_id': start, 'rows': 0, 'updated_at': now}
+            for start, end in zip(bounds, bounds[1:])])
+
+    limit = config['BACKFILL_INLINE_MAX_ROWS'] if inline_max_rows is None else inline_max_rows
+    if span <= limit:
+        for start in bounds[:-1]:
+            _run_range(name, start, config['BACKFILL_BATCH_SIZE'], connection=connection)
+        _finish(spec, connection)
+    return status(name, connection)[0]
+
+
+# -- 執行 --------------------------------------------------------------------
+
+def _run_range(name: str, range_start: int, batch_size: int, sleep: float = 0.0, connection=None,
+               on_batch: Optional[Callable[[], Any]] = None) -> int:
+    """
+    處理一段範圍剩下的部分，回傳處理列數
+
+    沒有傳入 connection 時每批在 db.session 上提交一次（回填與 checkpoint 同一個交易），每批之後呼叫 on_batch；
+    傳入時（migration 內）全部在該連線的交易中執行，不提交也不暫停。
+    """
+    spec = _specs[name]
+    inline = connection is not None
+    conn = connection or db.session.connection()
+    row = conn.execute(select(ranges.c.next_id, ranges.c.range_end)
+                       .where(ranges.c.job == name, ranges.c.range_start == range_start)).one()
+    next_id, range_end = row
+    processed = 0
+    while next_id < range_end:
+        end = min(next_id + batch_size, range_end)
+        try:
+            count = spec.fn(conn, next_id, end) or 0
+            conn.execute(update(ranges).where(ranges.c.job == name, ranges.c.range_start == range_start)
+                         .values(next_id=end, rows=ranges.c.rows + count, updated_at=datetime.utcnow()))
+            if not inline:
+                db.session.commit()
+        except Exception:
+            if not inline:
+                db.session.rollback()
+            raise
+        processed += count
+        next_id = end
+        if not inline:
+            if on_batch:
+                on_batch()
+            if sleep:
+                time.sleep(sleep)
+            conn = db.session.connection()
+    return processed
+
+
+def _finish(spec: BackfillSpec, connection):
+    """所有範圍完成後：finalize 並標記為 done（與 finalize 同一個交易）"""
+    if spec.finalize:
+        spec.finalize(connection)
+    rows = connection.execute(select(func.coalesce(func.sum(ranges.c.rows), 0))
+                              .where(ranges.c.job == spec.name)).scalar()
+    connection.execute(update(jobs).where(jobs.c.name == spec.name)
+                       .values(status='done', rows=rows, finished_at=datetime.utcnow()))
+
+
+def run(name: str, batch_size: Optional[int] = None, sleep: Optional[float] = None, workers: int = 1,
+        progress: Optional[Callable[[Dict[str, Any]], None]] = None, interval: float = 2.0) -> Dict[str, Any]:
+    """
+    執行（或繼續）已登記的回填工作（需在 app context 中呼叫）
+
+    workers > 1 時以 process pool 平行處理尚未完成的範圍，主行程每 interval 秒讀取 checkpoint 回報進度。
+    """
+    spec = get_spec(name)
+    config = current_app.config
+    batch_size = batch_size or config['BACKFILL_BATCH_SIZE']
+    sleep = config['BACKFILL_SLEEP'] if sleep is None else sleep
+    job = db.session.execute(select(jobs).where(jobs.c.name == name)).first()
+    if job is None:
+        raise ValueError(f'回填工作 {name} 尚未登記')
+    if job.status == 'done':
+        return status(name)[0]
+
+    started = time.perf_counter()
+    baseline = status(name)[0]
+    db.session.execute(update(jobs).where(jobs.c.name == name)
+                       .values(status='running', started_at=job.started_at or datetime.utcnow()))
+    db.session.commit()
+    pending = list(db.session.execute(select(ranges.c.range_start).where(
+        ranges.c.job == name, ranges.c.next_id < ranges.c.range_end).order_by(ranges.c.range_start)).scalars())
+
+    def report():
+        db.session.commit()  # 結束目前的讀取交易，才看得到其他行程提交的進度
+        current = status(name)[0]
+        elapsed = time.perf_counter() - started
+        done = current['ids_done'] - baseline['ids_done']
+        rate = done / elapsed if elapsed > 0 else 0.0
+        current.update(seconds=elapsed, ids_per_sec=rate,
+                       eta=(current['ids_total'] - current['ids_done']) / rate if rate else None)
+        if progress:
+            progress(current)
+        return current
+
+    if workers <= 1 or len(pending) <= 1:
+        last_report = [time.perf_counter()]
+
+        def tick():
+            if time.perf_counter() - last_report[0] >= interval:
+                report()
+                last_report[0] = time.perf_counter()
+
+        for range_start in pending:
+            _run_range(name, range_start, batch_size, sleep, on_batch=tick)
+    else:
+        overrides = {key: config[key] for key in ('SQLALCHEMY_DATABASE_URI', 'SECRET_KEY', 'SQLALCHEMY_ENGINE_OPTIONS',
+                                                 'BACKFILL_BATCH_SIZE', 'BACKFILL_SLEEP')
+                     if key in config}
+        modules = [spec.fn.__module__]
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(overrides, modules)) as pool:
+            futures = [pool.submit(_run_range_job, (name, range_start, batch_size, sleep)) for range_start in pending]
+            while True:
+                finished, running = wait(futures, timeout=interval, return_when=FIRST_EXCEPTION)
+                failed = [future for future in finished if future.exception() is not None]
+                if failed:
+                    for future in running:
+                        future.cancel()
+                    raise failed[0].exception()
+                if not running:
+                    break
+                report()
+
+    if all(r['next_id'] >= r['range_end'] for r in status(name)[0]['ranges']):
+        _finish(spec, db.session.connection())
+        db.session.commit()
+    return report()
+
+
+def status(name: Optional[str] = None, connection=None) -> List[Dict[str, Any]]:
+    """各工作的進度（ids_done / ids_total 以 id 計，rows 為實際處理的列數）"""
+    connection = connection or db.session.connection()
+    stmt = select(jobs).order_by(jobs.c.created_at, jobs.c.name)
+    if name:
+        stmt = stmt.where(jobs.c.name == name)
+    result = []
+    for job in connection.execute(stmt):
+        parts = [dict(row._mapping) for row in connection.execute(
+            select(ranges.c.range_start, ranges.c.range_end, ranges.c.next_id, ranges.c.rows)
+            .where(ranges.c.job == job.name).order_by(ranges.c.range_start))]
+        result.append({
+            'name': job.name, 'table': job.table_name, 'status': job.status,
+            'ids_total': job.id_max - job.id_min + 1,
+            'ids_done': sum(part['next_id'] - part['range_start'] for part in parts),
+            'rows': job.rows if job.status == 'done' else sum(part['rows'] for part in parts),
+            'ranges': parts,
+            'created_at': job.created_at, 'finished_at': job.finished_at,
+        })
+    return result
+
+
+def pending_jobs() -> List[str]:
+    """尚未完成的工作（依登記順序）"""
+    return list(db.session.execute(select(jobs.c.name).where(jobs.c.status != 'done')
+                                   .order_by(jobs.c.created_at, jobs.c.name)).scalars())
+
+
+_worker_app = None
+
+
+def _init_worker(overrides: dict, modules: List[str]):
+    """process pool 初始化：每個行程建立自己的應用程式與資料庫連線，並載入回填函式"""
+    global _worker_app
+    from app import create_app
+    from app.config import Config
+
+    _worker_app = create_app(type('BackfillWorkerConfig', (Config,), overrides))
+    _worker_app.app_context().push()
+    load_jobs(modules)
+
+
+def _run_range_job(job: tuple) -> int:
+    name, range_start, batch_size, sleep = job
+    try:
+        return _run_range(name, range_start, batch_size, sleep)
+    finally:
+        db.session.remove()
@@ -0,0 +1,102 @@
+"""
+論述資料來源的解析與正規化
+
+Argument.sources 是使用者輸入的原文：可能是 JSON（字串陣列，或含 url / title 的物件陣列），
+也可能是一行一個連結或引用的純文字。parse 從中取出每一筆來源：
+    url   網址正規化：scheme 統一為 https、主機轉小寫並去掉 www. 與預設連接埠、去掉 #fragment、
+          去掉追蹤參數（utm_*、fbclid…）並依名稱排序其餘參數、路徑去掉結尾的 /
+    text  沒有網址的一行（書目、機構報告…）：NFKC、去除項目符號、多餘空白與結尾標點、轉小寫；
+          與網址同一行的文字視為該網址的標題，不另外記錄
+正規化後相同的來源共用一個 key（BLAKE2b 64 位元的十六進位字串），即 sources 資料表的唯一鍵。
+"""
+import hashlib
+import json
+import re
+import unicodedata
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+from urllib.parse import parse_qsl, quote, unquote, urlencode, urlsplit, urlunsplit
+
+URL = 'url'
+TEXT = 'text'
+MAX_LENGTH = 2000
+
+# 網址在空白、引號、角括號與全形標點處結束
+_URL_RE = re.compile(r'https?://[^\s<>"\'，。、；：！？（）「」『』【】]+', re.IGNORECASE)
+_TRAILING = '.,;:!?)]}>'
+_BULLET_RE = re.compile(r'^\s*(?:[-*•·]|\d+[.)、]|\[\d+\])\s*')
+_TRACKING = ('utm_', 'fbclid', 'gclid', 'dclid', 'msclkid', 'mc_cid', 'mc_eid', 'igshid', 'ref_src', 'spm')
+
+
+class Citation(NamedTuple):
+    kind: str  # url / text
+    canonical: str
+    domain: Optional[str]
+    key: str
+
+
+def citation_key(kind: str, canonical: str) -> str:
+    return hashlib.blake2b(f'{kind}:{canonical}'.encode('utf-8'), digest_size=8).hexdigest()
+
+
+def canonical_url(url: str) -> Optional[Tuple[str, str]]:
+    """(正規化後的網址, 網域)；無法解析時為 None"""
+    try:
+        parts = urlsplit(url.strip().rstrip(_TRAILING))
+        host = (parts.hostname or '').lower().rstrip('.')
+        port = parts.port
+    except ValueError:
+        return None
+    if parts.scheme.lower() not in ('http', 'https') or not host:
+        return None
+    if host.startswith('www.'):
+        host = host[4:]
+    netloc = host if port in (None, 80, 443) else f'{host}:{port}'
+    path = quote(unquote(parts.path), safe="/:@!$&'()*+,;=-._~%").rstrip('/')
+    query = sorted((name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+                   if not name.lower().startswith(_TRACKING))
+    return urlunsplit(('https', netloc, path, urlencode(query), ''))[:MAX_LENGTH], host
+
+
+def canonical_text(text: str) -> str:
+    text = unicodedata.normalize('NFKC', text)
+    text = _BULLET_RE.sub('', text)
+    return ' '.join(text.split()).strip(' .,;:，。；：、').lower()[:MAX_LENGTH]
+
+
+def _entries(raw: str) -> Iterable[str]:
+    """原文中的每一筆（JSON 陣列的元素，或純文字的每一行）"""
+    stripped = raw.strip()
+    if stripped[:1] in ('[', '{'):
+        try:
+            value = json.loads(stripped)
+        except ValueError:
+            value = None
+        if value is not None:
+            for item in value if isinstance(value, list) else [value]:
+                if isinstance(item, dict):
+                    item = item.get('url') or item.get('href') or item.get('title') or item.get('text')
+                if isinstance(item, str):
+                    yield item
+            return
+    yield from re.split(r'[\r\n；;]+', raw)
+
+
+def parse(raw: Optional[str]) -> List[Citation]:
+    """原文 → 不重複的來源（依出現順序）"""
+    if not raw:
+        return []
+    found = {}
+    for entry in _entries(raw):
+        urls = _URL_RE.findall(entry)
+        for url in urls:
+            result = canonical_url(url)
+            if result:
+                key = citation_key(URL, result[0])
+                found.setdefault(key, Citation(URL, result[0], result[1], key))
+        if urls:  # 同一行的其他文字視為連結的標題
+            continue
+        text = canonical_text(entry)
+        if len(text) >= 2:
+            key = citation_key(TEXT, text)
+            found.setdefault(key, Citation(TEXT, text, None, key))
+    return list(found.values())
@@ -0,0 +1,543 @@
+"""
+CLI 指令 - 透過 `flask <command>` 執行的維運工作
+"""
+import os
+import time
+import json
+import click
+from flask import current_app
+from flask.cli import AppGroup, with_appcontext
+
+
+def register_commands(app):
+    """註冊所有 CLI 指令"""
+    app.cli.add_command(precompile_templates)
+    app.cli.add_command(assets_cli)
+    app.cli.add_command(hot_cli)
+    app.cli.add_command(views_cli)
+    app.cli.add_command(rollups_cli)
+    app.cli.add_command(archive_cli)
+    app.cli.add_command(snapshots_cli)
+    app.cli.add_command(hall_cli)
+    app.cli.add_command(worker_command)
+    app.cli.add_command(tasks_cli)
+    app.cli.add_command(export_command)
+    app.cli.add_command(related_cli)
+    app.cli.add_command(duplicates_cli)
+    app.cli.add_command(suggest_cli)
+    app.cli.add_command(moderation_cli)
+    app.cli.add_command(sources_cli)
+    app.cli.add_command(stats_cli)
+
+
+@click.command('precompile-templates')
+def precompile_templates():
+    """預先編譯所有 Jinja 模板並寫入位元組碼快取（部署時執行）"""
+    if not current_app.config.get('TEMPLATE_CACHE_DIR'):
+        raise click.ClickException('請先設定 TEMPLATE_CACHE_DIR')
+    
+    env = current_app.jinja_env
+    started = time.perf_counter()
+    names = env.list_templates(extensions=['html'])
+    for name in names:
+        env.get_template(name)
+    
+    elapsed = (time.perf_counter() - started) * 1000
+    click.echo(f"已編譯 {len(names)} 個模板至 {current_app.config['TEMPLATE_CACHE_DIR']}（{elapsed:.1f} ms）")
+
+
+@click.group('assets', cls=AppGroup)
+def assets_cli():
+    """靜態資源建置"""
+
+
+@assets_cli.command('build')
+@click.option('--vendor-dir', type=click.Path(exists=True, file_okay=False),
+              help='離線建置：從 <dir>/<host>/<path> 讀取上游檔案')
+def build_assets_command(vendor_dir):
+    """產生去除未使用樣式、雜湊命名並預先壓縮的 CSS 套件"""
+    from app.assets import build_assets, DIST_DIR
+    
+    output_dir = os.path.join(current_app.static_folder, DIST_DIR)
+    template_dir = os.path.join(current_app.root_path, current_app.template_folder)
+    report = build_assets(template_dir, output_dir, vendor_dir=vendor_dir)
+    _print_asset_report(report)
+    click.echo(f"輸出目錄：{output_dir}（{report['build_seconds']} 秒）")
+
+
+@assets_cli.command('report')
+def asset_report_command():
+    """顯示最近一次建置的大小與載入時間比較"""
+    from app.assets import DIST_DIR, REPORT_NAME
+    
+    path = os.path.join(current_app.static_folder, DIST_DIR, REPORT_NAME)
+    if not os.path.exists(path):
+        raise click.ClickException('尚未建置，請先執行 flask assets build')
+    with open(path, encoding='utf-8') as f:
+        _print_asset_report(json.load(f))
+
+
+def _print_asset_report(report):
+    def kb(value):
+        return f"{value / 1024:,.1f} KB"
+    
+    for bundle, stats in report['bundles'].items():
+        before, after = stats['original_total'], stats['purged']
+        click.echo(f"{bundle} -> {stats['file']}")
+        for encoding in ('raw', 'gzip', 'br'):
+            if encoding in before and encoding in after:
+                saved = (1 - after[encoding] / before[encoding]) * 100
+                click.echo(f"  {encoding:<5} CDN {kb(before[encoding]):>12}  自行託管 {kb(after[encoding]):>10}  (-{saved:.1f}%)")
+        for profile, estimate in report['latency_estimate_ms'][bundle].items():
+            click.echo(f"  {profile:<5} 估計載入 CDN {estimate['cdn_ms']:>8.1f} ms  自行託管 {estimate['self_hosted_ms']:>8.1f} ms")
+
+
+@click.group('hot', cls=AppGroup)
+def hot_cli():
+    """熱門排序"""
+
+
+@hot_cli.command('refresh')
+@click.option('--full', is_flag=True, help='清除水位線，從頭重算所有辯論')
+@click.option('--batch-size', default=1000, show_default=True, help='每批處理的辯論數')
+@click.option('--interval', type=float, help='常駐模式：每隔幾秒執行一次')
+def hot_refresh_command(full, batch_size, interval):
+    """增量重算有新活動的辯論熱門分數"""
+    from app.services.hot_ranking import HotRankingService
+    
+    while True:
+        result = HotRankingService.refresh(full=full, batch_size=batch_size)
+        click.echo(f"已更新 {result['debates']} 場辯論、{result['events']} 個事件（{result['seconds']:.2f} 秒）")
+        if not interval:
+            break
+        full = False
+        time.sleep(interval)
+
+
+@click.group('views', cls=AppGroup)
+def views_cli():
+    """不重複觀看者草圖"""
+
+
+@views_cli.command('prune')
+@click.option('--keep-days', type=int, help='保留天數（預設 VIEW_SKETCH_RETENTION_DAYS）')
+def views_prune_command(keep_days):
+    """刪除過期的每日觀看草圖"""
+    from app.services.view_counter import ViewCounter
+    
+    keep_days = keep_days or current_app.config['VIEW_SKETCH_RETENTION_DAYS']
+    deleted = ViewCounter.prune(keep_days)
+    click.echo(f"已刪除 {deleted} 份超過 {keep_days} 天的每日草圖")
+
+
+@click.group('rollups', cls=AppGroup)
+def rollups_cli():
+    """活動彙總"""
+
+
+@rollups_cli.command('compact')
+@click.option('--keep-days', type=int, help='小時桶保留天數（預設 ROLLUP_HOURLY_RETENTION_DAYS）')
+def rollups_compact_command(keep_days):
+    """把過期的小時桶併入日桶"""
+    from app.services.rollup_service import RollupService
+    
+    keep_days = keep_days if keep_days is not None else current_app.config['ROLLUP_HOURLY_RETENTION_DAYS']
+    result = RollupService.compact(keep_days)
+    click.echo(f"已將 {result['hourly_rows']} 個小時桶併入 {result['daily_rows']} 個日桶")
+
+
+@rollups_cli.command('rebuild')
+@click.option('--chunk-size', default=5000, show_default=True, help='每批讀取的資料列數')
+def rollups_rebuild_command(chunk_size):
+    """從歷史資料重建所有彙總"""
+    from app.services.rollup_service import RollupService
+    
+    result = RollupService.rebuild(current_app.config['ROLLUP_HOURLY_RETENTION_DAYS'], chunk_size=chunk_size)
+    click.echo(f"掃描 {result.get('debates', 0)} 場辯論、{result.get('arguments', 0)} 則論述、"
+               f"{result.get('hall_messages', 0)} 則大廳訊息，寫入 {result['buckets']} 個時間桶"
+               f"（{result['seconds']:.2f} 秒）")
+
+
+@click.group('archive', cls=AppGroup)
+def archive_cli():
+    """冷封存"""
+
+
+@archive_cli.command('run')
+@click.option('--older-than-days', type=int, help='完成超過幾天的辯論（預設 ARCHIVE_AFTER_DAYS）')
+@click.option('--batch-size', default=500, show_default=True, help='每個交易封存的辯論數')
+@click.option('--limit', type=int, help='本次最多封存的辯論數')
+def archive_run_command(older_than_days, batch_size, limit):
+    """把已完成的舊辯論搬到封存資料表"""
+    from app.services.archive_service import ArchiveService
+    
+    days = older_than_days if older_than_days is not None else current_app.config['ARCHIVE_AFTER_DAYS']
+    result = ArchiveService.archive(days, batch_size=batch_size, limit=limit)
+    click.echo(f"已封存 {result.get('debates', 0)} 場辯論、{result.get('arguments', 0)} 則論述、"
+               f"{result.get('debate_ratings', 0)} 筆評分、{result.get('debate_follows', 0)} 筆關注"
+               f"（{result['batches']} 批，{result['seconds']:.2f} 秒）")
+
+
+@click.group('snapshots', cls=AppGroup)
+def snapshots_cli():
+    """已完成辯論的靜態快照"""
+
+
+@snapshots_cli.command('build')
+@click.option('--all', 'rebuild_all', is_flag=True, help='忽略指紋，全部重新產生（模板變更後使用）')
+@click.option('--workers', default=os.cpu_count() or 1, show_default=True, help='平行渲染的行程數')
+@click.option('--chunk-size', default=100, show_default=True, help='每個工作單位的辯論數')
+def snapshots_build_command(rebuild_all, workers, chunk_size):
+    """產生缺少或過期的已完成辯論快照"""
+    from sqlalchemy import select
+    from app import db
+    from app.models.archive import ARCHIVE_BIND, archived_debates
+    from app.models.debate import Debate
+    from app.services.archive_service import ArchiveService
+    from app.snapshots import build_snapshots, stale_ids
+    
+    ArchiveService.ensure_tables()
+    ids = list(db.session.execute(select(Debate.id).where(Debate.status == 'completed')).scalars())
+    ids += db.session.execute(select(archived_debates.c.id),
+                              bind_arguments={'bind': db.engines[ARCHIVE_BIND]}).scalars().all()
+    stale = stale_ids(ids, rebuild_all=rebuild_all)
+    click.echo(f"{len(ids)} 場已完成辯論，{len(stale)} 份快照需要產生")
+    result = build_snapshots(stale, workers=workers, chunk_size=chunk_size)
+    click.echo(f"已產生 {result['built']} 份快照（{result['bytes'] / 1024:.0f} KB，"
+               f"{result['workers']} 個行程，{result['seconds']:.2f} 秒）")
+
+
+@click.group('hall', cls=AppGroup)
+def hall_cli():
+    """大廳訊息"""
+
+
+@hall_cli.command('prune')
+@click.option('--keep-days', type=int, help='保留天數（預設 HALL_RETENTION_DAYS）')
+@click.option('--mode', type=click.Choice(['delete', 'archive']), help='刪除或搬到封存資料表（預設 HALL_RETENTION_MODE）')
+@click.option('--batch-size', type=int, help='每個交易處理的訊息數（預設 HALL_RETENTION_BATCH）')
+@click.option('--max-batches', type=int, help='本次最多處理的批數（排程執行時限制工作量）')
+@click.option('--max-seconds', type=float, help='本次最多執行的秒數')
+@click.option('--pause', default=0.0, show_default=True, help='每批之間暫停的秒數')
+def hall_prune_command(keep_days, mode, batch_size, max_batches, max_seconds, pause):
+    """分批清除超過保留期的大廳訊息"""
+    from app.services.hall_retention import HallRetentionService
+    
+    config = current_app.config
+    keep_days = keep_days if keep_days is not None else config['HALL_RETENTION_DAYS']
+    result = HallRetentionService.run(keep_days, batch_size=batch_size or config['HALL_RETENTION_BATCH'],
+                                      mode=mode or config['HALL_RETENTION_MODE'], max_batches=max_batches,
+                                      max_seconds=max_seconds, pause=pause)
+    click.echo(f"已清除 {result['rows']} 則超過 {keep_days} 天的訊息（{result['batches']} 批，"
+               f"{result['seconds']:.2f} 秒，{result['rows_per_sec']:.0f} 列/秒）"
+               f"{'' if result['done'] else '，尚未完成'}")
+
+
+@click.command('worker')
+@click.option('--processes', default=1, show_default=True, help='worker 行程數')
+@click.option('--batch-size', type=int, help='每次取出的同名工作數（預設 TASK_BATCH_SIZE）')
+@click.option('--visibility-timeout', type=float, help='租約秒數（預設 TASK_VISIBILITY_TIMEOUT）')
+@click.option('--poll-interval', default=1.0, show_default=True, help='佇列空時的輪詢間隔（秒）')
+@click.option('--burst', is_flag=True, help='佇列清空後結束')
+def worker_command(processes, batch_size, visibility_timeout, poll_interval, burst):
+    """執行背景工作"""
+    from app.tasks import run_pool
+    
+    config = current_app.config
+    result = run_pool(processes, batch_size=batch_size or config['TASK_BATCH_SIZE'],
+                      visibility_timeout=visibility_timeout or config['TASK_VISIBILITY_TIMEOUT'],
+                      poll_interval=poll_interval, burst=burst)
+    if result:
+        click.echo(f"已處理 {result['processed']} 筆工作（{result['batches']} 批，{result['seconds']:.2f} 秒）")
+
+
+@click.group('tasks', cls=AppGroup)
+def tasks_cli():
+    """背景工作佇列"""
+
+
+@tasks_cli.command('stats')
+@click.option('--window', default=300.0, show_default=True, help='延遲統計涵蓋最近幾秒完成的工作')
+def tasks_stats_command(window):
+    """顯示各工作的佇列深度與延遲"""
+    from app.tasks import TaskQueue
+    
+    def seconds(value):
+        return '-' if value is None else f"{value:.3f}"
+    
+    click.echo(f"{'task':<22}{'ready':>8}{'delayed':>9}{'running':>9}{'dead':>6}{'oldest s':>10}"
+               f"{'done':>8}{'wait p50':>10}{'wait p95':>10}{'lat p95':>10}")
+    for name, stats in sorted(TaskQueue.stats(window).items()):
+        click.echo(f"{name:<22}{stats['ready']:>8}{stats['delayed']:>9}{stats['running']:>9}{stats['dead']:>6}"
+                   f"{stats['oldest_age']:>10.1f}{stats['done']:>8}{seconds(stats['wait_p50']):>10}"
+                   f"{seconds(stats['wait_p95']):>10}{seconds(stats['latency_p95']):>10}")
+
+
+@tasks_cli.command('retry-dead')
+@click.option('--name', help='只重新排入這種工作')
+def tasks_retry_dead_command(name):
+    """把超過重試次數的工作重新排入"""
+    from app.tasks import TaskQueue
+    
+    click.echo(f"已重新排入 {TaskQueue.retry_dead(name)} 筆工作")
+
+
+@click.command('export')
+@click.argument('datasets', nargs=-1)
+@click.option('--format', 'fmt', type=click.Choice(['ndjson', 'parquet']), default='ndjson', show_default=True)
+@click.option('--output', default=os.path.join('instance', 'export'), show_default=True,
+              help='輸出目錄；"-" 為標準輸出（單一資料集、單一行程）')
+@click.option('--since', type=click.DateTime(), help='只匯出此時間（UTC）之後變動的資料')
+@click.option('--since-id', type=int, help='只匯出 id 大於此值的資料')
+@click.option('--incremental', is_flag=True, help='從上次增量匯出的水位線繼續，完成後更新水位線')
+@click.option('--include-archive', is_flag=True, help='一併匯出已封存的辯論')
+@click.option('--workers', default=1, show_default=True, help='平行匯出的行程數')
+@click.option('--parts', type=int, help='依 id 範圍切成的分片數（預設與 --workers 相同）')
+@click.option('--batch-size', type=int, help='每批讀取的資料列數（預設 EXPORT_BATCH_SIZE）')
+def export_command(datasets, fmt, output, since, since_id, incremental, include_archive, workers, parts, batch_size):
+    """匯出辯論、論述與評分給分析系統（debates / arguments / ratings，預設全部）"""
+    import sys
+    from app.export import DATASETS, ExportError, Window, commit_window, export_dataset, incremental_window, write_export
+    
+    names = datasets or tuple(DATASETS)
+    batch_size = batch_size or current_app.config['EXPORT_BATCH_SIZE']
+    if incremental and (since or since_id is not None):
+        raise click.UsageError('--incremental 不能與 --since / --since-id 同時使用')
+    if output == '-' and len(names) != 1:
+        raise click.UsageError('輸出到標準輸出時只能指定一個資料集')
+    
+    try:
+        for name in names:
+            state = None
+            if incremental:
+                window, state = incremental_window(name)
+            else:
+                window = Window(since=since, since_id=since_id)
+            started = time.perf_counter()
+            if output == '-':
+                rows = write_export(name, fmt, sys.stdout.buffer, window, include_archive, batch_size)
+                sys.stdout.buffer.flush()
+                click.echo(f"{name}：{rows} 列（{time.perf_counter() - started:.2f} 秒）", err=True)
+            else:
+                result = export_dataset(name, output, fmt, window, include_archive=include_archive,
+                                        workers=workers, parts=parts, batch_size=batch_size)
+                seconds = result['seconds']
+                click.echo(f"{name}：{result['rows']} 列、{result['bytes'] / 1048576:.1f} MB、"
+                           f"{len(result['parts'])} 個分片（{seconds:.2f} 秒，"
+                           f"{result['rows'] / seconds if seconds else 0:,.0f} 列/秒）→ {result['directory']}")
+            if state is not None:
+                commit_window(state, window)
+    except ExportError as e:
+        raise click.UsageError(str(e))
+
+
+@click.group('related', cls=AppGroup)
+def related_cli():
+    """相關辯論"""
+
+
+@related_cli.command('rebuild')
+@click.option('--batch-size', type=int, help='每批計算相似度的辯論數（預設 RELATED_BATCH_SIZE）')
+def related_rebuild_command(batch_size):
+    """重新計算 idf、所有辯論的向量與相關辯論"""
+    from app.services.related_service import RelatedService
+    
+    if not RelatedService.available():
+        raise click.ClickException('相關辯論需要安裝 numpy 與 scipy')
+    result = RelatedService.rebuild(batch_size=batch_size)
+    click.echo(f"已計算 {result['debates']} 場辯論、{result['neighbors']} 筆相關辯論"
+               f"（向量化 {result['vectorize_seconds']:.2f} 秒，相似度 {result['neighbor_seconds']:.2f} 秒）")
+
+
+@related_cli.command('refresh')
+@click.option('--ids', 'debate_ids', multiple=True, type=int, help='內容被修改的辯論（可重複指定）')
+@click.option('--batch-size', type=int, help='每批計算相似度的辯論數（預設 RELATED_BATCH_SIZE）')
+@click.option('--interval', type=float, help='常駐模式：每隔幾秒執行一次')
+def related_refresh_command(debate_ids, batch_size, interval):
+    """增量更新新辯論、已封存辯論與指定辯論的相關辯論"""
+    from app.services.related_service import RelatedService
+    
+    if not RelatedService.available():
+        raise click.ClickException('相關辯論需要安裝 numpy 與 scipy')
+    while True:
+        result = RelatedService.refresh(debate_ids, batch_size=batch_size)
+        if result.get('full'):
+            click.echo(f"尚未建立索引，已完整重建 {result['debates']} 場辯論（{result['seconds']:.2f} 秒）")
+        else:
+            click.echo(f"新增或修改 {result['changed']} 場、移除 {result['removed']} 場、連帶重算 {result['affected']} 場"
+                       f"（{result['seconds']:.2f} 秒）")
+        if not interval:
+            break
+        debate_ids = ()
+        time.sleep(interval)
+
+
+@click.group('duplicates', cls=AppGroup)
+def duplicates_cli():
+    """重複辯論偵測"""
+
+
+@duplicates_cli.command('build')
+def duplicates_build_command():
+    """從資料庫重建標題的 MinHash 索引並寫入 DUPLICATE_INDEX_PATH"""
+    from app.services.duplicate_service import DuplicateService
+    
+    result = DuplicateService.build()
+    click.echo(f"已建立 {result['debates']} 場辯論的索引（{result['seconds']:.2f} 秒）"
+               f"→ {current_app.config['DUPLICATE_INDEX_PATH']}")
+
+
+@click.group('suggest', cls=AppGroup)
+def suggest_cli():
+    """搜尋自動完成"""
+
+
+@suggest_cli.command('rebuild')
+@click.option('--interval', type=float, help='常駐模式：每隔幾秒重建一次（讓熱度與新辯論併入排序的索引）')
+def suggest_rebuild_command(interval):
+    """依熱度重建標題前綴索引並寫入 SUGGEST_INDEX_PATH（各 worker 會自動重新載入）"""
+    from app.services.suggest_service import SuggestService
+    
+    while True:
+        result = SuggestService.rebuild()
+        skipped = f"，{result['skipped']} 場超過記憶體上限未收錄" if result['skipped'] else ''
+        click.echo(f"已收錄 {result['debates']} 場辯論、{result['keys']} 個鍵（{result['mb']} MB{skipped}，"
+                   f"{result['seconds']:.2f} 秒）")
+        if not interval:
+            break
+        time.sleep(interval)
+
+
+@click.group('moderation', cls=AppGroup)
+def moderation_cli():
+    """內容審查"""
+
+
+@moderation_cli.command('check')
+@click.argument('text')
+def moderation_check_command(text):
+    """以目前的字詞表檢查一段文字"""
+    from app.services.moderation_service import ModerationService
+    
+    moderator = ModerationService.moderator()
+    verdict = moderator.review(text)
+    click.echo(f"字詞表 {len(moderator)} 個字詞（{len(moderator.automaton)} 個狀態）")
+    click.echo(f"結果：{verdict.action}")
+    for match in verdict.matches:
+        click.echo(f"  {match.term}（{match.action}）：{text[match.start:match.end]}")
+    if verdict.content != text:
+        click.echo(f"遮蔽後：{verdict.content}")
+
+
+@moderation_cli.command('rescan')
+@click.option('--target', 'targets', multiple=True, type=click.Choice(['hall_messages', 'arguments']),
+              help='要掃描的內容（可重複指定，預設全部）')
+@click.option('--workers', default=os.cpu_count() or 1, show_default=True, help='平行比對的行程數')
+@click.option('--chunk-size', default=20000, show_default=True, help='每個工作單位的 id 範圍')
+@click.option('--dry-run', is_flag=True, help='只統計命中數，不記錄')
+def moderation_rescan_command(targets, workers, chunk_size, dry_run):
+    """以目前的字詞表重新掃描既有的大廳訊息與論述（字詞表更新後執行）"""
+    from app.services.moderation_service import TARGETS, ModerationService
+    
+    for target in targets or TARGETS:
+        result = ModerationService.rescan(target, workers=workers, chunk_size=chunk_size, apply=not dry_run)
+        click.echo(f"{target}：掃描 {result['scanned']} 則，命中 {result['matched']} 則，"
+                   f"新增 {result['flagged']} 筆待檢視（其中 mask {result['masked']} 筆），"
+                   f"{result['workers']} 個行程，{result['seconds']:.2f} 秒")
+
+
+@click.group('sources', cls=AppGroup)
+def sources_cli():
+    """論述引用來源"""
+
+
+@sources_cli.command('rebuild')
+@click.option('--batch-size', type=int, help='每批（每個交易）處理的論述 id 數（預設 BACKFILL_BATCH_SIZE）')
+@click.option('--workers', default=1, show_default=True, help='平行處理的行程數')
+def sources_rebuild_command(batch_size, workers):
+    """重新解析所有論述的資料來源，重建來源對應與引用數（解析規則變更後執行；中斷後以 `flask db backfill` 續跑）"""
+    from app import db
+    from app.backfill import run, schedule
+    
+    schedule('argument_sources', inline_max_rows=0, replace=True)
+    db.session.commit()
+    result = run('argument_sources', batch_size=batch_size, workers=workers, progress=_echo_backfill)
+    click.echo(f"已解析 {result['rows']} 則論述（{result['seconds']:.2f} 秒）")
+
+
+@sources_cli.command('top')
+@click.option('--limit', default=20, show_default=True)
+@click.option('--domain', help='只列出此網域的來源')
+def sources_top_command(limit, domain):
+    """列出最常被引用的來源"""
+    from app.services.citation_service import CitationService
+    
+    for source in CitationService.top_sources(limit, domain=domain):
+        click.echo(f"{source['citation_count']:>8}  {source['canonical']}")
+
+
+@click.group('stats', cls=AppGroup)
+def stats_cli():
+    """使用者統計"""
+
+
+@stats_cli.command('recompute')
+@click.option('--chunk-size', default=2000, show_default=True, help='每批讀取的辯論數（連同其所有論述）')
+def stats_recompute_command(chunk_size):
+    """從辯論與論述的歷史重算所有使用者的統計（部署 user_stats 累加前或規則變更後執行）"""
+    from app.services.user_stats_service import UserStatsService
+    
+    def progress(totals):
+        click.echo(f"  {totals.get('debates', 0)} 場辯論、{totals.get('arguments', 0)} 則論述"
+                   f"（至 id {totals['last_id']}，{totals['seconds']:.1f} 秒）")
+    
+    try:
+        result = UserStatsService.recompute(chunk_size=chunk_size, progress=progress)
+    except ImportError:
+        raise click.ClickException('重算使用者統計需要安裝 numpy')
+    click.echo(f"掃描 {result.get('debates', 0)} 場辯論、{result.get('arguments', 0)} 則論述，"
+               f"更新 {result['users']} 位使用者（{result['seconds']:.2f} 秒）")
+
+
+def _echo_backfill(progress):
+    percent = progress['ids_done'] / progress['ids_total'] * 100 if progress['ids_total'] else 100.0
+    eta = f"，約剩 {progress['eta']:.0f} 秒" if progress.get('eta') else ''
+    click.echo(f"  {progress['name']}：{percent:5.1f}%（{progress['rows']} 列，"
+               f"{progress['ids_per_sec']:,.0f} id/秒{eta}）")
+
+
+@click.command('backfill')
+@click.argument('names', nargs=-1)
+@click.option('--batch-size', type=int, help='每批（每個交易）處理的 id 數（預設 BACKFILL_BATCH_SIZE）')
+@click.option('--sleep', type=float, help='每批之間暫停的秒數（預設 BACKFILL_SLEEP）')
+@click.option('--workers', default=1, show_default=True, help='平行處理的行程數（不超過工作的範圍數）')
+@click.option('--reset', is_flag=True, help='清除指定工作的進度並重新登記（以目前的 id 範圍）')
+@click.option('--status', 'show_status', is_flag=True, help='只列出各工作的進度')
+@with_appcontext
+def db_backfill_command(names, batch_size, sleep, workers, reset, show_status):
+    """執行或續跑 migration 登記的線上回填工作（未指定名稱時執行所有未完成的工作）"""
+    from app import db
+    from app.backfill import pending_jobs, run, schedule, status
+    
+    if show_status:
+        for job in status():
+            percent = job['ids_done'] / job['ids_total'] * 100 if job['ids_total'] else 100.0
+            click.echo(f"{job['name']:<24} {job['status']:<8} {percent:5.1f}%  {job['rows']} 列"
+                       f"（{job['table']}，{len(job['ranges'])} 段）")
+        return
+    if reset:
+        if not names:
+            raise click.UsageError('--reset 需要指定工作名稱')
+        for name in names:
+            schedule(name, inline_max_rows=0, replace=True)
+        db.session.commit()
+    
+    names = names or pending_jobs()
+    if not names:
+        click.echo('沒有未完成的回填工作')
+    for name in names:
+        try:
+            result = run(name, batch_size=batch_size, sleep=sleep, workers=workers, progress=_echo_backfill)
+        except ValueError as e:
+            raise click.ClickException(str(e))
+        click.echo(f"{name}：{result['status']}，{result['rows']} 列（{result.get('seconds', 0):.2f} 秒）")
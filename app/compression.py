@@ -0,0 +1,215 @@
+"""
+回應壓縮中介層 - 依 Accept-Encoding 協商 zstd / brotli / gzip
+
+- 太小、已壓縮或不可壓縮的內容直接略過
+- 沒有 Content-Length 的串流回應以串流方式逐塊壓縮
+- 應用程式以 cacheable(response) 標記的回應，會以 (ETag, 編碼) 為鍵快取壓縮結果，
+  相同內容重複請求時不必再次壓縮
+"""
+import gzip
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Iterable, Optional
+
+from flask import request
+from werkzeug.datastructures import Headers
+from werkzeug.http import parse_accept_header
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+CACHE_MARKER = 'X-Compression-Cache'
+
+COMPRESSIBLE_TYPES = (
+    'text/',
+    'application/json',
+    'application/x-ndjson',
+    'application/javascript',
+    'application/xml',
+    'image/svg+xml',
+)
+
+
+def cacheable(response):
+    """
+    標記回應可快取壓縮結果（並補上 ETag、處理條件式請求）
+
+    只適合內容完全由 ETag 決定的回應。
+    """
+    response.add_etag()
+    response.headers[CACHE_MARKER] = '1'
+    return response.make_conditional(request)
+
+
+class CompressedCache:
+    """以位元組總量為上限的 LRU 快取"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key) -> Optional[bytes]:
+        with self._lock:
+            value = self._data.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.size = 0
+
+    def set(self, key, value: bytes):
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self.size -= len(old)
+            self._data[key] = value
+            self.size += len(value)
+            while self.size > self.max_bytes:
+                _, evicted = self._data.popitem(last=False)
+                self.size -= len(evicted)
+
+
+class CompressionMiddleware:
+    """WSGI 壓縮中介層"""
+
+    def __init__(self, app, min_size: int = 500, gzip_level: int = 6, brotli_quality: int = 5,
+                 zstd_level: int = 3, cache_bytes: int = 16 * 1024 * 1024):
+        self.app = app
+        self.min_size = min_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.zstd_level = zstd_level
+        self.cache = CompressedCache(cache_bytes)
+        self.encodings = [name for name, available in (
+            ('zstd', zstandard is not None),
+            ('br', brotli is not None),
+            ('gzip', True),
+        ) if available]
+
+    # -- 壓縮器 ---------------------------------------------------------
+
+    def compress(self, data: bytes, encoding: str) -> bytes:
+        if encoding == 'zstd':
+            return zstandard.ZstdCompressor(level=self.zstd_level).compress(data)
+        if encoding == 'br':
+            return brotli.compress(data, quality=self.brotli_quality)
+        return gzip.compress(data, self.gzip_level, mtime=0)
+
+    def _stream_compressor(self, encoding: str):
+        """回傳 (compress, flush, finish) 函式組"""
+        if encoding == 'zstd':
+            compressor = zstandard.ZstdCompressor(level=self.zstd_level).compressobj()
+            return compressor.compress, lambda: compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK), compressor.flush
+        if encoding == 'br':
+            compressor = brotli.Compressor(quality=self.brotli_quality)
+            return compressor.process, compressor.flush, compressor.finish
+        compressor = zlib.compressobj(self.gzip_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        return compressor.compress, lambda: compressor.flush(zlib.Z_SYNC_FLUSH), compressor.flush
+
+    def _stream(self, app_iter: Iterable[bytes], encoding: str):
+        compress, flush, finish = self._stream_compressor(encoding)
+        try:
+            for chunk in app_iter:
+                if chunk:
+                    # 每塊都 flush，讓串流模板的內容能即時送達瀏覽器
+                    yield compress(chunk) + flush()
+            yield finish()
+        finally:
+            if hasattr(app_iter, 'close'):
+                app_iter.close()
+
+    # -- WSGI ------------------------------------------------------------
+
+    def _should_compress(self, status: str, headers: Headers) -> bool:
+        if not status.startswith('200'):
+            return False
+        if 'Content-Encoding' in headers:
+            return False
+        content_type = headers.get('Content-Type', '')
+        if not content_type.startswith(COMPRESSIBLE_TYPES):
+            return False
+        length = headers.get('Content-Length')
+        return length is None or int(length) >= self.min_size
+
+    def __call__(self, environ, start_response):
+        accept = parse_accept_header(environ.get('HTTP_ACCEPT_ENCODING', ''))
+        encoding = accept.best_match(self.encodings)
+        if not encoding or environ.get('REQUEST_METHOD') == 'HEAD':
+            return self._strip_marker(environ, start_response)
+
+        captured = {}
+
+        def capture(status, headers, exc_info=None):
+            captured.update(status=status, headers=headers, exc_info=exc_info)
+            return lambda data: None
+
+        app_iter = self.app(environ, capture)
+        status = captured['status']
+        headers = Headers(captured['headers'])
+        cache_marked = headers.pop(CACHE_MARKER, None) is not None
+
+        if not self._should_compress(status, headers):
+            start_response(status, headers.to_wsgi_list(), captured['exc_info'])
+            return app_iter
+
+        headers.add('Vary', 'Accept-Encoding')
+        headers['Content-Encoding'] = encoding
+        etag = headers.get('ETag')
+        if etag and not etag.startswith('W/'):
+            # 壓縮後位元組不同，改為弱 ETag；werkzeug 以弱比較處理 If-None-Match
+            headers['ETag'] = 'W/' + etag
+
+        if headers.get('Content-Length') is None:
+            start_response(status, headers.to_wsgi_list(), captured['exc_info'])
+            return self._stream(app_iter, encoding)
+
+        key = (etag, encoding) if cache_marked and etag else None
+        body = self.cache.get(key) if key else None
+        if body is None:
+            try:
+                body = self.compress(b''.join(app_iter), encoding)
+            finally:
+                if hasattr(app_iter, 'close'):
+                    app_iter.close()
+            if key:
+                self.cache.set(key, body)
+        elif hasattr(app_iter, 'close'):
+            app_iter.close()
+
+        headers['Content-Length'] = str(len(body))
+        start_response(status, headers.to_wsgi_list(), captured['exc_info'])
+        return [body]
+
+    def _strip_marker(self, environ, start_response):
+        """
+        未壓縮時仍要移除內部標記標頭
+
+        可壓縮的回應也要加上 Vary: Accept-Encoding，否則共用快取可能把未壓縮版本回給支援壓縮的用戶端
+        """
+        def strip(status, headers, exc_info=None):
+            headers = Headers([(k, v) for k, v in headers if k != CACHE_MARKER])
+            if (status.startswith('200') and 'Content-Encoding' not in headers
+                    and headers.get('Content-Type', '').startswith(COMPRESSIBLE_TYPES)):
+                headers.add('Vary', 'Accept-Encoding')
+            return start_response(status, headers.to_wsgi_list(), exc_info)
+        return self.app(environ, strip)
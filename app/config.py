@@ -11,6 +11,106 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.environ.get("DATABASE_URL") or f"sqlite:///{os.path.join(basedir, '..', 'app.db')}"
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # 啟動設定
+    TEMPLATE_CACHE_DIR = os.environ.get("TEMPLATE_CACHE_DIR")  # Jinja 位元組碼快取目錄
+
+    # 回應壓縮
+    COMPRESSION_ENABLED = os.environ.get("COMPRESSION_ENABLED", "1").lower() in ("1", "true", "yes")
+    COMPRESSION_MIN_SIZE = int(os.environ.get("COMPRESSION_MIN_SIZE", 500))  # 位元組，小於此值不壓縮
+    COMPRESSION_CACHE_MB = int(os.environ.get("COMPRESSION_CACHE_MB", 16))  # 壓縮結果快取上限
+
+    # 熱門排序
+    HOT_HALF_LIFE_HOURS = float(os.environ.get("HOT_HALF_LIFE_HOURS", 24))  # 互動熱度的半衰期
+    HOT_TOP_K = int(os.environ.get("HOT_TOP_K", 50))  # 記憶體內熱門榜大小
+    HOT_TOP_K_TTL = int(os.environ.get("HOT_TOP_K_TTL", 60))  # 秒，熱門榜重新載入間隔
+    HOT_WATERMARK_LAG = int(os.environ.get("HOT_WATERMARK_LAG", 60))  # 秒，熱門度重算不包含最近這段時間的事件（留給尚未提交的交易）
+
+    # 不重複觀看者（HyperLogLog）
+    VIEW_SKETCH_PRECISION = int(os.environ.get("VIEW_SKETCH_PRECISION", 12))  # 2^p 個暫存器，約 1.6% 誤差
+    VIEW_FLUSH_SECONDS = float(os.environ.get("VIEW_FLUSH_SECONDS", 10))  # worker 內草圖寫回資料庫的間隔
+    VIEW_SKETCH_RETENTION_DAYS = int(os.environ.get("VIEW_SKETCH_RETENTION_DAYS", 30))  # 每日草圖保留天數
+
+    # 活動彙總
+    ROLLUP_HOURLY_RETENTION_DAYS = int(os.environ.get("ROLLUP_HOURLY_RETENTION_DAYS", 7))  # 小時桶保留天數，之後併入日桶
+
+    # 冷封存
+    ARCHIVE_DATABASE_URL = os.environ.get("ARCHIVE_DATABASE_URL")  # 封存資料庫，未設定時與主資料庫相同（獨立的資料表）
+    ARCHIVE_AFTER_DAYS = int(os.environ.get("ARCHIVE_AFTER_DAYS", 180))  # 完成超過此天數的辯論才封存
+
+    # 已完成辯論的靜態快照
+    SNAPSHOTS_ENABLED = os.environ.get("SNAPSHOTS_ENABLED", "1").lower() in ("1", "true", "yes")
+    SNAPSHOT_DIR = os.environ.get("SNAPSHOT_DIR") or os.path.join(basedir, "..", "instance", "snapshots")
+    SNAPSHOT_MAX_AGE = int(os.environ.get("SNAPSHOT_MAX_AGE", 60))  # 秒，快照回應的 Cache-Control max-age
+
+    # 大廳訊息保留
+    HALL_RETENTION_DAYS = int(os.environ.get("HALL_RETENTION_DAYS", 30))  # 超過此天數的訊息會被清除
+    HALL_RETENTION_MODE = os.environ.get("HALL_RETENTION_MODE", "delete")  # delete 或 archive（搬到封存資料表）
+    HALL_RETENTION_BATCH = int(os.environ.get("HALL_RETENTION_BATCH", 2000))  # 每批（每個交易）處理的訊息數
+
+    # 關注通知
+    NOTIFY_FANOUT_LIMIT = int(os.environ.get("NOTIFY_FANOUT_LIMIT", 1000))  # 關注者超過此數的辯論改為讀取時展開
+    NOTIFY_BATCH_SIZE = int(os.environ.get("NOTIFY_BATCH_SIZE", 1000))  # 寫入展開時每批寫入的收件匣列數
+
+    # 背景工作佇列（`flask worker` 執行）
+    TASK_QUEUE_URL = os.environ.get("TASK_QUEUE_URL") or f"sqlite:///{os.path.join(basedir, '..', 'instance', 'tasks.db')}"
+    TASK_ALWAYS_EAGER = (os.environ["TASK_ALWAYS_EAGER"].lower() in ("1", "true", "yes")
+                         if os.environ.get("TASK_ALWAYS_EAGER") else None)  # 不經佇列，直接在請求內執行；未設定時 debug / testing 模式開啟
+    TASK_VISIBILITY_TIMEOUT = float(os.environ.get("TASK_VISIBILITY_TIMEOUT", 60))  # 秒，取出後未完成即可被重新取出
+    TASK_MAX_ATTEMPTS = int(os.environ.get("TASK_MAX_ATTEMPTS", 5))
+    TASK_RETRY_BASE = float(os.environ.get("TASK_RETRY_BASE", 2))  # 秒，第 n 次失敗後延後 base * 2^(n-1)
+    TASK_RETRY_MAX = float(os.environ.get("TASK_RETRY_MAX", 300))
+    TASK_BATCH_SIZE = int(os.environ.get("TASK_BATCH_SIZE", 100))  # 每次取出的同名工作數
+    TASK_DONE_RETENTION = float(os.environ.get("TASK_DONE_RETENTION", 3600))  # 秒，完成的工作保留供延遲統計
+
+    # 分析用匯出（`flask export` 與 /api/export）
+    EXPORT_TOKEN = os.environ.get("EXPORT_TOKEN")  # HTTP 匯出的 Bearer token，未設定時停用
+    EXPORT_BATCH_SIZE = int(os.environ.get("EXPORT_BATCH_SIZE", 10000))  # 每批讀取與寫入的資料列數
+    EXPORT_WATERMARK_LAG = int(os.environ.get("EXPORT_WATERMARK_LAG", 60))  # 秒，增量匯出不包含最近這段時間的變動
+
+    # 相關辯論（`flask related rebuild` / `flask related refresh`）
+    RELATED_DIR = os.environ.get("RELATED_DIR") or os.path.join(basedir, "..", "instance", "related")  # 向量索引
+    RELATED_TOP_K = int(os.environ.get("RELATED_TOP_K", 6))  # 每場辯論保存的鄰居數
+    RELATED_MIN_SCORE = float(os.environ.get("RELATED_MIN_SCORE", 0.05))  # 餘弦相似度低於此值不列入
+    RELATED_MAX_DF = int(os.environ.get("RELATED_MAX_DF", 1000))  # 出現在超過此數量辯論中的詞項不計分
+    RELATED_CATEGORY_BOOST = float(os.environ.get("RELATED_CATEGORY_BOOST", 0.05))  # 同分類的加分
+    RELATED_BATCH_SIZE = int(os.environ.get("RELATED_BATCH_SIZE", 512))  # 每批計算相似度的辯論數
+
+    # 搜尋頁分面統計
+    SEARCH_FACET_TTL = float(os.environ.get("SEARCH_FACET_TTL", 30))  # 秒，同一關鍵字的狀態 × 分類計數快取時間
+
+    # 搜尋自動完成（標題前綴索引，`flask suggest rebuild`）
+    SUGGEST_INDEX_PATH = os.environ.get("SUGGEST_INDEX_PATH") or os.path.join(basedir, "..", "instance", "suggest.idx")
+    SUGGEST_MEMORY_MB = int(os.environ.get("SUGGEST_MEMORY_MB", 256))  # 索引大小上限，超過時只收錄較熱門的辯論
+    SUGGEST_KEY_CHARS = int(os.environ.get("SUGGEST_KEY_CHARS", 24))  # 每個鍵最多保留的字數
+    SUGGEST_REFRESH_SECONDS = float(os.environ.get("SUGGEST_REFRESH_SECONDS", 10))  # 檢查新辯論與新索引檔的間隔
+
+    # 發起辯論時的重複偵測（MinHash + LSH，`flask duplicates build`）
+    DUPLICATE_CHECK = os.environ.get("DUPLICATE_CHECK", "1").lower() in ("1", "true", "yes")  # 發現相似辯論時先詢問是否改為加入
+    DUPLICATE_INDEX_PATH = os.environ.get("DUPLICATE_INDEX_PATH") or os.path.join(basedir, "..", "instance", "duplicates.idx")
+    DUPLICATE_REFRESH_SECONDS = float(os.environ.get("DUPLICATE_REFRESH_SECONDS", 10))  # 檢查新索引檔的間隔（檔案由 `flask duplicates build` 建立）
+    DUPLICATE_THRESHOLD = float(os.environ.get("DUPLICATE_THRESHOLD", 0.6))  # 標題 shingle 的 Jaccard 係數
+    DUPLICATE_NUM_PERM = int(os.environ.get("DUPLICATE_NUM_PERM", 64))  # MinHash 簽章長度（16 的倍數）
+    DUPLICATE_BANDS = int(os.environ.get("DUPLICATE_BANDS", 16))  # LSH 段數，NUM_PERM = BANDS × 4
+
+    # 行動版 API（/api/v1）
+    API_PAGE_SIZE = int(os.environ.get("API_PAGE_SIZE", 50))  # 列表預設筆數
+    API_MAX_PAGE_SIZE = int(os.environ.get("API_MAX_PAGE_SIZE", 200))  # ?limit= 上限
+    API_MAX_BATCH_IDS = int(os.environ.get("API_MAX_BATCH_IDS", 100))  # ?ids= 一次最多的 id 數
+
+    # 大廳訊息與論述的字詞審查（`flask moderation check/rescan`）
+    MODERATION_ENABLED = os.environ.get("MODERATION_ENABLED", "1").lower() in ("1", "true", "yes")
+    MODERATION_WORDLIST_PATH = os.environ.get("MODERATION_WORDLIST_PATH") or os.path.join(basedir, "..", "instance", "moderation_words.txt")
+    MODERATION_VARIANTS_PATH = os.environ.get("MODERATION_VARIANTS_PATH")  # 補充的異體字對應，每行兩個字
+    MODERATION_DEFAULT_ACTION = os.environ.get("MODERATION_DEFAULT_ACTION", "mask")  # 字詞未指定動作時：block / mask / flag
+    MODERATION_MASK_CHAR = os.environ.get("MODERATION_MASK_CHAR", "＊")  # 遮蔽字元
+    MODERATION_RELOAD_SECONDS = float(os.environ.get("MODERATION_RELOAD_SECONDS", 30))  # 檢查字詞表是否更新的間隔
+
+    # 大型資料表的線上分批回填（`flask db backfill`，見 app/backfill.py）
+    BACKFILL_BATCH_SIZE = int(os.environ.get("BACKFILL_BATCH_SIZE", 5000))  # 每批（每個交易）處理的 id 數
+    BACKFILL_SLEEP = float(os.environ.get("BACKFILL_SLEEP", 0.01))  # 秒，每批之間暫停讓線上寫入取得鎖（0 為全速）
+    BACKFILL_RANGES = int(os.environ.get("BACKFILL_RANGES", 8))  # 登記時切成的 id 範圍數（平行行程數的上限）
+    BACKFILL_INLINE_MAX_ROWS = int(os.environ.get("BACKFILL_INLINE_MAX_ROWS", 100000))  # schedule() 登記時 id 範圍不超過此數就直接做完
+
     # LINE OAuth 配置
     LINE_CHANNEL_ID = os.environ.get("LINE_CHANNEL_ID")
     LINE_CHANNEL_SECRET = os.environ.get("LINE_CHANNEL_SECRET")
@@ -0,0 +1,67 @@
+"""
+API 回應的編碼 - JSON 與 MessagePack，依請求的 Accept 標頭選擇
+
+    application/json      有安裝 orjson 時使用 orjson，否則使用標準函式庫 json（結果相同，只是較慢）
+    application/msgpack   需要安裝 msgpack（application/x-msgpack 亦可）
+
+兩種格式的日期時間都輸出為 ISO 8601 字串（2025-10-14T10:12:37），與 jsonify 的 HTTP 日期格式不同。
+orjson 與 msgpack 都是選用套件，沒有安裝時 negotiate 只會選擇 JSON。
+"""
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, List
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+JSON = 'application/json'
+MSGPACK = 'application/msgpack'
+MSGPACK_ALIASES = (MSGPACK, 'application/x-msgpack')
+
+
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f'無法編碼的型別：{type(value).__name__}')
+
+
+_json_encode = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'), default=_default).encode
+
+
+def encode_json(payload: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(payload, default=_default)
+    return _json_encode(payload).encode('utf-8')
+
+
+def encode_msgpack(payload: Any) -> bytes:
+    return msgpack.packb(payload, default=_default, use_bin_type=True)
+
+
+def available() -> List[str]:
+    """可提供的格式（第一個為預設）"""
+    return [JSON, *MSGPACK_ALIASES] if msgpack is not None else [JSON]
+
+
+def negotiate(accept) -> str:
+    """依 Accept（werkzeug 的 MIMEAccept）選擇格式；沒有可接受的格式時回傳 None"""
+    if not accept:
+        return JSON
+    best = accept.best_match(available())
+    if best is None:
+        return None
+    return MSGPACK if best in MSGPACK_ALIASES else JSON
+
+
+def encode(payload: Any, mimetype: str) -> bytes:
+    return encode_msgpack(payload) if mimetype == MSGPACK else encode_json(payload)
@@ -0,0 +1,364 @@
+"""
+分析用的批次匯出
+
+以 Core 查詢逐批讀取（stream_results + yield_per，PostgreSQL 使用伺服器端游標），
+寫成 NDJSON 或 Parquet（pyarrow 的 record batch，每批一個 row group），記憶體用量與資料量無關：
+
+    debates    辯論，增量水位線為 last_activity_at（加入、發言、狀態轉換都會更新）
+    arguments  論述，增量水位線為 updated_at
+    ratings    評分，只會新增，增量水位線為 id
+
+增量匯出只輸出水位線之後變動的資料（同一列可能出現在多次匯出中，下游以 id 去重保留最新一筆）；
+時間水位線的上限為「現在 - EXPORT_WATERMARK_LAG 秒」，匯出當下尚未提交的交易留到下一次。
+`flask export` 依 id 範圍切成多個分片，以 process pool 平行寫成
+<目錄>/<資料集>/<時間>/part-NNNNN.<格式>，全部完成後才寫入 _manifest.json。
+已封存的辯論（見 ArchiveService）以 include_archive 一併匯出。
+"""
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, BinaryIO, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from flask import current_app
+from sqlalchemy import Boolean, DateTime, Float, Integer, LargeBinary, func, or_, select
+
+from app import db
+from app.models.archive import ARCHIVE_BIND, archived_arguments, archived_debate_ratings, archived_debates
+from app.models.debate import Argument, Debate, DebateRating
+from app.models.job import JobState
+
+# pyarrow 為選用套件（沒有安裝時只能匯出 NDJSON），第一次匯出 Parquet 時才載入，不拖慢啟動
+pyarrow = None
+
+FORMATS = ('ndjson', 'parquet')
+MIMETYPES = {'ndjson': 'application/x-ndjson', 'parquet': 'application/vnd.apache.parquet'}
+
+
+class Dataset(NamedTuple):
+    table: Any
+    archive: Any
+    watermark: Optional[str]  # 時間水位線欄位，None 時以 id 增量
+
+
+DATASETS = {
+    'debates': Dataset(Debate.__table__, archived_debates, 'last_activity_at'),
+    'arguments': Dataset(Argument.__table__, archived_arguments, 'updated_at'),
+    'ratings': Dataset(DebateRating.__table__, archived_debate_ratings, None),
+}
+
+
+class ExportError(ValueError):
+    """匯出參數錯誤"""
+
+
+def dataset(name: str) -> Dataset:
+    if name not in DATASETS:
+        raise ExportError(f'未知的資料集：{name}（可用：{", ".join(DATASETS)}）')
+    return DATASETS[name]
+
+
+def _load_pyarrow():
+    global pyarrow
+    if pyarrow is None:
+        try:
+            import pyarrow as module
+            import pyarrow.parquet  # noqa: F401
+        except ImportError:
+            return None
+        pyarrow = module
+    return pyarrow
+
+
+def check_format(fmt: str):
+    if fmt not in FORMATS:
+        raise ExportError(f'未知的格式：{fmt}（可用：{", ".join(FORMATS)}）')
+    if fmt == 'parquet' and _load_pyarrow() is None:
+        raise ExportError('匯出 Parquet 需要安裝 pyarrow')
+
+
+# -- 讀取 ------------------------------------------------------------------
+
+class Window(NamedTuple):
+    """匯出範圍：id 在 [id_from, id_to) 之間，且在水位線之後"""
+    since: Optional[datetime] = None
+    until: Optional[datetime] = None
+    since_id: Optional[int] = None
+    until_id: Optional[int] = None
+    id_from: Optional[int] = None
+    id_to: Optional[int] = None
+
+
+def _sources(spec: Dataset, include_archive: bool) -> List[Tuple[Any, Any]]:
+    """(資料表, engine)；封存資料表只取與主資料表相同的欄位"""
+    sources = [(spec.table, db.engine)]
+    if include_archive:
+        sources.append((spec.archive, db.engines[ARCHIVE_BIND]))
+    return sources
+
+
+def _filtered(stmt, table, spec: Dataset, window: Window):
+    if spec.watermark is not None:
+        column = table.c[spec.watermark]
+        if window.since is not None:
+            stmt = stmt.where(column > window.since)
+        if window.until is not None:
+            # 第一次匯出時，沒有活動時間的舊資料也要包含
+            stmt = stmt.where(column <= window.until if window.since is not None
+                              else or_(column <= window.until, column.is_(None)))
+    if window.since_id is not None:
+        stmt = stmt.where(table.c.id > window.since_id)
+    if window.until_id is not None:
+        stmt = stmt.where(table.c.id <= window.until_id)
+    if window.id_from is not None:
+        stmt = stmt.where(table.c.id >= window.id_from)
+    if window.id_to is not None:
+        stmt = stmt.where(table.c.id < window.id_to)
+    return stmt
+
+
+def id_bounds(name: str, window: Window, include_archive: bool = False) -> Optional[Tuple[int, int]]:
+    """符合範圍的最小與最大 id（沒有資料時為 None）"""
+    spec = dataset(name)
+    low = high = None
+    for table, engine in _sources(spec, include_archive):
+        stmt = _filtered(select(func.min(table.c.id), func.max(table.c.id)), table, spec, window)
+        with engine.connect() as conn:
+            lo, hi = conn.execute(stmt).one()
+        if lo is not None:
+            low = lo if low is None else min(low, lo)
+            high = hi if high is None else max(high, hi)
+    return None if low is None else (low, high)
+
+
+def iter_batches(name: str, window: Window, include_archive: bool = False,
+                 batch_size: int = 10000) -> Iterator[List[tuple]]:
+    """依 id 順序逐批讀取資料列（每個來源各自依 id 排序）"""
+    spec = dataset(name)
+    columns = [column.name for column in spec.table.columns]
+    for table, engine in _sources(spec, include_archive):
+        stmt = _filtered(select(*(table.c[column] for column in columns)), table, spec, window)
+        with engine.connect() as conn:
+            result = conn.execution_options(stream_results=True, yield_per=batch_size).execute(
+                stmt.order_by(table.c.id))
+            for partition in result.partitions():
+                yield partition
+
+
+# -- 寫入 ------------------------------------------------------------------
+
+def _arrow_type(column):
+    if isinstance(column.type, Boolean):
+        return pyarrow.bool_()
+    if isinstance(column.type, Integer):
+        return pyarrow.int64()
+    if isinstance(column.type, Float):
+        return pyarrow.float64()
+    if isinstance(column.type, DateTime):
+        return pyarrow.timestamp('us')
+    if isinstance(column.type, LargeBinary):
+        return pyarrow.binary()
+    return pyarrow.string()
+
+
+def arrow_schema(name: str):
+    return pyarrow.schema([(column.name, _arrow_type(column)) for column in dataset(name).table.columns])
+
+
+class NDJSONWriter:
+    """每列一個 JSON 物件；時間欄位為 ISO 8601（UTC）"""
+
+    def __init__(self, name: str, out: BinaryIO):
+        columns = list(dataset(name).table.columns)
+        self.names = [column.name for column in columns]
+        self.datetimes = [i for i, column in enumerate(columns) if isinstance(column.type, DateTime)]
+        self.encode = json.JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+        self.out = out
+
+    def write(self, rows: List[tuple]):
+        names, datetimes, encode = self.names, self.datetimes, self.encode
+        lines = []
+        for row in rows:
+            if datetimes:
+                row = list(row)
+                for i in datetimes:
+                    if row[i] is not None:
+                        row[i] = row[i].isoformat()
+            lines.append(encode(dict(zip(names, row))))
+        lines.append('')
+        self.out.write('\n'.join(lines).encode('utf-8'))
+
+    def close(self):
+        pass
+
+
+class ParquetWriter:
+    """每批寫成一個 row group（zstd 壓縮）"""
+
+    def __init__(self, name: str, out: BinaryIO):
+        self.schema = arrow_schema(name)
+        self.writer = pyarrow.parquet.ParquetWriter(out, self.schema, compression='zstd')
+
+    def write(self, rows: List[tuple]):
+        arrays = [pyarrow.array(values, type=field.type) for values, field in zip(zip(*rows), self.schema)]
+        self.writer.write_batch(pyarrow.RecordBatch.from_arrays(arrays, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+WRITERS = {'ndjson': NDJSONWriter, 'parquet': ParquetWriter}
+
+
+def write_export(name: str, fmt: str, out: BinaryIO, window: Window, include_archive: bool = False,
+                 batch_size: int = 10000) -> int:
+    """匯出到檔案物件，回傳列數"""
+    check_format(fmt)
+    writer = WRITERS[fmt](name, out)
+    rows = 0
+    for batch in iter_batches(name, window, include_archive, batch_size):
+        writer.write(batch)
+        rows += len(batch)
+    writer.close()
+    return rows
+
+
+class _ChunkSink:
+    """pyarrow 寫入的暫存區，讓 HTTP 回應可以逐塊送出"""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def stream_export(name: str, fmt: str, window: Window, include_archive: bool = False,
+                  batch_size: int = 10000) -> Iterator[bytes]:
+    """逐批產生匯出內容（HTTP 串流回應使用）"""
+    check_format(fmt)
+    sink = _ChunkSink()
+    writer = WRITERS[fmt](name, sink)
+    for batch in iter_batches(name, window, include_archive, batch_size):
+        writer.write(batch)
+        data = sink.drain()
+        if data:
+            yield data
+    writer.close()
+    yield sink.drain()
+
+
+# -- 增量與分片 --------------------------------------------------------------
+
+def incremental_window(name: str, now: Optional[datetime] = None) -> Tuple[Window, JobState]:
+    """依上次匯出的位置決定這次的範圍（水位線在匯出成功後以 commit_window 更新）"""
+    spec = dataset(name)
+    state = JobState.get(f'export:{name}')
+    if spec.watermark is not None:
+        now = now or datetime.utcnow()
+        until = now - timedelta(seconds=current_app.config['EXPORT_WATERMARK_LAG'])
+        return Window(since=state.watermark, until=until), state
+    until_id = db.session.execute(select(func.max(spec.table.c.id))).scalar() or 0
+    return Window(since_id=state.cursor, until_id=until_id), state
+
+
+def commit_window(state: JobState, window: Window):
+    if window.until is not None:
+        state.watermark = window.until
+    if window.until_id is not None:
+        state.cursor = window.until_id
+    db.session.commit()
+
+
+def partitions(bounds: Optional[Tuple[int, int]], count: int) -> List[Tuple[int, int]]:
+    """把 [最小 id, 最大 id] 切成 count 段等寬的 [id_from, id_to)"""
+    if bounds is None:
+        return []
+    low, high = bounds
+    step = max(1, -(-(high - low + 1) // max(1, count)))
+    return [(start, min(start + step, high + 1)) for start in range(low, high + 1, step)]
+
+
+_worker_app = None
+
+
+def _init_worker(overrides: dict):
+    """process pool 初始化：每個行程建立自己的應用程式與資料庫連線"""
+    global _worker_app
+    from app import create_app
+    from app.config import Config
+
+    _worker_app = create_app(type('ExportWorkerConfig', (Config,), overrides))
+    _worker_app.app_context().push()
+
+
+def _export_part(job: tuple) -> Tuple[str, int, int]:
+    name, fmt, path, window, include_archive, batch_size = job
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as out:
+        rows = write_export(name, fmt, out, window, include_archive, batch_size)
+    os.replace(tmp, path)
+    return os.path.basename(path), rows, os.path.getsize(path)
+
+
+def export_dataset(name: str, directory: str, fmt: str = 'ndjson', window: Window = Window(),
+                   include_archive: bool = False, workers: int = 1, parts: Optional[int] = None,
+                   batch_size: int = 10000) -> Dict[str, Any]:
+    """
+    匯出一個資料集到 directory/<資料集>/<時間>/（需在 app context 中呼叫）
+
+    依 id 範圍切成 parts 個分片（預設與 workers 相同），workers > 1 時以 process pool 平行寫入。
+    """
+    check_format(fmt)
+    started = time.perf_counter()
+    run_dir = os.path.join(directory, name, datetime.utcnow().strftime('%Y%m%dT%H%M%S.%f'))
+    os.makedirs(run_dir)
+    ranges = partitions(id_bounds(name, window, include_archive), parts or workers)
+    jobs = [(name, fmt, os.path.join(run_dir, f'part-{n:05d}.{fmt}'),
+             window._replace(id_from=id_from, id_to=id_to), include_archive, batch_size)
+            for n, (id_from, id_to) in enumerate(ranges)]
+    if workers <= 1 or len(jobs) <= 1:
+        results = [_export_part(job) for job in jobs]
+    else:
+        config = current_app.config
+        overrides = {key: config[key] for key in ('SQLALCHEMY_DATABASE_URI', 'ARCHIVE_DATABASE_URL', 'SECRET_KEY',
+                                                 'SQLALCHEMY_ENGINE_OPTIONS') if key in config}
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(overrides,)) as pool:
+            results = list(pool.map(_export_part, jobs))
+
+    manifest = {
+        'dataset': name,
+        'format': fmt,
+        'columns': [column.name for column in dataset(name).table.columns],
+        'since': window.since.isoformat() if window.since else None,
+        'until': window.until.isoformat() if window.until else None,
+        'since_id': window.since_id,
+        'until_id': window.until_id,
+        'include_archive': include_archive,
+        'parts': [{'file': file, 'rows': rows, 'bytes': size} for file, rows, size in results],
+        'rows': sum(rows for _, rows, _ in results),
+        'bytes': sum(size for _, _, size in results),
+    }
+    with open(os.path.join(run_dir, '_manifest.json'), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    manifest.update(directory=run_dir, seconds=time.perf_counter() - started, workers=workers)
+    return manifest
@@ -0,0 +1,93 @@
+"""
+HyperLogLog 基數估計
+
+以固定大小的暫存器陣列估計不重複元素數量；兩個草圖取逐格最大值即可合併，
+因此不同 worker、不同日期的草圖都能任意合併。精度 p 時有 2^p 個暫存器（每個 1 位元組），
+標準誤差約 1.04 / sqrt(2^p)；預設 p=12 為 4 KB、約 1.6% 誤差。
+
+序列化格式：1 位元組精度 + zlib 壓縮的暫存器。低基數時大多數暫存器為 0，壓縮後只有數十位元組。
+"""
+import hashlib
+import math
+import zlib
+from typing import Iterable, Optional
+
+DEFAULT_PRECISION = 12
+
+# 2^-r 查表，估計時不必重複計算次方
+_INVERSE_POWERS = [2.0 ** -r for r in range(65)]
+
+
+def _hash64(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+class HyperLogLog:
+    """HyperLogLog 草圖"""
+
+    __slots__ = ('precision', 'registers')
+
+    def __init__(self, precision: int = DEFAULT_PRECISION, registers: Optional[bytearray] = None):
+        if not 4 <= precision <= 16:
+            raise ValueError('precision 必須介於 4 到 16 之間')
+        self.precision = precision
+        self.registers = registers if registers is not None else bytearray(1 << precision)
+
+    @property
+    def size(self) -> int:
+        return len(self.registers)
+
+    def add(self, value: str):
+        h = _hash64(value)
+        index = h >> (64 - self.precision)
+        rest = h & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def update(self, values: Iterable[str]):
+        for value in values:
+            self.add(value)
+
+    def merge(self, other: 'HyperLogLog') -> 'HyperLogLog':
+        """就地合併另一個草圖（逐格取最大值）"""
+        if other.precision != self.precision:
+            raise ValueError('只能合併相同精度的草圖')
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    @classmethod
+    def union(cls, sketches: Iterable['HyperLogLog'], precision: int = DEFAULT_PRECISION) -> 'HyperLogLog':
+        result = cls(precision)
+        for sketch in sketches:
+            result.merge(sketch)
+        return result
+
+    def count(self) -> int:
+        """估計不重複元素數量"""
+        m = self.size
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(map(_INVERSE_POWERS.__getitem__, self.registers))
+        if estimate <= 2.5 * m:
+            # 小範圍改用線性計數
+            zeros = self.registers.count(0)
+            if zeros:
+                estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+    def is_empty(self) -> bool:
+        return not any(self.registers)
+
+    def to_bytes(self) -> bytes:
+        return bytes([self.precision]) + zlib.compress(bytes(self.registers), 1)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'HyperLogLog':
+        precision = data[0]
+        registers = bytearray(zlib.decompress(data[1:]))
+        if len(registers) != 1 << precision:
+            raise ValueError('草圖資料長度不符')
+        return cls(precision, registers)
+
+    def copy(self) -> 'HyperLogLog':
+        return HyperLogLog(self.precision, bytearray(self.registers))
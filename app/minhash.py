@@ -0,0 +1,190 @@
+"""
+MinHash 與 LSH 分段索引
+
+標題正規化（NFKC、小寫、去掉標點與空白）後取相鄰兩字為 shingle，兩個標題的相似度為 shingle 集合的
+Jaccard 係數。MinHash 以 num_perm 個雜湊函數各取最小值，兩個簽章相同位置相等的比例即為 Jaccard 的估計值。
+每個 shingle 只算一次 blake2b（64 位元組一組，切成 16 個 32 位元的值），各位置取最小值由 map(min, zip(...))
+在 C 裡完成，不必在 Python 迴圈裡做 num_perm × shingle 次乘法取餘數；
+每個值只保留低 16 位元（b-bit MinHash），每個標題 num_perm × 2 位元組，隨機碰撞機率 2^-16 可忽略。
+
+LSH：簽章切成 bands 段，每段 4 個值組成 64 位元的鍵，任一段相同即為候選。
+Jaccard 為 s 時成為候選的機率為 1 - (1 - s^4)^bands；預設 64 個值、16 段時
+s = 0.5 / 0.6 / 0.7 / 0.8 分別約 64% / 89% / 99% / 100%。
+
+每段的鍵存成排序後的 array（bisect 查詢），新增的標題先放在 dict，compact() 時才合併，
+100 萬個標題約 330 MB；save() / load() 直接寫入與讀回這些 array，不必重新計算簽章。
+"""
+import hashlib
+import math
+import operator
+import os
+import pickle
+import re
+import struct
+import unicodedata
+from array import array
+from collections import Counter
+from bisect import bisect_left, bisect_right
+from typing import Callable, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+DEFAULT_NUM_PERM = 64
+DEFAULT_BANDS = 16
+ROWS_PER_BAND = 4
+_VALUES_PER_DIGEST = 16
+_NON_WORD = re.compile(r'[\W_]+')
+
+
+def normalize(title: str) -> str:
+    return _NON_WORD.sub('', unicodedata.normalize('NFKC', title).lower())
+
+
+def shingles(title: str) -> FrozenSet[str]:
+    """正規化後相鄰兩字的集合（中文不需斷詞）"""
+    text = normalize(title)
+    if len(text) < 2:
+        return frozenset([text]) if text else frozenset()
+    return frozenset(text[i:i + 2] for i in range(len(text) - 1))
+
+
+def jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def weighted_jaccard(a: FrozenSet[str], b: FrozenSet[str], weight: Callable[[str], float]) -> float:
+    """以 weight 加權的 Jaccard：句型用字（是否、應該）權重低，主題用字權重高"""
+    union = sum(map(weight, a | b))
+    return sum(map(weight, a & b)) / union if union else 0.0
+
+
+class MinHasher:
+    """標題 → b-bit MinHash 簽章"""
+
+    def __init__(self, num_perm: int = DEFAULT_NUM_PERM):
+        if num_perm % _VALUES_PER_DIGEST:
+            raise ValueError(f'num_perm 必須是 {_VALUES_PER_DIGEST} 的倍數')
+        self.num_perm = num_perm
+        self.persons = [f'dsweb-minhash{i:02d}'.encode() for i in range(num_perm // _VALUES_PER_DIGEST)]
+        self.unpack = struct.Struct(f'<{num_perm}I').unpack
+
+    def _hashes(self, gram: str) -> Tuple[int, ...]:
+        data = gram.encode('utf-8')
+        return self.unpack(b''.join(hashlib.blake2b(data, digest_size=64, person=person).digest()
+                                    for person in self.persons))
+
+    def signature(self, grams: Iterable[str]) -> Optional[List[int]]:
+        rows = [self._hashes(gram) for gram in grams]
+        if not rows:
+            return None
+        return [value & 0xFFFF for value in map(min, zip(*rows))]
+
+
+class LSHIndex:
+    """MinHash 簽章的 LSH 分段索引（只存 id 與簽章，標題由呼叫端查詢）"""
+
+    def __init__(self, num_perm: int = DEFAULT_NUM_PERM, bands: int = DEFAULT_BANDS):
+        if bands * ROWS_PER_BAND != num_perm:
+            raise ValueError(f'num_perm 必須等於 bands × {ROWS_PER_BAND}')
+        self.num_perm = num_perm
+        self.bands = bands
+        self.hasher = MinHasher(num_perm)
+        self.ids = array('q')
+        self.signatures = array('H')
+        self.max_id = 0
+        self.df: Counter = Counter()  # shingle 出現在幾個標題中（加權驗證用，不隨移除遞減）
+        # 每段：排序後的鍵與對應的列號；尚未 compact 的新標題放在 recent
+        self.keys = [array('Q') for _ in range(bands)]
+        self.rows = [array('I') for _ in range(bands)]
+        self.recent: List[Dict[int, List[int]]] = [{} for _ in range(bands)]
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _band_keys(self, signature) -> List[int]:
+        keys = []
+        for band in range(self.bands):
+            a, b, c, d = signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND]
+            keys.append(a << 48 | b << 32 | c << 16 | d)
+        return keys
+
+    def idf(self, gram: str) -> float:
+        return math.log((len(self.ids) + 1) / (self.df.get(gram, 0) + 1)) + 1
+
+    def add(self, item_id: int, title: str) -> bool:
+        grams = shingles(title)
+        signature = self.hasher.signature(grams)
+        self.max_id = max(self.max_id, item_id)
+        if signature is None:
+            return False
+        self.df.update(grams)
+        row = len(self.ids)
+        self.ids.append(item_id)
+        self.signatures.extend(signature)
+        for band, key in enumerate(self._band_keys(signature)):
+            self.recent[band].setdefault(key, []).append(row)
+        return True
+
+    def compact(self):
+        """把 recent 合併進排序的 array（重建或儲存前呼叫，請求中不需要）"""
+        for band in range(self.bands):
+            if not self.recent[band]:
+                continue
+            pairs = list(zip(self.keys[band], self.rows[band]))
+            pairs.extend((key, row) for key, rows in self.recent[band].items() for row in rows)
+            pairs.sort()
+            self.keys[band] = array('Q', (key for key, _ in pairs))
+            self.rows[band] = array('I', (row for _, row in pairs))
+            self.recent[band] = {}
+
+    def candidates(self, signature: List[int]) -> Dict[int, int]:
+        """列號 → 相同的段數"""
+        hits: Dict[int, int] = {}
+        for band, key in enumerate(self._band_keys(signature)):
+            keys = self.keys[band]
+            start = bisect_left(keys, key)
+            if start < len(keys) and keys[start] == key:
+                for row in self.rows[band][start:bisect_right(keys, key, start)]:
+                    hits[row] = hits.get(row, 0) + 1
+            for row in self.recent[band].get(key, ()):
+                hits[row] = hits.get(row, 0) + 1
+        return hits
+
+    def estimate(self, signature: List[int], row: int) -> float:
+        start = row * self.num_perm
+        return sum(map(operator.eq, signature, self.signatures[start:start + self.num_perm])) / self.num_perm
+
+    def query(self, title: str, threshold: float, limit: int = 20) -> List[Tuple[int, float]]:
+        """估計 Jaccard 不低於 threshold 的 (id, 估計值)，由高到低"""
+        signature = self.hasher.signature(shingles(title))
+        if signature is None:
+            return []
+        matches = []
+        for row in self.candidates(signature):
+            score = self.estimate(signature, row)
+            if score >= threshold:
+                matches.append((self.ids[row], score))
+        matches.sort(key=lambda m: (-m[1], m[0]))
+        return matches[:limit]
+
+    def save(self, path: str):
+        self.compact()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp = f'{path}.{os.getpid()}.tmp'  # 多個行程同時寫入時不共用暫存檔
+        with open(tmp, 'wb') as f:
+            pickle.dump({'num_perm': self.num_perm, 'bands': self.bands, 'max_id': self.max_id,
+                         'ids': self.ids, 'signatures': self.signatures, 'df': self.df,
+                         'keys': self.keys, 'rows': self.rows}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> Optional['LSHIndex']:
+        if not os.path.exists(path):
+            return None
+        with open(path, 'rb') as f:
+            state = pickle.load(f)
+        index = cls(state['num_perm'], state['bands'])
+        index.max_id = state['max_id']
+        index.ids, index.signatures, index.df = state['ids'], state['signatures'], state['df']
+        index.keys, index.rows = state['keys'], state['rows']
+        return index
@@ -0,0 +1,56 @@
+from app import db
+from datetime import datetime
+from app.models.debate import Debate, Argument, DebateRating, DebateFollow, HallMessage
+from app.models.source import ArgumentSource
+
+ARCHIVE_BIND = 'archive'
+
+
+def _archive_table(source, name, *extra):
+    """依來源資料表建立欄位相同、不含外鍵的封存資料表"""
+    columns = [db.Column(column.name, column.type, primary_key=column.primary_key, nullable=column.nullable)
+               for column in source.columns]
+    return db.Table(name, *columns, *extra, bind_key=ARCHIVE_BIND)
+
+
+archived_debates = _archive_table(
+    Debate.__table__, 'archived_debates',
+    db.Column('archived_at', db.DateTime, default=datetime.utcnow),
+)
+
+archived_arguments = _archive_table(
+    Argument.__table__, 'archived_arguments',
+    db.Index('ix_archived_arguments_debate', 'debate_id', 'round_number', 'created_at'),
+)
+
+# 來源本身（sources）留在主資料庫，已封存的對應不計入 citation_count
+archived_argument_sources = _archive_table(
+    ArgumentSource.__table__, 'archived_argument_sources',
+    db.Index('ix_archived_argument_sources_debate', 'debate_id'),
+    db.Index('ix_archived_argument_sources_source', 'source_id'),
+)
+
+archived_debate_ratings = _archive_table(
+    DebateRating.__table__, 'archived_debate_ratings',
+    db.Index('ix_archived_debate_ratings_debate', 'debate_id'),
+)
+
+archived_debate_follows = _archive_table(
+    DebateFollow.__table__, 'archived_debate_follows',
+    db.Index('ix_archived_debate_follows_debate', 'debate_id'),
+)
+
+# 保留期過後搬出的大廳訊息（HallRetentionService 的 archive 模式），不隨辯論封存
+archived_hall_messages = _archive_table(
+    HallMessage.__table__, 'archived_hall_messages',
+    db.Index('ix_archived_hall_messages_created_at', 'created_at'),
+)
+
+# 主資料表 → 封存資料表（依寫入順序）
+ARCHIVE_TABLES = [
+    (Debate.__table__, archived_debates),
+    (Argument.__table__, archived_arguments),
+    (ArgumentSource.__table__, archived_argument_sources),
+    (DebateRating.__table__, archived_debate_ratings),
+    (DebateFollow.__table__, archived_debate_follows),
+]
@@ -0,0 +1,27 @@
+from app import db
+from datetime import datetime
+
+class BackfillJob(db.Model):
+    """線上回填工作（見 app/backfill.py）"""
+    __tablename__ = "backfill_jobs"
+
+    name = db.Column(db.String(64), primary_key=True)
+    table_name = db.Column(db.String(64), nullable=False)
+    id_min = db.Column(db.Integer, nullable=False)  # 登記時資料表的 id 範圍，之後新增的列由應用程式寫入
+    id_max = db.Column(db.Integer, nullable=False)
+    status = db.Column(db.String(10), nullable=False, default='pending')  # pending, running, done
+    rows = db.Column(db.BigInteger, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+class BackfillRange(db.Model):
+    """回填工作的一段 id 範圍 [range_start, range_end)，next_id 之前都已處理（中斷後由此繼續）"""
+    __tablename__ = "backfill_ranges"
+
+    job = db.Column(db.String(64), db.ForeignKey('backfill_jobs.name', ondelete='CASCADE'), primary_key=True)
+    range_start = db.Column(db.Integer, primary_key=True)
+    range_end = db.Column(db.Integer, nullable=False)
+    next_id = db.Column(db.Integer, nullable=False)
+    rows = db.Column(db.BigInteger, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -1,6 +1,9 @@
 from app import db
 from datetime import datetime, timedelta
 
+# 辯論分類（與發起辯論表單一致）
+DEBATE_CATEGORIES = ['科技', '社會', '環境', '政治', '教育', '經濟', '文化', '健康', '其他']
+
 class Debate(db.Model):
     """辯論模型"""
     __tablename__ = "debates"
@@ -37,12 +40,26 @@ class Debate(db.Model):
     # 統計
     views = db.Column(db.Integer, default=0)
     
+    # 熱門度：以固定起點換算的對數分數，見 HotRankingService
+    hot_score = db.Column(db.Float, nullable=False, default=0.0, server_default='0', index=True)
+    hot_views_counted = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # 已計入分數的觀看數
+    last_activity_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    
+    # 搜尋頁分面統計（GROUP BY status, category）可只掃描索引
+    __table_args__ = (
+        db.Index('ix_debates_status_category', 'status', 'category'),
+    )
+    
     # 關聯
     creator = db.relationship('User', foreign_keys=[creator_id], backref='created_debates')
     pro_participant = db.relationship('User', foreign_keys=[pro_participant_id])
     con_participant = db.relationship('User', foreign_keys=[con_participant_id])
     arguments = db.relationship('Argument', backref='debate', lazy='dynamic', cascade='all, delete-orphan')
     
+    def touch(self):
+        """標記有新活動，讓熱門度背景工作重新計算"""
+        self.last_activity_at = datetime.utcnow()
+    
     @property
     def participants_count(self):
         """參與者數量"""
@@ -61,24 +78,33 @@ class Debate(db.Model):
     @property
     def time_remaining(self):
         """剩餘時間"""
-        if self.current_deadline:
-            remaining = self.current_deadline - datetime.utcnow()
-            if remaining.total_seconds() > 0:
-                hours = int(remaining.total_seconds() // 3600)
-                minutes = int((remaining.total_seconds() % 3600) // 60)
-                if hours > 0:
-                    return f"{hours}小時{minutes}分鐘"
-                else:
-                    return f"{minutes}分鐘"
-        return None
+        return remaining_text(self.current_deadline, datetime.utcnow())
     
     @property
     def is_urgent(self):
         """是否緊急（剩餘時間少於6小時）"""
-        if self.current_deadline:
-            remaining = self.current_deadline - datetime.utcnow()
-            return remaining.total_seconds() < 6 * 3600
-        return False
+        return deadline_urgent(self.current_deadline, datetime.utcnow())
+
+
+def remaining_text(deadline, now):
+    """截止時間的剩餘時間文字（已過期或沒有截止時間時為 None），Debate 與列表頁的 DebateRow 共用"""
+    if deadline:
+        remaining = deadline - now
+        if remaining.total_seconds() > 0:
+            hours = int(remaining.total_seconds() // 3600)
+            minutes = int((remaining.total_seconds() % 3600) // 60)
+            if hours > 0:
+                return f"{hours}小時{minutes}分鐘"
+            else:
+                return f"{minutes}分鐘"
+    return None
+
+
+def deadline_urgent(deadline, now):
+    """剩餘時間是否少於 6 小時"""
+    if deadline:
+        return (deadline - now).total_seconds() < 6 * 3600
+    return False
 
 class Argument(db.Model):
     """論述模型"""
@@ -94,7 +120,12 @@ class Argument(db.Model):
     sources = db.Column(db.Text, nullable=True)  # JSON格式儲存來源
     
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)  # 增量匯出的水位線
+    
+    # 時間軸分頁依 (round_number, created_at, id) 做 keyset 查詢
+    __table_args__ = (
+        db.Index('ix_arguments_debate_round_created', 'debate_id', 'round_number', 'created_at'),
+    )
     
     # 關聯
     user = db.relationship('User', backref='arguments')
@@ -107,7 +138,8 @@ class HallMessage(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     content = db.Column(db.Text, nullable=False)
     message_type = db.Column(db.String(20), default='general')  # general, challenge
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    debate_id = db.Column(db.Integer, db.ForeignKey('debates.id'), nullable=True, index=True)  # 挑戰對應的辯論
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     
     # 關聯
     user = db.relationship('User', backref='hall_messages')
@@ -160,12 +192,19 @@ class UserStats(db.Model):
     # 專業領域
     best_categories = db.Column(db.Text, nullable=True)  # JSON格式
     
-    # 時間統計
+    # 時間統計（由 UserStatsService 隨辯論事件累加）
     total_time_debating = db.Column(db.Integer, default=0)  # 分鐘
-    average_response_time = db.Column(db.Integer, default=0)  # 分鐘
+    average_response_time = db.Column(db.Integer, default=0)  # 分鐘，= response_seconds / response_count
+    response_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # 計入平均的論述數
+    response_seconds = db.Column(db.BigInteger, nullable=False, default=0, server_default='0')  # 回應時間總和（秒）
     
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    # 每位使用者一列（累加時以 user_id upsert）
+    __table_args__ = (
+        db.UniqueConstraint('user_id', name='uq_user_stats_user_id'),
+    )
+    
     # 關聯
     user = db.relationship('User', backref=db.backref('stats', uselist=False))
     
@@ -182,7 +221,7 @@ class DebateFollow(db.Model):
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
-    debate_id = db.Column(db.Integer, db.ForeignKey('debates.id'), nullable=False)
+    debate_id = db.Column(db.Integer, db.ForeignKey('debates.id'), nullable=False, index=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     # 設定唯一約束
@@ -190,4 +229,13 @@ class DebateFollow(db.Model):
     
     # 關聯
     user = db.relationship('User', backref='followed_debates')
-    debate = db.relationship('Debate', backref='followers_rel')
\ No newline at end of file
+    debate = db.relationship('Debate', backref='followers_rel')
+
+class DebateViewSketch(db.Model):
+    """辯論不重複觀看者草圖（HyperLogLog，每日一份加上累計一份）"""
+    __tablename__ = "debate_view_sketches"
+
+    debate_id = db.Column(db.Integer, db.ForeignKey('debates.id'), primary_key=True)
+    bucket = db.Column(db.String(10), primary_key=True)  # 'YYYY-MM-DD' 或 'all'
+    sketch = db.Column(db.LargeBinary, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
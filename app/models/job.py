@@ -0,0 +1,20 @@
+from app import db
+from datetime import datetime
+
+class JobState(db.Model):
+    """背景工作狀態（增量處理的水位線與游標）"""
+    __tablename__ = "job_states"
+
+    name = db.Column(db.String(64), primary_key=True)
+    watermark = db.Column(db.DateTime, nullable=True)  # 已處理到的時間點
+    cursor = db.Column(db.Integer, nullable=True)  # 已處理到的 id
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    @staticmethod
+    def get(name: str) -> "JobState":
+        """取得工作狀態，不存在時建立（尚未提交）"""
+        state = db.session.get(JobState, name)
+        if state is None:
+            state = JobState(name=name)
+            db.session.add(state)
+        return state
@@ -0,0 +1,18 @@
+from app import db
+from datetime import datetime
+
+class ModerationFlag(db.Model):
+    """命中 flag 字詞（或重新掃描時命中任何字詞）的內容，待人工檢視，見 ModerationService"""
+    __tablename__ = "moderation_flags"
+
+    id = db.Column(db.Integer, primary_key=True)
+    content_type = db.Column(db.String(20), nullable=False)  # hall_message, argument
+    content_id = db.Column(db.Integer, nullable=False)  # 不設外鍵：訊息可能已被保留期清除或封存
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True, index=True)
+    action = db.Column(db.String(10), nullable=False)  # flag, mask, block（重新掃描時不改寫原文，mask 也只記錄）
+    terms = db.Column(db.Text, nullable=False)  # JSON 陣列，命中的字詞
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+    __table_args__ = (
+        db.UniqueConstraint('content_type', 'content_id', name='uq_moderation_flags_content'),
+    )
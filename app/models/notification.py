@@ -0,0 +1,40 @@
+from app import db
+from datetime import datetime
+
+class DebateEvent(db.Model):
+    """辯論事件（通知的來源，關注者的收件匣都指向這裡）"""
+    __tablename__ = "debate_events"
+
+    id = db.Column(db.Integer, primary_key=True)
+    debate_id = db.Column(db.Integer, db.ForeignKey('debates.id'), nullable=False)
+    kind = db.Column(db.String(32), nullable=False)  # argument_posted, participant_joined, status_changed
+    detail = db.Column(db.String(64), nullable=True)  # status_changed 時為新狀態
+    actor_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)  # 觸發事件的用戶，不通知自己
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (db.Index('ix_debate_events_debate_id', 'debate_id', 'id'),)
+
+class Notification(db.Model):
+    """收件匣（寫入時展開：每位關注者一列）"""
+    __tablename__ = "notifications"
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    event_id = db.Column(db.Integer, db.ForeignKey('debate_events.id'), primary_key=True)
+
+    __table_args__ = (db.Index('ix_notifications_event_id', 'event_id'),)
+
+class NotificationHub(db.Model):
+    """關注者眾多、改為讀取時展開的辯論；since_event_id 之後的事件不再寫入收件匣"""
+    __tablename__ = "notification_hubs"
+
+    debate_id = db.Column(db.Integer, db.ForeignKey('debates.id'), primary_key=True)
+    since_event_id = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class NotificationState(db.Model):
+    """每位用戶的未讀計數與已讀位置"""
+    __tablename__ = "notification_states"
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    unread = db.Column(db.Integer, nullable=False, default=0)  # 寫入展開的未讀數
+    read_event_id = db.Column(db.Integer, nullable=False, default=0)  # 全部標為已讀時的最新事件 id
@@ -0,0 +1,10 @@
+from app import db
+
+class DebateNeighbor(db.Model):
+    """相關辯論（預先計算的最近鄰，每場辯論最多 RELATED_TOP_K 筆，見 RelatedService）"""
+    __tablename__ = "debate_neighbors"
+
+    debate_id = db.Column(db.Integer, db.ForeignKey('debates.id'), primary_key=True)
+    rank = db.Column(db.Integer, primary_key=True)  # 0 為最相關
+    neighbor_id = db.Column(db.Integer, nullable=False, index=True)  # 不設外鍵：已封存的鄰居在查詢時由 join 濾掉
+    score = db.Column(db.Float, nullable=False)
@@ -0,0 +1,33 @@
+from app import db
+from datetime import datetime
+
+class ActivityRollup(db.Model):
+    """
+    活動彙總
+    --------
+    granularity : 'hour'、'day' 或 'all'（累計，bucket_start 固定為 ROLLUP_EPOCH）
+    bucket_start : 時間桶起點（UTC）
+    metric : 指標名稱，例如 debate_created、debate_completed、hall_message、status:ongoing
+    category : 辯論分類（大廳訊息為訊息類型）
+    count : 次數；status:* 為狀態增減量，累計值即目前各狀態的辯論數
+    """
+    __tablename__ = "activity_rollups"
+
+    granularity = db.Column(db.String(8), primary_key=True)
+    bucket_start = db.Column(db.DateTime, primary_key=True)
+    metric = db.Column(db.String(32), primary_key=True)
+    category = db.Column(db.String(50), primary_key=True, default='')
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.Index('ix_activity_rollups_metric_bucket', 'metric', 'granularity', 'bucket_start'),
+    )
+
+class RollupEvent(db.Model):
+    """已計入彙總的事件（rollups.record 背景工作重跑時略過），compact 時清除超過保留期的記錄"""
+    __tablename__ = "rollup_events"
+
+    event_id = db.Column(db.String(32), primary_key=True)
+    applied_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+ROLLUP_EPOCH = datetime(1970, 1, 1)
@@ -0,0 +1,33 @@
+from app import db
+from datetime import datetime
+
+class Source(db.Model):
+    """論述引用的資料來源（正規化後不重複，見 app/citations.py）"""
+    __tablename__ = "sources"
+
+    id = db.Column(db.Integer, primary_key=True)
+    key = db.Column(db.String(16), nullable=False, unique=True)  # citation_key(kind, canonical)
+    kind = db.Column(db.String(10), nullable=False)  # url, text
+    canonical = db.Column(db.Text, nullable=False)
+    domain = db.Column(db.String(255), nullable=True, index=True)
+    citation_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # 引用的論述數（不含已封存）
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    # 「最常被引用的來源」依引用數由大到小直接走索引
+    __table_args__ = (
+        db.Index('ix_sources_citation_count', 'citation_count'),
+    )
+
+class ArgumentSource(db.Model):
+    """論述與來源的對應"""
+    __tablename__ = "argument_sources"
+
+    argument_id = db.Column(db.Integer, db.ForeignKey('arguments.id'), primary_key=True)
+    source_id = db.Column(db.Integer, db.ForeignKey('sources.id'), primary_key=True)
+    debate_id = db.Column(db.Integer, db.ForeignKey('debates.id'), nullable=False, index=True)  # 隨辯論封存
+    position = db.Column(db.Integer, nullable=False, default=0)  # 在原文中的順序
+
+    # 「引用某個來源的所有論述」
+    __table_args__ = (
+        db.Index('ix_argument_sources_source', 'source_id', 'argument_id'),
+    )
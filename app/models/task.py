@@ -0,0 +1,27 @@
+from app import db
+
+TASKS_BIND = 'tasks'
+
+# 背景工作佇列（bind 'tasks'，預設為本機 SQLite 檔案，不經過 alembic 管理）
+# 時間欄位為 unix 秒；running 時 visible_at 是租約到期時間，到期後可被其他 worker 重新取出
+tasks = db.Table(
+    'tasks',
+    db.Column('id', db.Integer, primary_key=True),
+    db.Column('name', db.String(64), nullable=False),
+    db.Column('payload', db.Text, nullable=False),  # JSON
+    db.Column('dedup_key', db.String(128), nullable=True),
+    db.Column('state', db.String(10), nullable=False, default='queued'),  # queued, running, done, dead
+    db.Column('attempts', db.Integer, nullable=False, default=0),
+    db.Column('visible_at', db.Float, nullable=False),
+    db.Column('enqueued_at', db.Float, nullable=False),
+    db.Column('started_at', db.Float, nullable=True),
+    db.Column('finished_at', db.Float, nullable=True),
+    db.Column('claim', db.String(64), nullable=True),  # 取出這筆工作的 worker 與批次
+    db.Column('last_error', db.Text, nullable=True),
+    db.Index('ix_tasks_state_visible_at', 'state', 'visible_at'),
+    db.Index('ix_tasks_state_finished_at', 'state', 'finished_at'),
+    # 同一個去重鍵在尚未開始的工作中只會有一筆
+    db.Index('ix_tasks_dedup_key_queued', 'dedup_key', unique=True,
+             sqlite_where=db.text("state = 'queued'"), postgresql_where=db.text("state = 'queued'")),
+    bind_key=TASKS_BIND,
+)
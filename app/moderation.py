@@ -0,0 +1,287 @@
+"""
+多字串比對的內容審查（Aho-Corasick）
+
+字詞表每行一個字詞，可在字詞後以空白隔開指定動作（預設見 MODERATION_DEFAULT_ACTION）：
+    block  拒絕發表
+    mask   以遮蔽字元取代命中的字
+    flag   照常發表，另外記錄待人工檢視
+以 # 開頭的行為註解。
+
+比對前字詞與內容都先經過同一個正規化：NFKC（全形英數字轉半形、相容字元展開）、轉小寫、
+常用繁體字轉簡體（只用於比對，儲存的內容不變），並刪除空白、標點與符號：
+字詞「白痴」會命中「白癡」「白 痴」「白．痴」，字詞「baka」會命中「ＢＡＫＡ」。
+英數字詞另外要求原文中的字詞邊界：命中的前後不能緊接英數字，中間也不能跨過空白，
+因此字詞「ass」命中「ass」「A.S.S」，但不命中「class」「pass」或「was so」。
+正規化表在第一次使用時對整個 BMP 建立一次，之後每則內容只需一次 str.translate。
+
+所有字詞編譯成一個 Aho-Corasick 自動機（goto 為每個狀態一個 dict，另有失敗連結與輸出連結），
+掃描時間與內容長度成正比，與字詞數量無關；50,000 個隨機 2–4 字的字詞約 12 萬個狀態。
+命中時才把正規化後的位置換算回原文位置（遮蔽用），沒有命中的內容不需額外成本。
+"""
+import unicodedata
+from collections import deque
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+BLOCK = 'block'
+MASK = 'mask'
+FLAG = 'flag'
+ALLOW = 'allow'
+ACTIONS = (BLOCK, MASK, FLAG)
+SEVERITY = {ALLOW: 0, FLAG: 1, MASK: 2, BLOCK: 3}
+
+# 常用繁體字 → 簡體字（逐字對應，只用於比對；可以 load_variants 補充）
+_TRADITIONAL = (
+    '萬與專業東絲兩嚴喪個豐臨為麗舉義烏樂喬習鄉書買亂爭於虧雲亞產畝親億僅從倉儀們價眾優會傘偉傳傷倫偽體餘'
+    '俠侶偵側僑儂係倆儉債傾償儲兒兌黨蘭關興養獸內岡冊寫軍農馮衝決況凍淨涼減湊幾鳳憑凱擊劃劉則剛創刪別劑劍'
+    '劇勸辦務動勵勁勞勢勛勻華協單賣盧衛卻廠廳曆歷厲壓厭縣參雙發髮變敘疊號嘆嚇嗎啟吳員聽嗚響啞問啊喚喲嘍嗆'
+    '囉團園圍國圖圓場壞塊堅壇壩墳墜夠夢頭夾奪奮奧婦媽嬌孫學寧寶實審憲宮寬對尋導將專尷屆屍層屬歲豈島峽崗嶺'
+    '巖幣帥師帳帶幫幹並廣莊慶廢廟應廬開異棄張彈強歸當錄徹徑復從徵德憶態悶惡慮憂愛慣憤懷懶戀戰戲戶拋掛採揀'
+    '擔據擁擇撥擋擠擴擾攝攤敵數斷無舊時晝顯曬暫書會條來楊極構槍樣樓標樹橋機檢權歡殘殺殼毀氣漢湯溝滅滿漁潔'
+    '濃濕灣滾滯漲潛澤濟瀉災爐炮為烏無煙煩熱燒燈營爺牆獄獨獲獵猶貓狀猶獻環現瑣畢畫當瘋療癢癡發盜盞監盡盤盧'
+    '眾睏睜矚碼礎確礙禮禍禪離種稱穩窮竊筆築簡簽籃籌類糧糞緊紅約級紀紋納純紙紛素紡線細終組結給絕統絲經綁綠維'
+    '綱網緒線練績續總織繼纖纜罰罵羅習翹聖聞聯聲職聽肅腦膚膠腳臉興舊艙艦艱藝節範蘭藥蘋萊華蓋蓮薦蕭薩虛蟲蠟蠻'
+    '術衝補裝裡複製褲規覺覽觀視親說誰課調談請諒論諸謀謂講謊謝證識譯議護讀變讓讚豬貓貝負貢財責賢敗貨質販貪貧'
+    '購貯貴買貸費賀資賊賓賜賞賠賢賤賴賺賽贈贊贏趕趙趨跡踐蹤躍車軌軟較載輔輕輛輝輪輸轉轟辭遲邊達運過違遠遞選'
+    '遺還適遷邏鄧醫醬釋針釘鈔鈴鉛銀銅銷鋪鋒鋼錯錢錦錶鍋鍵鎖鎮鏡鐘鐵鑰長門閃閉開閒間閱闆闊闖關陣陰陳陸陽隊階'
+    '際隨險隱雞雖雙雜離難雲電霧靈靜韓韌頁頂項順須頓預領頻題額顏願類顧風飛飯飲飽飾館馬駕駛騎騙驅驗驚髒體鬥鬧'
+    '魚魯鮮鳥鳴鴨鵝鹽麥黃點黨齊齒龍龜臺檯颱裏著啓爲衆綫峯囪牀粧'
+)
+_SIMPLIFIED = (
+    '万与专业东丝两严丧个丰临为丽举义乌乐乔习乡书买乱争于亏云亚产亩亲亿仅从仓仪们价众优会伞伟传伤伦伪体余'
+    '侠侣侦侧侨侬系俩俭债倾偿储儿兑党兰关兴养兽内冈册写军农冯冲决况冻净凉减凑几凤凭凯击划刘则刚创删别剂剑'
+    '剧劝办务动励劲劳势勋匀华协单卖卢卫却厂厅历历厉压厌县参双发发变叙叠号叹吓吗启吴员听呜响哑问啊唤哟喽呛'
+    '啰团园围国图圆场坏块坚坛坝坟坠够梦头夹夺奋奥妇妈娇孙学宁宝实审宪宫宽对寻导将专尴届尸层属岁岂岛峡岗岭'
+    '岩币帅师帐带帮干并广庄庆废庙应庐开异弃张弹强归当录彻径复从征德忆态闷恶虑忧爱惯愤怀懒恋战戏户抛挂采拣'
+    '担据拥择拨挡挤扩扰摄摊敌数断无旧时昼显晒暂书会条来杨极构枪样楼标树桥机检权欢残杀壳毁气汉汤沟灭满渔洁'
+    '浓湿湾滚滞涨潜泽济泻灾炉炮为乌无烟烦热烧灯营爷墙狱独获猎犹猫状犹献环现琐毕画当疯疗痒痴发盗盏监尽盘卢'
+    '众困睁瞩码础确碍礼祸禅离种称稳穷窃笔筑简签篮筹类粮粪紧红约级纪纹纳纯纸纷素纺线细终组结给绝统丝经绑绿维'
+    '纲网绪线练绩续总织继纤缆罚骂罗习翘圣闻联声职听肃脑肤胶脚脸兴旧舱舰艰艺节范兰药苹莱华盖莲荐萧萨虚虫蜡蛮'
+    '术冲补装里复制裤规觉览观视亲说谁课调谈请谅论诸谋谓讲谎谢证识译议护读变让赞猪猫贝负贡财责贤败货质贩贪贫'
+    '购贮贵买贷费贺资贼宾赐赏赔贤贱赖赚赛赠赞赢赶赵趋迹践踪跃车轨软较载辅轻辆辉轮输转轰辞迟边达运过违远递选'
+    '遗还适迁逻邓医酱释针钉钞铃铅银铜销铺锋钢错钱锦表锅键锁镇镜钟铁钥长门闪闭开闲间阅板阔闯关阵阴陈陆阳队阶'
+    '际随险隐鸡虽双杂离难云电雾灵静韩韧页顶项顺须顿预领频题额颜愿类顾风飞饭饮饱饰馆马驾驶骑骗驱验惊脏体斗闹'
+    '鱼鲁鲜鸟鸣鸭鹅盐麦黄点党齐齿龙龟台台台里着启为众线峰囱床妆'
+)
+assert len(_TRADITIONAL) == len(_SIMPLIFIED)
+
+_variants: Dict[str, str] = {t: s for t, s in zip(_TRADITIONAL, _SIMPLIFIED) if t != s}
+_table: Optional[Dict[int, Optional[str]]] = None
+
+
+class ContentBlocked(ValueError):
+    """內容命中 block 字詞"""
+
+    def __init__(self, terms: List[str]):
+        super().__init__('內容包含不允許的字詞')
+        self.terms = terms
+
+
+class Match(NamedTuple):
+    term: str  # 字詞表中的原字詞
+    action: str
+    start: int  # 原文位置 [start, end)
+    end: int
+
+
+class Verdict(NamedTuple):
+    action: str  # 最嚴重的動作，沒有命中時為 allow
+    content: str  # 遮蔽後的內容
+    matches: List[Match]
+
+    def terms(self, *actions: str) -> List[str]:
+        return sorted({m.term for m in self.matches if not actions or m.action in actions})
+
+
+def load_variants(pairs: Iterable[Tuple[str, str]]):
+    """補充異體字對應（例如從檔案讀入的「臺 台」），需在第一次比對前呼叫"""
+    global _table
+    for source, target in pairs:
+        if len(source) == 1 and source != target:
+            _variants[source] = target
+    _table = None
+
+
+def _build_table() -> Dict[int, Optional[str]]:
+    table: Dict[int, Optional[str]] = {}
+    for code in range(0x10000):
+        ch = chr(code)
+        if 0xD800 <= code <= 0xDFFF:
+            continue
+        folded = ''.join(_variants.get(c, c) for c in unicodedata.normalize('NFKC', ch).lower()
+                         if c.isalnum())
+        if folded != ch:
+            table[code] = folded or None
+    return table
+
+
+def fold(text: str) -> str:
+    """比對用的正規化（見模組說明）"""
+    global _table
+    if _table is None:
+        _table = _build_table()
+    return text.translate(_table)
+
+
+def _is_word(ch: str) -> bool:
+    """原文字元正規化後是否為英數字（scan 已先呼叫過 fold，對照表必定已建立）"""
+    folded = _table.get(ord(ch), ch)
+    return bool(folded) and folded.isascii() and folded.isalnum()
+
+
+def _latin(ch: str) -> bool:
+    return ch.isascii() and ch.isalnum()
+
+
+def _positions(text: str) -> List[int]:
+    """正規化後每個字對應的原文位置"""
+    positions = []
+    get = _table.get  # scan 已先呼叫過 fold，對照表必定已建立
+    for i, ch in enumerate(text):
+        folded = get(ord(ch), ch)
+        if folded:
+            positions.extend([i] * len(folded))
+    return positions
+
+
+def parse_wordlist(lines: Iterable[str], default_action: str = MASK) -> Dict[str, str]:
+    """字詞 → 動作（同一個字詞出現多次時取最嚴重的動作）"""
+    words: Dict[str, str] = {}
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        parts = line.rsplit(None, 1)
+        if len(parts) == 2 and parts[1].lower() in ACTIONS:
+            word, action = parts[0], parts[1].lower()
+        else:
+            word, action = line, default_action
+        if SEVERITY[action] > SEVERITY[words.get(word, ALLOW)]:
+            words[word] = action
+    return words
+
+
+class Automaton:
+    """Aho-Corasick 自動機（字詞需已正規化）"""
+
+    __slots__ = ('goto', 'fail', 'output', 'link')
+
+    def __init__(self, patterns: Iterable[str]):
+        goto: List[Dict[str, int]] = [{}]
+        output = [-1]  # 狀態 → 結束於此的字詞編號
+        for number, pattern in enumerate(patterns):
+            state = 0
+            for ch in pattern:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = goto[state][ch] = len(goto)
+                    goto.append({})
+                    output.append(-1)
+                state = nxt
+            if output[state] < 0:
+                output[state] = number
+
+        # 依深度建立失敗連結與輸出連結（最近的、本身為字詞結尾的失敗狀態）
+        fail = [0] * len(goto)
+        link = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in goto[state].items():
+                queue.append(nxt)
+                f = fail[state]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                target = goto[f].get(ch, 0) if state else 0
+                fail[nxt] = target
+                link[nxt] = target if output[target] >= 0 else link[target]
+        self.goto, self.fail, self.output, self.link = goto, fail, output, link
+
+    def __len__(self) -> int:
+        return len(self.goto)
+
+    def search(self, text: str) -> List[Tuple[int, int]]:
+        """(結束位置, 字詞編號)，text 需已正規化"""
+        goto, fail, output, link = self.goto, self.fail, self.output, self.link
+        root = goto[0]
+        found = []
+        state = 0
+        for position, ch in enumerate(text):
+            if state:
+                while state and ch not in goto[state]:
+                    state = fail[state]
+                state = goto[state].get(ch, 0)
+            else:
+                state = root.get(ch, 0)
+                if not state:
+                    continue
+            hit = state if output[state] >= 0 else link[state]
+            while hit:
+                found.append((position, output[hit]))
+                hit = link[hit]
+        return found
+
+
+class Moderator:
+    """編譯好的字詞表"""
+
+    def __init__(self, words: Dict[str, str], mask_char: str = '＊'):
+        self.mask_char = mask_char
+        self.terms: List[str] = []
+        self.actions: List[str] = []
+        self.lengths: List[int] = []
+        # 字詞開頭 / 結尾是否為英數字（需檢查邊界），以及是否整個為英數字（不可跨過空白）
+        self.bounds: List[Tuple[bool, bool, bool]] = []
+        folded: Dict[str, int] = {}
+        for word, action in words.items():
+            key = fold(word)
+            if not key:
+                continue
+            if key in folded:  # 正規化後相同的字詞合併，取最嚴重的動作
+                number = folded[key]
+                if SEVERITY[action] > SEVERITY[self.actions[number]]:
+                    self.actions[number] = action
+                continue
+            folded[key] = len(self.terms)
+            self.terms.append(word)
+            self.actions.append(action)
+            self.lengths.append(len(key))
+            self.bounds.append((_latin(key[0]), _latin(key[-1]), all(map(_latin, key))))
+        self.automaton = Automaton(folded)
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+    def _bounded(self, text: str, number: int, start: int, end: int) -> bool:
+        """英數字詞在原文中的命中是否位於字詞邊界"""
+        left, right, latin = self.bounds[number]
+        if left and start > 0 and _is_word(text[start - 1]):
+            return False
+        if right and end < len(text) and _is_word(text[end]):
+            return False
+        return not (latin and any(ch.isspace() for ch in text[start:end]))
+
+    def scan(self, text: str) -> List[Match]:
+        hits = self.automaton.search(fold(text))
+        if not hits:
+            return []
+        positions = _positions(text)
+        matches = []
+        for end, number in hits:
+            start, stop = positions[end - self.lengths[number] + 1], positions[end] + 1
+            if any(self.bounds[number]) and not self._bounded(text, number, start, stop):
+                continue
+            matches.append(Match(self.terms[number], self.actions[number], start, stop))
+        return matches
+
+    def review(self, text: str) -> Verdict:
+        matches = self.scan(text)
+        if not matches:
+            return Verdict(ALLOW, text, [])
+        action = max((m.action for m in matches), key=SEVERITY.__getitem__)
+        masked = [m for m in matches if m.action == MASK]
+        if masked:
+            chars = list(text)
+            for m in masked:
+                chars[m.start:m.end] = self.mask_char * (m.end - m.start)
+            text = ''.join(chars)
+        return Verdict(action, text, matches)
@@ -0,0 +1,234 @@
+"""
+版本化的 JSON API（/api/v1）- 行動版用戶端使用
+
+    GET /api/v1/debates                    辯論列表（新到舊，?status= ?category= 篩選，?before=<id> 翻頁）
+    GET /api/v1/debates?ids=1,2,3          依 id 批次取得（一次查詢），找不到的 id 列在 missing
+    GET /api/v1/debates/<id>
+    GET /api/v1/debates/<id>/arguments     論述（依發表順序，?after=<id> 翻頁）
+    GET /api/v1/arguments?ids=1,2,3
+    GET /api/v1/hall-messages              大廳訊息（新到舊，?before=<id> 翻頁）
+    GET /api/v1/sources/top                最常被引用的來源（?kind=url|text ?domain=）
+    GET /api/v1/sources?ref=<網址或引用>   查詢單一來源（正規化後比對）
+    GET /api/v1/sources/<id>/arguments     引用該來源的論述（?after=<id> 翻頁）
+    GET /api/v1/users/<id>/stats
+    GET /api/v1/user-stats?ids=1,2,3       依使用者 id 批次取得
+
+所有端點都支援：
+    ?fields=id,title     只回傳指定欄位（查詢也只取這些欄位；主鍵一律包含）
+    ?limit=              列表筆數（預設 API_PAGE_SIZE，上限 API_MAX_PAGE_SIZE）
+    Accept               application/json 或 application/msgpack，見 app/encoding.py
+    If-None-Match        回應附 ETag，內容未變時回傳 304
+回應格式為 {"data": ...}，列表另有 "next"（下一頁的游標，沒有下一頁時為 null）；錯誤為 {"error": "..."}。
+只提供讀取，且只包含未封存的資料。
+"""
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from flask import Blueprint, Response, current_app, request
+from sqlalchemy import desc, select
+
+from app import db
+from app.compression import cacheable
+from app.encoding import JSON, encode, negotiate
+from app.models.debate import Argument, Debate, HallMessage, UserStats
+from app.services.citation_service import CitationService
+
+api_v1_bp = Blueprint('api_v1', __name__)
+
+
+class Resource(NamedTuple):
+    table: Any
+    key: str  # 批次查詢與一律回傳的欄位
+    fields: Tuple[str, ...]  # 可透過 ?fields= 選擇的欄位（未指定時全部回傳）
+
+
+def _columns(model, *exclude: str) -> Tuple[str, ...]:
+    return tuple(column.name for column in model.__table__.columns if column.name not in exclude)
+
+
+DEBATES = Resource(Debate.__table__, 'id', _columns(Debate, 'hot_views_counted'))
+ARGUMENTS = Resource(Argument.__table__, 'id', _columns(Argument))
+HALL_MESSAGES = Resource(HallMessage.__table__, 'id', _columns(HallMessage))
+USER_STATS = Resource(UserStats.__table__, 'user_id', _columns(UserStats, 'id'))
+
+
+class ApiError(Exception):
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+@api_v1_bp.errorhandler(ApiError)
+def _api_error(error: ApiError):
+    return Response(encode({'error': error.message}, JSON), status=error.status, mimetype=JSON)
+
+
+# -- 參數 ------------------------------------------------------------------
+
+def _fields(resource: Resource) -> Tuple[str, ...]:
+    requested = request.args.get('fields')
+    if not requested:
+        return resource.fields
+    names = [name.strip() for name in requested.split(',') if name.strip()]
+    unknown = [name for name in names if name not in resource.fields]
+    if unknown:
+        raise ApiError(f'未知的欄位：{", ".join(unknown)}（可用：{", ".join(resource.fields)}）')
+    return tuple(dict.fromkeys([resource.key, *names]))
+
+
+def _ids() -> Optional[List[int]]:
+    raw = request.args.get('ids')
+    if raw is None:
+        return None
+    try:
+        ids = list(dict.fromkeys(int(part) for part in raw.split(',') if part.strip()))
+    except ValueError:
+        raise ApiError('ids 必須是以逗號分隔的整數')
+    if len(ids) > current_app.config['API_MAX_BATCH_IDS']:
+        raise ApiError(f"ids 最多 {current_app.config['API_MAX_BATCH_IDS']} 個")
+    return ids
+
+
+def _limit() -> int:
+    limit = request.args.get('limit', current_app.config['API_PAGE_SIZE'], type=int)
+    return max(1, min(limit, current_app.config['API_MAX_PAGE_SIZE']))
+
+
+# -- 查詢與回應 ------------------------------------------------------------
+
+def _select(resource: Resource, fields: Tuple[str, ...]):
+    return select(*(resource.table.c[name] for name in fields))
+
+
+def _fetch(stmt, fields: Tuple[str, ...]) -> List[Dict[str, Any]]:
+    return [dict(zip(fields, row)) for row in db.session.execute(stmt)]
+
+
+def _respond(payload: Dict[str, Any]) -> Response:
+    mimetype = negotiate(request.accept_mimetypes)
+    if mimetype is None:
+        raise ApiError('不支援的格式（可用：application/json、application/msgpack）', 406)
+    response = Response(encode(payload, mimetype), mimetype=mimetype)
+    response.vary.add('Accept')
+    return cacheable(response)
+
+
+def _batch(resource: Resource, ids: List[int]) -> Response:
+    """依 ids 的順序回傳（一次 IN 查詢）"""
+    fields = _fields(resource)
+    key = resource.table.c[resource.key]
+    rows = _fetch(_select(resource, fields).where(key.in_(ids)), fields) if ids else []
+    by_key = {row[resource.key]: row for row in rows}
+    return _respond({'data': [by_key[i] for i in ids if i in by_key],
+                     'missing': [i for i in ids if i not in by_key]})
+
+
+def _one(resource: Resource, value: int) -> Response:
+    fields = _fields(resource)
+    rows = _fetch(_select(resource, fields).where(resource.table.c[resource.key] == value).limit(1), fields)
+    if not rows:
+        raise ApiError('找不到資料', 404)
+    return _respond({'data': rows[0]})
+
+
+def _page(resource: Resource, *criteria, newest_first: bool = True) -> Response:
+    """以 id 做 keyset 分頁：新到舊時以 ?before= 往前翻，舊到新時以 ?after= 往後翻"""
+    fields = _fields(resource)
+    limit = _limit()
+    key = resource.table.c.id
+    cursor = request.args.get('before' if newest_first else 'after', type=int)
+    criteria = list(criteria)
+    if cursor is not None:
+        criteria.append(key < cursor if newest_first else key > cursor)
+    stmt = (select(key, *(resource.table.c[name] for name in fields if name != 'id'))
+            .where(*criteria).order_by(desc(key) if newest_first else key).limit(limit + 1))
+    rows = db.session.execute(stmt).all()
+    names = ('id', *(name for name in fields if name != 'id'))
+    data = [dict(zip(names, row)) for row in rows[:limit]]
+    return _respond({'data': data, 'next': rows[limit - 1].id if len(rows) > limit else None})
+
+
+# -- 端點 ------------------------------------------------------------------
+
+@api_v1_bp.route('/debates')
+def debates():
+    """辯論列表或批次取得"""
+    ids = _ids()
+    if ids is not None:
+        return _batch(DEBATES, ids)
+    criteria = []
+    if request.args.getlist('status'):
+        criteria.append(Debate.__table__.c.status.in_(request.args.getlist('status')))
+    if request.args.getlist('category'):
+        criteria.append(Debate.__table__.c.category.in_(request.args.getlist('category')))
+    return _page(DEBATES, *criteria)
+
+
+@api_v1_bp.route('/debates/<int:debate_id>')
+def debate(debate_id: int):
+    return _one(DEBATES, debate_id)
+
+
+@api_v1_bp.route('/debates/<int:debate_id>/arguments')
+def debate_arguments(debate_id: int):
+    exists = db.session.execute(select(Debate.__table__.c.id).where(Debate.__table__.c.id == debate_id)).first()
+    if exists is None:
+        raise ApiError('找不到辯論', 404)
+    return _page(ARGUMENTS, ARGUMENTS.table.c.debate_id == debate_id, newest_first=False)
+
+
+@api_v1_bp.route('/arguments')
+def arguments():
+    ids = _ids()
+    if ids is None:
+        raise ApiError('請以 ids 指定論述，或使用 /debates/<id>/arguments')
+    return _batch(ARGUMENTS, ids)
+
+
+@api_v1_bp.route('/hall-messages')
+def hall_messages():
+    ids = _ids()
+    if ids is not None:
+        return _batch(HALL_MESSAGES, ids)
+    return _page(HALL_MESSAGES)
+
+
+@api_v1_bp.route('/sources/top')
+def top_sources():
+    return _respond({'data': CitationService.top_sources(_limit(), kind=request.args.get('kind'),
+                                                          domain=request.args.get('domain'))})
+
+
+@api_v1_bp.route('/sources')
+def source_lookup():
+    reference = request.args.get('ref', '').strip()
+    if not reference:
+        raise ApiError('請以 ref 指定網址或引用文字')
+    source = CitationService.find(reference)
+    if source is None:
+        raise ApiError('找不到來源', 404)
+    return _respond({'data': source})
+
+
+@api_v1_bp.route('/sources/<int:source_id>/arguments')
+def source_arguments(source_id: int):
+    limit = _limit()
+    ids = CitationService.citing_arguments(source_id, limit + 1, after_id=request.args.get('after', 0, type=int))
+    fields = _fields(ARGUMENTS)
+    rows = _fetch(_select(ARGUMENTS, fields).where(ARGUMENTS.table.c.id.in_(ids[:limit])), fields) if ids else []
+    by_id = {row['id']: row for row in rows}
+    return _respond({'data': [by_id[i] for i in ids[:limit] if i in by_id],
+                     'next': ids[limit - 1] if len(ids) > limit else None})
+
+
+@api_v1_bp.route('/users/<int:user_id>/stats')
+def user_stats(user_id: int):
+    return _one(USER_STATS, user_id)
+
+
+@api_v1_bp.route('/user-stats')
+def user_stats_batch():
+    ids = _ids()
+    if ids is None:
+        raise ApiError('請以 ids 指定使用者')
+    return _batch(USER_STATS, ids)
@@ -1,4 +1,3 @@
-import requests
 import urllib.parse
 from flask import Blueprint, render_template, redirect, request, url_for, session, current_app, flash
 from app import db
@@ -25,6 +24,9 @@ def login():
 
 @auth_bp.route("/callback")
 def callback():
+    # requests 載入成本不低，只有 OAuth 回呼會用到
+    import requests
+    
     code = request.args.get("code")
     state = request.args.get("state")
     error = request.args.get("error")
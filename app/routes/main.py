@@ -1,12 +1,66 @@
-from flask import Blueprint, render_template, request, session, redirect, url_for, flash, jsonify
+from flask import Blueprint, Response, abort, current_app, render_template, stream_template, stream_with_context, request, session, redirect, url_for, flash, get_flashed_messages, jsonify
 from datetime import datetime, timedelta
+import hmac
 from app import db
 from app.models.user import User
-from app.models.debate import Debate, HallMessage, Argument
-from sqlalchemy import func, desc, or_
+from app.models.debate import Debate, HallMessage, Argument, DebateFollow, DEBATE_CATEGORIES
+from app.services.debate_service import DebateService, HallService, ArgumentTimelineService
+from app.services.rollup_service import RollupService
+from app.services.archive_service import ArchiveService
+from app.services.view_counter import ViewCounter
+from app.services.notification_service import NotificationService
+from app.services.related_service import RelatedService
+from app.services.duplicate_service import DuplicateService
+from app.services.suggest_service import SuggestService
+from app.services.search_facets import SearchFacetService
+from app.services.listing_service import ListingService
+from app.services.user_stats_service import UserStatsService
+from app.compression import cacheable
+from app.snapshots import serve_snapshot, build_later
+from app.moderation import ContentBlocked
+from app.export import ExportError, MIMETYPES, Window, check_format, dataset, stream_export
+from sqlalchemy import func, desc
+from sqlalchemy.orm import joinedload
 
 main_bp = Blueprint('main', __name__)
 
+# 詳情頁每批載入的論述數
+ARGUMENT_CHUNK_SIZE = 100
+# 串流輸出時累積到此大小（字元）才送出一塊，避免 Jinja 的細碎輸出
+STREAM_BUFFER_SIZE = 8192
+
+# 大廳通知列表的圖示與顏色（依事件種類或新狀態）
+NOTIFICATION_STYLES = {
+    'argument_posted': ('comments', 'info'),
+    'participant_joined': ('user-plus', 'primary'),
+    'ongoing': ('play-circle', 'primary'),
+    'judging': ('gavel', 'warning'),
+    'completed': ('trophy', 'success'),
+}
+
+def _time_ago(moment):
+    """相對時間文字"""
+    seconds = int((datetime.utcnow() - moment).total_seconds())
+    if seconds < 60:
+        return '剛剛'
+    if seconds < 3600:
+        return f'{seconds // 60}分鐘前'
+    if seconds < 86400:
+        return f'{seconds // 3600}小時前'
+    return f'{seconds // 86400}天前'
+
+def _buffered(chunks, size=STREAM_BUFFER_SIZE):
+    """將模板串流合併成較大的區塊"""
+    buffer, buffered = [], 0
+    for chunk in chunks:
+        buffer.append(chunk)
+        buffered += len(chunk)
+        if buffered >= size:
+            yield ''.join(buffer)
+            buffer, buffered = [], 0
+    if buffer:
+        yield ''.join(buffer)
+
 @main_bp.route('/')
 def index():
     """首頁"""
@@ -37,14 +91,11 @@ def index():
 @main_bp.route('/debate-board')
 def debate_board():
     """辯論看板 - 重新設計的主頁面"""
-    # 獲取統計數據
-    waiting_count = Debate.query.filter_by(status='waiting').count() or 12
-    ongoing_count = Debate.query.filter_by(status='ongoing').count() or 8
-    completed_count = Debate.query.filter_by(status='completed').count() or 156
-    total_participants = 245  # 示例數據
-    
-    # 獲取熱門辯論（按觀看數排序）
-    hot_debates = Debate.query.order_by(desc(Debate.views)).limit(4).all()
+    # 獲取統計數據（活動彙總）
+    stats = RollupService.dashboard()
+    
+    # 獲取熱門辯論（記憶體內熱門榜，依時間衰減熱門分數排序）
+    hot_debates = ListingService.hot_debates(4)
     if not hot_debates:
         # 示例數據
         hot_debates = [
@@ -59,7 +110,7 @@ def debate_board():
         ]
     
     # 獲取最新辯論
-    latest_debates = Debate.query.order_by(desc(Debate.created_at)).limit(6).all()
+    latest_debates = ListingService.latest_debates(6)
     if not latest_debates:
         # 示例數據
         latest_debates = [
@@ -74,22 +125,14 @@ def debate_board():
         ]
     
     # 分類統計
-    categories = [
-        {'name': '科技', 'count': 45},
-        {'name': '社會', 'count': 38},
-        {'name': '環境', 'count': 29},
-        {'name': '政治', 'count': 22},
-        {'name': '教育', 'count': 31},
-        {'name': '經濟', 'count': 19},
-        {'name': '文化', 'count': 12},
-        {'name': '健康', 'count': 16}
-    ]
+    created_by_category = RollupService.by_category('debate_created')
+    categories = [{'name': name, 'count': created_by_category.get(name, 0)} for name in DEBATE_CATEGORIES]
     
     return render_template('debate_board.html',
-                         waiting_count=waiting_count,
-                         ongoing_count=ongoing_count,
-                         completed_count=completed_count,
-                         total_participants=total_participants,
+                         waiting_count=stats['waiting'],
+                         ongoing_count=stats['ongoing'],
+                         completed_count=stats['completed'],
+                         total_participants=stats['total_participants'],
                          hot_debates=hot_debates,
                          latest_debates=latest_debates,
                          categories=categories)
@@ -110,74 +153,62 @@ def search_debates():
     per_page = 10
     sort_by = request.args.get('sort', 'newest')
     
-    # 構建查詢
-    query = Debate.query
+    # 構建查詢條件
+    criteria = []
     
     # 搜尋條件
     if search_query:
-        query = query.filter(
-            or_(
-                Debate.title.contains(search_query),
-                Debate.description.contains(search_query)
-            )
-        )
+        criteria.append(SearchFacetService.text_filter(search_query))
     
     # 狀態篩選
     if selected_filters['status']:
-        query = query.filter(Debate.status.in_(selected_filters['status']))
+        criteria.append(Debate.status.in_(selected_filters['status']))
     
     # 分類篩選
     if selected_filters['category']:
-        query = query.filter(Debate.category.in_(selected_filters['category']))
+        criteria.append(Debate.category.in_(selected_filters['category']))
     
     # 排序
     if sort_by == 'hot':
-        query = query.order_by(desc(Debate.views))
+        order_by = desc(Debate.hot_score)
     elif sort_by == 'urgent':
-        query = query.filter(Debate.status == 'ongoing').order_by(Debate.current_deadline)
+        criteria.append(Debate.status == 'ongoing')
+        order_by = Debate.current_deadline
     else:  # newest
-        query = query.order_by(desc(Debate.created_at))
-    
-    # 分頁
-    debates_pagination = query.paginate(page=page, per_page=per_page, error_out=False)
-    debates = debates_pagination.items
-    
-    # 為每個辯論添加額外信息
-    for debate in debates:
-        # 計算緊急狀態
-        if debate.status == 'ongoing' and debate.current_deadline:
-            remaining = debate.current_deadline - datetime.utcnow()
-            debate._is_urgent = remaining.total_seconds() < 6 * 3600
-        else:
-            debate._is_urgent = False
-        
-        # 添加統計數據（示例）
-        if not hasattr(debate, 'views') or debate.views is None:
-            debate.views = 42
-        debate._arguments_count = 8
-        debate._followers = 15
-    
-    # 分類統計
-    categories = [
-        {'name': '科技', 'count': 45},
-        {'name': '社會', 'count': 38},
-        {'name': '環境', 'count': 29},
-        {'name': '政治', 'count': 22},
-        {'name': '教育', 'count': 31},
-        {'name': '經濟', 'count': 19},
-        {'name': '文化', 'count': 12},
-        {'name': '健康', 'count': 16}
-    ]
+        order_by = desc(Debate.created_at)
+    
+    # 分面統計與總數都來自同一個（快取的）GROUP BY，分頁不必再執行 COUNT
+    matrix = SearchFacetService.matrix(search_query)
+    facets = SearchFacetService.facets(matrix, selected_filters['status'], selected_filters['category'])
+    statuses = selected_filters['status'] or None
+    if sort_by == 'urgent':  # 只列出進行中的辯論
+        statuses = ['ongoing'] if statuses is None or 'ongoing' in statuses else []
+    total_debates = SearchFacetService.total(matrix, statuses, selected_filters['category'] or None)
+    total_pages = (total_debates + per_page - 1) // per_page
+    # 只查列表需要的欄位（含論述數與關注數），緊急狀態與剩餘時間在 DebateRow 中算好
+    debates = ListingService.debates(*criteria, order_by=order_by, offset=(max(page, 1) - 1) * per_page,
+                                     limit=per_page, with_counts=True)
     
     return render_template('search_debates.html',
                          debates=debates,
-                         categories=categories,
+                         categories=facets['category'],
+                         status_counts=facets['status'],
                          selected_filters=selected_filters,
                          search_query=search_query,
                          sort_by=sort_by,
                          current_page=page,
-                         total_pages=debates_pagination.pages,
-                         total_debates=debates_pagination.total)
+                         pagination_args={k: v for k, v in request.args.lists() if k != 'page'},
+                         total_pages=total_pages,
+                         total_debates=total_debates)
+
+@main_bp.route('/api/search/suggest')
+def search_suggest():
+    """搜尋框輸入時的自動完成：以輸入文字開頭的熱門辯論標題與分類"""
+    query = request.args.get('q', '').strip()
+    limit = request.args.get('limit', 8, type=int)
+    if not query:
+        return jsonify({'success': True, 'debates': [], 'categories': []})
+    return jsonify({'success': True, **SuggestService.suggest(query[:50], limit)})
 
 @main_bp.route('/create')
 def create_debate_page():
@@ -191,26 +222,114 @@ def create_debate_page():
 @main_bp.route('/debate/<int:debate_id>')
 def debate_detail(debate_id):
     """辯論詳情頁"""
-    debate = Debate.query.get_or_404(debate_id)
-    
-    # 增加觀看次數
-    debate.views = (debate.views or 0) + 1
-    db.session.commit()
-    
-    # 這裡把論述依照 created_at 排序好
-    arguments = debate.arguments.order_by(Argument.created_at.desc()).all()
-    
+    # 已完成辯論對匿名訪客直接回應預先渲染的快照，不經過 ORM；沒有快照時排入背景產生，這次照常動態渲染
+    use_snapshot = (current_app.config['SNAPSHOTS_ENABLED'] and
+                    not session.get('user_id') and not session.get('_flashes'))
+    if use_snapshot:
+        response = serve_snapshot(debate_id)
+        if response is not None:
+            # 快照可被共用快取保存，不能因為記錄觀看而建立 session（Set-Cookie 會被快取並發給其他訪客）
+            ViewCounter.record(debate_id, ViewCounter.viewer_key(create=False))
+            return response
+    
+    debate = db.session.get(Debate, debate_id)
+    if debate is None:
+        response = archived_debate_detail(debate_id)  # 不存在時 404
+        if use_snapshot:
+            build_later(debate_id)
+        return response
+    if use_snapshot and debate.status == 'completed':
+        build_later(debate_id)
+    
+    # 記錄不重複觀看者（重新整理不會重複計算）
+    ViewCounter.record(debate_id)
+    
+    # 串流時 session cookie 隨回應標頭先送出，flash 訊息必須在此之前取出，否則不會從 session 移除
+    flashes = get_flashed_messages(with_categories=True)
+    
+    @stream_with_context
+    def generate():
+        # 串流開始時原本的 session 已在 teardown 關閉，需重新載入
+        debate = db.session.get(Debate, debate_id)
+        
+        # 只在伺服器端渲染最新一輪，較早的輪次由時間軸 API 在捲動時載入；
+        # 論述以 yield_per 分批查詢、模板串流輸出，標題區塊先送出
+        arguments_count = debate.arguments.count()
+        latest_round = ArgumentTimelineService.latest_round(debate_id)
+        arguments = (debate.arguments
+                     .options(joinedload(Argument.user))
+                     .filter(Argument.round_number == latest_round)
+                     .order_by(Argument.created_at.desc(), Argument.id.desc())
+                     .yield_per(ARGUMENT_CHUNK_SIZE))
+        has_older_rounds = (latest_round is not None and
+                            ArgumentTimelineService.has_arguments_before(debate_id, latest_round))
+        viewers = ViewCounter.unique_viewers(debate_id)
+        related_debates = RelatedService.related(debate_id)
+        
+        yield from _buffered(stream_template(
+            'debate_detail.html',
+            debate=debate,
+            arguments=arguments,
+            arguments_count=arguments_count,
+            latest_round=latest_round,
+            has_older_rounds=has_older_rounds,
+            viewers=viewers,
+            related_debates=related_debates,
+            flashes=flashes
+        ))
+    
+    return Response(generate(), mimetype='text/html')
+
+def archived_debate_detail(debate_id):
+    """已封存的辯論：從封存資料表讀取，一次渲染所有論述"""
+    archived = ArchiveService.load_debate(debate_id)
+    if archived is None:
+        abort(404)
+    debate, arguments = archived
     return render_template(
         'debate_detail.html',
         debate=debate,
-        arguments=arguments  # 傳給 template
+        arguments=arguments,
+        arguments_count=len(arguments),
+        latest_round=None,
+        has_older_rounds=False,
+        viewers={'today': 0, 'week': 0, 'all_time': debate.views or 0}
     )
 
+@main_bp.route('/api/debates/<int:debate_id>/arguments')
+def debate_arguments(debate_id):
+    """論述時間軸（keyset 分頁，新到舊）"""
+    debate = Debate.query.get_or_404(debate_id)
+    limit = max(1, min(request.args.get('limit', 20, type=int), 100))
+    
+    try:
+        page = ArgumentTimelineService.get_page(
+            debate,
+            cursor=request.args.get('cursor'),
+            before_round=request.args.get('before_round', type=int),
+            limit=limit
+        )
+    except ValueError:
+        return jsonify({'success': False, 'message': '無效的分頁游標'}), 400
+    
+    html = render_template('partials/argument_list.html', arguments=page['arguments'])
+    response = jsonify({
+        'success': True,
+        'arguments': [dict(a, created_at=a['created_at'].isoformat()) for a in page['arguments']],
+        'html': html,
+        'next_cursor': page['next_cursor']
+    })
+    if page['immutable']:
+        # 已結束輪次的分頁不會再變動
+        response.cache_control.public = True
+        response.cache_control.max_age = 86400
+    return cacheable(response)
+
 @main_bp.route('/debate-hall')
 def debate_hall():
     """辯手大廳"""
     # 獲取當前進行的辯論（置頂訊息用）
-    current_debates = Debate.query.filter_by(status='ongoing').limit(2).all()
+    current_debates = ListingService.debates(Debate.status == 'ongoing', limit=2)
     
     # 獲取辯手排行榜（本月）
     top_debaters = [
@@ -247,45 +366,33 @@ def debate_hall():
     ]
     
     # 今日統計
+    stats = RollupService.dashboard()
     today_stats = {
-        'active_debates': Debate.query.filter_by(status='ongoing').count() or 12,
-        'completed_today': 8
+        'active_debates': stats['ongoing'],
+        'completed_today': stats['completed_today']
     }
     
     # 獲取大廳訊息
-    hall_messages = HallMessage.query.order_by(desc(HallMessage.created_at)).limit(20).all()
+    hall_messages = ListingService.hall_messages(20)
     
-    # 即時通知（示例）
-    recent_notifications = [
-        {
-            'icon': 'comments',
-            'type': 'info',
-            'message': '新的辯論對手向您發起挑戰',
-            'time_ago': '5分鐘前'
-        },
-        {
-            'icon': 'trophy',
-            'type': 'success',
-            'message': '您在科技議題辯論中獲勝',
-            'time_ago': '1小時前'
-        },
-        {
-            'icon': 'level-up-alt',
-            'type': 'warning',
-            'message': '恭喜升級到 Lv.8',
-            'time_ago': '2小時前'
-        }
-    ]
+    # 關注辯論的最新通知
+    recent_notifications = []
+    if session.get('user_id'):
+        for item in NotificationService.inbox(session['user_id'], limit=5)['items']:
+            icon, style = NOTIFICATION_STYLES.get(item['detail'] or item['kind'], ('bell', 'info'))
+            recent_notifications.append({
+                'icon': icon,
+                'type': style,
+                'message': item['message'],
+                'time_ago': _time_ago(item['created_at'])
+            })
     
-    # 獲取當前用戶資訊
+    # 獲取當前用戶資訊與統計（由 UserStatsService 隨辯論事件維護）
     current_user = None
+    current_stats = None
     if session.get('user_id'):
         current_user = User.query.get(session['user_id'])
-        if current_user:
-            current_user.total_debates = 25  # 示例數據
-            current_user.wins = 18
-            current_user.rating = 1420
-            current_user.level = 8
+        current_stats = UserStatsService.get(session['user_id'])
     
     return render_template('debate_hall.html', 
                          current_debates=current_debates,
@@ -293,15 +400,83 @@ def debate_hall():
                          today_stats=today_stats,
                          hall_messages=hall_messages,
                          recent_notifications=recent_notifications,
-                         current_user=current_user)
+                         current_user=current_user,
+                         current_stats=current_stats)
 
 # AJAX 路由
 @main_bp.route('/api/hall-messages')
 def get_hall_messages():
     """獲取大廳訊息（AJAX）"""
-    messages = HallMessage.query.order_by(desc(HallMessage.created_at)).limit(20).all()
-    html = render_template('partials/hall_messages.html', messages=messages)
-    return jsonify({'html': html})
+    messages = ListingService.hall_messages(20)
+    html = render_template('partials/hall_messages.html', hall_messages=messages)
+    # 內容相同時回傳 304，並讓壓縮中介層重用已壓縮的結果
+    return cacheable(jsonify({'html': html}))
+
+@main_bp.route('/api/notifications')
+def notifications():
+    """關注辯論的通知收件匣（游標分頁，新到舊）"""
+    if not session.get('user_id'):
+        return jsonify({'success': False, 'message': '請先登入'})
+    
+    limit = max(1, min(request.args.get('limit', 20, type=int), 100))
+    cursor = request.args.get('cursor')
+    if cursor is not None and not cursor.isdigit():
+        return jsonify({'success': False, 'message': '無效的分頁游標'}), 400
+    
+    page = NotificationService.inbox(session['user_id'], before=int(cursor) if cursor else None, limit=limit)
+    return jsonify({
+        'success': True,
+        'notifications': [dict(item, created_at=item['created_at'].isoformat()) for item in page['items']],
+        'unread': page['unread'],
+        'next_cursor': page['next_cursor']
+    })
+
+@main_bp.route('/api/notifications/read', methods=['POST'])
+def mark_notifications_read():
+    """全部通知標為已讀"""
+    if not session.get('user_id'):
+        return jsonify({'success': False, 'message': '請先登入'})
+    
+    NotificationService.mark_all_read(session['user_id'])
+    return jsonify({'success': True, 'unread': 0})
+
+@main_bp.route('/api/stats/trends')
+def stats_trends():
+    """每日趨勢統計（由活動彙總讀取）"""
+    metric = request.args.get('metric', 'debate_created')
+    days = min(max(request.args.get('days', 30, type=int), 1), 365)
+    category = request.args.get('category') or None
+    return cacheable(jsonify({
+        'metric': metric,
+        'category': category,
+        'series': RollupService.series(metric, days, category),
+    }))
+
+@main_bp.route('/api/export/<name>')
+def export_stream(name):
+    """分析用串流匯出（Authorization: Bearer <EXPORT_TOKEN>）"""
+    token = current_app.config.get('EXPORT_TOKEN')
+    if not token:
+        abort(404)
+    if not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return jsonify({'success': False, 'message': '未授權'}), 401
+    
+    fmt = request.args.get('format', 'ndjson')
+    try:
+        dataset(name)
+        check_format(fmt)
+        since, until = (request.args.get(key) for key in ('since', 'until'))
+        window = Window(since=datetime.fromisoformat(since) if since else None,
+                        until=datetime.fromisoformat(until) if until else None,
+                        since_id=int(request.args['since_id']) if request.args.get('since_id') else None)
+    except (ExportError, ValueError) as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    
+    body = stream_export(name, fmt, window, include_archive=request.args.get('archive') == '1',
+                         batch_size=current_app.config['EXPORT_BATCH_SIZE'])
+    response = Response(stream_with_context(body), mimetype=MIMETYPES[fmt])
+    response.headers['Content-Disposition'] = f'attachment; filename="{name}.{fmt}"'
+    return response
 
 @main_bp.route('/api/post-hall-message', methods=['POST'])
 def post_hall_message():
@@ -311,23 +486,19 @@ def post_hall_message():
     
     message_content = request.form.get('message', '').strip()
     message_type = request.form.get('message_type', 'general')
+    # 針對既有辯論發出的挑戰，連結到該辯論（辯論進行中保留期不會清除）
+    debate_id = request.form.get('debate_id', type=int) if message_type == 'challenge' else None
     
     if not message_content:
         flash('訊息內容不能為空', 'error')
         return redirect(url_for('main.debate_hall'))
     
-    # 創建新訊息
-    new_message = HallMessage(
-        user_id=session['user_id'],
-        content=message_content,
-        message_type=message_type,
-        created_at=datetime.utcnow()
-    )
-    
     try:
-        db.session.add(new_message)
-        db.session.commit()
+        HallService.post_message(session['user_id'], message_content, message_type, debate_id=debate_id)
         flash('訊息發送成功！', 'success')
+    except ContentBlocked:
+        db.session.rollback()
+        flash('訊息包含不允許的字詞，請修改後再發送', 'error')
     except Exception as e:
         db.session.rollback()
         flash('發送失敗，請稍後再試', 'error')
@@ -340,17 +511,21 @@ def accept_challenge():
     if not session.get('user_id'):
         return jsonify({'success': False, 'message': '請先登入'})
     
-    data = request.get_json()
+    data = request.get_json(silent=True) or {}
     message_id = data.get('message_id')
     
-    # 這裡應該實現接受挑戰的邏輯
-    # 1. 找到挑戰訊息
-    # 2. 創建新的辯論
-    # 3. 設定參與者
+    # 挑戰訊息建立或加入的辯論會連結回訊息
+    try:
+        debate = HallService.accept_challenge(message_id, session['user_id'])
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': '操作失敗，請稍後再試'})
+    if not debate:
+        return jsonify({'success': False, 'message': '無法接受這個挑戰'})
     
     return jsonify({
         'success': True,
-        'debate_url': url_for('main.debate_detail', debate_id=1)
+        'debate_url': url_for('main.debate_detail', debate_id=debate.id)
     })
 
 @main_bp.route('/api/find-random-opponent', methods=['POST'])
@@ -392,26 +567,91 @@ def join_debate():
     elif position == 'con' and debate.con_participant_id:
         return jsonify({'success': False, 'message': '反方已滿'})
     
-    # 加入辯論
+    # 加入辯論（雙方都有人時開始辯論）
+    try:
+        if not DebateService.join_debate(debate.id, session['user_id'], position):
+            return jsonify({'success': False, 'message': '無法加入該辯論'})
+        return jsonify({'success': True})
+    
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': '操作失敗，請稍後再試'})
+
+@main_bp.route('/api/add-argument', methods=['POST'])
+def add_argument():
+    """發表論述"""
+    if not session.get('user_id'):
+        flash('請先登入', 'error')
+        return redirect(url_for('auth.login'))
+    
+    debate_id = request.form.get('debate_id', type=int)
+    content = request.form.get('content', '').strip()
+    sources = request.form.get('sources', '').strip() or None
+    
+    if not content:
+        flash('論述內容不能為空', 'error')
+        return redirect(url_for('main.debate_detail', debate_id=debate_id))
+    
     try:
-        if position == 'pro':
-            debate.pro_participant_id = session['user_id']
+        if DebateService.add_argument(debate_id, session['user_id'], content, sources):
+            flash('論述發表成功！', 'success')
         else:
-            debate.con_participant_id = session['user_id']
-        
-        # 如果雙方都有人，開始辯論
-        if debate.pro_participant_id and debate.con_participant_id:
-            debate.status = 'ongoing'
-            debate.started_at = datetime.utcnow()
-            debate.current_deadline = datetime.utcnow() + timedelta(hours=debate.time_limit_hours or 24)
+            flash('目前無法發表論述', 'error')
+    except ContentBlocked:
+        db.session.rollback()
+        flash('論述包含不允許的字詞，請修改後再發表', 'error')
+    except Exception as e:
+        db.session.rollback()
+        flash('發表失敗，請稍後再試', 'error')
+    
+    return redirect(url_for('main.debate_detail', debate_id=debate_id))
+
+@main_bp.route('/api/add-comment', methods=['POST'])
+def add_comment():
+    """發表觀眾評論"""
+    debate_id = request.form.get('debate_id', type=int)
+    # 觀眾評論功能開發中
+    flash('觀眾評論功能開發中', 'info')
+    return redirect(url_for('main.debate_detail', debate_id=debate_id))
+
+@main_bp.route('/api/toggle-follow', methods=['POST'])
+def toggle_follow():
+    """關注/取消關注辯論"""
+    if not session.get('user_id'):
+        return jsonify({'success': False, 'message': '請先登入'})
+    
+    data = request.get_json()
+    debate_id = data.get('debate_id')
+    
+    debate = Debate.query.get(debate_id)
+    if not debate:
+        return jsonify({'success': False, 'message': '找不到該辯論'})
+    
+    try:
+        follow = DebateFollow.query.filter_by(user_id=session['user_id'], debate_id=debate_id).first()
+        if follow:
+            db.session.delete(follow)
+            following = False
+        else:
+            db.session.add(DebateFollow(user_id=session['user_id'], debate_id=debate_id))
+            following = True
         
+        debate.touch()
         db.session.commit()
-        return jsonify({'success': True})
+        return jsonify({'success': True, 'following': following})
     
     except Exception as e:
         db.session.rollback()
         return jsonify({'success': False, 'message': '操作失敗，請稍後再試'})
 
+@main_bp.route('/api/debates/similar')
+def similar_debates():
+    """發起辯論時輸入標題，即時提示標題幾乎相同的現有辯論"""
+    title = request.args.get('title', '').strip()
+    if len(title) < 10 or not current_app.config['DUPLICATE_CHECK']:
+        return jsonify({'success': True, 'debates': []})
+    return jsonify({'success': True, 'debates': DuplicateService.find(title)})
+
 @main_bp.route('/api/create-debate', methods=['POST'])
 def create_debate():
     """創建辯論"""
@@ -437,29 +677,23 @@ def create_debate():
         flash('辯論主題至少需要10個字元', 'error')
         return redirect(url_for('main.create_debate_page'))
     
+    # 已有幾乎相同的辯論時先建議加入，使用者確認後（allow_duplicate）才建立
+    if current_app.config['DUPLICATE_CHECK'] and not request.form.get('allow_duplicate'):
+        duplicates = DuplicateService.find(title)
+        if duplicates:
+            return render_template('create_debate.html', duplicates=duplicates, form=request.form)
+    
     try:
-        new_debate = Debate(
-            title=title,
-            description=description,
-            category=category,
-            creator_id=session['user_id'],
-            status='waiting',
-            time_limit_hours=time_limit,
-            level_limit=level_limit,
-            need_sources=need_sources,
-            allow_audience=allow_audience,
-            created_at=datetime.utcnow(),
-            views=0
-        )
-        
-        # 設定創建者的立場
-        if position == 'pro':
-            new_debate.pro_participant_id = session['user_id']
-        else:
-            new_debate.con_participant_id = session['user_id']
-        
-        db.session.add(new_debate)
-        db.session.commit()
+        new_debate = DebateService.create_debate(session['user_id'], {
+            'title': title,
+            'description': description,
+            'category': category,
+            'position': position,
+            'time_limit': time_limit,
+            'level_limit': level_limit,
+            'need_sources': need_sources,
+            'allow_audience': allow_audience,
+        })
         
         flash('辯論創建成功！等待對手加入', 'success')
         return redirect(url_for('main.debate_detail', debate_id=new_debate.id))
@@ -0,0 +1,155 @@
+"""
+冷封存服務 - 把久未變動的已完成辯論移出主資料表
+
+完成超過 ARCHIVE_AFTER_DAYS 天的辯論連同論述（與其來源對應）、評分與關注，分批搬到封存資料表
+（bind 'archive'，可設定為另一個 SQLite 檔案）。主資料表、索引與熱門榜只保留活躍資料；
+debate_detail 在主資料表找不到時改從封存資料表讀取，網址不變。
+
+每批先在封存端「刪除後寫入」並提交，再於主資料庫刪除並提交；
+中途失敗時重跑同一批即可，不會產生重複資料。
+"""
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import select, delete, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app import db
+from app.models.archive import (ARCHIVE_BIND, ARCHIVE_TABLES, archived_debates, archived_arguments,
+                                archived_debate_follows)
+from app.models.debate import Debate, Argument, DebateFollow, DebateViewSketch, HallMessage
+from app.models.notification import DebateEvent, Notification, NotificationHub
+from app.models.related import DebateNeighbor
+from app.models.source import ArgumentSource
+from app.models.user import User
+from app.services.citation_service import CitationService
+
+
+def _archive_execute(stmt, params=None):
+    """在封存 bind 上執行（Flask-SQLAlchemy 只會自動路由 insert/update/delete）"""
+    return db.session.execute(stmt, params, bind_arguments={'bind': db.engines[ARCHIVE_BIND]})
+
+
+class ArchiveService:
+    """冷封存服務類"""
+
+    @staticmethod
+    def ensure_tables():
+        """建立封存資料表（封存 bind 不經過 alembic 管理）"""
+        db.create_all(bind_key=ARCHIVE_BIND)
+
+    @staticmethod
+    def candidate_ids(cutoff: datetime, limit: int) -> List[int]:
+        return list(db.session.execute(
+            select(Debate.id)
+            .where(Debate.status == 'completed', Debate.completed_at < cutoff)
+            .order_by(Debate.id).limit(limit)).scalars())
+
+    @staticmethod
+    def archive_batch(debate_ids: List[int]) -> Dict[str, int]:
+        """封存一批辯論，回傳各資料表搬移的列數"""
+        moved = {}
+        now = datetime.utcnow()
+
+        # 1. 封存端：先刪除（重跑時）再寫入，提交
+        for source, target in ARCHIVE_TABLES:
+            key = source.c.id if source is Debate.__table__ else source.c.debate_id
+            rows = [dict(row._mapping) for row in db.session.execute(select(source).where(key.in_(debate_ids)))]
+            target_key = target.c.id if target is archived_debates else target.c.debate_id
+            _archive_execute(delete(target).where(target_key.in_(debate_ids)))
+            if rows:
+                if target is archived_debates:
+                    for row in rows:
+                        row['archived_at'] = now
+                _archive_execute(target.insert(), rows)
+            moved[source.name] = len(rows)
+        db.session.commit()
+
+        # 2. 主資料庫：刪除子資料列後刪除辯論，提交（大廳訊息保留，只解除對辯論的連結）
+        db.session.execute(delete(DebateViewSketch.__table__).where(
+            DebateViewSketch.__table__.c.debate_id.in_(debate_ids)))
+        db.session.execute(update(HallMessage.__table__).where(
+            HallMessage.__table__.c.debate_id.in_(debate_ids)).values(debate_id=None))
+        # 已完成辯論的通知不再保留
+        events = select(DebateEvent.id).where(DebateEvent.debate_id.in_(debate_ids))
+        db.session.execute(delete(Notification.__table__).where(Notification.__table__.c.event_id.in_(events)))
+        db.session.execute(delete(DebateEvent.__table__).where(DebateEvent.__table__.c.debate_id.in_(debate_ids)))
+        db.session.execute(delete(NotificationHub.__table__).where(
+            NotificationHub.__table__.c.debate_id.in_(debate_ids)))
+        # 以已封存辯論為鄰居的資料列保留，下次 `flask related refresh` 時據此重算
+        db.session.execute(delete(DebateNeighbor.__table__).where(
+            DebateNeighbor.__table__.c.debate_id.in_(debate_ids)))
+        cited = db.session.execute(select(ArgumentSource.__table__.c.source_id).distinct().where(
+            ArgumentSource.__table__.c.debate_id.in_(debate_ids))).scalars().all()
+        for source, _ in reversed(ARCHIVE_TABLES):
+            key = source.c.id if source is Debate.__table__ else source.c.debate_id
+            db.session.execute(delete(source).where(key.in_(debate_ids)))
+        # 已封存的引用不計入來源的引用數
+        CitationService.refresh_counts(db.session.connection(), cited)
+        db.session.commit()
+        return moved
+
+    @staticmethod
+    def archive(older_than_days: int, batch_size: int = 500, limit: Optional[int] = None) -> Dict[str, float]:
+        """分批封存完成超過 older_than_days 天的辯論"""
+        started = time.perf_counter()
+        ArchiveService.ensure_tables()
+        cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+        totals = {'batches': 0}
+        while limit is None or totals.get('debates', 0) < limit:
+            size = batch_size if limit is None else min(batch_size, limit - totals.get('debates', 0))
+            ids = ArchiveService.candidate_ids(cutoff, size)
+            if not ids:
+                break
+            for table, count in ArchiveService.archive_batch(ids).items():
+                totals[table] = totals.get(table, 0) + count
+            totals['batches'] += 1
+        totals['seconds'] = time.perf_counter() - started
+        return totals
+
+    # -- 讀取 ------------------------------------------------------------------
+
+    @staticmethod
+    def _users(user_ids) -> Dict[int, User]:
+        user_ids = {user_id for user_id in user_ids if user_id}
+        if not user_ids:
+            return {}
+        return {user.id: user for user in User.query.filter(User.id.in_(user_ids))}
+
+    @staticmethod
+    def load_debate(debate_id: int) -> Optional[Tuple[Debate, List[Argument]]]:
+        """
+        從封存資料表載入辯論（含論述與關注）
+
+        回傳不屬於 session 的 (Debate, 論述列表)，關聯以 set_committed_value 直接填入，
+        模板可以和一般辯論一樣讀取。
+        """
+        try:
+            row = _archive_execute(select(archived_debates).where(archived_debates.c.id == debate_id)).first()
+        except SQLAlchemyError:
+            # 尚未建立封存資料表
+            db.session.rollback()
+            return None
+        if row is None:
+            return None
+
+        values = dict(row._mapping)
+        values.pop('archived_at', None)
+        debate = Debate(**values)
+        arguments = [Argument(**dict(r._mapping)) for r in _archive_execute(
+            select(archived_arguments).where(archived_arguments.c.debate_id == debate_id)
+            .order_by(archived_arguments.c.created_at.desc(), archived_arguments.c.id.desc()))]
+        follows = [DebateFollow(**dict(r._mapping)) for r in _archive_execute(
+            select(archived_debate_follows).where(archived_debate_follows.c.debate_id == debate_id))]
+
+        users = ArchiveService._users([debate.creator_id, debate.pro_participant_id, debate.con_participant_id] +
+                                      [argument.user_id for argument in arguments])
+        set_committed_value(debate, 'creator', users.get(debate.creator_id))
+        set_committed_value(debate, 'pro_participant', users.get(debate.pro_participant_id))
+        set_committed_value(debate, 'con_participant', users.get(debate.con_participant_id))
+        set_committed_value(debate, 'followers_rel', follows)
+        for argument in arguments:
+            set_committed_value(argument, 'user', users.get(argument.user_id))
+        return debate, arguments
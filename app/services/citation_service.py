@@ -0,0 +1,177 @@
+"""
+引用來源服務 - 維護 sources / argument_sources
+
+Argument.sources 保留使用者輸入的原文（論述頁照原樣顯示），另外解析成正規化的來源（見 app/citations.py）：
+    sources            每個不重複的來源一列，citation_count 為引用它的論述數
+    argument_sources   論述 ↔ 來源，帶 debate_id 以便隨辯論一起封存
+發表論述時在同一個交易中寫入；既有資料由 migration 逐批回填，`flask sources rebuild` 以回填工作
+argument_sources（app/backfill.py，可續跑、可平行）重新建立。
+「最常被引用的來源」直接依 citation_count 的索引取前 N 筆，不必再解析任何原文。
+所有寫入函式都接受 connection 參數，migration 中使用 op.get_bind()，應用程式中使用 session 的連線。
+"""
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, desc, func, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app import db
+from app.backfill import backfill
+from app.citations import TEXT, URL, Citation, canonical_text, canonical_url, citation_key, parse
+from app.models.debate import Argument
+from app.models.source import ArgumentSource, Source
+
+sources = Source.__table__
+links = ArgumentSource.__table__
+arguments = Argument.__table__
+
+CHUNK = 500  # IN 清單的大小（SQLite 的參數數量有上限）
+
+
+def _chunks(items: List, size: int = CHUNK):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class CitationService:
+    """引用來源服務類"""
+
+    @staticmethod
+    def _source_ids(connection, citations: Dict[str, Citation]) -> Dict[str, int]:
+        """key → sources.id，不存在的來源先新增（同時新增同一個來源時以唯一鍵去重）"""
+        keys = list(citations)
+        ids: Dict[str, int] = {}
+        for chunk in _chunks(keys):
+            ids.update(connection.execute(select(sources.c.key, sources.c.id).where(sources.c.key.in_(chunk))).all())
+        missing = [citations[key] for key in keys if key not in ids]
+        if not missing:
+            return ids
+        now = datetime.utcnow()
+        rows = [{'key': c.key, 'kind': c.kind, 'canonical': c.canonical, 'domain': c.domain,
+                 'citation_count': 0, 'created_at': now} for c in missing]
+        dialect = connection.dialect.name
+        if dialect in ('sqlite', 'postgresql'):
+            insert = sqlite.insert if dialect == 'sqlite' else postgresql.insert
+            connection.execute(insert(sources).on_conflict_do_nothing(index_elements=['key']), rows)
+        else:
+            connection.execute(sources.insert(), rows)
+        for chunk in _chunks([c.key for c in missing]):
+            ids.update(connection.execute(select(sources.c.key, sources.c.id).where(sources.c.key.in_(chunk))).all())
+        return ids
+
+    @staticmethod
+    def refresh_counts(connection, source_ids: Optional[Iterable[int]] = None):
+        """重算引用數（None 表示全部）"""
+        count = (select(func.count()).select_from(links).where(links.c.source_id == sources.c.id)
+                 .scalar_subquery())
+        if source_ids is None:
+            connection.execute(update(sources).values(citation_count=count))
+            return
+        for chunk in _chunks(sorted(set(source_ids))):
+            connection.execute(update(sources).where(sources.c.id.in_(chunk)).values(citation_count=count))
+
+    @staticmethod
+    def index(connection, rows: List[Tuple[int, int, Optional[str]]], refresh: bool = True) -> Tuple[int, int]:
+        """
+        重建一批論述的來源對應，rows 為 (argument_id, debate_id, 原文)
+
+        refresh=False 時不更新引用數（整批回填結束後再以 refresh_counts() 一次重算）。
+        回傳 (對應數, 來源數)。
+        """
+        parsed = [(argument_id, debate_id, parse(raw)) for argument_id, debate_id, raw in rows]
+        citations = {c.key: c for _, _, found in parsed for c in found}
+        ids = CitationService._source_ids(connection, citations) if citations else {}
+        argument_ids = [argument_id for argument_id, _, _ in parsed]
+        affected = set()
+        for chunk in _chunks(argument_ids):
+            if refresh:
+                affected.update(connection.execute(
+                    select(links.c.source_id).where(links.c.argument_id.in_(chunk))).scalars())
+            connection.execute(delete(links).where(links.c.argument_id.in_(chunk)))
+        new_links = [{'argument_id': argument_id, 'source_id': ids[c.key], 'debate_id': debate_id, 'position': position}
+                     for argument_id, debate_id, found in parsed for position, c in enumerate(found)]
+        if new_links:
+            connection.execute(links.insert(), new_links)
+        if refresh:
+            CitationService.refresh_counts(connection, affected | {link['source_id'] for link in new_links})
+        return len(new_links), len(citations)
+
+    @staticmethod
+    def link(argument: Argument):
+        """發表論述時建立來源對應（與論述同一個交易，需在 commit 前呼叫）"""
+        if not argument.sources:
+            return
+        db.session.flush()
+        CitationService.index(db.session.connection(), [(argument.id, argument.debate_id, argument.sources)])
+
+    @staticmethod
+    def backfill(connection, batch_size: int = 5000,
+                 progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """
+        依 id 逐批解析所有論述的原文並建立對應，最後一次重算引用數
+
+        每批只讀取 batch_size 列，記憶體用量與資料量無關；重複執行結果相同。
+        """
+        started = time.perf_counter()
+        totals = {'arguments': 0, 'links': 0, 'batches': 0}
+        last_id = 0
+        while True:
+            rows = connection.execute(
+                select(arguments.c.id, arguments.c.debate_id, arguments.c.sources)
+                .where(arguments.c.id > last_id, arguments.c.sources.isnot(None))
+                .order_by(arguments.c.id).limit(batch_size)).all()
+            if not rows:
+                break
+            linked, _ = CitationService.index(connection, [tuple(row) for row in rows], refresh=False)
+            last_id = rows[-1].id
+            totals['arguments'] += len(rows)
+            totals['links'] += linked
+            totals['batches'] += 1
+            if progress:
+                progress(dict(totals, last_id=last_id, seconds=time.perf_counter() - started))
+        CitationService.refresh_counts(connection)
+        totals['sources'] = connection.execute(select(func.count()).select_from(sources)).scalar()
+        totals['seconds'] = time.perf_counter() - started
+        return totals
+
+    # -- 查詢 ------------------------------------------------------------------
+
+    @staticmethod
+    def top_sources(limit: int = 20, kind: Optional[str] = None, domain: Optional[str] = None) -> List[Dict[str, Any]]:
+        """最常被引用的來源"""
+        stmt = (select(sources.c.id, sources.c.kind, sources.c.canonical, sources.c.domain, sources.c.citation_count)
+                .where(sources.c.citation_count > 0)
+                .order_by(desc(sources.c.citation_count), desc(sources.c.id)).limit(limit))
+        if kind:
+            stmt = stmt.where(sources.c.kind == kind)
+        if domain:
+            stmt = stmt.where(sources.c.domain == domain.lower().removeprefix('www.'))
+        return [dict(row._mapping) for row in db.session.execute(stmt)]
+
+    @staticmethod
+    def find(reference: str) -> Optional[Dict[str, Any]]:
+        """依網址或引用文字（正規化後比對）找到來源"""
+        result = canonical_url(reference)
+        key = citation_key(URL, result[0]) if result else citation_key(TEXT, canonical_text(reference))
+        row = db.session.execute(select(sources).where(sources.c.key == key)).first()
+        return dict(row._mapping) if row else None
+
+    @staticmethod
+    def citing_arguments(source_id: int, limit: int = 50, after_id: int = 0) -> List[int]:
+        """引用某個來源的論述 id（依 id 排序）"""
+        return list(db.session.execute(
+            select(links.c.argument_id)
+            .where(links.c.source_id == source_id, links.c.argument_id > after_id)
+            .order_by(links.c.argument_id).limit(limit)).scalars())
+
+
+@backfill('argument_sources', arguments, finalize=lambda connection: CitationService.refresh_counts(connection))
+def _index_arguments(connection, start: int, end: int) -> int:
+    """回填工作：重建 id ∈ [start, end) 的論述的來源對應，引用數在全部完成後一次重算"""
+    rows = connection.execute(select(arguments.c.id, arguments.c.debate_id, arguments.c.sources)
+                              .where(arguments.c.id >= start, arguments.c.id < end,
+                                     arguments.c.sources.isnot(None))).all()
+    if rows:
+        CitationService.index(connection, [tuple(row) for row in rows], refresh=False)
+    return len(rows)
@@ -1,10 +1,24 @@
 """
 辯論服務層 - 處理辯論相關業務邏輯
 """
+import base64
+import json
+import sys
 from datetime import datetime, timedelta
-from typing import Optional, List, Dict, Any
-from sqlalchemy import desc, or_, and_
+from typing import Optional, List, Dict, Any, Tuple
+from sqlalchemy import desc, or_, and_, event, func, tuple_
+from sqlalchemy.orm import object_session
 from app import db
+from app.cache import SizedLRUCache
+from app.services.citation_service import CitationService
+from app.services.duplicate_service import DuplicateService
+from app.services.hot_ranking import HotRankingService, hot_top_k
+from app.services.moderation_service import ModerationService
+from app.services.suggest_service import SuggestService
+from app.services.view_counter import ViewCounter
+from app.services.rollup_service import RollupService
+from app.services.user_stats_service import UserStatsService
+from app.services.notification_service import NotificationService
 from app.models.debate import Debate, Argument, HallMessage, DebateRating, UserStats
 from app.models.user import User
 
@@ -28,6 +42,7 @@ class DebateService:
             created_at=datetime.utcnow(),
             views=0
         )
+        debate.hot_score = HotRankingService.initial_score(debate.created_at)
         
         # 設定創建者立場
         if data['position'] == 'pro':
@@ -36,7 +51,12 @@ class DebateService:
             debate.con_participant_id = user_id
             
         db.session.add(debate)
+        RollupService.debate_created(debate)
+        UserStatsService.debate_joined(user_id)
         db.session.commit()
+        SuggestService.debate_created(debate)
+        DuplicateService.debate_created(debate)
+        hot_top_k.offer(debate.id, debate.hot_score)
         return debate
     
     @staticmethod
@@ -52,26 +72,53 @@ class DebateService:
             debate.con_participant_id = user_id
         else:
             return False
+        RollupService.record_later('participant_joined', debate.category)
+        NotificationService.publish(debate, 'participant_joined', actor_id=user_id)
+        UserStatsService.debate_joined(user_id)
             
         # 檢查是否雙方都有參與者
         if debate.pro_participant_id and debate.con_participant_id:
-            debate.status = 'ongoing'
+            DebateService.change_status(debate, 'ongoing', actor_id=user_id)
             debate.started_at = datetime.utcnow()
             debate.current_deadline = datetime.utcnow() + timedelta(hours=debate.time_limit_hours)
             debate.current_turn = 'pro'  # 正方先發言
             debate.current_round = 1
             
+        debate.touch()
         db.session.commit()
         return True
     
     @staticmethod
-    def get_debate_with_arguments(debate_id: int) -> Optional[Debate]:
+    def change_status(debate: Debate, status: str, actor_id: Optional[int] = None):
+        """變更辯論狀態，並同步更新活動彙總、通知關注者（由呼叫端提交）"""
+        if debate.status == status:
+            return
+        RollupService.debate_status_changed(debate, debate.status, status)
+        debate.status = status
+        NotificationService.publish(debate, 'status_changed', actor_id=actor_id, detail=status)
+    
+    @staticmethod
+    def complete_debate(debate_id: int) -> bool:
+        """結束評審，完成辯論"""
+        debate = Debate.query.get(debate_id)
+        if not debate or debate.status != 'judging':
+            return False
+        
+        DebateService.change_status(debate, 'completed')
+        debate.completed_at = datetime.utcnow()
+        debate.current_deadline = None
+        UserStatsService.debate_completed(debate)
+        debate.touch()
+        db.session.commit()
+        return True
+    
+    @staticmethod
+    def get_debate_with_arguments(debate_id: int, viewer: Optional[str] = None) -> Optional[Debate]:
         """獲取辯論及其論述"""
         debate = Debate.query.get(debate_id)
         if debate:
-            # 增加觀看次數
-            debate.views = (debate.views or 0) + 1
-            db.session.commit()
+            # 記錄不重複觀看者
+            ViewCounter.record(debate_id, viewer)
         return debate
     
     @staticmethod
@@ -86,17 +133,23 @@ class DebateService:
            (debate.current_turn == 'con' and debate.con_participant_id != user_id):
             return False
             
+        verdict = ModerationService.review(content)  # 命中 block 字詞時拋出 ContentBlocked
         argument = Argument(
             debate_id=debate_id,
             user_id=user_id,
             position=debate.current_turn,
             round_number=debate.current_round,
-            content=content,
+            content=verdict.content,
             sources=sources,
             created_at=datetime.utcnow()
         )
         
         db.session.add(argument)
+        ModerationService.record('argument', argument, user_id, verdict)
+        CitationService.link(argument)
+        UserStatsService.argument_posted(argument, debate)
+        RollupService.record_later('argument_posted', debate.category)
+        NotificationService.publish(debate, 'argument_posted', actor_id=user_id)
         
         # 更新辯論狀態
         debate.current_turn = 'con' if debate.current_turn == 'pro' else 'pro'
@@ -117,8 +170,9 @@ class DebateService:
         if pro_args > 0 and con_args > 0:
             debate.current_round += 1
             if debate.current_round > 3:  # 限制最多3輪
-                debate.status = 'judging'
+                DebateService.change_status(debate, 'judging', actor_id=user_id)
                 
+        debate.touch()
         db.session.commit()
         return True
     
@@ -146,7 +200,7 @@ class DebateService:
                 
         # 排序
         if sort_by == 'hot':
-            debates_query = debates_query.order_by(desc(Debate.views))
+            debates_query = debates_query.order_by(desc(Debate.hot_score))
         elif sort_by == 'urgent':
             debates_query = debates_query.filter(
                 and_(Debate.status == 'ongoing', Debate.current_deadline.isnot(None))
@@ -159,7 +213,7 @@ class DebateService:
     @staticmethod
     def get_hot_debates(limit: int = 10) -> List[Debate]:
         """獲取熱門辯論"""
-        return Debate.query.order_by(desc(Debate.views)).limit(limit).all()
+        return HotRankingService.get_hot_debates(limit)
     
     @staticmethod
     def get_recent_debates(limit: int = 10) -> List[Debate]:
@@ -168,32 +222,61 @@ class DebateService:
     
     @staticmethod
     def get_debate_statistics() -> Dict[str, int]:
-        """獲取辯論統計"""
-        return {
-            'waiting': Debate.query.filter_by(status='waiting').count(),
-            'ongoing': Debate.query.filter_by(status='ongoing').count(),
-            'judging': Debate.query.filter_by(status='judging').count(),
-            'completed': Debate.query.filter_by(status='completed').count(),
-            'total': Debate.query.count()
-        }
+        """獲取辯論統計（由活動彙總的累計桶讀取）"""
+        stats = RollupService.status_counts()
+        stats['total'] = sum(stats.values())
+        return stats
 
 
 class HallService:
     """大廳服務類"""
     
     @staticmethod
-    def post_message(user_id: int, content: str, message_type: str = 'general') -> HallMessage:
-        """發送大廳訊息"""
+    def post_message(user_id: int, content: str, message_type: str = 'general',
+                     debate_id: Optional[int] = None) -> HallMessage:
+        """發送大廳訊息（挑戰訊息可連結到對應的辯論，辯論進行中不會被保留期清除）"""
+        verdict = ModerationService.review(content)  # 命中 block 字詞時拋出 ContentBlocked
         message = HallMessage(
             user_id=user_id,
-            content=content,
+            content=verdict.content,
             message_type=message_type,
+            debate_id=debate_id,
             created_at=datetime.utcnow()
         )
         db.session.add(message)
+        ModerationService.record('hall_message', message, user_id, verdict)
+        RollupService.record_later('hall_message', message_type, at=message.created_at)
         db.session.commit()
         return message
-    
+
+    @staticmethod
+    def accept_challenge(message_id: int, user_id: int) -> Optional[Debate]:
+        """
+        接受挑戰訊息：已連結辯論時加入該辯論的空缺立場，否則以訊息內容建立辯論（發文者為正方）
+        並把訊息連結到新辯論，接受者加入反方。無法接受時回傳 None
+        """
+        message = HallMessage.query.get(message_id)
+        if not message or message.message_type != 'challenge' or message.user_id == user_id:
+            return None
+
+        if message.debate_id is None:
+            debate = DebateService.create_debate(message.user_id, {
+                'title': message.content[:200],
+                'category': '其他',
+                'position': 'pro',
+            })
+            message.debate_id = debate.id  # 與加入辯論一起提交
+        else:
+            debate = Debate.query.get(message.debate_id)
+            if not debate:
+                return None
+
+        position = 'con' if debate.con_participant_id is None else 'pro'
+        if not DebateService.join_debate(debate.id, user_id, position):
+            db.session.commit()
+            return None
+        return debate
+
     @staticmethod
     def get_recent_messages(limit: int = 20) -> List[HallMessage]:
         """獲取最近的大廳訊息"""
@@ -209,4 +292,159 @@ class HallService:
             {'username': 'FactChecker', 'rating': 1680, 'win_rate': 72, 'level': 11},
             {'username': 'ReasonSeeker', 'rating': 1620, 'win_rate': 65, 'level': 10},
             {'username': 'WisdomFinder', 'rating': 1580, 'win_rate': 70, 'level': 9}
-        ][:limit]
\ No newline at end of file
+        ][:limit]
+
+
+CLOSED_PAGES_MAX_BYTES = 32 * 1024 * 1024
+TIMELINE_PENDING_KEY = 'pending_timeline_invalidations'
+
+
+def _page_size(page: Dict[str, Any]) -> int:
+    """估計一頁論述佔用的記憶體（字串本身加上每則 dict 的固定成本）"""
+    size = 1024
+    for argument in page['arguments']:
+        size += 800 + sys.getsizeof(argument['content']) + sys.getsizeof(argument['sources'] or '')
+        size += sys.getsizeof(argument['user']['username'] or '')
+    return size
+
+
+class ArgumentTimelineService:
+    """論述時間軸服務 - 依 (round_number, created_at, id) 做 keyset 分頁"""
+    
+    # 已結束輪次的論述不會再變動，這些分頁可以直接快取（以估計的位元組總量為上限，每則論述的長度差異很大）；
+    # 論述被修改或刪除時，提交後清除同一場辯論的分頁（只清除目前 worker 的快取）
+    closed_pages = SizedLRUCache(CLOSED_PAGES_MAX_BYTES, _page_size)
+    
+    @staticmethod
+    def invalidate(debate_id: int) -> int:
+        """清除某場辯論已快取的分頁"""
+        return ArgumentTimelineService.closed_pages.delete_where(lambda key: key[0] == debate_id)
+    
+    @staticmethod
+    def encode_cursor(round_number: int, created_at: datetime, argument_id: int) -> str:
+        """產生不透明的分頁游標"""
+        raw = json.dumps([round_number, created_at.isoformat(), argument_id])
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+    
+    @staticmethod
+    def decode_cursor(cursor: str) -> Tuple[int, datetime, int]:
+        """解析分頁游標，格式錯誤時拋出 ValueError"""
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            round_number, created_at, argument_id = json.loads(raw)
+            return int(round_number), datetime.fromisoformat(created_at), int(argument_id)
+        except (TypeError, ValueError, UnicodeDecodeError) as e:
+            raise ValueError(f'無效的分頁游標: {cursor}') from e
+    
+    @staticmethod
+    def latest_round(debate_id: int) -> Optional[int]:
+        """最新一輪的輪次（走 debate_id + round_number 索引）"""
+        return db.session.query(func.max(Argument.round_number)).filter(
+            Argument.debate_id == debate_id
+        ).scalar()
+    
+    @staticmethod
+    def has_arguments_before(debate_id: int, round_number: int) -> bool:
+        """是否有更早輪次的論述"""
+        return db.session.query(Argument.id).filter(
+            Argument.debate_id == debate_id,
+            Argument.round_number < round_number
+        ).first() is not None
+    
+    @staticmethod
+    def is_round_closed(debate: Debate, round_number: int) -> bool:
+        """輪次是否已結束（之後不會再有新論述）"""
+        if debate.status in ('judging', 'completed'):
+            return True
+        return round_number < (debate.current_round or 0)
+    
+    @staticmethod
+    def get_page(debate: Debate, cursor: str = None, before_round: int = None,
+                 limit: int = 20) -> Dict[str, Any]:
+        """
+        取得一頁論述（新到舊）
+        
+        cursor 為上一頁最後一則的游標；before_round 則從該輪之前開始。
+        回傳 arguments、next_cursor 以及 immutable（此頁內容是否不會再變動）。
+        """
+        key = (debate.id, cursor, before_round, limit)
+        cached = ArgumentTimelineService.closed_pages.get(key)
+        if cached is not None:
+            return cached
+        
+        query = db.session.query(
+            Argument.id, Argument.position, Argument.round_number, Argument.content,
+            Argument.sources, Argument.created_at, Argument.user_id, User.username
+        ).join(User, User.id == Argument.user_id).filter(Argument.debate_id == debate.id)
+        
+        if cursor:
+            position = ArgumentTimelineService.decode_cursor(cursor)
+            query = query.filter(
+                tuple_(Argument.round_number, Argument.created_at, Argument.id) < tuple_(*position)
+            )
+        elif before_round is not None:
+            query = query.filter(Argument.round_number < before_round)
+        
+        rows = query.order_by(
+            desc(Argument.round_number), desc(Argument.created_at), desc(Argument.id)
+        ).limit(limit + 1).all()
+        
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        arguments = [{
+            'id': row.id,
+            'position': row.position,
+            'round_number': row.round_number,
+            'content': row.content,
+            'sources': row.sources,
+            'created_at': row.created_at,
+            'user': {'id': row.user_id, 'username': row.username},
+        } for row in rows]
+        
+        next_cursor = None
+        if has_more:
+            last = rows[-1]
+            next_cursor = ArgumentTimelineService.encode_cursor(last.round_number, last.created_at, last.id)
+        
+        # 只有從游標往回翻（或辯論已結束）且全部屬於已結束輪次的分頁才不會變動
+        bounded = cursor is not None or before_round is not None or debate.status in ('judging', 'completed')
+        immutable = bounded and all(
+            ArgumentTimelineService.is_round_closed(debate, a['round_number']) for a in arguments
+        )
+        
+        page = {'arguments': arguments, 'next_cursor': next_cursor, 'immutable': immutable}
+        if immutable:
+            ArgumentTimelineService.closed_pages.set(key, page)
+        return page
+
+
+def _argument_changed(mapper, connection, target):
+    """flush 時只記下辯論，提交後才清除（提交前清除的話，同時的請求可能以提交前的資料重新快取）"""
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault(TIMELINE_PENDING_KEY, set()).add(target.debate_id)
+
+
+def _after_commit(session):
+    for debate_id in session.info.pop(TIMELINE_PENDING_KEY, ()):
+        ArgumentTimelineService.invalidate(debate_id)
+
+
+def _after_rollback(session, previous_transaction):
+    if previous_transaction.parent is None:
+        session.info.pop(TIMELINE_PENDING_KEY, None)
+
+
+_listeners_registered = False
+
+
+def init_timeline_cache():
+    """論述修改或刪除時，在交易提交後清除對應辯論的分頁快取"""
+    global _listeners_registered
+    if _listeners_registered:
+        return
+    for name in ('after_update', 'after_delete'):
+        event.listen(Argument, name, _argument_changed)
+    event.listen(db.session, 'after_commit', _after_commit)
+    event.listen(db.session, 'after_soft_rollback', _after_rollback)
+    _listeners_registered = True
@@ -0,0 +1,205 @@
+"""
+重複辯論偵測服務 - 發起辯論時找出標題幾乎相同的現有辯論
+
+每個 worker 在記憶體中保有一份 LSHIndex（見 app/minhash.py），第一次使用時從 DUPLICATE_INDEX_PATH 載入。
+索引檔通常由 `flask duplicates build`（部署時執行）建立；檔案不存在時（例如新部署忘了執行）由第一個用到的
+worker 在背景執行緒建立並寫入（以鎖定檔確保同一時間只有一個行程在建立），建好之前先使用只收錄新辯論的空索引，
+請求不必等待。每 DUPLICATE_REFRESH_SECONDS 秒檢查一次：索引檔出現或更新時載入新檔，並以主鍵範圍補上
+id 大於 index.max_id 的辯論（其他 worker 建立的辯論）。資料庫查詢與載入都在鎖外進行，鎖只保護記憶體內的索引；
+本行程建立的辯論由 debate_created 立即加入。
+
+索引只負責挑出候選；候選的標題、狀態再以一次主鍵查詢取得，計算以 idf 加權的 Jaccard 係數：
+「台灣是否應該全面禁止死刑」與「台灣是否應該全面禁止核能」共用的多是句型用字，加權後相似度明顯較低。
+已封存、刪除或改過標題的辯論也因此不會被誤報，索引不必即時移除。
+`flask duplicates build` 重建並寫回索引檔（清掉已封存的辯論、合併新加入的部分）。
+"""
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from flask import current_app
+from sqlalchemy import func, select
+
+from app import db
+from app.minhash import LSHIndex, shingles, weighted_jaccard
+from app.models.debate import Debate
+
+# 估計值有誤差，候選門檻略低於實際門檻，最後以實際 Jaccard 判斷
+ESTIMATE_MARGIN = 0.15
+MAX_CANDIDATES = 20
+BUILD_CHUNK_SIZE = 5000
+
+logger = logging.getLogger(__name__)
+
+_index: Optional[LSHIndex] = None
+_loaded_mtime = 0.0
+_checked_at = 0.0
+_building = False
+_lock = threading.Lock()
+
+# 背景建立索引的鎖定檔超過這個時間視為前一次建立中斷留下的
+BUILD_LOCK_STALE_SECONDS = 3600
+
+
+def _mtime(path: str) -> float:
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return 0.0
+
+
+def _empty(config) -> LSHIndex:
+    """尚未建立索引檔時使用的空索引：只收錄目前最大 id 之後新建的辯論"""
+    index = LSHIndex(config['DUPLICATE_NUM_PERM'], config['DUPLICATE_BANDS'])
+    index.max_id = db.session.execute(select(func.coalesce(func.max(Debate.id), 0))).scalar()
+    return index
+
+
+def _new_rows(max_id: int) -> List:
+    """id 大於 max_id 的辯論（依 id 排序）"""
+    rows = []
+    while True:
+        chunk = db.session.execute(select(Debate.id, Debate.title).where(Debate.id > max_id)
+                                   .order_by(Debate.id).limit(BUILD_CHUNK_SIZE)).all()
+        rows.extend(chunk)
+        if len(chunk) < BUILD_CHUNK_SIZE:
+            return rows
+        max_id = chunk[-1].id
+
+
+def _add_rows(index: LSHIndex, rows: List) -> int:
+    added = 0
+    for debate_id, title in rows:
+        if debate_id > index.max_id:
+            index.add(debate_id, title)
+            added += 1
+    return added
+
+
+def _acquire_build_lock(path: str) -> Optional[str]:
+    """以 O_EXCL 建立鎖定檔；其他行程正在建立時回傳 None"""
+    lock = path + '.building'
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    for _ in range(2):
+        try:
+            os.close(os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return lock
+        except FileExistsError:
+            if time.time() - _mtime(lock) < BUILD_LOCK_STALE_SECONDS:
+                return None
+            try:
+                os.remove(lock)
+            except FileNotFoundError:
+                pass
+    return None
+
+
+def _build_in_background(app):
+    """索引檔不存在時在背景建立（每個行程最多一個執行緒，多個行程之間以鎖定檔互斥）"""
+    global _building
+    with _lock:
+        if _building:
+            return
+        _building = True
+
+    def run():
+        global _building
+        try:
+            with app.app_context():
+                lock = _acquire_build_lock(app.config['DUPLICATE_INDEX_PATH'])
+                if lock is None:
+                    return
+                try:
+                    result = DuplicateService.build()
+                    logger.info('已在背景建立重複辯論索引：%d 場辯論（%.1f 秒）', result['debates'], result['seconds'])
+                finally:
+                    os.remove(lock)
+                    db.session.remove()
+        except Exception:
+            logger.exception('背景建立重複辯論索引失敗')
+        finally:
+            with _lock:
+                _building = False
+
+    threading.Thread(target=run, name='duplicates-build', daemon=True).start()
+
+
+class DuplicateService:
+    """重複辯論偵測服務類"""
+
+    @staticmethod
+    def build() -> Dict[str, float]:
+        """從資料庫重建索引並寫入 DUPLICATE_INDEX_PATH（其他 worker 在下一次檢查時載入）"""
+        global _index, _loaded_mtime
+        config = current_app.config
+        path = config['DUPLICATE_INDEX_PATH']
+        started = time.perf_counter()
+        index = LSHIndex(config['DUPLICATE_NUM_PERM'], config['DUPLICATE_BANDS'])
+        _add_rows(index, _new_rows(0))
+        index.save(path)
+        with _lock:
+            _index, _loaded_mtime = index, _mtime(path)
+        return {'debates': len(index), 'seconds': time.perf_counter() - started}
+
+    @staticmethod
+    def index() -> LSHIndex:
+        """目前 worker 的索引（每 DUPLICATE_REFRESH_SECONDS 秒檢查新的索引檔並補上新辯論）"""
+        global _index, _loaded_mtime, _checked_at
+        config = current_app.config
+        now = time.monotonic()
+        with _lock:
+            current, loaded_mtime = _index, _loaded_mtime
+            if current is not None and now - _checked_at < config['DUPLICATE_REFRESH_SECONDS']:
+                return current
+            _checked_at = now
+
+        # 以下的檔案讀取與資料庫查詢都不持有鎖
+        path = config['DUPLICATE_INDEX_PATH']
+        mtime = _mtime(path)
+        if current is None or mtime > loaded_mtime:
+            loaded = LSHIndex.load(path) if mtime else None
+            if loaded is None and current is None:
+                logger.warning('找不到重複辯論索引 %s，在背景建立；建好之前只比對新建立的辯論', path)
+                _build_in_background(current_app._get_current_object())
+                loaded = _empty(config)
+            if loaded is not None:
+                with _lock:
+                    _index, _loaded_mtime = loaded, mtime
+                current = loaded
+
+        rows = _new_rows(current.max_id)
+        if rows:
+            with _lock:
+                _add_rows(current, rows)
+        return current
+
+    @staticmethod
+    def debate_created(debate: Debate):
+        """新辯論立即加入本行程的索引（索引尚未載入時不必處理）"""
+        with _lock:
+            if _index is not None:
+                _add_rows(_index, [(debate.id, debate.title)])
+
+    @staticmethod
+    def find(title: str, limit: int = 5, exclude_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """標題與 title 相似度（加權 Jaccard）不低於 DUPLICATE_THRESHOLD 的辯論，由高到低"""
+        threshold = current_app.config['DUPLICATE_THRESHOLD']
+        index = DuplicateService.index()
+        with _lock:  # 查詢期間索引不能被其他執行緒加入新辯論
+            matches = index.query(title, threshold - ESTIMATE_MARGIN, MAX_CANDIDATES)
+        ids = [debate_id for debate_id, _ in matches if debate_id != exclude_id]
+        if not ids:
+            return []
+
+        grams = shingles(title)
+        results = []
+        for row in db.session.execute(select(Debate.id, Debate.title, Debate.category, Debate.status)
+                                      .where(Debate.id.in_(ids))):
+            similarity = weighted_jaccard(grams, shingles(row.title), index.idf)
+            if similarity >= threshold:
+                results.append({'id': row.id, 'title': row.title, 'category': row.category,
+                                'status': row.status, 'similarity': round(similarity, 3)})
+        results.sort(key=lambda r: (-r['similarity'], r['id']))
+        return results[:limit]
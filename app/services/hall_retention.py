@@ -0,0 +1,124 @@
+"""
+大廳訊息保留服務 - 分批清除超過保留期的大廳訊息
+
+大廳只顯示最新 20 則（沿 created_at 索引倒序讀取），更舊的訊息只會讓資料表與索引持續成長。
+run() 沿 created_at 索引由舊到新處理，每批最多 batch_size 則，各自一個短交易，不會長時間鎖表：
+    delete   直接刪除
+    archive  先寫入封存資料表 archived_hall_messages 並提交，再從主資料表刪除
+仍連結到未完成辯論的挑戰訊息會保留，等辯論完成後的下一次執行才清除。
+
+max_batches / max_seconds 限制單次執行的工作量，排程器定期執行 `flask hall prune` 即可逐步追上；
+進度（最後清除的訊息時間與 id）記錄在 JobState，下一次執行從水位線 (created_at, id) 之後沿索引繼續，
+同一時間點的多則訊息不會重複讀取或遺漏。
+archive 模式搬出的訊息仍由 `flask rollups rebuild` 從封存資料表重建；delete 模式清除後無法再重建
+保留期之前的 hall_message 彙總，請在清除前先重建。
+"""
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import select, delete, and_, or_, exists
+
+from app import db
+from app.models.archive import archived_hall_messages
+from app.models.debate import Debate, HallMessage
+from app.models.job import JobState
+from app.services.archive_service import ArchiveService, _archive_execute
+
+JOB_NAME = 'hall_retention'
+MODES = ('delete', 'archive')
+
+
+class HallRetentionService:
+    """大廳訊息保留服務類"""
+
+    @staticmethod
+    def _kept():
+        """仍連結到未完成辯論的挑戰訊息"""
+        return and_(HallMessage.message_type == 'challenge',
+                    exists().where(Debate.id == HallMessage.debate_id, Debate.status != 'completed'))
+
+    @staticmethod
+    def candidates(cutoff: datetime, limit: int, after: Optional[Tuple[datetime, int]] = None,
+                   upto: Optional[Tuple[datetime, int]] = None, full_rows: bool = False) -> List:
+        """
+        cutoff 之前可以清除的最舊訊息，依 (created_at, id) 排序（full_rows 時回傳完整資料列供封存）
+
+        after / upto 為 (created_at, id) 水位線：只取其後（不含）/ 其前（含）的訊息
+        """
+        table = HallMessage.__table__
+        columns = [table] if full_rows else [table.c.id, table.c.created_at]
+        stmt = select(*columns).where(table.c.created_at < cutoff, ~HallRetentionService._kept())
+        if after is not None:
+            stmt = stmt.where(or_(table.c.created_at > after[0],
+                                  and_(table.c.created_at == after[0], table.c.id > after[1])))
+        if upto is not None:
+            stmt = stmt.where(or_(table.c.created_at < upto[0],
+                                  and_(table.c.created_at == upto[0], table.c.id <= upto[1])))
+        return db.session.execute(stmt.order_by(table.c.created_at, table.c.id).limit(limit)).all()
+
+    @staticmethod
+    def _purge(rows: List, mode: str):
+        """清除一批訊息（封存端會先提交；主資料庫的刪除由呼叫端提交）"""
+        ids = [row.id for row in rows]
+        if mode == 'archive':
+            # 先刪除再寫入，中途失敗後重跑同一批不會重複
+            _archive_execute(delete(archived_hall_messages).where(archived_hall_messages.c.id.in_(ids)))
+            _archive_execute(archived_hall_messages.insert(), [dict(row._mapping) for row in rows])
+            db.session.commit()
+        db.session.execute(delete(HallMessage.__table__).where(HallMessage.__table__.c.id.in_(ids)))
+
+    @staticmethod
+    def run(keep_days: int, batch_size: int = 2000, mode: str = 'delete',
+            max_batches: Optional[int] = None, max_seconds: Optional[float] = None,
+            pause: float = 0.0, now: Optional[datetime] = None) -> Dict[str, float]:
+        """
+        清除超過 keep_days 天的大廳訊息
+
+        每批之間可暫停 pause 秒，讓線上寫入有機會取得鎖；
+        達到 max_batches 或 max_seconds 時停止，回傳的 done 表示是否已清除完畢。
+        """
+        if mode not in MODES:
+            raise ValueError(f'未知的保留模式：{mode}')
+        started = time.perf_counter()
+        if mode == 'archive':
+            ArchiveService.ensure_tables()
+        cutoff = (now or datetime.utcnow()) - timedelta(days=keep_days)
+        state = JobState.get(JOB_NAME)
+        totals = {'rows': 0, 'batches': 0, 'done': False}
+
+        # 水位線之前只剩被保留的挑戰訊息：每次執行先重新檢查一次（辯論可能已完成），
+        # 之後沿索引從水位線繼續，每批不必再掃過這些保留的訊息
+        mark = (state.watermark, state.cursor or 0) if state.watermark is not None else None
+        phases = []
+        if mark is not None:
+            phases.append((None, mark, False))
+        phases.append((mark, None, True))
+
+        for after, upto, advance in phases:
+            while True:
+                if max_batches is not None and totals['batches'] >= max_batches:
+                    break
+                if max_seconds is not None and time.perf_counter() - started >= max_seconds:
+                    break
+                rows = HallRetentionService.candidates(cutoff, batch_size, after=after, upto=upto,
+                                                       full_rows=(mode == 'archive'))
+                if rows:
+                    HallRetentionService._purge(rows, mode)
+                    if advance:
+                        state.watermark, state.cursor = rows[-1].created_at, rows[-1].id
+                        after = (state.watermark, state.cursor)
+                    db.session.commit()
+                    totals['rows'] += len(rows)
+                    totals['batches'] += 1
+                if len(rows) < batch_size:
+                    totals['done'] = advance
+                    break
+                if pause:
+                    time.sleep(pause)
+
+        db.session.commit()
+        totals['seconds'] = time.perf_counter() - started
+        totals['rows_per_sec'] = totals['rows'] / totals['seconds'] if totals['seconds'] else 0.0
+        totals['watermark'] = state.watermark
+        return totals
@@ -0,0 +1,250 @@
+"""
+熱門度服務 - 時間衰減的熱門分數與看板熱門榜
+
+熱門度定義為所有互動事件的指數衰減加權和：
+
+    hot(now) = Σ w_i · exp(-(now - t_i) / τ)
+
+對所有辯論而言 exp(-now / τ) 是共同因子，不影響排序，因此資料庫只儲存與時間無關的
+
+    hot_score = ln Σ w_i · exp((t_i - EPOCH) / τ)
+
+好處是：沒有新活動的辯論分數不必隨時間重算；有新事件時只要把新事件以 logaddexp
+累加上去即可。背景工作（flask hot refresh）只處理 last_activity_at 晚於上次水位線的辯論。
+事件時間在提交前就已決定，水位線的上限為「現在 - HOT_WATERMARK_LAG 秒」，執行當下尚未提交的事件留到下一次。
+建立辯論時直接寫入建立事件的分數（initial_score），新辯論不必等下一次背景工作才出現在熱門排序中。
+"""
+import heapq
+import math
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from flask import current_app
+from sqlalchemy import desc, select, update, bindparam
+
+from app import db
+from app.models.debate import Debate, Argument, DebateFollow, DebateRating
+from app.models.job import JobState
+
+EPOCH = datetime(2025, 1, 1)
+JOB_NAME = 'hot_ranking'
+
+# 各類事件的權重
+WEIGHT_CREATED = 1.0
+WEIGHT_VIEW = 1.0
+WEIGHT_ARGUMENT = 8.0
+WEIGHT_FOLLOW = 5.0
+WEIGHT_RATING = 3.0
+
+
+def _logaddexp(a: float, b: float) -> float:
+    """ln(e^a + e^b)，避免溢位"""
+    if a < b:
+        a, b = b, a
+    return a + math.log1p(math.exp(b - a))
+
+
+class HotTopK:
+    """
+    看板熱門榜的記憶體內 top-K
+
+    hot_score 只增不減，因此只要把每次更新的分數 offer 進來，top-K 就保持正確；
+    其他行程（背景工作）更新的分數則靠 TTL 到期後從索引重新載入。
+    """
+
+    def __init__(self, k: int = 50, ttl: float = 60.0):
+        self.k = k
+        self.ttl = ttl
+        self._scores: Dict[int, float] = {}
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def is_stale(self) -> bool:
+        return time.monotonic() - self._loaded_at > self.ttl
+
+    def load(self, rows: Iterable[Tuple[int, float]]):
+        """以資料庫查詢結果整批替換"""
+        with self._lock:
+            self._scores = dict(rows)
+            self._loaded_at = time.monotonic()
+
+    def offer(self, debate_id: int, score: float):
+        """提交新分數，必要時擠掉榜尾"""
+        with self._lock:
+            if debate_id in self._scores or len(self._scores) < self.k:
+                self._scores[debate_id] = score
+                return
+            floor_id = min(self._scores, key=self._scores.get)
+            if score > self._scores[floor_id]:
+                del self._scores[floor_id]
+                self._scores[debate_id] = score
+
+    def top(self, n: int) -> List[Tuple[int, float]]:
+        with self._lock:
+            return heapq.nlargest(n, self._scores.items(), key=lambda item: item[1])
+
+    def clear(self):
+        with self._lock:
+            self._scores = {}
+            self._loaded_at = 0.0
+
+
+hot_top_k = HotTopK()
+
+
+class HotRankingService:
+    """熱門度服務類"""
+
+    @staticmethod
+    def tau_seconds() -> float:
+        """衰減時間常數（由半衰期換算）"""
+        return current_app.config['HOT_HALF_LIFE_HOURS'] * 3600 / math.log(2)
+
+    @staticmethod
+    def event_score(weight: float, at: datetime, tau: float) -> float:
+        """單一事件在對數空間中的分數"""
+        return math.log(weight) + (at - EPOCH).total_seconds() / tau
+
+    @staticmethod
+    def initial_score(created_at: datetime) -> float:
+        """新辯論的熱門分數（只有建立事件）"""
+        return HotRankingService.event_score(WEIGHT_CREATED, created_at, HotRankingService.tau_seconds())
+
+    @staticmethod
+    def current_hotness(hot_score: float, now: Optional[datetime] = None) -> float:
+        """換算為目前時間點的衰減熱度（供顯示用）"""
+        now = now or datetime.utcnow()
+        tau = HotRankingService.tau_seconds()
+        return math.exp(hot_score - (now - EPOCH).total_seconds() / tau)
+
+    # -- 背景重算 ----------------------------------------------------------
+
+    @staticmethod
+    def _events_since(model, debate_ids: List[int], since: Optional[datetime],
+                      until: datetime) -> Dict[int, List[datetime]]:
+        """取得一批辯論在 (since, until] 期間的事件時間"""
+        stmt = select(model.debate_id, model.created_at).where(
+            model.debate_id.in_(debate_ids), model.created_at <= until)
+        if since is not None:
+            stmt = stmt.where(model.created_at > since)
+        events = defaultdict(list)
+        for debate_id, created_at in db.session.execute(stmt):
+            if created_at is not None:
+                events[debate_id].append(created_at)
+        return events
+
+    @staticmethod
+    def _batches(columns, full: bool, since: Optional[datetime], batch_size: int):
+        """
+        逐批產生要重算的辯論
+
+        全量時以 id 做 keyset 分批；增量時先以 last_activity_at 索引取出水位線之後有活動的 id，
+        避免沿主鍵掃過整張表（不設上限：最後活動晚於本次上限的辯論，仍可能有上限之前的事件）。
+        """
+        if full:
+            last_id = 0
+            while True:
+                batch = db.session.execute(select(*columns).where(Debate.id > last_id)
+                                           .order_by(Debate.id).limit(batch_size)).all()
+                if not batch:
+                    return
+                last_id = batch[-1].id
+                yield batch
+            
+        if since is not None:
+            stmt = select(Debate.id).where(Debate.last_activity_at > since)
+        else:
+            stmt = select(Debate.id).where(Debate.last_activity_at.isnot(None))
+        ids = sorted(db.session.execute(stmt).scalars())
+        for offset in range(0, len(ids), batch_size):
+            chunk = ids[offset:offset + batch_size]
+            yield db.session.execute(select(*columns).where(Debate.id.in_(chunk)).order_by(Debate.id)).all()
+
+    @staticmethod
+    def refresh(full: bool = False, batch_size: int = 1000, now: Optional[datetime] = None) -> Dict[str, float]:
+        """
+        增量重算熱門分數
+
+        只處理上次執行後有活動的辯論，事件範圍為 (水位線, now - HOT_WATERMARK_LAG]；
+        full=True 時清除水位線並從頭重算所有辯論。
+        回傳處理的辯論數、事件數與耗時。
+        """
+        started = time.perf_counter()
+        now = now or datetime.utcnow()
+        until = now - timedelta(seconds=current_app.config['HOT_WATERMARK_LAG'])
+        tau = HotRankingService.tau_seconds()
+        state = JobState.get(JOB_NAME)
+        since = None if full else state.watermark
+        if since is not None and since >= until:
+            return {'debates': 0, 'events': 0, 'seconds': time.perf_counter() - started}
+
+        columns = (Debate.id, Debate.hot_score, Debate.views, Debate.hot_views_counted, Debate.created_at)
+        update_stmt = update(Debate.__table__).where(Debate.__table__.c.id == bindparam('b_id')).values(
+            hot_score=bindparam('b_score'), hot_views_counted=bindparam('b_views'))
+
+        debates = events = 0
+        for batch in HotRankingService._batches(columns, full, since, batch_size):
+            ids = [row.id for row in batch]
+            event_sets = [
+                (WEIGHT_ARGUMENT, HotRankingService._events_since(Argument, ids, since, until)),
+                (WEIGHT_FOLLOW, HotRankingService._events_since(DebateFollow, ids, since, until)),
+                (WEIGHT_RATING, HotRankingService._events_since(DebateRating, ids, since, until)),
+            ]
+            params = []
+            for row in batch:
+                if since is None:
+                    # 從頭計算
+                    score, counted = -math.inf, 0
+                else:
+                    score, counted = row.hot_score, row.hot_views_counted or 0
+                # 水位線之後建立的辯論若已有分數，建立事件已由 initial_score 計入
+                created = row.created_at and row.created_at <= until
+                if created and (since is None or (row.created_at > since and not row.hot_score)):
+                    score = _logaddexp(score, HotRankingService.event_score(WEIGHT_CREATED, row.created_at, tau))
+                for weight, per_debate in event_sets:
+                    for at in per_debate.get(row.id, ()):
+                        score = _logaddexp(score, HotRankingService.event_score(weight, at, tau))
+                        events += 1
+                # 觀看數沒有逐筆時間，新增的觀看視為發生在本次執行時
+                new_views = (row.views or 0) - counted
+                if new_views > 0:
+                    score = _logaddexp(score, HotRankingService.event_score(WEIGHT_VIEW * new_views, now, tau))
+                    events += new_views
+                if score == -math.inf:
+                    score = 0.0
+                params.append({'b_id': row.id, 'b_score': score, 'b_views': row.views or 0})
+                hot_top_k.offer(row.id, score)
+
+            db.session.execute(update_stmt, params)
+            debates += len(batch)
+
+        state.watermark = until
+        db.session.commit()
+        return {'debates': debates, 'events': events, 'seconds': time.perf_counter() - started}
+
+    # -- 查詢 --------------------------------------------------------------
+
+    @staticmethod
+    def top_ids(limit: int) -> List[int]:
+        """從記憶體內 top-K 取熱門辯論 id，過期時以 hot_score 索引重新載入"""
+        if limit > hot_top_k.k:
+            return list(db.session.execute(
+                select(Debate.id).order_by(desc(Debate.hot_score)).limit(limit)).scalars())
+        if hot_top_k.is_stale():
+            hot_top_k.k = current_app.config['HOT_TOP_K']
+            hot_top_k.ttl = current_app.config['HOT_TOP_K_TTL']
+            hot_top_k.load(db.session.execute(
+                select(Debate.id, Debate.hot_score).order_by(desc(Debate.hot_score)).limit(hot_top_k.k)).all())
+        return [debate_id for debate_id, _ in hot_top_k.top(limit)]
+
+    @staticmethod
+    def get_hot_debates(limit: int = 10) -> List[Debate]:
+        """獲取熱門辯論（依熱門分數排序）"""
+        ids = HotRankingService.top_ids(limit)
+        if not ids:
+            return []
+        debates = {debate.id: debate for debate in Debate.query.filter(Debate.id.in_(ids))}
+        return [debates[debate_id] for debate_id in ids if debate_id in debates]
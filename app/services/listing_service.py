@@ -0,0 +1,144 @@
+"""
+列表頁的唯讀查詢 - 看板、搜尋頁、大廳
+
+列表只顯示標題、分類、狀態、觀看數與參與者名稱，不需要完整的 Debate 物件（二十多個欄位、identity map、
+屬性追蹤、關聯的延遲載入）。這裡以 Core 只查需要的欄位，轉成輕量的唯讀物件：
+    DebateRow       __slots__ 類別，建立時一次算好 is_urgent、time_remaining 等衍生欄位
+    HallMessageRow  NamedTuple
+    UserRef         NamedTuple，列表中的使用者名稱與等級
+一頁列表固定兩個查詢：一次取出列表本身，一次取出頁面上所有使用者（名稱與 user_stats 的等級）。
+這些物件與模板中原本使用的屬性名稱相同，但只能讀取；需要修改資料時仍應使用 ORM 模型。
+"""
+from datetime import datetime
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+from sqlalchemy import desc, func, select
+
+from app import db
+from app.models.debate import (Argument, Debate, DebateFollow, HallMessage, UserStats, deadline_urgent,
+                               remaining_text)
+from app.models.user import User
+from app.services.hot_ranking import HotRankingService
+
+debates = Debate.__table__
+users = User.__table__
+
+DEBATE_COLUMNS = (debates.c.id, debates.c.title, debates.c.description, debates.c.category, debates.c.status,
+                  debates.c.views, debates.c.created_at, debates.c.current_deadline, debates.c.creator_id,
+                  debates.c.pro_participant_id, debates.c.con_participant_id)
+
+
+class UserRef(NamedTuple):
+    id: int
+    username: Optional[str]
+    level: int
+
+
+class DebateRow:
+    """列表中的一場辯論（唯讀）"""
+
+    __slots__ = ('id', 'title', 'description', 'category', 'status', 'views', 'created_at', 'current_deadline',
+                 'creator_id', 'creator', 'pro_participant', 'con_participant', 'participants_count',
+                 'is_urgent', 'time_remaining', 'arguments_count', 'followers')
+
+    def __init__(self, row, people: Dict[int, UserRef], now: datetime):
+        (self.id, self.title, self.description, self.category, self.status, views, self.created_at,
+         self.current_deadline, self.creator_id, pro_id, con_id) = row[:11]
+        self.views = views or 0
+        self.creator = people.get(self.creator_id)
+        self.pro_participant = people.get(pro_id) if pro_id else None
+        self.con_participant = people.get(con_id) if con_id else None
+        self.participants_count = (pro_id is not None) + (con_id is not None)
+        # 只有進行中的辯論才有「即將截止」的意義
+        self.is_urgent = self.status == 'ongoing' and deadline_urgent(self.current_deadline, now)
+        self.time_remaining = remaining_text(self.current_deadline, now)
+        self.arguments_count, self.followers = row[11:13] if len(row) > 11 else (None, None)
+
+    def __repr__(self):
+        return f'<DebateRow {self.id} {self.title!r}>'
+
+
+class HallMessageRow(NamedTuple):
+    id: int
+    user_id: int
+    user: Optional[UserRef]
+    content: str
+    message_type: str
+    debate_id: Optional[int]
+    created_at: datetime
+
+
+class ListingService:
+    """列表頁唯讀查詢服務類"""
+
+    @staticmethod
+    def users(ids: Iterable[int]) -> Dict[int, UserRef]:
+        """使用者 id → UserRef（沒有統計資料時等級為 1）"""
+        ids = {user_id for user_id in ids if user_id}
+        if not ids:
+            return {}
+        level = (select(UserStats.__table__.c.level).where(UserStats.__table__.c.user_id == users.c.id)
+                 .limit(1).scalar_subquery())
+        rows = db.session.execute(select(users.c.id, users.c.username, level).where(users.c.id.in_(ids)))
+        return {user_id: UserRef(user_id, username, level or 1) for user_id, username, level in rows}
+
+    @staticmethod
+    def debates(*criteria, order_by=None, offset: int = 0, limit: int = 20,
+                with_counts: bool = False) -> List[DebateRow]:
+        """
+        符合條件的辯論列表
+
+        criteria 與 order_by 可直接使用 Debate 的欄位（例如 Debate.status == 'ongoing'）。
+        with_counts=True 時同一個查詢另外取出論述數與關注數（相關子查詢，只對取出的列執行）。
+        """
+        columns = DEBATE_COLUMNS
+        if with_counts:
+            arguments_count = (select(func.count()).select_from(Argument.__table__)
+                               .where(Argument.__table__.c.debate_id == debates.c.id).scalar_subquery())
+            followers = (select(func.count()).select_from(DebateFollow.__table__)
+                         .where(DebateFollow.__table__.c.debate_id == debates.c.id).scalar_subquery())
+            columns += (arguments_count, followers)
+        stmt = select(*columns).where(*criteria)
+        if order_by is not None:
+            stmt = stmt.order_by(order_by)
+        rows = db.session.execute(stmt.offset(offset).limit(limit)).all()
+        return ListingService._debate_rows(rows)
+
+    @staticmethod
+    def debates_by_ids(ids: List[int]) -> List[DebateRow]:
+        """依 ids 的順序（例如熱門榜）取出辯論，已不存在的略過"""
+        if not ids:
+            return []
+        rows = db.session.execute(select(*DEBATE_COLUMNS).where(debates.c.id.in_(ids))).all()
+        by_id = {row.id: row for row in rows}
+        return ListingService._debate_rows([by_id[debate_id] for debate_id in ids if debate_id in by_id])
+
+    @staticmethod
+    def _debate_rows(rows) -> List[DebateRow]:
+        people = ListingService.users(user_id for row in rows for user_id in row[8:11])
+        now = datetime.utcnow()
+        return [DebateRow(row, people, now) for row in rows]
+
+    @staticmethod
+    def hot_debates(limit: int = 10) -> List[DebateRow]:
+        """熱門辯論（依記憶體內熱門榜的順序）"""
+        return ListingService.debates_by_ids(HotRankingService.top_ids(limit))
+
+    @staticmethod
+    def latest_debates(limit: int = 6) -> List[DebateRow]:
+        """最新辯論"""
+        return ListingService.debates(order_by=desc(debates.c.created_at), limit=limit)
+
+    @staticmethod
+    def hall_messages(limit: int = 20) -> List[HallMessageRow]:
+        """最近的大廳訊息（新到舊）"""
+        table = HallMessage.__table__
+        rows = db.session.execute(
+            select(table.c.id, table.c.user_id, table.c.content, table.c.message_type, table.c.debate_id,
+                   table.c.created_at)
+            .order_by(desc(table.c.created_at)).limit(limit)
+        ).all()
+        people = ListingService.users(row.user_id for row in rows)
+        return [HallMessageRow(row.id, row.user_id, people.get(row.user_id), row.content,
+                               row.message_type or 'general', row.debate_id, row.created_at)
+                for row in rows]
@@ -0,0 +1,191 @@
+"""
+內容審查服務 - 大廳訊息與論述發表前的字詞檢查
+
+每個 worker 保有一份編譯好的 Moderator（見 app/moderation.py），第一次使用時從 MODERATION_WORDLIST_PATH
+讀入字詞表；之後每 MODERATION_RELOAD_SECONDS 秒檢查字詞表（與 MODERATION_VARIANTS_PATH）的修改時間，
+有變動時在背景之外重新編譯並整個替換，不需重新啟動。字詞表不存在時不做任何檢查。
+
+發表時：命中 block 拋出 ContentBlocked；mask 以遮蔽後的內容儲存；flag 照常儲存並寫入 moderation_flags。
+`flask moderation rescan` 以 process pool 依 id 範圍平行掃描既有內容（字詞表更新後使用），
+子行程只負責比對，寫入由主行程逐批進行，不會有多個行程同時寫入 SQLite。
+重新掃描不改寫已儲存的內容：命中的 mask、block、flag 字詞都寫入 moderation_flags 待人工檢視，
+原文保持不變，論述分頁快取與已完成辯論的快照也因此不會過期。
+"""
+import json
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from flask import current_app
+from sqlalchemy import func, select
+
+from app import db
+from app.models.debate import Argument, HallMessage
+from app.models.moderation import ModerationFlag
+from app.moderation import ALLOW, BLOCK, FLAG, MASK, ContentBlocked, Moderator, Verdict, load_variants, parse_wordlist
+
+# 可重新掃描的內容：名稱 → (資料表, moderation_flags.content_type)
+TARGETS = {
+    'hall_messages': (HallMessage.__table__, 'hall_message'),
+    'arguments': (Argument.__table__, 'argument'),
+}
+
+_moderator: Optional[Moderator] = None
+_loaded_mtimes: Tuple[float, float] = (0.0, 0.0)
+_checked_at = 0.0
+_lock = threading.Lock()
+
+
+def _mtime(path: Optional[str]) -> float:
+    try:
+        return os.path.getmtime(path) if path else 0.0
+    except OSError:
+        return 0.0
+
+
+def _variant_pairs(lines: Iterable[str]):
+    """異體字檔每行兩個字（可用空白隔開），前者比對時視為後者"""
+    for line in lines:
+        chars = ''.join(line.split())
+        if len(chars) == 2 and not line.startswith('#'):
+            yield chars[0], chars[1]
+
+
+def _compile(config) -> Moderator:
+    variants = config['MODERATION_VARIANTS_PATH']
+    if variants and os.path.exists(variants):
+        with open(variants, encoding='utf-8') as f:
+            load_variants(_variant_pairs(f))
+    words: Dict[str, str] = {}
+    if os.path.exists(config['MODERATION_WORDLIST_PATH']):
+        with open(config['MODERATION_WORDLIST_PATH'], encoding='utf-8') as f:
+            words = parse_wordlist(f, config['MODERATION_DEFAULT_ACTION'])
+    return Moderator(words, config['MODERATION_MASK_CHAR'])
+
+
+class ModerationService:
+    """內容審查服務類"""
+
+    @staticmethod
+    def moderator() -> Moderator:
+        """目前 worker 的 Moderator（字詞表有變動時重新編譯）"""
+        global _moderator, _loaded_mtimes, _checked_at
+        config = current_app.config
+        with _lock:
+            now = time.monotonic()
+            if _moderator is not None and now - _checked_at < config['MODERATION_RELOAD_SECONDS']:
+                return _moderator
+            _checked_at = now
+            mtimes = (_mtime(config['MODERATION_WORDLIST_PATH']), _mtime(config['MODERATION_VARIANTS_PATH']))
+            if _moderator is None or mtimes != _loaded_mtimes:
+                _moderator = _compile(config)
+                _loaded_mtimes = mtimes
+            return _moderator
+
+    @staticmethod
+    def review(content: str) -> Verdict:
+        """檢查即將發表的內容；命中 block 字詞時拋出 ContentBlocked"""
+        if not current_app.config['MODERATION_ENABLED']:
+            return Verdict(ALLOW, content, [])
+        verdict = ModerationService.moderator().review(content)
+        if verdict.action == BLOCK:
+            raise ContentBlocked(verdict.terms(BLOCK))
+        return verdict
+
+    @staticmethod
+    def record(content_type: str, item, user_id: Optional[int], verdict: Verdict):
+        """命中 flag 字詞時記錄（與內容同一個交易，需在 commit 前呼叫）"""
+        terms = verdict.terms(FLAG)
+        if not terms:
+            return
+        db.session.flush()
+        db.session.add(ModerationFlag(content_type=content_type, content_id=item.id, user_id=user_id,
+                                      action=FLAG, terms=json.dumps(terms, ensure_ascii=False)))
+
+    # -- 重新掃描 ------------------------------------------------------------
+
+    @staticmethod
+    def _write(table, content_type: str, results: List[tuple]) -> Tuple[int, int]:
+        """寫入一批掃描結果：新增尚未記錄的 flag（已儲存的內容不變），回傳 (mask 筆數, 新增筆數)"""
+        existing = set(db.session.execute(
+            select(ModerationFlag.content_id).where(ModerationFlag.content_type == content_type,
+                                                    ModerationFlag.content_id.in_([row[0] for row in results]))
+        ).scalars())
+        new_flags = [{'content_type': content_type, 'content_id': item_id, 'user_id': user_id,
+                      'action': action, 'terms': json.dumps(terms, ensure_ascii=False)}
+                     for item_id, user_id, action, terms in results if item_id not in existing]
+        if new_flags:
+            db.session.execute(ModerationFlag.__table__.insert(), new_flags)
+        db.session.commit()
+        return sum(1 for row in new_flags if row['action'] == MASK), len(new_flags)
+
+    @staticmethod
+    def rescan(target: str, workers: int = 1, chunk_size: int = 20000, apply: bool = True) -> Dict[str, Any]:
+        """
+        依 id 範圍重新掃描既有內容（需在 app context 中呼叫）
+
+        命中的內容以最嚴重的動作（block、mask 或 flag）寫入 moderation_flags 待人工檢視，
+        不改寫已儲存的內容。apply=False 時只統計不寫入。
+        """
+        table, content_type = TARGETS[target]
+        started = time.perf_counter()
+        low, high = db.session.execute(select(func.min(table.c.id), func.max(table.c.id))).one()
+        jobs = [(target, start, start + chunk_size) for start in range(low, high + 1, chunk_size)] if low else []
+        totals = {'target': target, 'scanned': 0, 'matched': 0, 'masked': 0, 'flagged': 0, 'workers': workers}
+
+        def consume(scanned: int, results: List[tuple]):
+            totals['scanned'] += scanned
+            totals['matched'] += len(results)
+            if apply and results:
+                masked, flagged = ModerationService._write(table, content_type, results)
+                totals['masked'] += masked
+                totals['flagged'] += flagged
+
+        if workers <= 1 or len(jobs) <= 1:
+            for job in jobs:
+                consume(*_scan_chunk(job))
+        else:
+            config = current_app.config
+            overrides = {key: config[key] for key in ('SQLALCHEMY_DATABASE_URI', 'SECRET_KEY', 'SQLALCHEMY_ENGINE_OPTIONS',
+                                                     'MODERATION_WORDLIST_PATH', 'MODERATION_VARIANTS_PATH',
+                                                     'MODERATION_DEFAULT_ACTION', 'MODERATION_MASK_CHAR')
+                         if key in config}
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(overrides,)) as pool:
+                for scanned, results in pool.map(_scan_chunk, jobs):
+                    consume(scanned, results)
+        totals['seconds'] = time.perf_counter() - started
+        return totals
+
+
+_worker_app = None
+
+
+def _init_worker(overrides: dict):
+    """process pool 初始化：每個行程建立自己的應用程式、資料庫連線並編譯字詞表"""
+    global _worker_app
+    from app import create_app
+    from app.config import Config
+
+    _worker_app = create_app(type('ModerationWorkerConfig', (Config,), overrides))
+    _worker_app.app_context().push()
+    ModerationService.moderator()
+
+
+def _scan_chunk(job: tuple) -> Tuple[int, List[tuple]]:
+    """掃描 [id_from, id_to)，回傳 (掃描筆數, [(id, user_id, 動作, 命中的字詞)])"""
+    target, id_from, id_to = job
+    table = TARGETS[target][0]
+    moderator = ModerationService.moderator()
+    scanned = 0
+    results = []
+    rows = db.session.execute(select(table.c.id, table.c.user_id, table.c.content)
+                              .where(table.c.id >= id_from, table.c.id < id_to))
+    for item_id, user_id, content in rows:
+        scanned += 1
+        verdict = moderator.review(content or '')
+        if verdict.matches:
+            results.append((item_id, user_id, verdict.action, verdict.terms()))
+    db.session.remove()
+    return scanned, results
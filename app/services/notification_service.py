@@ -0,0 +1,203 @@
+"""
+關注通知服務 - 把辯論事件展開到關注者的收件匣
+
+DebateService 的加入、發言與狀態轉換呼叫 publish()，在同一個交易內寫入一筆 debate_events，
+再排入背景工作 notify.fan_out，由 worker 依關注者數量選擇展開方式：
+    寫入時展開  關注者不超過 NOTIFY_FANOUT_LIMIT：分批寫入每位關注者的 notifications 列並累加未讀計數
+    讀取時展開  關注者更多的辯論登記到 notification_hubs，之後的事件只有一列，
+               讀取收件匣時再依 debate_follows 合併進來
+辯論一旦改為讀取時展開就不再切回，同一事件不會重複或遺漏。
+收件匣依事件 id 由新到舊分頁，游標為上一頁最後一則的事件 id。
+"""
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from flask import current_app
+from sqlalchemy import select, desc, func, or_, and_, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app import db
+from app.tasks import enqueue, task
+from app.models.debate import Debate, DebateFollow
+from app.models.notification import DebateEvent, Notification, NotificationHub, NotificationState
+from app.models.user import User
+
+STATUS_MESSAGES = {
+    'ongoing': '「{title}」辯論開始了',
+    'judging': '「{title}」進入評審階段',
+    'completed': '「{title}」辯論已結束',
+}
+KIND_MESSAGES = {
+    'argument_posted': '{actor}在「{title}」發表了新論述',
+    'participant_joined': '{actor}加入了「{title}」',
+}
+
+
+def describe(kind: str, detail: Optional[str], title: str, actor: Optional[str]) -> str:
+    """通知文字"""
+    if kind == 'status_changed':
+        template = STATUS_MESSAGES.get(detail, '「{title}」狀態已更新')
+    else:
+        template = KIND_MESSAGES.get(kind, '「{title}」有新動態')
+    return template.format(title=title, actor=actor or '有人')
+
+
+class NotificationService:
+    """關注通知服務類"""
+
+    # -- 寫入 ----------------------------------------------------------------
+
+    @staticmethod
+    def publish(debate: Debate, kind: str, actor_id: Optional[int] = None,
+                detail: Optional[str] = None) -> DebateEvent:
+        """記錄辯論事件，並排入展開給關注者的背景工作（由呼叫端提交）"""
+        event = DebateEvent(debate_id=debate.id, kind=kind, detail=detail, actor_id=actor_id,
+                            created_at=datetime.utcnow())
+        db.session.add(event)
+        db.session.flush()
+        enqueue('notify.fan_out', {'event_id': event.id}, dedup_key=f'notify:{event.id}')
+        return event
+
+    @staticmethod
+    def fan_out(event: DebateEvent, limit: Optional[int] = None) -> str:
+        """依關注者數量展開事件，回傳採用的方式（'write' 或 'read'）"""
+        if limit is None:
+            limit = current_app.config['NOTIFY_FANOUT_LIMIT']
+        if db.session.get(NotificationHub, event.debate_id) is not None:
+            return 'read'
+        # 最多讀取 limit + 1 位，超過就不必再讀完
+        followers = list(db.session.execute(
+            select(DebateFollow.user_id).where(DebateFollow.debate_id == event.debate_id).limit(limit + 1)
+        ).scalars())
+        if len(followers) > limit:
+            db.session.add(NotificationHub(debate_id=event.debate_id, since_event_id=event.id - 1))
+            return 'read'
+        NotificationService.deliver(event.id, [user_id for user_id in followers if user_id != event.actor_id])
+        return 'write'
+
+    @staticmethod
+    def delivered(event_id: int) -> bool:
+        """事件是否已寫入收件匣（背景工作重新執行時略過）"""
+        return db.session.execute(
+            select(Notification.user_id).where(Notification.event_id == event_id).limit(1)).first() is not None
+
+    @staticmethod
+    def deliver(event_id: int, user_ids: List[int], batch_size: Optional[int] = None):
+        """分批寫入收件匣並累加未讀計數"""
+        batch_size = batch_size or current_app.config['NOTIFY_BATCH_SIZE']
+        table = Notification.__table__
+        for offset in range(0, len(user_ids), batch_size):
+            chunk = user_ids[offset:offset + batch_size]
+            db.session.execute(table.insert(), [{'user_id': user_id, 'event_id': event_id} for user_id in chunk])
+            NotificationService._add_unread(chunk)
+
+    @staticmethod
+    def _add_unread(user_ids: List[int]):
+        table = NotificationState.__table__
+        rows = [{'user_id': user_id, 'unread': 1, 'read_event_id': 0} for user_id in user_ids]
+        dialect = db.session.get_bind().dialect.name
+        if dialect in ('sqlite', 'postgresql'):
+            insert = sqlite.insert if dialect == 'sqlite' else postgresql.insert
+            stmt = insert(table)
+            stmt = stmt.on_conflict_do_update(index_elements=['user_id'],
+                                              set_={'unread': table.c.unread + 1})
+            db.session.execute(stmt, rows)
+            return
+        result = db.session.execute(update(table).where(table.c.user_id.in_(user_ids))
+                                    .values(unread=table.c.unread + 1))
+        if result.rowcount < len(user_ids):
+            existing = set(db.session.execute(select(table.c.user_id).where(table.c.user_id.in_(user_ids))).scalars())
+            missing = [row for row in rows if row['user_id'] not in existing]
+            if missing:
+                db.session.execute(table.insert(), missing)
+
+    # -- 讀取 ----------------------------------------------------------------
+
+    @staticmethod
+    def _pulled(user_id: int, *columns):
+        """用戶關注、改為讀取時展開的辯論中，關注之後由他人觸發的事件"""
+        return (select(*columns)
+                .join(DebateFollow, and_(DebateFollow.debate_id == DebateEvent.debate_id,
+                                         DebateFollow.user_id == user_id))
+                .join(NotificationHub, NotificationHub.debate_id == DebateEvent.debate_id)
+                .where(DebateEvent.id > NotificationHub.since_event_id,
+                       DebateEvent.created_at >= DebateFollow.created_at,
+                       or_(DebateEvent.actor_id.is_(None), DebateEvent.actor_id != user_id)))
+
+    @staticmethod
+    def _state(user_id: int) -> Dict[str, int]:
+        state = db.session.get(NotificationState, user_id)
+        return {'unread': state.unread if state else 0, 'read_event_id': state.read_event_id if state else 0}
+
+    @staticmethod
+    def unread_count(user_id: int, state: Optional[Dict[str, int]] = None) -> int:
+        """未讀數：寫入展開的計數加上已讀位置之後的讀取展開事件"""
+        state = state or NotificationService._state(user_id)
+        pulled = db.session.execute(NotificationService._pulled(user_id, func.count(DebateEvent.id))
+                                    .where(DebateEvent.id > state['read_event_id'])).scalar()
+        return state['unread'] + pulled
+
+    @staticmethod
+    def inbox(user_id: int, before: Optional[int] = None, limit: int = 20) -> Dict[str, Any]:
+        """
+        收件匣一頁（新到舊）
+
+        before 為上一頁的 next_cursor；兩種展開方式各取 limit + 1 筆後合併。
+        """
+        written = select(Notification.event_id).where(Notification.user_id == user_id)
+        pulled = NotificationService._pulled(user_id, DebateEvent.id)
+        if before is not None:
+            written = written.where(Notification.event_id < before)
+            pulled = pulled.where(DebateEvent.id < before)
+        ids = set(db.session.execute(written.order_by(desc(Notification.event_id)).limit(limit + 1)).scalars())
+        ids.update(db.session.execute(pulled.order_by(desc(DebateEvent.id)).limit(limit + 1)).scalars())
+        ids = sorted(ids, reverse=True)
+        has_more = len(ids) > limit
+        ids = ids[:limit]
+
+        rows = db.session.execute(
+            select(DebateEvent.id, DebateEvent.kind, DebateEvent.detail, DebateEvent.debate_id,
+                   DebateEvent.created_at, Debate.title, User.username)
+            .join(Debate, Debate.id == DebateEvent.debate_id)
+            .outerjoin(User, User.id == DebateEvent.actor_id)
+            .where(DebateEvent.id.in_(ids)).order_by(desc(DebateEvent.id))).all() if ids else []
+
+        state = NotificationService._state(user_id)
+        items = [{
+            'id': row.id,
+            'kind': row.kind,
+            'detail': row.detail,
+            'debate_id': row.debate_id,
+            'debate_title': row.title,
+            'actor': row.username,
+            'message': describe(row.kind, row.detail, row.title, row.username),
+            'created_at': row.created_at,
+            'read': row.id <= state['read_event_id'],
+        } for row in rows]
+        return {
+            'items': items,
+            'next_cursor': str(ids[-1]) if has_more else None,
+            'unread': NotificationService.unread_count(user_id, state),
+        }
+
+    @staticmethod
+    def mark_all_read(user_id: int):
+        """全部標為已讀"""
+        latest = db.session.execute(select(func.max(DebateEvent.id))).scalar() or 0
+        state = db.session.get(NotificationState, user_id)
+        if state is None:
+            state = NotificationState(user_id=user_id)
+            db.session.add(state)
+        state.unread = 0
+        state.read_event_id = latest
+        db.session.commit()
+
+
+@task('notify.fan_out', batch=True)
+def fan_out_events(payloads: List[Dict[str, int]]):
+    """背景展開事件；辯論已封存或事件已寫入收件匣時略過"""
+    for event_id in sorted({payload['event_id'] for payload in payloads}):
+        event = db.session.get(DebateEvent, event_id)
+        if event is None or NotificationService.delivered(event_id):
+            continue
+        NotificationService.fan_out(event)
@@ -0,0 +1,351 @@
+"""
+相關辯論服務 - 預先計算的 TF-IDF 最近鄰
+
+每場辯論的標題與說明切成詞項（連續的中文字取相鄰兩字的 bigram，英數取整個單字，標題計 TITLE_WEIGHT 次），
+以 feature hashing 對應到 2^20 維，權重為 (1 + ln tf) · idf，再做 L2 正規化。
+出現在超過 RELATED_MAX_DF 場辯論中的詞項（「是否」「應該」之類）idf 設為 0：一批辯論的相似度計算量
+約為其詞項出現次數的總和，以絕對數量設上限，計算量才會隨辯論數線性成長（30 萬場的測試資料中，前 6 名與不設上限時約 90% 相同）；
+分類同理不放進向量（同分類的辯論太多），改為在有文字相似度的候選上加 RELATED_CATEGORY_BOOST。
+
+相似度以 scipy 稀疏矩陣分批計算（X[批次] · Xᵀ），每列以 argpartition 取前 k 名寫入 debate_neighbors，
+詳情頁只需一次以主鍵查詢 join debates。
+
+向量、idf 與每場辯論目前第 k 名的分數存在 RELATED_DIR/index.npz，`flask related refresh` 增量更新：
+    新辯論與指定的辯論（內容被修改）重新向量化並計算鄰居
+    它們與某場辯論的分數超過那場辯論目前的第 k 名時，重算那場辯論
+    鄰居中有已封存或被修改的辯論時，重算
+idf 固定為上次完整重建時的值，需定期以 `flask related rebuild` 完整重建。
+numpy / scipy 為選用套件，只有建立索引的工作需要；沒有安裝時詳情頁不顯示相關辯論。
+"""
+import os
+import re
+import time
+import zlib
+from array import array
+from collections import Counter
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from flask import current_app
+from sqlalchemy import delete, select
+
+from app import db
+from app.models.debate import Debate, DEBATE_CATEGORIES
+from app.models.related import DebateNeighbor
+
+N_FEATURES = 1 << 20
+TITLE_WEIGHT = 2
+INDEX_FILE = 'index.npz'
+CATEGORY_CODES = {category: code for code, category in enumerate(DEBATE_CATEGORIES)}
+
+_TOKEN = re.compile(r'[㐀-䶿一-鿿豈-﫿]+|[a-z0-9]+')
+
+# numpy / scipy 在第一次建立索引時才載入
+np = sparse = None
+
+
+def _load_numpy() -> bool:
+    global np, sparse
+    if np is None:
+        try:
+            import numpy
+            import scipy.sparse
+        except ImportError:
+            return False
+        np, sparse = numpy, scipy.sparse
+    return True
+
+
+def terms(text: str) -> Iterator[str]:
+    """中文 bigram 與英數單字"""
+    for run in _TOKEN.findall(text.lower()):
+        if len(run) == 1 or run.isascii():
+            yield run
+        else:
+            yield from map(''.join, zip(run, run[1:]))
+
+
+def _buckets(text: Optional[str]) -> List[int]:
+    mask = N_FEATURES - 1
+    return [zlib.crc32(term.encode('utf-8')) & mask for term in terms(text or '')]
+
+
+def term_counts(title: Optional[str], description: Optional[str]) -> Counter:
+    """雜湊後的維度 → 加權次數"""
+    counts = Counter(_buckets(description))
+    for bucket in _buckets(title):
+        counts[bucket] += TITLE_WEIGHT
+    return counts
+
+
+def _raw_matrix(docs: Iterable[Tuple[int, str, str, str]]):
+    """(id, 標題, 說明, 分類) → (ids, 分類代碼, 詞頻 CSR)；以 array 累積，避免大量 Python int 物件"""
+    ids, cats = array('q'), array('h')
+    indptr, indices, data = array('q', [0]), array('i'), array('f')
+    for debate_id, title, description, category in docs:
+        counts = term_counts(title, description)
+        ids.append(debate_id)
+        cats.append(CATEGORY_CODES.get(category, -1))
+        indices.extend(counts.keys())
+        data.extend(counts.values())
+        indptr.append(len(indices))
+    matrix = sparse.csr_matrix(
+        (np.frombuffer(data, dtype=np.float32), np.frombuffer(indices, dtype=np.int32),
+         np.frombuffer(indptr, dtype=np.int64)), shape=(len(ids), N_FEATURES))
+    return np.frombuffer(ids, dtype=np.int64).copy(), np.frombuffer(cats, dtype=np.int16).copy(), matrix
+
+
+def _idf(raw, max_df: int):
+    n = raw.shape[0]
+    df = np.bincount(raw.indices, minlength=N_FEATURES)
+    idf = (np.log((n + 1) / (df + 1)) + 1).astype(np.float32)
+    idf[df > max_df] = 0
+    return idf
+
+
+def _weigh(raw, idf):
+    """(1 + ln tf) · idf 後 L2 正規化"""
+    matrix = raw.astype(np.float32, copy=True)
+    matrix.data = (1 + np.log(matrix.data)) * idf[matrix.indices]
+    matrix.eliminate_zeros()
+    norms = np.sqrt(np.asarray(matrix.power(2).sum(axis=1), dtype=np.float32).ravel())
+    norms[norms == 0] = 1
+    matrix.data /= np.repeat(norms, np.diff(matrix.indptr))
+    return matrix
+
+
+class _Index:
+    """記憶體中的向量索引（rows 依 id 排序）"""
+
+    def __init__(self, ids, cats, matrix, idf, thresholds):
+        self.ids = ids
+        self.cats = cats
+        self.matrix = matrix.tocsr()
+        self.idf = idf
+        self.thresholds = thresholds
+        self._transposed = None
+
+    @property
+    def transposed(self):
+        if self._transposed is None:
+            self._transposed = self.matrix.T.tocsr()
+        return self._transposed
+
+    def positions(self, debate_ids) -> Any:
+        """id → 列位置（不在索引中的 id 略過）"""
+        debate_ids = np.asarray(debate_ids, dtype=np.int64)
+        positions = np.searchsorted(self.ids, debate_ids)
+        found = positions < len(self.ids)
+        positions, debate_ids = positions[found], debate_ids[found]
+        return positions[self.ids[positions] == debate_ids]
+
+    def save(self, directory: str):
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, INDEX_FILE)
+        tmp = path + '.tmp.npz'
+        np.savez(tmp, ids=self.ids, cats=self.cats, data=self.matrix.data, indices=self.matrix.indices,
+                 indptr=self.matrix.indptr, idf=self.idf, thresholds=self.thresholds)
+        os.replace(tmp, path)
+
+    @staticmethod
+    def load(directory: str) -> Optional['_Index']:
+        path = os.path.join(directory, INDEX_FILE)
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as f:
+            matrix = sparse.csr_matrix((f['data'], f['indices'], f['indptr']), shape=(len(f['ids']), N_FEATURES))
+            return _Index(f['ids'], f['cats'], matrix, f['idf'], f['thresholds'])
+
+
+def _similarities(index: _Index, rows, boost: float):
+    """rows 對所有辯論的分數（稀疏），已加上同分類加分並去掉自己"""
+    scores = (index.matrix[rows] @ index.transposed).tocsr()
+    own = np.repeat(rows, np.diff(scores.indptr))
+    if boost:
+        own_cats = index.cats[own]
+        scores.data += boost * ((index.cats[scores.indices] == own_cats) & (own_cats >= 0))
+    scores.data[scores.indices == own] = 0
+    scores.eliminate_zeros()
+    return scores
+
+
+def _top_k(scores, k: int, min_score: float) -> List[Tuple[Any, Any]]:
+    """每列分數最高的 k 個 (欄位, 分數)，由高到低"""
+    result = []
+    for i in range(scores.shape[0]):
+        start, end = scores.indptr[i], scores.indptr[i + 1]
+        cols, vals = scores.indices[start:end], scores.data[start:end]
+        keep = vals >= min_score
+        cols, vals = cols[keep], vals[keep]
+        if len(vals) > k:
+            top = np.argpartition(-vals, k)[:k]
+            cols, vals = cols[top], vals[top]
+        order = np.lexsort((cols, -vals))
+        result.append((cols[order], vals[order]))
+    return result
+
+
+class RelatedService:
+    """相關辯論服務類"""
+
+    @staticmethod
+    def available() -> bool:
+        return _load_numpy()
+
+    @staticmethod
+    def related(debate_id: int, limit: Optional[int] = None) -> List[Any]:
+        """詳情頁的相關辯論（一次以主鍵查詢；已封存的鄰居由 join 濾掉）"""
+        query = (select(Debate.id, Debate.title, Debate.category, Debate.status, DebateNeighbor.score)
+                 .join(DebateNeighbor, DebateNeighbor.neighbor_id == Debate.id)
+                 .where(DebateNeighbor.debate_id == debate_id)
+                 .order_by(DebateNeighbor.rank))
+        if limit:
+            query = query.limit(limit)
+        return db.session.execute(query).all()
+
+    # -- 建立索引 --------------------------------------------------------------
+
+    @staticmethod
+    def _options() -> Dict[str, Any]:
+        config = current_app.config
+        return {
+            'k': config['RELATED_TOP_K'],
+            'min_score': config['RELATED_MIN_SCORE'],
+            'boost': config['RELATED_CATEGORY_BOOST'],
+        }
+
+    @staticmethod
+    def _compute(index: _Index, rows, batch_size: int, options: Dict[str, Any],
+                 reverse: Optional[set] = None) -> int:
+        """重算 rows（矩陣列位置）的鄰居並寫入；reverse 不為 None 時收集分數超過對方第 k 名的辯論"""
+        k, min_score = options['k'], options['min_score']
+        table = DebateNeighbor.__table__
+        written = 0
+        for start in range(0, len(rows), batch_size):
+            batch = np.asarray(rows[start:start + batch_size], dtype=np.int64)
+            scores = _similarities(index, batch, options['boost'])
+            if reverse is not None:
+                beats = scores.data > index.thresholds[scores.indices]
+                reverse.update(scores.indices[beats].tolist())
+            values = []
+            for row, (cols, vals) in zip(batch, _top_k(scores, k, min_score)):
+                # 未滿 k 名時，任何達到 min_score 的辯論都能進入
+                index.thresholds[row] = vals[-1] if len(vals) >= k else np.nextafter(np.float32(min_score), -1)
+                debate_id = int(index.ids[row])
+                values.extend({'debate_id': debate_id, 'rank': rank, 'neighbor_id': int(index.ids[col]),
+                               'score': round(float(val), 6)}
+                              for rank, (col, val) in enumerate(zip(cols, vals)))
+            db.session.execute(delete(table).where(table.c.debate_id.in_(index.ids[batch].tolist())))
+            if values:
+                db.session.execute(table.insert(), values)
+            db.session.commit()
+            written += len(values)
+        return written
+
+    @staticmethod
+    def rebuild(batch_size: Optional[int] = None) -> Dict[str, float]:
+        """完整重建：重新計算 idf、所有向量與鄰居"""
+        if not _load_numpy():
+            raise RuntimeError('相關辯論需要安裝 numpy 與 scipy')
+        config = current_app.config
+        batch_size = batch_size or config['RELATED_BATCH_SIZE']
+        options = RelatedService._options()
+        started = time.perf_counter()
+
+        docs = db.session.execute(select(Debate.id, Debate.title, Debate.description, Debate.category)
+                                  .order_by(Debate.id).execution_options(yield_per=5000))
+        ids, cats, raw = _raw_matrix(docs)
+        idf = _idf(raw, config['RELATED_MAX_DF'])
+        index = _Index(ids, cats, _weigh(raw, idf), idf,
+                       np.zeros(len(ids), dtype=np.float32))
+        del raw
+        vectorized = time.perf_counter()
+
+        written = RelatedService._compute(index, np.arange(len(ids)), batch_size, options)
+        # 已不存在的辯論（封存時通常已刪除，以防萬一）
+        table = DebateNeighbor.__table__
+        if len(ids):
+            db.session.execute(delete(table).where(~table.c.debate_id.in_(select(Debate.id))))
+            db.session.commit()
+        index.save(config['RELATED_DIR'])
+        finished = time.perf_counter()
+        return {
+            'debates': len(ids),
+            'neighbors': written,
+            'nnz': int(index.matrix.nnz),
+            'vectorize_seconds': vectorized - started,
+            'neighbor_seconds': finished - vectorized,
+            'seconds': finished - started,
+        }
+
+    @staticmethod
+    def refresh(debate_ids: Iterable[int] = (), batch_size: Optional[int] = None) -> Dict[str, float]:
+        """
+        增量更新：新辯論、debate_ids 指定的辯論（內容被修改）以及受影響的辯論
+
+        尚未建立索引時改為完整重建。
+        """
+        if not _load_numpy():
+            raise RuntimeError('相關辯論需要安裝 numpy 與 scipy')
+        config = current_app.config
+        batch_size = batch_size or config['RELATED_BATCH_SIZE']
+        options = RelatedService._options()
+        started = time.perf_counter()
+        index = _Index.load(config['RELATED_DIR'])
+        if index is None:
+            result = RelatedService.rebuild(batch_size)
+            result['full'] = True
+            return result
+
+        current = np.fromiter(db.session.execute(select(Debate.id).order_by(Debate.id)).scalars(), dtype=np.int64)
+        removed = index.ids[~np.isin(index.ids, current)]
+        edited = np.intersect1d(np.asarray(list(debate_ids), dtype=np.int64), current)
+        changed = np.union1d(current[~np.isin(current, index.ids)], edited)
+        if not len(changed) and not len(removed):
+            return {'changed': 0, 'removed': 0, 'affected': 0, 'neighbors': 0,
+                    'seconds': time.perf_counter() - started}
+
+        docs = []
+        for offset in range(0, len(changed), 500):
+            docs.extend(db.session.execute(
+                select(Debate.id, Debate.title, Debate.description, Debate.category)
+                .where(Debate.id.in_(changed[offset:offset + 500].tolist())).order_by(Debate.id)).all())
+        new_ids, new_cats, raw = _raw_matrix(docs)
+
+        # 以新向量取代舊列，依 id 重新排序（idf 沿用完整重建時的值）
+        keep = ~np.isin(index.ids, np.union1d(changed, removed))
+        ids = np.concatenate([index.ids[keep], new_ids])
+        order = np.argsort(ids, kind='stable')
+        index = _Index(
+            ids[order],
+            np.concatenate([index.cats[keep], new_cats])[order],
+            sparse.vstack([index.matrix[keep], _weigh(raw, index.idf)]).tocsr()[order],
+            index.idf,
+            np.concatenate([index.thresholds[keep], np.zeros(len(new_ids), dtype=np.float32)])[order],
+        )
+
+        reverse = set()
+        changed_rows = index.positions(new_ids)
+        written = RelatedService._compute(index, changed_rows, batch_size, options, reverse=reverse)
+
+        # 鄰居中有被修改或已封存的辯論，也要重算
+        table = DebateNeighbor.__table__
+        stale = np.union1d(edited, removed).tolist()
+        referrers = set()
+        for offset in range(0, len(stale), 500):
+            referrers.update(db.session.execute(
+                select(table.c.debate_id).where(table.c.neighbor_id.in_(stale[offset:offset + 500]))).scalars())
+        affected = (reverse | set(index.positions(sorted(referrers)).tolist())) - set(changed_rows.tolist())
+        written += RelatedService._compute(index, sorted(affected), batch_size, options)
+
+        if len(removed):
+            for offset in range(0, len(removed), 500):
+                db.session.execute(delete(table).where(table.c.debate_id.in_(removed[offset:offset + 500].tolist())))
+            db.session.commit()
+        index.save(config['RELATED_DIR'])
+        return {
+            'changed': len(changed),
+            'removed': len(removed),
+            'affected': len(affected),
+            'neighbors': written,
+            'seconds': time.perf_counter() - started,
+        }
@@ -0,0 +1,321 @@
+"""
+活動彙總服務 - 以時間桶預先彙總的統計
+
+各狀態的辯論數在狀態轉換的同一個交易內更新；事件次數（建立、加入、發言、大廳訊息）
+以背景工作 rollups.record 記錄，worker 把一批事件合併成一次 upsert 累加到小時桶與累計桶。
+背景工作為至少一次執行：每個事件帶有 event_id，累加時在同一個交易內寫入 rollup_events，
+worker 在提交後、回報完成前中斷而重跑同一批時，已計入的事件會略過，不會重複計入。
+compact() 把超過保留期的小時桶併入日桶。
+儀表板與趨勢查詢只讀取時間範圍內的桶，成本與資料量無關。
+"""
+import secrets
+import time
+from collections import Counter
+from datetime import datetime, date, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import inspect, select, delete, func, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app import db
+from app.tasks import enqueue, task
+from app.models.debate import Debate, Argument, HallMessage
+from app.models.archive import ARCHIVE_BIND, archived_arguments, archived_debates, archived_hall_messages
+from app.models.rollup import ActivityRollup, RollupEvent, ROLLUP_EPOCH
+
+HOUR = 'hour'
+DAY = 'day'
+TOTAL = 'all'
+
+# 狀態轉換對應的事件指標
+STATUS_METRICS = {
+    'ongoing': 'debate_started',
+    'judging': 'debate_judging',
+    'completed': 'debate_completed',
+}
+STATUSES = ('waiting', 'ongoing', 'judging', 'completed')
+
+RollupKey = Tuple[str, datetime, str, str]
+
+
+def hour_start(at: datetime) -> datetime:
+    return at.replace(minute=0, second=0, microsecond=0)
+
+
+def day_start(at: datetime) -> datetime:
+    return at.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+class RollupService:
+    """活動彙總服務類"""
+
+    # -- 寫入 ----------------------------------------------------------------
+
+    @staticmethod
+    def _upsert(counts: Dict[RollupKey, int]):
+        """把增量累加到彙總表（同一交易內，由呼叫端提交）"""
+        rows = [{'granularity': g, 'bucket_start': b, 'metric': m, 'category': c, 'count': n}
+                for (g, b, m, c), n in counts.items() if n]
+        if not rows:
+            return
+        table = ActivityRollup.__table__
+        dialect = db.session.get_bind().dialect.name
+        if dialect in ('sqlite', 'postgresql'):
+            insert = sqlite.insert if dialect == 'sqlite' else postgresql.insert
+            stmt = insert(table)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=['granularity', 'bucket_start', 'metric', 'category'],
+                set_={'count': table.c.count + stmt.excluded['count']})
+            db.session.execute(stmt, rows)
+            return
+        for row in rows:
+            result = db.session.execute(update(table).where(
+                table.c.granularity == row['granularity'], table.c.bucket_start == row['bucket_start'],
+                table.c.metric == row['metric'], table.c.category == row['category'],
+            ).values(count=table.c.count + row['count']))
+            if result.rowcount == 0:
+                db.session.execute(table.insert(), [row])
+
+    @staticmethod
+    def record(metric: str, category: str = '', amount: int = 1, at: Optional[datetime] = None):
+        """記錄事件：累加小時桶與累計桶"""
+        at = at or datetime.utcnow()
+        RollupService._upsert({
+            (HOUR, hour_start(at), metric, category or ''): amount,
+            (TOTAL, ROLLUP_EPOCH, metric, category or ''): amount,
+        })
+
+    @staticmethod
+    def record_later(metric: str, category: str = '', amount: int = 1, at: Optional[datetime] = None):
+        """以背景工作記錄事件（交易提交後才排入）"""
+        at = at or datetime.utcnow()
+        enqueue('rollups.record', {'event_id': secrets.token_hex(16), 'metric': metric, 'category': category or '',
+                                   'amount': amount, 'at': at.isoformat()})
+
+    @staticmethod
+    def debate_created(debate: Debate):
+        RollupService.record_later('debate_created', debate.category, at=debate.created_at)
+        RollupService.record_later('participant_joined', debate.category, amount=debate.participants_count,
+                                   at=debate.created_at)
+        RollupService._upsert({(TOTAL, ROLLUP_EPOCH, 'status:waiting', debate.category): 1})
+
+    @staticmethod
+    def debate_status_changed(debate: Debate, old_status: str, new_status: str):
+        """狀態轉換：更新各狀態的累計數量並記錄轉換事件"""
+        if old_status == new_status:
+            return
+        RollupService._upsert({
+            (TOTAL, ROLLUP_EPOCH, f'status:{old_status}', debate.category): -1,
+            (TOTAL, ROLLUP_EPOCH, f'status:{new_status}', debate.category): 1,
+        })
+        if new_status in STATUS_METRICS:
+            RollupService.record_later(STATUS_METRICS[new_status], debate.category)
+
+    # -- 查詢 ----------------------------------------------------------------
+
+    @staticmethod
+    def _filtered(stmt, metric: str, category: Optional[str]):
+        stmt = stmt.where(ActivityRollup.metric == metric)
+        if category is not None:
+            stmt = stmt.where(ActivityRollup.category == category)
+        return stmt
+
+    @staticmethod
+    def total(metric: str, category: Optional[str] = None) -> int:
+        """累計次數（category 為 None 時加總所有分類）"""
+        stmt = RollupService._filtered(
+            select(func.coalesce(func.sum(ActivityRollup.count), 0))
+            .where(ActivityRollup.granularity == TOTAL), metric, category)
+        return db.session.execute(stmt).scalar()
+
+    @staticmethod
+    def by_category(metric: str) -> Dict[str, int]:
+        stmt = (select(ActivityRollup.category, ActivityRollup.count)
+                .where(ActivityRollup.granularity == TOTAL, ActivityRollup.metric == metric))
+        return dict(db.session.execute(stmt).all())
+
+    @staticmethod
+    def count(metric: str, start: datetime, end: datetime, category: Optional[str] = None) -> int:
+        """
+        [start, end) 期間的次數
+
+        完整落在範圍內的日桶加上範圍內的小時桶；已壓縮的日子只有日桶，
+        因此跨越已壓縮日子的範圍以整天為精度。
+        """
+        stmt = RollupService._filtered(
+            select(ActivityRollup.granularity, ActivityRollup.bucket_start, ActivityRollup.count)
+            .where(ActivityRollup.granularity.in_((HOUR, DAY)),
+                   ActivityRollup.bucket_start >= day_start(start),
+                   ActivityRollup.bucket_start < end), metric, category)
+        total = 0
+        for granularity, bucket_start, count in db.session.execute(stmt):
+            if granularity == HOUR and bucket_start >= start:
+                total += count
+            elif granularity == DAY and bucket_start >= start and bucket_start + timedelta(days=1) <= end:
+                total += count
+        return total
+
+    @staticmethod
+    def series(metric: str, days: int, category: Optional[str] = None,
+               today: Optional[date] = None) -> List[Dict]:
+        """最近 days 天（含今天）的每日次數"""
+        today = today or datetime.utcnow().date()
+        first = datetime.combine(today - timedelta(days=days - 1), datetime.min.time())
+        stmt = RollupService._filtered(
+            select(ActivityRollup.bucket_start, ActivityRollup.count)
+            .where(ActivityRollup.granularity.in_((HOUR, DAY)), ActivityRollup.bucket_start >= first),
+            metric, category)
+        per_day = Counter()
+        for bucket_start, count in db.session.execute(stmt):
+            per_day[bucket_start.date()] += count
+        return [{'date': (first + timedelta(days=n)).date().isoformat(),
+                 'count': per_day[(first + timedelta(days=n)).date()]} for n in range(days)]
+
+    @staticmethod
+    def status_counts() -> Dict[str, int]:
+        """各狀態目前的辯論數"""
+        stmt = (select(ActivityRollup.metric, func.sum(ActivityRollup.count))
+                .where(ActivityRollup.granularity == TOTAL, ActivityRollup.metric.like('status:%'))
+                .group_by(ActivityRollup.metric))
+        counts = {metric.split(':', 1)[1]: total for metric, total in db.session.execute(stmt)}
+        return {status: counts.get(status, 0) for status in STATUSES}
+
+    @staticmethod
+    def dashboard(now: Optional[datetime] = None) -> Dict[str, int]:
+        """看板與大廳使用的統計"""
+        now = now or datetime.utcnow()
+        today = day_start(now)
+        stats = RollupService.status_counts()
+        stats.update({
+            'total': sum(stats.values()),
+            'total_participants': RollupService.total('participant_joined'),
+            'created_today': RollupService.count('debate_created', today, now + timedelta(hours=1)),
+            'completed_today': RollupService.count('debate_completed', today, now + timedelta(hours=1)),
+            'hall_messages_today': RollupService.count('hall_message', today, now + timedelta(hours=1)),
+        })
+        return stats
+
+    # -- 維護 ----------------------------------------------------------------
+
+    @staticmethod
+    def compact(keep_days: int, now: Optional[datetime] = None) -> Dict[str, int]:
+        """把早於保留期的小時桶併入日桶（整天為單位，同一交易內完成），並清除同樣過期的事件記錄"""
+        cutoff = day_start(now or datetime.utcnow()) - timedelta(days=keep_days)
+        hourly = ActivityRollup.__table__
+        rows = db.session.execute(
+            select(hourly.c.bucket_start, hourly.c.metric, hourly.c.category, hourly.c.count)
+            .where(hourly.c.granularity == HOUR, hourly.c.bucket_start < cutoff)).all()
+        daily = Counter()
+        for bucket_start, metric, category, count in rows:
+            daily[(DAY, day_start(bucket_start), metric, category)] += count
+        RollupService._upsert(daily)
+        db.session.execute(delete(hourly).where(hourly.c.granularity == HOUR, hourly.c.bucket_start < cutoff))
+        db.session.execute(delete(RollupEvent.__table__).where(RollupEvent.__table__.c.applied_at < cutoff))
+        db.session.commit()
+        return {'hourly_rows': len(rows), 'daily_rows': len(daily)}
+
+    @staticmethod
+    def _stream(stmt, key_column, chunk_size: int, engine=None) -> Iterable:
+        """以 keyset 分批讀取，避免一次載入整張表（engine 為封存資料庫時改用該連線）"""
+        last = 0
+        while True:
+            rows = db.session.execute(stmt.where(key_column > last).order_by(key_column).limit(chunk_size),
+                                      bind_arguments={'bind': engine} if engine else None).all()
+            if not rows:
+                return
+            last = rows[-1][0]
+            yield from rows
+
+    @staticmethod
+    def _sources():
+        """
+        (辯論表, 論述表, 大廳訊息表, engine)：主資料表，以及封存資料庫中已建立的封存資料表
+
+        封存不會調整彙總（已封存的辯論仍計入各狀態的累計），重建時也必須計入；尚未建立的封存資料表為 None。
+        """
+        yield Debate.__table__, Argument.__table__, HallMessage.__table__, None
+        engine = db.engines[ARCHIVE_BIND]
+        existing = set(inspect(engine).get_table_names())
+        tables = [table if table.name in existing else None
+                  for table in (archived_debates, archived_arguments, archived_hall_messages)]
+        if any(table is not None for table in tables):
+            yield (*tables, engine)
+
+    @staticmethod
+    def rebuild(keep_days: int, chunk_size: int = 5000, now: Optional[datetime] = None) -> Dict[str, float]:
+        """
+        從歷史資料重建所有彙總
+
+        辯論、論述與大廳訊息（含封存資料表）以 keyset 分批串流讀取，只在記憶體中保留各時間桶的計數。
+        保留期內的事件寫入小時桶，更早的直接寫入日桶。沒有時間記錄的轉換（進入評審）不重建，
+        保留期清除時直接刪除（delete 模式）的大廳訊息也無法重建。
+        """
+        started = time.perf_counter()
+        cutoff = day_start(now or datetime.utcnow()) - timedelta(days=keep_days)
+        counts = Counter()
+        scanned = Counter()
+
+        def add(metric: str, category: str, at: Optional[datetime], amount: int = 1):
+            if at is None:
+                return
+            bucket = (HOUR, hour_start(at)) if at >= cutoff else (DAY, day_start(at))
+            counts[bucket + (metric, category or '')] += amount
+            counts[(TOTAL, ROLLUP_EPOCH, metric, category or '')] += amount
+
+        for debates, arguments, messages, engine in RollupService._sources():
+            if debates is not None:
+                stmt = select(debates.c.id, debates.c.category, debates.c.status, debates.c.created_at,
+                              debates.c.started_at, debates.c.completed_at, debates.c.pro_participant_id,
+                              debates.c.con_participant_id)
+                for row in RollupService._stream(stmt, debates.c.id, chunk_size, engine):
+                    scanned['debates'] += 1
+                    add('debate_created', row.category, row.created_at)
+                    add('participant_joined', row.category, row.created_at,
+                        int(row.pro_participant_id is not None) + int(row.con_participant_id is not None))
+                    add('debate_started', row.category, row.started_at)
+                    add('debate_completed', row.category, row.completed_at)
+                    counts[(TOTAL, ROLLUP_EPOCH, f'status:{row.status or "waiting"}', row.category or '')] += 1
+
+            if debates is not None and arguments is not None:
+                # 論述與所屬辯論一起封存，分類從同一個資料庫的辯論表取得
+                stmt = (select(arguments.c.id, arguments.c.created_at, debates.c.category)
+                        .join(debates, debates.c.id == arguments.c.debate_id))
+                for row in RollupService._stream(stmt, arguments.c.id, chunk_size, engine):
+                    scanned['arguments'] += 1
+                    add('argument_posted', row.category, row.created_at)
+
+            if messages is not None:
+                stmt = select(messages.c.id, messages.c.created_at, messages.c.message_type)
+                for row in RollupService._stream(stmt, messages.c.id, chunk_size, engine):
+                    scanned['hall_messages'] += 1
+                    add('hall_message', row.message_type, row.created_at)
+
+        db.session.execute(delete(ActivityRollup.__table__))
+        rows = [{'granularity': g, 'bucket_start': b, 'metric': m, 'category': c, 'count': n}
+                for (g, b, m, c), n in counts.items() if n]
+        for offset in range(0, len(rows), chunk_size):
+            db.session.execute(ActivityRollup.__table__.insert(), rows[offset:offset + chunk_size])
+        db.session.commit()
+        return dict(scanned, buckets=len(rows), seconds=time.perf_counter() - started)
+
+
+@task('rollups.record', batch=True)
+def record_events(payloads: List[Dict]):
+    """合併一批事件，一次 upsert；已計入的事件（重跑）略過，新事件的 event_id 在同一個交易內記錄"""
+    events = RollupEvent.__table__
+    event_ids = {payload['event_id'] for payload in payloads if payload.get('event_id')}
+    applied = set(db.session.execute(
+        select(events.c.event_id).where(events.c.event_id.in_(event_ids))).scalars()) if event_ids else set()
+    now = datetime.utcnow()
+    counts = Counter()
+    for payload in payloads:
+        event_id = payload.get('event_id')
+        if event_id:
+            if event_id in applied:
+                continue
+            applied.add(event_id)  # 同一批內重複的事件也只計一次
+            db.session.execute(events.insert(), [{'event_id': event_id, 'applied_at': now}])
+        at = datetime.fromisoformat(payload['at'])
+        counts[(HOUR, hour_start(at), payload['metric'], payload['category'])] += payload['amount']
+        counts[(TOTAL, ROLLUP_EPOCH, payload['metric'], payload['category'])] += payload['amount']
+    RollupService._upsert(counts)
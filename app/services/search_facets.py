@@ -0,0 +1,84 @@
+"""
+搜尋分面統計 - 搜尋頁側欄的各狀態、各分類辯論數
+
+同一個關鍵字只執行一次 GROUP BY status, category，得到「狀態 × 分類」的計數矩陣。
+側欄的數字、分頁需要的總數都由矩陣在記憶體中加總而來，因此切換篩選、翻頁都不必再查詢：
+    分類的數字套用目前的狀態篩選（不套用分類篩選，才看得出勾選其他分類會多出幾場）
+    狀態的數字套用目前的分類篩選
+    總數同時套用兩者
+沒有關鍵字時只掃描 (status, category) 索引。矩陣以關鍵字為鍵放在行程內的 LRU 快取，SEARCH_FACET_TTL 秒後重新查詢；
+期間新建立或改變狀態的辯論，側欄數字與總頁數最多延遲這麼久。
+"""
+import time
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from flask import current_app
+from sqlalchemy import func, or_, select
+
+from app import db
+from app.cache import LRUCache
+from app.models.debate import Debate
+
+STATUSES = ('waiting', 'ongoing', 'judging', 'completed')
+
+FacetMatrix = Dict[Tuple[str, str], int]
+
+facet_cache = LRUCache(max_entries=1024)
+
+
+class SearchFacetService:
+    """搜尋分面統計服務類"""
+
+    @staticmethod
+    def text_filter(search_query: str):
+        """搜尋關鍵字的條件（列表查詢與分面統計共用）"""
+        return or_(Debate.title.contains(search_query), Debate.description.contains(search_query))
+
+    @staticmethod
+    def matrix(search_query: str) -> FacetMatrix:
+        """關鍵字對應的 (狀態, 分類) → 辯論數，優先使用快取"""
+        cached = facet_cache.get(search_query)
+        if cached is not None and time.monotonic() - cached[0] < current_app.config['SEARCH_FACET_TTL']:
+            return cached[1]
+        if search_query:
+            # 先篩出符合關鍵字的列再分組：直接 GROUP BY 時 SQLite 會改走 (status, category) 索引、
+            # 逐列回表比對 LIKE，比掃描整張表慢數倍
+            matched = (select(Debate.status, Debate.category)
+                       .where(SearchFacetService.text_filter(search_query))
+                       .cte('matched').prefix_with('MATERIALIZED'))
+            stmt = (select(matched.c.status, matched.c.category, func.count())
+                    .group_by(matched.c.status, matched.c.category))
+        else:
+            stmt = select(Debate.status, Debate.category, func.count()).group_by(Debate.status, Debate.category)
+        matrix = {(status, category): count for status, category, count in db.session.execute(stmt)}
+        facet_cache.set(search_query, (time.monotonic(), matrix))
+        return matrix
+
+    @staticmethod
+    def total(matrix: FacetMatrix, statuses: Optional[Iterable[str]] = None,
+              categories: Optional[Iterable[str]] = None) -> int:
+        """符合篩選的辯論數（None 表示不篩選該欄位）"""
+        statuses = None if statuses is None else set(statuses)
+        categories = None if categories is None else set(categories)
+        return sum(count for (status, category), count in matrix.items()
+                   if (statuses is None or status in statuses) and (categories is None or category in categories))
+
+    @staticmethod
+    def facets(matrix: FacetMatrix, statuses: List[str], categories: List[str]) -> Dict[str, Any]:
+        """側欄的狀態與分類計數"""
+        by_status: Counter = Counter()
+        by_category: Counter = Counter()
+        for (status, category), count in matrix.items():
+            if not categories or category in categories:
+                by_status[status] += count
+            if not statuses or status in statuses:
+                by_category[category] += count
+        for category in categories:  # 已勾選的分類即使沒有結果也要顯示，才能取消勾選
+            by_category.setdefault(category, 0)
+        by_category.pop(None, None)
+        return {
+            'status': {status: by_status.get(status, 0) for status in STATUSES},
+            'category': [{'name': name, 'count': count}
+                         for name, count in sorted(by_category.items(), key=lambda item: (-item[1], item[0]))],
+        }
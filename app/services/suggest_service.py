@@ -0,0 +1,140 @@
+"""
+搜尋自動完成服務 - 輸入時提示熱門的辯論標題與分類
+
+每個 worker 在記憶體中保有一份 PrefixIndex（見 app/suggest.py），第一次使用時從 SUGGEST_INDEX_PATH 載入
+（不存在時從資料庫建立並寫入）。`flask suggest rebuild` 依 hot_score 由高到低重建，
+只收錄 SUGGEST_MEMORY_MB 放得下的辯論。
+
+本行程建立的辯論在 create_debate 之後立即加入；其他 worker 建立的辯論、以及重建後的新索引檔，
+每 SUGGEST_REFRESH_SECONDS 秒檢查一次。候選的標題與狀態以一次主鍵查詢取得，已封存或刪除的辯論自然不會出現。
+"""
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from flask import current_app
+from sqlalchemy import desc, func, select
+
+from app import db
+from app.models.debate import Debate
+from app.services.hot_ranking import WEIGHT_CREATED, HotRankingService
+from app.suggest import PrefixIndex
+
+BUILD_CHUNK_SIZE = 5000
+MAX_LIMIT = 10
+
+_index: Optional[PrefixIndex] = None
+_loaded_mtime = 0.0
+_checked_at = 0.0
+_lock = threading.Lock()
+
+
+def _mtime(path: str) -> float:
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return 0.0
+
+
+def _initial_score(hot_score: Optional[float], created_at: Optional[datetime]) -> float:
+    """背景工作（flask hot refresh）尚未計算的新辯論，以建立事件本身的分數排序"""
+    if hot_score or created_at is None:
+        return hot_score or 0.0
+    return HotRankingService.event_score(WEIGHT_CREATED, created_at, HotRankingService.tau_seconds())
+
+
+def _add_new(index: PrefixIndex) -> int:
+    """加入 id 大於 index.max_id 的辯論"""
+    added = 0
+    while True:
+        rows = db.session.execute(select(Debate.id, Debate.title, Debate.category, Debate.hot_score,
+                                         Debate.created_at)
+                                  .where(Debate.id > index.max_id)
+                                  .order_by(Debate.id).limit(BUILD_CHUNK_SIZE)).all()
+        for row in rows:
+            index.add(row.id, row.title, row.category, _initial_score(row.hot_score, row.created_at))
+        added += len(rows)
+        if len(rows) < BUILD_CHUNK_SIZE:
+            return added
+
+
+class SuggestService:
+    """搜尋自動完成服務類"""
+
+    @staticmethod
+    def _build() -> PrefixIndex:
+        config = current_app.config
+        max_id = db.session.execute(select(func.max(Debate.id))).scalar() or 0
+        result = db.session.execute(select(Debate.id, Debate.title, Debate.category, Debate.hot_score)
+                                    .where(Debate.id <= max_id)
+                                    .order_by(desc(Debate.hot_score))
+                                    .execution_options(yield_per=BUILD_CHUNK_SIZE))
+        index = PrefixIndex.build(((row.id, row.title, row.category, row.hot_score) for row in result),
+                                  config['SUGGEST_KEY_CHARS'], config['SUGGEST_MEMORY_MB'] * 1024 * 1024)
+        index.max_id = max(index.max_id, max_id)
+        return index
+
+    @staticmethod
+    def rebuild() -> Dict[str, Any]:
+        """從資料庫重建索引並寫入 SUGGEST_INDEX_PATH"""
+        global _index, _loaded_mtime
+        path = current_app.config['SUGGEST_INDEX_PATH']
+        started = time.perf_counter()
+        index = SuggestService._build()
+        index.save(path)
+        with _lock:
+            _index, _loaded_mtime = index, _mtime(path)
+        return {'debates': len(index), 'skipped': index.skipped, 'keys': len(index.targets),
+                'mb': round(index.nbytes() / 1048576, 1), 'seconds': time.perf_counter() - started}
+
+    @staticmethod
+    def index() -> PrefixIndex:
+        """目前 worker 的索引（每 SUGGEST_REFRESH_SECONDS 秒檢查新辯論與新的索引檔）"""
+        global _index, _loaded_mtime, _checked_at
+        config = current_app.config
+        path = config['SUGGEST_INDEX_PATH']
+        with _lock:
+            now = time.monotonic()
+            if _index is not None and now - _checked_at < config['SUGGEST_REFRESH_SECONDS']:
+                return _index
+            _checked_at = now
+            mtime = _mtime(path)
+            if _index is None or mtime > _loaded_mtime:
+                _index = PrefixIndex.load(path)
+                if _index is None:
+                    _index = SuggestService._build()
+                    _index.save(path)
+                    mtime = _mtime(path)
+                _loaded_mtime = mtime
+            _add_new(_index)
+            return _index
+
+    @staticmethod
+    def debate_created(debate: Debate):
+        """新辯論立即出現在本行程的自動完成（索引尚未載入時不必處理）"""
+        with _lock:
+            if _index is not None and debate.id > _index.max_id:
+                _index.add(debate.id, debate.title, debate.category,
+                           _initial_score(debate.hot_score, debate.created_at))
+
+    @staticmethod
+    def suggest(query: str, limit: int = 8) -> Dict[str, List[Dict[str, Any]]]:
+        """以 query 開頭的熱門辯論與分類"""
+        limit = max(1, min(limit, MAX_LIMIT))
+        index = SuggestService.index()
+        # 多取幾個，扣掉已封存或刪除的辯論
+        matches = index.top(query, limit + 4)
+        debates = []
+        if matches:
+            rows = {row.id: row for row in db.session.execute(
+                select(Debate.id, Debate.title, Debate.category, Debate.status)
+                .where(Debate.id.in_([debate_id for debate_id, _ in matches])))}
+            for debate_id, _ in matches:
+                row = rows.get(debate_id)
+                if row is not None:
+                    debates.append({'id': row.id, 'title': row.title, 'category': row.category,
+                                    'status': row.status})
+        categories = [{'name': name, 'count': count} for name, count in index.match_categories(query)]
+        return {'debates': debates[:limit], 'categories': categories}
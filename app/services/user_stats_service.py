@@ -0,0 +1,244 @@
+"""
+使用者統計服務 - 隨辯論事件累加 user_stats
+
+    total_debates           參與的辯論數：發起（發起人即一方辯手）或加入時 +1
+    total_time_debating     已完成辯論的進行時間（分鐘，started_at → completed_at），完成時加到雙方
+    average_response_time   平均回應時間（分鐘）：每則論述距離對手上一則論述的時間，
+                            沒有對手論述時（第一則）從辯論開始起算
+
+平均以 response_count 與 response_seconds 兩個累加欄位維護，每則論述只做一次 upsert，
+average_response_time 在同一個 UPDATE 內由累加後的值算出；與其他事件一樣在業務交易內寫入。
+recompute() 從辯論與論述的歷史（含封存資料表）以 numpy 逐批重算所有欄位，
+用於上線前的初始化，或統計規則變更後重建。numpy 為選用套件，只有重算需要（寫入路徑不依賴）。
+"""
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from sqlalchemy import String, case, func, inspect, select, type_coerce, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app import db
+from app.models.archive import ARCHIVE_BIND, archived_arguments, archived_debates
+from app.models.debate import Argument, Debate, UserStats
+from app.models.user import User
+
+stats = UserStats.__table__
+
+COUNTERS = ('total_debates', 'total_time_debating', 'response_count', 'response_seconds')
+
+
+def _average_minutes(count, seconds):
+    """平均回應時間（分鐘，四捨五入）；count 與 seconds 可以是整數或 SQL 運算式"""
+    if isinstance(count, int):
+        return (seconds + count * 30) // (count * 60) if count > 0 else 0
+    return case((count > 0, (seconds + count * 30) // (count * 60)), else_=0)
+
+
+def _timestamps(column, dialect: str):
+    """SQLite 以字串儲存 DateTime：直接取出字串交給 numpy 解析，比逐一建立 datetime 再轉換快一個數量級"""
+    return type_coerce(column, String).label(column.name) if dialect == 'sqlite' else column
+
+
+def _row(user_id: int, now: datetime, **counters: int) -> Dict[str, Any]:
+    row = {'user_id': user_id, 'updated_at': now, **{name: int(counters.get(name, 0)) for name in COUNTERS}}
+    row['average_response_time'] = _average_minutes(row['response_count'], row['response_seconds'])
+    return row
+
+
+class UserStatsService:
+    """使用者統計服務類"""
+
+    # -- 寫入 ----------------------------------------------------------------
+
+    @staticmethod
+    def _upsert(rows: List[Dict[str, Any]], accumulate: bool = True):
+        """accumulate=True 時把各計數累加到既有的列，否則直接覆寫（同一交易內，由呼叫端提交）"""
+        if not rows:
+            return
+        dialect = db.session.get_bind().dialect.name
+        if dialect in ('sqlite', 'postgresql'):
+            insert = sqlite.insert if dialect == 'sqlite' else postgresql.insert
+            stmt = insert(stats)
+            excluded = stmt.excluded
+            if accumulate:
+                values = {name: stats.c[name] + excluded[name] for name in COUNTERS}
+                values['average_response_time'] = _average_minutes(values['response_count'],
+                                                                   values['response_seconds'])
+            else:
+                values = {name: excluded[name] for name in (*COUNTERS, 'average_response_time')}
+            values['updated_at'] = excluded.updated_at
+            db.session.execute(stmt.on_conflict_do_update(index_elements=['user_id'], set_=values), rows)
+            return
+        for row in rows:
+            if accumulate:
+                values = {name: stats.c[name] + row[name] for name in COUNTERS}
+                values['average_response_time'] = _average_minutes(values['response_count'],
+                                                                   values['response_seconds'])
+            else:
+                values = {name: row[name] for name in (*COUNTERS, 'average_response_time')}
+            result = db.session.execute(update(stats).where(stats.c.user_id == row['user_id'])
+                                        .values(updated_at=row['updated_at'], **values))
+            if result.rowcount == 0:
+                db.session.execute(stats.insert(), [row])
+
+    @staticmethod
+    def debate_joined(user_id: int):
+        """成為辯論的一方（發起或加入）"""
+        UserStatsService._upsert([_row(user_id, datetime.utcnow(), total_debates=1)])
+
+    @staticmethod
+    def argument_posted(argument: Argument, debate: Debate):
+        """
+        發表論述：把這則的回應時間計入平均
+
+        回應時間從對手最近一則論述起算（輪流發言，即上一則論述）；辯論的第一則從 started_at 起算。
+        走 debate_id 開頭的索引取一個 MAX，與歷史資料量無關。
+        """
+        reference = db.session.query(func.max(Argument.created_at)).filter(
+            Argument.debate_id == debate.id, Argument.position != argument.position
+        ).scalar() or debate.started_at
+        if reference is None or argument.created_at is None:
+            return
+        seconds = max(int((argument.created_at - reference).total_seconds()), 0)
+        UserStatsService._upsert([_row(argument.user_id, datetime.utcnow(),
+                                       response_count=1, response_seconds=seconds)])
+
+    @staticmethod
+    def debate_completed(debate: Debate):
+        """辯論完成：進行時間加到雙方的總辯論時間"""
+        if debate.started_at is None or debate.completed_at is None:
+            return
+        minutes = max(int((debate.completed_at - debate.started_at).total_seconds() // 60), 0)
+        now = datetime.utcnow()
+        UserStatsService._upsert([_row(user_id, now, total_time_debating=minutes)
+                                  for user_id in (debate.pro_participant_id, debate.con_participant_id)
+                                  if user_id is not None])
+
+    # -- 查詢 ----------------------------------------------------------------
+
+    @staticmethod
+    def get(user_id: int) -> Optional[UserStats]:
+        return UserStats.query.filter_by(user_id=user_id).first()
+
+    # -- 重算 ----------------------------------------------------------------
+
+    @staticmethod
+    def _sources():
+        """(辯論表, 論述表, engine)：主資料表，以及已建立的封存資料表（已封存的辯論仍計入統計）"""
+        yield Debate.__table__, Argument.__table__, None
+        engine = db.engines[ARCHIVE_BIND]
+        if inspect(engine).has_table(archived_debates.name):
+            yield archived_debates, archived_arguments, engine
+
+    @staticmethod
+    def _debate_batches(debates, engine, dialect: str, chunk_size: int) -> Iterable[List]:
+        """以 id keyset 分批讀取辯論"""
+        columns = (debates.c.id, debates.c.status, debates.c.pro_participant_id, debates.c.con_participant_id,
+                   _timestamps(debates.c.started_at, dialect), _timestamps(debates.c.completed_at, dialect))
+        last_id = 0
+        while True:
+            rows = db.session.execute(
+                select(*columns).where(debates.c.id > last_id).order_by(debates.c.id).limit(chunk_size),
+                bind_arguments={'bind': engine} if engine else None).all()
+            if not rows:
+                return
+            last_id = rows[-1].id
+            yield rows
+
+    @staticmethod
+    def response_times(debate_ids, positions, created_at, started_at):
+        """
+        一批論述（依辯論、輪次、時間排序，每場辯論的論述完整）的回應時間，回傳 (有效的遮罩, 秒數)
+
+        以累積最大值找出每一列之前最近一則對手論述的位置：不在同一場辯論內時改用辯論的 started_at。
+        """
+        import numpy as np
+        
+        n = len(debate_ids)
+        index = np.arange(n)
+        first = np.ones(n, dtype=bool)
+        first[1:] = debate_ids[1:] != debate_ids[:-1]
+        segment = np.maximum.accumulate(np.where(first, index, 0))
+        pro = positions == 'pro'
+        last_pro = np.maximum.accumulate(np.where(pro, index, -1))
+        last_con = np.maximum.accumulate(np.where(pro, -1, index))
+        opponent = np.where(pro, last_con, last_pro)
+        reference = np.where(opponent >= segment, created_at[np.maximum(opponent, 0)], started_at)
+        valid = ~(np.isnat(reference) | np.isnat(created_at))
+        seconds = np.maximum((created_at[valid] - reference[valid]) // np.timedelta64(1, 's'), 0)
+        return valid, seconds
+
+    @staticmethod
+    def recompute(chunk_size: int = 2000,
+                  progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """
+        從歷史資料重算所有使用者的統計（覆寫 user_stats 的計數欄位）
+
+        每批讀取 chunk_size 場辯論與它們的所有論述，以向量運算算出回應時間後依 user_id 累加，
+        記憶體中只保留每位使用者的計數。重算期間的新事件可能被覆蓋，應在離峰時執行。
+        需要 numpy（沒有安裝時拋出 ImportError）。
+        """
+        import numpy as np
+        
+        started = time.perf_counter()
+        size = (db.session.execute(select(func.max(User.id))).scalar() or 0) + 1
+        totals = {name: np.zeros(size, dtype=np.int64) for name in COUNTERS}
+        scanned = Counter()
+
+        def add(name: str, user_ids, weights=None):
+            if not len(user_ids):
+                return
+            length = int(user_ids.max()) + 1
+            if length > len(totals[name]):  # 使用者在開始重算後才註冊
+                for key in COUNTERS:
+                    totals[key] = np.concatenate([totals[key], np.zeros(length - len(totals[key]), np.int64)])
+            totals[name] += np.bincount(user_ids, weights, minlength=len(totals[name])).astype(np.int64)
+
+        for debates, arguments, engine in UserStatsService._sources():
+            dialect = (engine or db.session.get_bind()).dialect.name
+            for rows in UserStatsService._debate_batches(debates, engine, dialect, chunk_size):
+                ids, statuses, pro_ids, con_ids, started_at, completed_at = zip(*rows)
+                debate_ids = np.array(ids, dtype=np.int64)
+                started_at = np.array(started_at, dtype='datetime64[us]')
+                completed_at = np.array(completed_at, dtype='datetime64[us]')
+                done = (np.array(statuses) == 'completed') & ~np.isnat(started_at) & ~np.isnat(completed_at)
+                minutes = np.maximum((completed_at[done] - started_at[done]) // np.timedelta64(1, 'm'), 0)
+                for side in (pro_ids, con_ids):
+                    user_ids = np.array([-1 if user_id is None else user_id for user_id in side], dtype=np.int64)
+                    add('total_debates', user_ids[user_ids >= 0])
+                    finished = user_ids[done]
+                    add('total_time_debating', finished[finished >= 0], minutes[finished >= 0])
+                scanned['debates'] += len(rows)
+
+                # 同一批辯論的所有論述；辯論的 started_at 以 searchsorted 對回每一列，不必 JOIN
+                history = db.session.execute(
+                    select(arguments.c.debate_id, arguments.c.user_id, arguments.c.position,
+                           _timestamps(arguments.c.created_at, dialect))
+                    .where(arguments.c.debate_id.between(rows[0].id, rows[-1].id))
+                    .order_by(arguments.c.debate_id, arguments.c.round_number, arguments.c.created_at,
+                              arguments.c.id),
+                    bind_arguments={'bind': engine} if engine else None).all()
+                if history:
+                    argument_debates, authors, positions, created_at = zip(*history)
+                    argument_debates = np.array(argument_debates, dtype=np.int64)
+                    valid, seconds = UserStatsService.response_times(
+                        argument_debates, np.array(positions), np.array(created_at, dtype='datetime64[us]'),
+                        started_at[np.searchsorted(debate_ids, argument_debates)])
+                    authors = np.array(authors, dtype=np.int64)[valid]
+                    add('response_count', authors)
+                    add('response_seconds', authors, seconds)
+                    scanned['arguments'] += len(history)
+                if progress:
+                    progress(dict(scanned, last_id=rows[-1].id, seconds=time.perf_counter() - started))
+
+        db.session.execute(update(stats).values(average_response_time=0, **{name: 0 for name in COUNTERS}))
+        active = np.flatnonzero(np.any([totals[name] for name in COUNTERS], axis=0))
+        now = datetime.utcnow()
+        rows = [_row(int(user_id), now, **{name: int(totals[name][user_id]) for name in COUNTERS})
+                for user_id in active]
+        for offset in range(0, len(rows), 1000):
+            UserStatsService._upsert(rows[offset:offset + 1000], accumulate=False)
+        db.session.commit()
+        return dict(scanned, users=len(rows), seconds=time.perf_counter() - started)
@@ -0,0 +1,239 @@
+"""
+不重複觀看者服務 - 以 HyperLogLog 草圖估計每場辯論的觀看人數
+
+每次觀看只在 worker 記憶體內的草圖加入觀看者鍵（登入者 user id，否則為 session 內的隨機 id；
+快照等可快取的回應不寫入 session，改用來源位址與 User-Agent 的雜湊），
+每隔 VIEW_FLUSH_SECONDS（以及 worker 正常結束時）把草圖排入背景工作 views.merge，
+由 `flask worker` 合併寫回 debate_view_sketches：
+    'YYYY-MM-DD'  當日草圖，合併最近 7 份即為 7 日不重複觀看者
+    'all'         累計草圖
+請求本身不寫入主資料庫，也不提交 db.session。
+worker 被強制終止（SIGKILL、OOM）時最多遺失最近 VIEW_FLUSH_SECONDS 內的觀看紀錄。
+草圖合併是逐格取最大值，可交換且重複合併無害（工作重跑不會重複計算）；
+讀取與寫回在同一個交易內並先取得寫入鎖（SQLite 以 BEGIN IMMEDIATE，其他資料庫以 SELECT ... FOR UPDATE），
+多個 worker 同時合併同一場辯論時依序進行，不會覆蓋彼此的暫存器。
+寫回時累計估計值會更新到 Debate.views，看板顯示與熱門分數都以此為準。
+"""
+import atexit
+import base64
+import hashlib
+import logging
+import secrets
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from flask import current_app, request, session
+from sqlalchemy import select, tuple_, delete, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app import db
+from app.hll import HyperLogLog
+from app.models.debate import Debate, DebateViewSketch
+from app.tasks import enqueue, task
+
+logger = logging.getLogger(__name__)
+
+ALL_TIME = 'all'
+debates = Debate.__table__
+view_sketches = DebateViewSketch.__table__
+
+
+class PendingViews:
+    """worker 內尚未寫回的草圖"""
+
+    def __init__(self):
+        self.sketches: Dict[Tuple[int, str], HyperLogLog] = {}
+        self.last_flush = time.monotonic()
+        self.lock = threading.Lock()
+
+    def add(self, debate_id: int, bucket: str, viewer: str, precision: int):
+        with self.lock:
+            sketch = self.sketches.get((debate_id, bucket))
+            if sketch is None:
+                sketch = self.sketches[(debate_id, bucket)] = HyperLogLog(precision)
+            sketch.add(viewer)
+
+    def take(self) -> Dict[Tuple[int, str], HyperLogLog]:
+        with self.lock:
+            sketches, self.sketches = self.sketches, {}
+            self.last_flush = time.monotonic()
+            return sketches
+
+    def restore(self, sketches: Dict[Tuple[int, str], HyperLogLog]):
+        """寫回失敗時放回緩衝區，下次再試"""
+        with self.lock:
+            for key, sketch in sketches.items():
+                current = self.sketches.get(key)
+                self.sketches[key] = current.merge(sketch) if current else sketch
+
+    def local(self, debate_id: int, bucket: str) -> Optional[HyperLogLog]:
+        with self.lock:
+            sketch = self.sketches.get((debate_id, bucket))
+            return sketch.copy() if sketch else None
+
+
+pending_views = PendingViews()
+_exit_hook_registered = False
+
+
+def _flush_at_exit(app):
+    """行程結束時把尚未寫回的草圖排入佇列（gunicorn 等 worker 正常結束時會執行 atexit）"""
+    with app.app_context():
+        ViewCounter.flush()
+
+
+class ViewCounter:
+    """不重複觀看者服務類"""
+
+    @staticmethod
+    def viewer_key(create: bool = True) -> str:
+        """
+        目前請求的觀看者鍵
+
+        create=False 時不寫入 session（可被共用快取保存的回應不能帶 Set-Cookie）：
+        沒有 viewer_id 的匿名訪客改以來源位址與 User-Agent 的雜湊為鍵
+        """
+        if session.get('user_id'):
+            return f"user:{session['user_id']}"
+        if session.get('viewer_id'):
+            return f"anon:{session['viewer_id']}"
+        if not create:
+            raw = f"{request.remote_addr}|{request.user_agent.string}".encode()
+            return f"addr:{hashlib.blake2b(raw, digest_size=8).hexdigest()}"
+        session['viewer_id'] = secrets.token_hex(8)
+        return f"anon:{session['viewer_id']}"
+
+    @staticmethod
+    def day_bucket(day: date) -> str:
+        return day.isoformat()
+
+    @staticmethod
+    def record(debate_id: int, viewer: Optional[str] = None):
+        """記錄一次觀看；距上次寫回超過間隔時把草圖排入背景工作"""
+        global _exit_hook_registered
+        viewer = viewer or ViewCounter.viewer_key()
+        precision = current_app.config['VIEW_SKETCH_PRECISION']
+        if not _exit_hook_registered:
+            _exit_hook_registered = True
+            atexit.register(_flush_at_exit, current_app._get_current_object())
+        today = ViewCounter.day_bucket(datetime.utcnow().date())
+        pending_views.add(debate_id, today, viewer, precision)
+        pending_views.add(debate_id, ALL_TIME, viewer, precision)
+
+        if time.monotonic() - pending_views.last_flush >= current_app.config['VIEW_FLUSH_SECONDS']:
+            ViewCounter.flush()
+
+    @staticmethod
+    def flush() -> int:
+        """把 worker 內的草圖排入 views.merge（立即寫入佇列，與目前的交易無關），回傳草圖數"""
+        sketches = pending_views.take()
+        if not sketches:
+            return 0
+        payload = {'sketches': [[debate_id, bucket, base64.b64encode(sketch.to_bytes()).decode('ascii')]
+                                for (debate_id, bucket), sketch in sketches.items()]}
+        try:
+            enqueue('views.merge', payload, defer=False)
+        except Exception:
+            pending_views.restore(sketches)
+            logger.exception('排入觀看草圖失敗')
+            return 0
+        return len(sketches)
+
+    @staticmethod
+    def merge(sketches: Dict[Tuple[int, str], HyperLogLog]) -> int:
+        """
+        把草圖合併寫回資料庫，回傳更新的辯論數
+
+        使用獨立的連線並自行提交（不影響呼叫端的 db.session）；先鎖定再讀取，合併結果不會被同時寫回的 worker 覆蓋。
+        """
+        with db.engine.connect() as conn:
+            dialect = conn.dialect.name
+            if dialect == 'sqlite':
+                # pysqlite 在第一個寫入前才開始交易，SELECT 不會鎖定；BEGIN IMMEDIATE 先取得寫入鎖
+                conn.exec_driver_sql('BEGIN IMMEDIATE')
+            # 已封存或刪除的辯論不再計數
+            live = set(conn.execute(select(debates.c.id).where(
+                debates.c.id.in_({debate_id for debate_id, _ in sketches}))).scalars())
+            sketches = {key: sketch for key, sketch in sketches.items() if key[0] in live}
+            if not sketches:
+                conn.commit()
+                return 0
+            now = datetime.utcnow()
+            if dialect in ('sqlite', 'postgresql'):
+                # 先補上缺少的列，之後一律以 FOR UPDATE 鎖定既有列再合併（PostgreSQL 同時新增同一列時不會衝突）
+                insert = sqlite.insert if dialect == 'sqlite' else postgresql.insert
+                conn.execute(insert(view_sketches).on_conflict_do_nothing(), [
+                    {'debate_id': debate_id, 'bucket': bucket, 'sketch': HyperLogLog(sketch.precision).to_bytes(),
+                     'updated_at': now} for (debate_id, bucket), sketch in sketches.items()])
+            stored = {
+                (row.debate_id, row.bucket): row.sketch
+                for row in conn.execute(
+                    select(view_sketches.c.debate_id, view_sketches.c.bucket, view_sketches.c.sketch)
+                    .where(tuple_(view_sketches.c.debate_id, view_sketches.c.bucket).in_(list(sketches)))
+                    .with_for_update())
+            }
+            totals = {}
+            for (debate_id, bucket), sketch in sketches.items():
+                if (debate_id, bucket) in stored:
+                    merged = HyperLogLog.from_bytes(stored[(debate_id, bucket)]).merge(sketch)
+                    conn.execute(update(view_sketches).where(view_sketches.c.debate_id == debate_id,
+                                                             view_sketches.c.bucket == bucket)
+                                 .values(sketch=merged.to_bytes(), updated_at=now))
+                else:
+                    merged = sketch
+                    conn.execute(view_sketches.insert(), [{'debate_id': debate_id, 'bucket': bucket,
+                                                           'sketch': merged.to_bytes(), 'updated_at': now}])
+                if bucket == ALL_TIME:
+                    totals[debate_id] = merged.count()
+
+            for debate_id, views in totals.items():
+                conn.execute(update(debates).where(debates.c.id == debate_id, debates.c.views.is_distinct_from(views))
+                             .values(views=views, last_activity_at=now))
+            conn.commit()
+            return len(totals)
+
+    @staticmethod
+    def unique_viewers(debate_id: int, today: Optional[date] = None) -> Dict[str, int]:
+        """今日、7 日與累計的不重複觀看者估計（含 worker 內尚未寫回的部分）"""
+        today = today or datetime.utcnow().date()
+        precision = current_app.config['VIEW_SKETCH_PRECISION']
+        week = [ViewCounter.day_bucket(today - timedelta(days=n)) for n in range(7)]
+        rows = dict(db.session.execute(
+            select(DebateViewSketch.bucket, DebateViewSketch.sketch).where(
+                DebateViewSketch.debate_id == debate_id,
+                DebateViewSketch.bucket.in_(week + [ALL_TIME]))).all())
+
+        def sketch_for(bucket: str) -> HyperLogLog:
+            sketch = HyperLogLog.from_bytes(rows[bucket]) if bucket in rows else HyperLogLog(precision)
+            local = pending_views.local(debate_id, bucket)
+            return sketch.merge(local) if local else sketch
+
+        today_sketch = sketch_for(week[0])
+        return {
+            'today': today_sketch.count(),
+            'week': HyperLogLog.union([today_sketch] + [sketch_for(b) for b in week[1:]], precision).count(),
+            'all_time': sketch_for(ALL_TIME).count(),
+        }
+
+    @staticmethod
+    def prune(keep_days: int) -> int:
+        """刪除超過保留天數的每日草圖（累計草圖不受影響）"""
+        cutoff = ViewCounter.day_bucket(datetime.utcnow().date() - timedelta(days=keep_days))
+        result = db.session.execute(delete(DebateViewSketch).where(
+            DebateViewSketch.bucket != ALL_TIME, DebateViewSketch.bucket < cutoff))
+        db.session.commit()
+        return result.rowcount
+
+
+@task('views.merge', batch=True)
+def _merge_views(payloads: List[Dict[str, Any]]):
+    """合併各 worker 排入的草圖（同一批內相同的辯論與日期先在記憶體合併）"""
+    sketches: Dict[Tuple[int, str], HyperLogLog] = {}
+    for payload in payloads:
+        for debate_id, bucket, data in payload['sketches']:
+            sketch = HyperLogLog.from_bytes(base64.b64decode(data))
+            current = sketches.get((debate_id, bucket))
+            sketches[(debate_id, bucket)] = current.merge(sketch) if current else sketch
+    ViewCounter.merge(sketches)
@@ -0,0 +1,330 @@
+"""
+已完成辯論的靜態快照
+
+已完成的辯論內容不會再變動，只需以匿名訪客身分渲染一次，存成預先壓縮的 HTML：
+
+    <SNAPSHOT_DIR>/<id // 1000>/<id>.html.gz   gzip
+    <SNAPSHOT_DIR>/<id // 1000>/<id>.html.br   brotli（有安裝時）
+    <SNAPSHOT_DIR>/<id // 1000>/<id>.json      ETag、Last-Modified 與內容指紋
+
+debate_detail 對未登入訪客先呼叫 serve_snapshot()，只讀取檔案、完全不經過 ORM。
+沒有快照時這次照常動態渲染，並以背景工作 snapshots.build 產生（同一場辯論在佇列中只有一筆），
+不會在請求內渲染與高壓縮，失效後同時湧入的訪客也不會各自重建。
+
+內容指紋由完成時間、評分與關注數組成；評分或關注變動時，在交易提交後刪除快照（init_snapshots 註冊的事件）。
+產生快照時寫入後會再計算一次指紋，與渲染前不同（渲染期間有評分或關注提交）就刪除剛寫入的快照，
+不會留下以提交前資料渲染、之後一直被回應的快照。
+`flask snapshots build` 以 process pool 重新產生缺少或指紋不符的快照。
+
+快照中的觀看人數與相關辯論是產生當時的值，不會隨之後的觀看或相關辯論重算而更新
+（直到指紋變動，或以 `flask snapshots build --all` 全部重新產生）。
+"""
+import gzip
+import hashlib
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from flask import Response, current_app, render_template, request
+from sqlalchemy import event, func, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import joinedload, object_session
+
+from app import db
+from app.tasks import enqueue, task
+
+try:
+    import brotli
+except ImportError:  # brotli 為選用套件，沒有安裝時只產生 gzip
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+PENDING_KEY = 'pending_snapshot_invalidations'
+
+
+def _paths(directory: str, debate_id: int) -> Dict[str, str]:
+    base = os.path.join(directory, f'{debate_id // 1000:04d}', str(debate_id))
+    return {'gzip': base + '.html.gz', 'br': base + '.html.br', 'meta': base + '.json'}
+
+
+def _write_atomic(path: str, data: bytes):
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def read_meta(directory: str, debate_id: int) -> Optional[dict]:
+    try:
+        with open(_paths(directory, debate_id)['meta'], encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def store(directory: str, debate_id: int, html: str, fingerprint: str) -> int:
+    """寫入快照，回傳寫入的位元組數；meta 最後寫入，存在即代表快照完整"""
+    paths = _paths(directory, debate_id)
+    os.makedirs(os.path.dirname(paths['meta']), exist_ok=True)
+    body = html.encode('utf-8')
+    variants = {'gzip': gzip.compress(body, 9, mtime=0)}
+    if brotli is not None:
+        variants['br'] = brotli.compress(body, quality=11)
+    for encoding, data in variants.items():
+        _write_atomic(paths[encoding], data)
+    meta = {
+        'etag': hashlib.sha1(body).hexdigest()[:20],
+        'fingerprint': fingerprint,
+        'last_modified': datetime.utcnow().replace(microsecond=0).isoformat(),
+        'encodings': sorted(variants),
+        'size': len(body),
+    }
+    _write_atomic(paths['meta'], json.dumps(meta).encode('utf-8'))
+    return sum(len(data) for data in variants.values())
+
+
+def invalidate(directory: str, debate_id: int):
+    """刪除快照（先刪 meta，讓讀取端立即改走動態渲染）"""
+    for key in ('meta', 'gzip', 'br'):
+        try:
+            os.remove(_paths(directory, debate_id)[key])
+        except FileNotFoundError:
+            pass
+
+
+def serve_snapshot(debate_id: int) -> Optional[Response]:
+    """有快照時直接回應（含條件式請求），否則回傳 None"""
+    directory = current_app.config['SNAPSHOT_DIR']
+    meta = read_meta(directory, debate_id)
+    if meta is None:
+        return None
+
+    encoding = request.accept_encodings.best_match(meta['encodings'] + ['identity'], default='identity')
+    path = _paths(directory, debate_id)['gzip' if encoding == 'identity' else encoding]
+    try:
+        with open(path, 'rb') as f:
+            body = f.read()
+    except FileNotFoundError:
+        return None
+    if encoding == 'identity':
+        body = gzip.decompress(body)
+
+    response = Response(body, mimetype='text/html')
+    if encoding != 'identity':
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    # 各編碼的位元組不同，使用弱 ETag
+    response.set_etag(meta['etag'], weak=True)
+    response.last_modified = datetime.fromisoformat(meta['last_modified'])
+    response.cache_control.public = True
+    response.cache_control.max_age = current_app.config['SNAPSHOT_MAX_AGE']
+    return response.make_conditional(request)
+
+
+# -- 渲染 ------------------------------------------------------------------
+
+def fingerprints(debate_ids: List[int]) -> Dict[int, str]:
+    """已完成辯論的內容指紋（主資料表與封存資料表）；未完成的辯論不在結果中"""
+    from app.models.archive import ARCHIVE_BIND, archived_debates, archived_debate_ratings, archived_debate_follows
+    from app.models.debate import Debate, DebateRating, DebateFollow
+
+    sources = [
+        (Debate.__table__, DebateRating.__table__, DebateFollow.__table__, None),
+        (archived_debates, archived_debate_ratings, archived_debate_follows,
+         {'bind': db.engines[ARCHIVE_BIND]}),
+    ]
+    result = {}
+    for debates, ratings, follows, bind in sources:
+        try:
+            completed = dict(db.session.execute(
+                select(debates.c.id, debates.c.completed_at)
+                .where(debates.c.id.in_(debate_ids), debates.c.status == 'completed'),
+                bind_arguments=bind).all())
+            if not completed:
+                continue
+            rating_stats = {row[0]: row[1:] for row in db.session.execute(
+                select(ratings.c.debate_id, func.count(), func.max(ratings.c.created_at))
+                .where(ratings.c.debate_id.in_(list(completed))).group_by(ratings.c.debate_id),
+                bind_arguments=bind)}
+            follow_counts = dict(db.session.execute(
+                select(follows.c.debate_id, func.count())
+                .where(follows.c.debate_id.in_(list(completed))).group_by(follows.c.debate_id),
+                bind_arguments=bind).all())
+        except SQLAlchemyError:
+            # 尚未建立封存資料表
+            db.session.rollback()
+            continue
+        for debate_id, completed_at in completed.items():
+            rating_count, rating_at = rating_stats.get(debate_id, (0, None))
+            raw = f'{completed_at}|{rating_count}|{rating_at}|{follow_counts.get(debate_id, 0)}'
+            result[debate_id] = hashlib.sha1(raw.encode('utf-8')).hexdigest()[:16]
+    return result
+
+
+def render_snapshot(debate_id: int) -> Optional[str]:
+    """以匿名訪客身分渲染已完成辯論的完整頁面（所有輪次一次輸出）"""
+    from app.models.debate import Debate, Argument
+    from app.services.archive_service import ArchiveService
+    from app.services.related_service import RelatedService
+    from app.services.view_counter import ViewCounter
+
+    debate = db.session.get(Debate, debate_id)
+    if debate is not None:
+        arguments = (debate.arguments.options(joinedload(Argument.user))
+                     .order_by(Argument.created_at.desc(), Argument.id.desc()).all())
+        viewers = ViewCounter.unique_viewers(debate_id)
+        related_debates = RelatedService.related(debate_id)
+    else:
+        archived = ArchiveService.load_debate(debate_id)
+        if archived is None:
+            return None
+        debate, arguments = archived
+        viewers = {'today': 0, 'week': 0, 'all_time': debate.views or 0}
+        related_debates = []
+    if debate.status != 'completed':
+        return None
+
+    with current_app.test_request_context(f'/debate/{debate_id}'):
+        return render_template('debate_detail.html', debate=debate, arguments=arguments,
+                               arguments_count=len(arguments), latest_round=None,
+                               has_older_rounds=False, viewers=viewers, related_debates=related_debates)
+
+
+def build_snapshot(debate_id: int, fingerprint: Optional[str] = None) -> int:
+    """
+    渲染並寫入單一快照，回傳寫入的位元組數（不是已完成辯論時為 0）
+
+    寫入後重新計算指紋：渲染期間有評分或關注提交時，刪除剛寫入的快照並回傳 0。
+    """
+    fingerprint = fingerprint or fingerprints([debate_id]).get(debate_id)
+    if fingerprint is None:
+        return 0
+    html = render_snapshot(debate_id)
+    if html is None:
+        return 0
+    directory = current_app.config['SNAPSHOT_DIR']
+    written = store(directory, debate_id, html, fingerprint)
+    if fingerprints([debate_id]).get(debate_id) != fingerprint:
+        invalidate(directory, debate_id)
+        return 0
+    return written
+
+
+def build_later(debate_id: int):
+    """排入背景工作產生快照（立即寫入佇列；同一場辯論尚未開始的工作只有一筆）"""
+    try:
+        enqueue('snapshots.build', {'debate_id': debate_id}, dedup_key=f'snapshot:{debate_id}', defer=False)
+    except Exception:
+        logger.exception('排入快照工作失敗：%s', debate_id)
+
+
+@task('snapshots.build')
+def _build_task(payload: dict):
+    if current_app.config['SNAPSHOTS_ENABLED']:
+        build_snapshot(payload['debate_id'])
+
+
+def stale_ids(debate_ids: Iterable[int], rebuild_all: bool = False) -> Dict[int, str]:
+    """找出缺少快照或指紋不符的已完成辯論"""
+    directory = current_app.config['SNAPSHOT_DIR']
+    debate_ids = list(debate_ids)
+    stale = {}
+    for offset in range(0, len(debate_ids), 500):
+        for debate_id, fingerprint in fingerprints(debate_ids[offset:offset + 500]).items():
+            meta = None if rebuild_all else read_meta(directory, debate_id)
+            if meta is None or meta.get('fingerprint') != fingerprint:
+                stale[debate_id] = fingerprint
+    return stale
+
+
+_worker_app = None
+
+
+def _init_worker(overrides: dict):
+    """process pool 初始化：每個行程建立自己的應用程式與資料庫連線"""
+    global _worker_app
+    from app import create_app
+    from app.config import Config
+
+    _worker_app = create_app(type('SnapshotWorkerConfig', (Config,), overrides))
+    _worker_app.app_context().push()
+
+
+def _build_chunk(items: List[tuple]) -> tuple:
+    written = built = 0
+    for debate_id, fingerprint in items:
+        size = build_snapshot(debate_id, fingerprint)
+        if size:
+            built += 1
+            written += size
+    db.session.remove()
+    return built, written
+
+
+def build_snapshots(stale: Dict[int, str], workers: int = 1, chunk_size: int = 100) -> Dict[str, float]:
+    """
+    產生快照（需在 app context 中呼叫）
+
+    workers > 1 時以 process pool 平行渲染，每個行程以目前的設定建立獨立的應用程式。
+    """
+    started = time.perf_counter()
+    items = sorted(stale.items())
+    chunks = [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+    if workers <= 1:
+        results = [_build_chunk(chunk) for chunk in chunks]
+    else:
+        config = current_app.config
+        overrides = {key: config[key] for key in ('SQLALCHEMY_DATABASE_URI', 'ARCHIVE_DATABASE_URL', 'SECRET_KEY',
+                                                 'SNAPSHOT_DIR', 'SQLALCHEMY_ENGINE_OPTIONS') if key in config}
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(overrides,)) as pool:
+            results = list(pool.map(_build_chunk, chunks))
+    return {
+        'built': sum(built for built, _ in results),
+        'bytes': sum(written for _, written in results),
+        'seconds': time.perf_counter() - started,
+        'workers': workers,
+    }
+
+
+# -- 初始化 ----------------------------------------------------------------
+
+_listeners_registered = False
+
+
+def _invalidate_target(mapper, connection, target):
+    """flush 時只記下辯論，提交後才刪除（提交前刪除的話，同時的請求可能以提交前的資料重建）"""
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault(PENDING_KEY, set()).add(target.debate_id)
+
+
+def _after_commit(session):
+    debate_ids = session.info.pop(PENDING_KEY, None)
+    if debate_ids and current_app and current_app.config.get('SNAPSHOTS_ENABLED'):
+        for debate_id in debate_ids:
+            invalidate(current_app.config['SNAPSHOT_DIR'], debate_id)
+
+
+def _after_rollback(session, previous_transaction):
+    if previous_transaction.parent is None:
+        session.info.pop(PENDING_KEY, None)
+
+
+def init_snapshots(app):
+    """評分或關注變動時，在交易提交後刪除對應辯論的快照"""
+    global _listeners_registered
+    os.makedirs(app.config['SNAPSHOT_DIR'], exist_ok=True)
+    if _listeners_registered:
+        return
+    from app.models.debate import DebateRating, DebateFollow
+    for model in (DebateRating, DebateFollow):
+        for name in ('after_insert', 'after_update', 'after_delete'):
+            event.listen(model, name, _invalidate_target)
+    event.listen(db.session, 'after_commit', _after_commit)
+    event.listen(db.session, 'after_soft_rollback', _after_rollback)
+    _listeners_registered = True
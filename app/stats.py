@@ -0,0 +1,17 @@
+"""
+統計輔助函式
+
+應用程式（`flask tasks stats`）與 benchmarks/ 共用同一個百分位數定義，兩邊回報的 p50/p95 才能直接比較。
+"""
+import math
+from typing import Iterable, Optional
+
+
+def percentile(values: Iterable[float], pct: float) -> Optional[float]:
+    """最近秩法百分位數（第 ceil(p/100 × n) 小的值），沒有資料時回傳 None"""
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    # 先乘再除，避免 0.07 × 100 之類的浮點誤差多進一位
+    index = max(0, min(len(ordered) - 1, math.ceil(pct * len(ordered) / 100.0) - 1))
+    return ordered[index]
@@ -0,0 +1,223 @@
+"""
+搜尋自動完成的前綴索引
+
+每個標題在標題開頭、標點之後，以及中英文交界處各取一個起點，從起點到標題結尾的文字（正規化為 NFKC、小寫、
+去掉標點與空白，最多 key_chars 個字）即為一個鍵。輸入「核能」可以找到「核能發電是否該退場」，
+也可以找到「台灣 2030 年前，核能應該歸零嗎」；中文沒有斷詞，句中的詞（「是否該退場」）不會被找到。
+
+所有鍵排序後以 UTF-8 串接成一個 bytes，另以 array('I') 記錄每個鍵的起點，
+bisect 在這個序列上找出前綴範圍（UTF-8 不含 0xff，前綴 + b'\\xff' 即為範圍上界）。
+每個鍵只多佔 8 個位元組（起點與所屬的列），100 萬個標題約 3 百萬個鍵、一百多 MB。
+
+範圍內取熱度最高的 k 個：每 32 個鍵一個區塊、每 32 個區塊一個超級區塊，各記錄區間內的最高熱度。
+查詢時把範圍拆成頭尾零散的鍵、區塊與中間完整的超級區塊放進 heap，依上界由高到低展開，
+取出的鍵就是剩下的最大值，湊滿 k 個不同的標題即停止；再短的前綴（一個字、數十萬個鍵）也只需展開數十個節點。
+
+建立後的結構不再修改：新標題放在 recent，查詢時逐一比對後合併，下一次重建才併入排序的部分。
+"""
+import heapq
+import os
+import pickle
+import re
+import unicodedata
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from itertools import accumulate
+from typing import Dict, Iterable, List, Optional, Tuple
+
+DEFAULT_KEY_CHARS = 24
+BLOCK = 32  # 每個區塊的鍵數，超級區塊為 BLOCK × BLOCK 個鍵
+
+_RUN = re.compile(r'[a-z0-9]+|[^\W\da-z_]+')  # 英數字、其他文字（中文）各自成段
+_NON_WORD = re.compile(r'[\W_]+')
+
+
+def normalize(text: str) -> str:
+    return _NON_WORD.sub('', unicodedata.normalize('NFKC', text).lower())
+
+
+def prefix_keys(title: str, key_chars: int = DEFAULT_KEY_CHARS) -> List[bytes]:
+    """標題的所有鍵（UTF-8），每段文字的開頭各一個"""
+    runs = [m.group() for m in _RUN.finditer(unicodedata.normalize('NFKC', title).lower())]
+    keys = []
+    for start in range(len(runs)):
+        key = ''.join(runs[start:])[:key_chars].encode('utf-8')
+        if key not in keys:
+            keys.append(key)
+    return keys
+
+
+class _Keys:
+    """把 blob 與 offsets 當成排序的 bytes 序列，供 bisect 使用"""
+
+    __slots__ = ('blob', 'offsets')
+
+    def __init__(self, blob: bytes, offsets: array):
+        self.blob = blob
+        self.offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> bytes:
+        return self.blob[self.offsets[i]:self.offsets[i + 1]]
+
+
+class PrefixIndex:
+    """標題前綴 → 熱度最高的 id"""
+
+    def __init__(self, key_chars: int = DEFAULT_KEY_CHARS):
+        self.key_chars = key_chars
+        self.ids = array('q')  # 列 → 辯論 id
+        self.scores = array('d')  # 列 → 建立時的熱度
+        self.max_id = 0  # 資料庫中已處理過的最大 id（包含因記憶體上限而略過的辯論）
+        self.skipped = 0
+        self.categories: Counter = Counter()
+        self.blob = b''
+        self.offsets = array('I', [0])
+        self.targets = array('I')  # 鍵 → 列
+        self.block_max = array('d')
+        self.super_max = array('d')
+        self.recent: List[Tuple[bytes, int]] = []
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def keys(self) -> _Keys:
+        return _Keys(self.blob, self.offsets)
+
+    def nbytes(self) -> int:
+        """排序結構與各陣列的大小（不含 recent）"""
+        arrays = (self.ids, self.scores, self.offsets, self.targets, self.block_max, self.super_max)
+        return len(self.blob) + sum(a.itemsize * len(a) for a in arrays)
+
+    @classmethod
+    def build(cls, rows: Iterable[Tuple[int, str, Optional[str], float]], key_chars: int = DEFAULT_KEY_CHARS,
+              memory_bytes: Optional[int] = None) -> 'PrefixIndex':
+        """
+        rows 為 (id, 標題, 分類, 熱度)，應依熱度由高到低排列：
+        超過 memory_bytes 後其餘的標題只計數不收錄，自動完成只放得下最熱門的部分
+        """
+        index = cls(key_chars)
+        pairs: List[Tuple[bytes, int]] = []
+        used = 0
+        for item_id, title, category, score in rows:
+            index.max_id = max(index.max_id, item_id)
+            if category:
+                index.categories[category] += 1
+            keys = prefix_keys(title, key_chars)
+            cost = 16 + sum(len(key) + 8 for key in keys)
+            if not keys or (memory_bytes is not None and used + cost > memory_bytes):
+                index.skipped += 1
+                continue
+            used += cost
+            row = len(index.ids)
+            index.ids.append(item_id)
+            index.scores.append(score)
+            pairs.extend((key, row) for key in keys)
+        pairs.sort()
+        index.blob = b''.join(key for key, _ in pairs)
+        index.offsets = array('I', accumulate((len(key) for key, _ in pairs), initial=0))
+        index.targets = array('I', (row for _, row in pairs))
+        del pairs
+        index._summarize()
+        return index
+
+    def _summarize(self):
+        scores, targets = self.scores, self.targets
+        self.block_max = array('d', (max(scores[row] for row in targets[start:start + BLOCK])
+                                     for start in range(0, len(targets), BLOCK)))
+        self.super_max = array('d', (max(self.block_max[start:start + BLOCK])
+                                     for start in range(0, len(self.block_max), BLOCK)))
+
+    def add(self, item_id: int, title: str, category: Optional[str], score: float) -> bool:
+        """新標題先放在 recent，重建時才併入排序的部分"""
+        self.max_id = max(self.max_id, item_id)
+        if category:
+            self.categories[category] += 1
+        keys = prefix_keys(title, self.key_chars)
+        if not keys:
+            return False
+        row = len(self.ids)
+        self.ids.append(item_id)
+        self.scores.append(score)
+        self.recent.extend((key, row) for key in keys)
+        return True
+
+    def _range(self, prefix: bytes) -> Tuple[int, int]:
+        keys = self.keys
+        lo = bisect_left(keys, prefix)
+        return lo, bisect_left(keys, prefix + b'\xff', lo)
+
+    def count(self, prefix: str) -> int:
+        """符合前綴的鍵數（不含 recent）"""
+        lo, hi = self._range(normalize(prefix).encode('utf-8'))
+        return hi - lo
+
+    def top(self, prefix: str, k: int) -> List[Tuple[int, float]]:
+        """以 prefix 開頭、熱度最高的 k 個 (id, 熱度)"""
+        encoded = normalize(prefix).encode('utf-8')
+        if not encoded or k <= 0:
+            return []
+        lo, hi = self._range(encoded)
+        scores, targets = self.scores, self.targets
+        # 節點為 (-上界, 層級, 位置)：層級 0 為鍵、1 為區塊、2 為超級區塊
+        heap = []
+        span = BLOCK * BLOCK
+        i = lo
+        while i < hi:
+            if i % span == 0 and i + span <= hi:
+                heap.append((-self.super_max[i // span], 2, i // span))
+                i += span
+            elif i % BLOCK == 0 and i + BLOCK <= hi:
+                heap.append((-self.block_max[i // BLOCK], 1, i // BLOCK))
+                i += BLOCK
+            else:
+                heap.append((-scores[targets[i]], 0, i))
+                i += 1
+        for key, row in self.recent:
+            if key.startswith(encoded):
+                heap.append((-scores[row], 0, -row - 1))  # 負數表示 recent 的列
+        heapq.heapify(heap)
+
+        found: Dict[int, float] = {}
+        while heap and len(found) < k:
+            bound, level, position = heapq.heappop(heap)
+            if level == 0:
+                row = targets[position] if position >= 0 else -position - 1
+                found.setdefault(row, -bound)
+            elif level == 1:
+                for j in range(position * BLOCK, position * BLOCK + BLOCK):
+                    heapq.heappush(heap, (-scores[targets[j]], 0, j))
+            else:
+                for b in range(position * BLOCK, position * BLOCK + BLOCK):
+                    heapq.heappush(heap, (-self.block_max[b], 1, b))
+        return [(self.ids[row], score) for row, score in found.items()]
+
+    def match_categories(self, prefix: str, limit: int = 5) -> List[Tuple[str, int]]:
+        text = normalize(prefix)
+        return [(name, count) for name, count in self.categories.most_common()
+                if normalize(name).startswith(text)][:limit]
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp = path + '.tmp'
+        with open(tmp, 'wb') as f:
+            pickle.dump({'key_chars': self.key_chars, 'ids': self.ids, 'scores': self.scores,
+                         'max_id': self.max_id, 'skipped': self.skipped, 'categories': self.categories,
+                         'blob': self.blob, 'offsets': self.offsets, 'targets': self.targets,
+                         'block_max': self.block_max, 'super_max': self.super_max,
+                         'recent': self.recent}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> Optional['PrefixIndex']:
+        if not os.path.exists(path):
+            return None
+        with open(path, 'rb') as f:
+            state = pickle.load(f)
+        index = cls(state.pop('key_chars'))
+        index.__dict__.update(state)
+        return index
@@ -0,0 +1,410 @@
+"""
+本機背景工作佇列
+
+請求只把副作用寫入佇列（bind 'tasks'，預設為 instance/tasks.db 的 SQLite 檔案，不需要外部 broker），
+由 `flask worker` 的行程取出執行：
+
+    至少一次  取出時設定租約（visibility timeout），worker 中斷時租約到期後會被重新取出
+    重試      失敗時以指數退避延後（TASK_RETRY_BASE * 2^(次數-1)，上限 TASK_RETRY_MAX），
+              超過重試次數改為 dead 並保留錯誤訊息
+    去重      同一個 dedup_key 在尚未開始的工作中只會有一筆
+    批次      一次取出最多 batch_size 筆同名工作；batch=True 的處理函式一次收到整批 payload
+
+enqueue() 在主資料庫交易提交後才寫入佇列（回滾時丟棄）；defer=False 時立即寫入，用於與交易無關的工作
+（例如觀看草圖）。處理函式不自行提交，由 worker 在整批成功後提交，重新取出時可能再執行一次，因此必須可以重複執行。
+TASK_ALWAYS_EAGER 時直接在目前的交易內執行（沒有執行 worker 的開發環境與基準測試使用）。
+TASK_ALWAYS_EAGER 未設定時依應用程式模式決定：debug（`flask run --debug`、run.py）與 testing 開啟，
+其餘關閉，沒有執行 `flask worker` 時通知、活動彙總等工作只會留在佇列中。
+"""
+import importlib
+import json
+import logging
+import os
+import random
+import secrets
+import signal
+import socket
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from flask import current_app
+from sqlalchemy import and_, case, delete, event, func, select, text, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app import db
+from app.models.task import TASKS_BIND, tasks
+from app.stats import percentile
+
+logger = logging.getLogger(__name__)
+
+PENDING_KEY = 'pending_tasks'
+# worker 啟動時載入，讓各模組以 @task 註冊處理函式
+HANDLER_MODULES = (
+    'app.services.notification_service',
+    'app.services.rollup_service',
+    'app.services.view_counter',
+    'app.snapshots',
+)
+
+
+class TaskHandler(NamedTuple):
+    name: str
+    fn: Callable
+    batch: bool
+    max_attempts: Optional[int]
+
+
+_handlers: Dict[str, TaskHandler] = {}
+
+
+def task(name: str, batch: bool = False, max_attempts: Optional[int] = None):
+    """註冊工作處理函式；batch=True 時一次收到同名工作的 payload 列表"""
+    def decorator(fn):
+        _handlers[name] = TaskHandler(name, fn, batch, max_attempts)
+        return fn
+    return decorator
+
+
+def load_handlers():
+    for module in HANDLER_MODULES:
+        importlib.import_module(module)
+
+
+def always_eager(app=None) -> bool:
+    """是否不經佇列直接執行（TASK_ALWAYS_EAGER；未設定時 debug / testing 模式為 True）"""
+    app = app or current_app
+    eager = app.config['TASK_ALWAYS_EAGER']
+    return (app.debug or app.testing) if eager is None else bool(eager)
+
+
+def enqueue(name: str, payload: Dict[str, Any], dedup_key: Optional[str] = None, delay: float = 0.0,
+            defer: bool = True):
+    """加入背景工作（目前的交易提交後才寫入佇列；defer=False 時立即寫入，與目前的交易無關）"""
+    if always_eager():
+        handler = _handlers[name]
+        if handler.batch:
+            handler.fn([payload])
+        else:
+            handler.fn(payload)
+        return
+    now = time.time()
+    row = {
+        'name': name,
+        'payload': json.dumps(payload, separators=(',', ':')),
+        'dedup_key': dedup_key,
+        'state': 'queued',
+        'attempts': 0,
+        'visible_at': now + delay,
+        'enqueued_at': now,
+    }
+    if not defer:
+        TaskQueue.push([row])
+        return
+    session = db.session()
+    if not session.in_transaction():
+        session.begin()  # 讓之後的 commit / rollback 一定會觸發事件
+    session.info.setdefault(PENDING_KEY, []).append(row)
+
+
+def _after_commit(session):
+    rows = session.info.pop(PENDING_KEY, None)
+    if rows:
+        try:
+            TaskQueue.push(rows)
+        except Exception:
+            # 主交易已提交，無法回復；記錄下來由維運補送
+            logger.exception('寫入背景工作佇列失敗：%s', [row['name'] for row in rows])
+
+
+def _after_rollback(session, previous_transaction):
+    # savepoint 回滾不影響外層交易的工作
+    if previous_transaction.parent is None:
+        session.info.pop(PENDING_KEY, None)
+
+
+def _sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    cursor.execute('PRAGMA busy_timeout=10000')
+    cursor.close()
+
+
+class TaskQueue:
+    """佇列操作（直接使用 tasks bind 的連線，與主資料庫的交易無關）"""
+
+    _prepared = set()
+
+    @staticmethod
+    def engine():
+        engine = db.engines[TASKS_BIND]
+        if id(engine) not in TaskQueue._prepared:
+            if engine.dialect.name == 'sqlite':
+                event.listen(engine, 'connect', _sqlite_pragmas)
+                engine.dispose()
+            tasks.create(engine, checkfirst=True)
+            TaskQueue._prepared.add(id(engine))
+        return engine
+
+    @staticmethod
+    def push(rows: List[Dict[str, Any]]) -> int:
+        """寫入工作，回傳實際加入的筆數（與尚未開始的工作重複的 dedup_key 會略過）"""
+        engine = TaskQueue.engine()
+        if engine.dialect.name in ('sqlite', 'postgresql'):
+            insert = sqlite.insert if engine.dialect.name == 'sqlite' else postgresql.insert
+            stmt = insert(tasks).on_conflict_do_nothing(index_elements=['dedup_key'],
+                                                       index_where=text("state = 'queued'"))
+        else:
+            stmt = tasks.insert()
+        with engine.begin() as conn:
+            return conn.execute(stmt, rows).rowcount
+
+    @staticmethod
+    def claim(worker: str, limit: int, visibility_timeout: float) -> Tuple[str, List]:
+        """取出最早到期的一種工作最多 limit 筆，回傳 (批次代號, 資料列)"""
+        now = time.time()
+        token = f'{worker}:{secrets.token_hex(4)}'
+        due = and_(tasks.c.state.in_(('queued', 'running')), tasks.c.visible_at <= now)
+        oldest = select(tasks.c.name).where(due).order_by(tasks.c.visible_at).limit(1).scalar_subquery()
+        ids = (select(tasks.c.id).where(due, tasks.c.name == oldest)
+               .order_by(tasks.c.visible_at).limit(limit).with_for_update(skip_locked=True))
+        stmt = update(tasks).where(tasks.c.id.in_(ids)).values(
+            state='running', claim=token, attempts=tasks.c.attempts + 1,
+            started_at=now, visible_at=now + visibility_timeout)
+        engine = TaskQueue.engine()
+        with engine.begin() as conn:
+            if engine.dialect.update_returning:
+                rows = conn.execute(stmt.returning(*tasks.c)).all()
+            else:
+                conn.execute(stmt)
+                rows = conn.execute(select(tasks).where(tasks.c.claim == token)).all()
+        return token, sorted(rows, key=lambda row: row.id)
+
+    @staticmethod
+    def complete(ids: List[int], token: str):
+        """標記完成（租約已被其他 worker 取走的不受影響）"""
+        if not ids:
+            return
+        with TaskQueue.engine().begin() as conn:
+            conn.execute(update(tasks).where(tasks.c.id.in_(ids), tasks.c.claim == token)
+                         .values(state='done', finished_at=time.time()))
+
+    @staticmethod
+    def fail(rows: List, token: str, error: str, max_attempts: int):
+        """失敗：以指數退避重新排入，超過重試次數改為 dead"""
+        config = current_app.config
+        now = time.time()
+        with TaskQueue.engine().begin() as conn:
+            for row in rows:
+                values = {'last_error': error[:2000], 'claim': None}
+                superseded = row.dedup_key is not None and conn.execute(
+                    select(tasks.c.id).where(tasks.c.dedup_key == row.dedup_key, tasks.c.state == 'queued')
+                ).first() is not None
+                if row.attempts >= max_attempts:
+                    values.update(state='dead', finished_at=now)
+                elif superseded:
+                    # 已有相同去重鍵的新工作在排隊，由它處理
+                    values.update(state='done', finished_at=now)
+                else:
+                    backoff = min(config['TASK_RETRY_BASE'] * 2 ** (row.attempts - 1), config['TASK_RETRY_MAX'])
+                    values.update(state='queued', visible_at=now + backoff * random.uniform(1.0, 1.2))
+                conn.execute(update(tasks).where(tasks.c.id == row.id, tasks.c.claim == token).values(**values))
+
+    @staticmethod
+    def retry_dead(name: Optional[str] = None) -> int:
+        """把 dead 工作重新排入"""
+        stmt = update(tasks).where(tasks.c.state == 'dead').values(
+            state='queued', attempts=0, visible_at=time.time(), finished_at=None)
+        if name:
+            stmt = stmt.where(tasks.c.name == name)
+        with TaskQueue.engine().begin() as conn:
+            return conn.execute(stmt).rowcount
+
+    @staticmethod
+    def prune(retention_seconds: float) -> int:
+        """刪除完成超過保留時間的工作"""
+        with TaskQueue.engine().begin() as conn:
+            return conn.execute(delete(tasks).where(
+                tasks.c.state == 'done', tasks.c.finished_at < time.time() - retention_seconds)).rowcount
+
+    @staticmethod
+    def stats(window: float = 300.0) -> Dict[str, Dict[str, Any]]:
+        """
+        各工作的佇列深度與延遲
+
+        ready / delayed / running / dead 為目前數量，oldest_age 為最久未完成工作的等待秒數；
+        wait（加入到開始）與 latency（加入到完成）的百分位數取自最近 window 秒內完成的工作。
+        """
+        now = time.time()
+        result = {}
+        with TaskQueue.engine().connect() as conn:
+            depth = conn.execute(
+                select(tasks.c.name, tasks.c.state, func.count(), func.min(tasks.c.enqueued_at),
+                       func.sum(case((tasks.c.visible_at <= now, 1), else_=0)))
+                .where(tasks.c.state.in_(('queued', 'running', 'dead')))
+                .group_by(tasks.c.name, tasks.c.state)).all()
+            done = conn.execute(
+                select(tasks.c.name, tasks.c.enqueued_at, tasks.c.started_at, tasks.c.finished_at)
+                .where(tasks.c.state == 'done', tasks.c.finished_at >= now - window)).all()
+
+        def entry(name):
+            return result.setdefault(name, {'ready': 0, 'delayed': 0, 'running': 0, 'dead': 0,
+                                            'oldest_age': 0.0, 'done': 0, 'wait': [], 'latency': []})
+
+        for name, state, count, oldest, visible in depth:
+            stats = entry(name)
+            if state == 'queued':
+                stats['ready'] += visible or 0
+                stats['delayed'] += count - (visible or 0)
+            else:
+                stats[state] += count
+            if state != 'dead':
+                stats['oldest_age'] = max(stats['oldest_age'], now - oldest)
+        for name, enqueued_at, started_at, finished_at in done:
+            stats = entry(name)
+            stats['done'] += 1
+            stats['wait'].append(started_at - enqueued_at)
+            stats['latency'].append(finished_at - enqueued_at)
+        for stats in result.values():
+            wait, latency = stats.pop('wait'), stats.pop('latency')
+            stats.update(wait_p50=percentile(wait, 50), wait_p95=percentile(wait, 95),
+                         latency_p50=percentile(latency, 50), latency_p95=percentile(latency, 95))
+        return result
+
+
+# -- worker ----------------------------------------------------------------
+
+def process_batch(worker: str, batch_size: int, visibility_timeout: float) -> int:
+    """取出並執行一批工作，回傳處理的筆數（需在 app context 中呼叫）"""
+    token, rows = TaskQueue.claim(worker, batch_size, visibility_timeout)
+    if not rows:
+        return 0
+    name = rows[0].name
+    handler = _handlers.get(name)
+    if handler is None:
+        TaskQueue.fail(rows, token, f'未註冊的工作：{name}', max_attempts=0)
+        return len(rows)
+    max_attempts = handler.max_attempts or current_app.config['TASK_MAX_ATTEMPTS']
+
+    # 租約多次到期（例如執行中的 worker 被終止）也算一次嘗試
+    expired = [row for row in rows if row.attempts > max_attempts]
+    if expired:
+        TaskQueue.fail(expired, token, '租約到期次數超過重試上限', max_attempts)
+        rows = [row for row in rows if row.attempts <= max_attempts]
+
+    try:
+        if handler.batch:
+            handler.fn([json.loads(row.payload) for row in rows])
+            db.session.commit()
+            TaskQueue.complete([row.id for row in rows], token)
+        else:
+            done = []
+            for row in rows:
+                try:
+                    handler.fn(json.loads(row.payload))
+                    db.session.commit()
+                    done.append(row.id)
+                except Exception as e:
+                    db.session.rollback()
+                    logger.exception('工作 %s #%s 失敗', name, row.id)
+                    TaskQueue.fail([row], token, repr(e), max_attempts)
+            TaskQueue.complete(done, token)
+    except Exception as e:
+        db.session.rollback()
+        logger.exception('批次工作 %s 失敗（%d 筆）', name, len(rows))
+        TaskQueue.fail(rows, token, repr(e), max_attempts)
+    finally:
+        db.session.remove()
+    return len(rows)
+
+
+def work(worker: Optional[str] = None, batch_size: int = 100, visibility_timeout: float = 60.0,
+         poll_interval: float = 1.0, burst: bool = False) -> Dict[str, float]:
+    """
+    worker 主迴圈（需在 app context 中呼叫）
+
+    佇列空時每隔 poll_interval 秒輪詢；burst 時佇列清空即結束。
+    收到 SIGTERM / SIGINT 時處理完目前這批才結束。
+    """
+    worker = worker or f'{socket.gethostname()}-{os.getpid()}'
+    load_handlers()
+    stopping = []
+
+    def stop(signum, frame):
+        stopping.append(signum)
+
+    try:
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+    except ValueError:
+        pass  # 不在主執行緒
+
+    started = time.perf_counter()
+    processed = batches = 0
+    last_prune = 0.0
+    while not stopping:
+        if time.monotonic() - last_prune > 60:
+            TaskQueue.prune(current_app.config['TASK_DONE_RETENTION'])
+            last_prune = time.monotonic()
+        count = process_batch(worker, batch_size, visibility_timeout)
+        if count:
+            processed += count
+            batches += 1
+            continue
+        if burst:
+            break
+        time.sleep(poll_interval)
+    return {'processed': processed, 'batches': batches, 'seconds': time.perf_counter() - started}
+
+
+def _worker_process(overrides: dict, worker: str, options: dict):
+    """worker pool 的子行程：建立自己的應用程式與資料庫連線"""
+    from app import create_app
+    from app.config import Config
+
+    app = create_app(type('TaskWorkerConfig', (Config,), overrides))
+    with app.app_context():
+        result = work(worker, **options)
+    logger.info('worker %s 結束：%s', worker, result)
+
+
+def run_pool(processes: int, **options) -> Optional[Dict[str, float]]:
+    """啟動 processes 個 worker 行程（1 時直接在目前行程執行）"""
+    if processes <= 1:
+        return work(**options)
+    import multiprocessing
+
+    config = current_app.config
+    overrides = {key: config[key] for key in ('SQLALCHEMY_DATABASE_URI', 'ARCHIVE_DATABASE_URL', 'TASK_QUEUE_URL',
+                                             'SECRET_KEY', 'SQLALCHEMY_ENGINE_OPTIONS') if key in config}
+    context = multiprocessing.get_context('spawn')
+    host = socket.gethostname()
+    children = [context.Process(target=_worker_process, args=(overrides, f'{host}-{os.getpid()}-{n}', options))
+                for n in range(processes)]
+    for child in children:
+        child.start()
+    try:
+        for child in children:
+            child.join()
+    except KeyboardInterrupt:
+        for child in children:
+            child.terminate()
+        for child in children:
+            child.join()
+    return None
+
+
+_listeners_registered = False
+
+
+def init_tasks(app):
+    """設定佇列 bind，並註冊提交後寫入佇列的 session 事件"""
+    global _listeners_registered
+    url = app.config['SQLALCHEMY_BINDS'][TASKS_BIND]
+    if url.startswith('sqlite:///'):
+        os.makedirs(os.path.dirname(os.path.abspath(url[len('sqlite:///'):])), exist_ok=True)
+    if _listeners_registered:
+        return
+    event.listen(db.session, 'after_commit', _after_commit)
+    event.listen(db.session, 'after_soft_rollback', _after_rollback)
+    _listeners_registered = True
@@ -0,0 +1,145 @@
+"""
+/api/v1 的基準測試
+
+以 seed.py 建立資料後量測：
+    serialize  同一份資料（--rows 場辯論的全部欄位、--rows 則論述）以 jsonify、標準函式庫 json、orjson、
+               msgpack（有安裝時）編碼的時間與大小（含 gzip 後大小）
+    fields     ?fields=id,title,status 與全部欄位的回應大小
+    batch      以 ?ids= 一次取得 --batch 場辯論，相對於逐一請求 /debates/<id> 的延遲與 SQL 數
+    etag       帶 If-None-Match 的條件式請求（304）相對於一般請求的延遲
+
+使用方式：
+    python -m benchmarks.api_bench
+    python -m benchmarks.api_bench --rows 500 --repeat 200
+"""
+import argparse
+import gzip
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+os.environ.setdefault('LINE_CHANNEL_ID', 'bench')
+os.environ.setdefault('LINE_CHANNEL_SECRET', 'bench')
+
+from flask import jsonify  # noqa: E402
+from sqlalchemy import event, select  # noqa: E402
+
+from app import create_app, db, encoding  # noqa: E402
+from app.routes.api_v1 import ARGUMENTS, DEBATES, _fetch, _select  # noqa: E402
+from benchmarks.http_bench import SQLCounter, make_config, percentile  # noqa: E402
+from benchmarks.seed import seed_database  # noqa: E402
+
+
+def timed(fn, repeat: int) -> float:
+    """每次的平均毫秒數"""
+    fn()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+def requests(client, urls, counter, headers=None):
+    latencies, statements = [], []
+    for url in urls:
+        counter.start()
+        started = time.perf_counter()
+        response = client.get(url, headers=headers)
+        response.get_data()
+        latencies.append((time.perf_counter() - started) * 1000)
+        statements.append(counter.stop())
+    return latencies, statements
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='DSWeb /api/v1 基準測試')
+    parser.add_argument('--debates', type=int, default=20_000)
+    parser.add_argument('--rows', type=int, default=200, help='序列化測試的資料筆數')
+    parser.add_argument('--repeat', type=int, default=100)
+    parser.add_argument('--batch', type=int, default=50)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--output', help='結果 JSON 檔案')
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix='dsweb-api-')
+    app = create_app(make_config(f"sqlite:///{os.path.join(workdir, 'bench.db')}"))
+    results = {'rows': args.rows, 'orjson': encoding.orjson is not None, 'msgpack': encoding.msgpack is not None}
+    rng = random.Random(9)
+
+    with app.app_context():
+        seed_database(users=1000, debates=args.debates, arguments_per_debate=3, hall_messages=0, follows_per_debate=0)
+        payload = {
+            'debates': _fetch(_select(DEBATES, DEBATES.fields).limit(args.rows), DEBATES.fields),
+            'arguments': _fetch(_select(ARGUMENTS, ARGUMENTS.fields).limit(args.rows), ARGUMENTS.fields),
+        }
+        stdlib = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'), default=encoding._default).encode
+        encoders = {
+            'jsonify': lambda: jsonify(payload).get_data(),
+            'json': lambda: stdlib(payload).encode('utf-8'),
+        }
+        if encoding.orjson is not None:
+            encoders['orjson'] = lambda: encoding.encode_json(payload)
+        if encoding.msgpack is not None:
+            encoders['msgpack'] = lambda: encoding.encode_msgpack(payload)
+        with app.test_request_context():
+            results['serialize'] = {}
+            for name, fn in encoders.items():
+                body = fn()
+                results['serialize'][name] = {'ms': round(timed(fn, args.repeat), 3), 'bytes': len(body),
+                                              'gzip_bytes': len(gzip.compress(body, 6))}
+        ids = db.session.execute(select(DEBATES.table.c.id)).scalars().all()
+        counter = SQLCounter()
+        event.listen(db.engine, 'before_cursor_execute', counter)
+
+    client = app.test_client()
+    full = client.get(f'/api/v1/debates?limit={args.rows}').get_data()
+    sparse = client.get(f'/api/v1/debates?limit={args.rows}&fields=id,title,status').get_data()
+    results['fields'] = {'all_bytes': len(full), 'sparse_bytes': len(sparse),
+                         'all_gzip_bytes': len(gzip.compress(full, 6)), 'sparse_gzip_bytes': len(gzip.compress(sparse, 6))}
+
+    batches = [rng.sample(ids, args.batch) for _ in range(max(1, args.requests // args.batch))]
+    batch_latency, batch_sql = requests(client, ['/api/v1/debates?ids=' + ','.join(map(str, batch))
+                                                 for batch in batches], counter)
+    single_latency, single_sql = requests(client, [f'/api/v1/debates/{i}' for batch in batches for i in batch], counter)
+    results['batch'] = {
+        'ids': args.batch,
+        'batch_ms': round(percentile(batch_latency, 50), 2), 'batch_sql': max(batch_sql),
+        'singles_ms': round(percentile(single_latency, 50) * args.batch, 2), 'singles_sql': sum(single_sql) // len(batches),
+    }
+
+    urls = [f'/api/v1/debates?limit=50&before={rng.choice(ids)}' for _ in range(args.requests)]
+    etags = {url: client.get(url).headers['ETag'] for url in urls}
+    fresh, _ = requests(client, urls, counter)
+    conditional = []
+    for url in urls:
+        latency, _ = requests(client, [url], counter, headers={'If-None-Match': etags[url]})
+        conditional += latency
+    results['etag'] = {'200_ms': round(percentile(fresh, 50), 2), '304_ms': round(percentile(conditional, 50), 2)}
+
+    base = results['serialize']['jsonify']
+    print(f"序列化 {args.rows} 場辯論 + {args.rows} 則論述（orjson {'有' if results['orjson'] else '無'}，"
+          f"msgpack {'有' if results['msgpack'] else '無'}）")
+    for name, stats in results['serialize'].items():
+        print(f"  {name:<8} {stats['ms']:>8.3f} ms（{base['ms'] / stats['ms']:>5.1f}×）  "
+              f"{stats['bytes']:>8,} bytes  gzip {stats['gzip_bytes']:>7,} bytes")
+    f = results['fields']
+    print(f"fields   全部欄位 {f['all_bytes']:,} bytes（gzip {f['all_gzip_bytes']:,}） → "
+          f"id,title,status {f['sparse_bytes']:,} bytes（gzip {f['sparse_gzip_bytes']:,}）")
+    b = results['batch']
+    print(f"batch    {b['ids']} 個 id：一次 ?ids= {b['batch_ms']} ms / {b['batch_sql']} 個 SQL；"
+          f"逐一請求約 {b['singles_ms']} ms / {b['singles_sql']} 個 SQL")
+    print(f"etag     200 {results['etag']['200_ms']} ms，304 {results['etag']['304_ms']} ms（p50）")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    shutil.rmtree(workdir, ignore_errors=True)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
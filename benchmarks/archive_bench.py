@@ -0,0 +1,138 @@
+"""
+冷封存前後的列表查詢基準測試
+
+建立多年份、以已完成辯論為主的資料集（預設 500,000 場辯論、2,000,000 則論述），
+先量測看板與搜尋常用的列表查詢，再以 ArchiveService 封存完成超過 --older-than-days 天的辯論
+（封存到另一個 SQLite 檔案），重新量測相同查詢，並比較：
+    主資料庫實際使用的大小、封存速度（列/秒）
+    一般辯論與已封存辯論的詳情頁延遲（透明回退）
+
+使用方式：
+    python -m benchmarks.archive_bench --debates 500000 --arguments-per-debate 4
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+os.environ.setdefault('LINE_CHANNEL_ID', 'bench')
+os.environ.setdefault('LINE_CHANNEL_SECRET', 'bench')
+
+from sqlalchemy import desc, select, text  # noqa: E402
+
+from app import create_app, db  # noqa: E402
+from app.models.archive import archived_debates  # noqa: E402
+from app.models.debate import Debate  # noqa: E402
+from app.services.archive_service import ArchiveService  # noqa: E402
+from app.services.debate_service import DebateService  # noqa: E402
+from benchmarks.http_bench import make_config  # noqa: E402
+from benchmarks.seed import seed_database  # noqa: E402
+
+# 依 STATUSES 順序：waiting, ongoing, judging, completed
+STATUS_WEIGHTS = [0.05, 0.08, 0.02, 0.85]
+
+QUERIES = {
+    'board_latest': lambda: Debate.query.order_by(desc(Debate.created_at)).limit(6).all(),
+    'board_hot': lambda: Debate.query.order_by(desc(Debate.hot_score)).limit(4).all(),
+    'search_newest_p1': lambda: DebateService.search_debates(sort_by='newest', page=1).items,
+    'search_newest_p50': lambda: DebateService.search_debates(sort_by='newest', page=50).items,
+    'search_category': lambda: DebateService.search_debates(filters={'category': ['科技']}, page=1).items,
+    'search_keyword': lambda: DebateService.search_debates(query='核電', page=1).items,
+    'search_urgent': lambda: DebateService.search_debates(sort_by='urgent', page=1).items,
+}
+
+
+def median_ms(fn, runs: int) -> float:
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+        db.session.remove()
+    return round(statistics.median(samples), 2)
+
+
+def used_bytes(engine) -> int:
+    """SQLite 實際使用的頁面大小（不含 freelist）"""
+    with engine.connect() as conn:
+        page_size = conn.execute(text('PRAGMA page_size')).scalar()
+        pages = conn.execute(text('PRAGMA page_count')).scalar()
+        free = conn.execute(text('PRAGMA freelist_count')).scalar()
+    return (pages - free) * page_size
+
+
+def detail_ms(client, debate_id: int, runs: int) -> float:
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        response = client.get(f'/debate/{debate_id}')
+        response.get_data()
+        assert response.status_code == 200, response.status_code
+        samples.append((time.perf_counter() - started) * 1000)
+    return round(statistics.median(samples), 2)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='DSWeb 冷封存列表查詢基準測試')
+    parser.add_argument('--debates', type=int, default=500_000)
+    parser.add_argument('--arguments-per-debate', type=int, default=4)
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--history-days', type=int, default=730)
+    parser.add_argument('--older-than-days', type=int, default=90)
+    parser.add_argument('--batch-size', type=int, default=2000)
+    parser.add_argument('--runs', type=int, default=7)
+    parser.add_argument('--output', help='結果 JSON 檔案')
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix='dsweb-archive-')
+    config = make_config(f"sqlite:///{os.path.join(workdir, 'main.db')}")
+    config.ARCHIVE_DATABASE_URL = f"sqlite:///{os.path.join(workdir, 'archive.db')}"
+    app = create_app(config)
+    results = {'debates': args.debates, 'arguments_per_debate': args.arguments_per_debate}
+
+    with app.app_context():
+        started = time.perf_counter()
+        results['seed'] = seed_database(users=args.users, debates=args.debates,
+                                        arguments_per_debate=args.arguments_per_debate, hall_messages=0,
+                                        follows_per_debate=2, argument_words=20, batch_size=20000,
+                                        status_weights=STATUS_WEIGHTS, history_days=args.history_days)
+        results['seed_seconds'] = round(time.perf_counter() - started, 2)
+        results['main_bytes_before'] = used_bytes(db.engine)
+        results['before_ms'] = {name: median_ms(fn, args.runs) for name, fn in QUERIES.items()}
+
+        archive = ArchiveService.archive(args.older_than_days, batch_size=args.batch_size)
+        moved_rows = sum(v for k, v in archive.items() if k not in ('batches', 'seconds'))
+        results['archive'] = dict(archive, rows_per_sec=round(moved_rows / archive['seconds']))
+        results['main_bytes_after'] = used_bytes(db.engine)
+        results['archive_bytes'] = used_bytes(db.engines['archive'])
+        results['after_ms'] = {name: median_ms(fn, args.runs) for name, fn in QUERIES.items()}
+
+        live_id = db.session.execute(select(Debate.id).order_by(Debate.id).limit(1)).scalar()
+        archived_id = db.session.execute(select(archived_debates.c.id).limit(1),
+                                         bind_arguments={'bind': db.engines['archive']}).scalar()
+
+    client = app.test_client()
+    results['detail_ms'] = {'live': detail_ms(client, live_id, args.runs),
+                            'archived': detail_ms(client, archived_id, args.runs) if archived_id else None}
+
+    print(f"封存 {archive.get('debates', 0)} 場辯論 / {moved_rows} 列，"
+          f"{archive['seconds']:.1f} 秒（{results['archive']['rows_per_sec']} 列/秒）")
+    print(f"主資料庫使用大小：{results['main_bytes_before'] / 2**20:.1f} MB → "
+          f"{results['main_bytes_after'] / 2**20:.1f} MB（封存檔 {results['archive_bytes'] / 2**20:.1f} MB）")
+    print(f"\n{'query':<20}{'before ms':>12}{'after ms':>12}{'speedup':>10}")
+    for name in QUERIES:
+        before, after = results['before_ms'][name], results['after_ms'][name]
+        print(f"{name:<20}{before:>12.2f}{after:>12.2f}{before / after if after else 0:>9.1f}x")
+    print(f"\n詳情頁：一般 {results['detail_ms']['live']} ms，已封存 {results['detail_ms']['archived']} ms")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,194 @@
+"""
+線上回填的基準測試
+
+以 seed.py 建立 --arguments 則論述後新增一個可為 NULL 的欄位（arguments.content_length），
+以 app.backfill 回填 length(content)，同時由另一條連線每 --write-interval 秒寫入一則大廳訊息，
+記錄線上寫入的等待時間。量測：
+    batch      不同 --batch-sizes 的每秒 id 數與線上寫入的 p99 / 最長等待
+    throttle   每批之間暫停 --sleep 秒的速度與線上寫入等待
+    workers    --workers 個行程平行處理（SQLite 同一時間只有一個寫入者，主要用來確認 checkpoint 正確）
+    resume     執行到一半中斷後重新執行，只處理剩下的範圍，結果與一次做完相同
+    single     對照組：migration 內一個 UPDATE 做完整張表（整段期間持有寫入鎖）
+
+使用方式：
+    python -m benchmarks.backfill_bench --arguments 10000000
+    python -m benchmarks.backfill_bench --arguments 1000000 --batch-sizes 1000 5000 20000
+"""
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+os.environ.setdefault('LINE_CHANNEL_ID', 'bench')
+os.environ.setdefault('LINE_CHANNEL_SECRET', 'bench')
+
+from sqlalchemy import text  # noqa: E402
+
+from app import create_app, db  # noqa: E402
+from app.backfill import backfill, run, schedule  # noqa: E402
+from app.models.debate import Argument  # noqa: E402
+from benchmarks.http_bench import make_config, percentile  # noqa: E402
+from benchmarks.seed import seed_database  # noqa: E402
+
+JOB = 'bench_content_length'
+FILL = text('UPDATE arguments SET content_length = length(content) WHERE id >= :start AND id < :end')
+
+# resume 量測時在這個 id 中斷
+_stop_at = None
+
+
+class Interrupted(Exception):
+    pass
+
+
+@backfill(JOB, Argument.__table__)
+def _content_length(connection, start, end):
+    if _stop_at is not None and start <= _stop_at < end:
+        raise Interrupted(start)
+    return connection.execute(FILL, {'start': start, 'end': end}).rowcount
+
+
+class Writer(threading.Thread):
+    """模擬線上流量：另一條連線定期寫入大廳訊息，記錄每次寫入（含等待鎖）的時間"""
+
+    def __init__(self, path: str, interval: float):
+        super().__init__(daemon=True)
+        self.connection = sqlite3.connect(path, timeout=600, isolation_level=None, check_same_thread=False)
+        self.interval = interval
+        self.latencies = []
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.is_set():
+            started = time.perf_counter()
+            self.connection.execute("INSERT INTO hall_messages (user_id, content, message_type, created_at) "
+                                    "VALUES (1, 'bench', 'general', ?)", (datetime.utcnow().isoformat(' '),))
+            self.latencies.append((time.perf_counter() - started) * 1000)
+            self.stopped.wait(self.interval)
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+        self.connection.close()
+        return {'writes': len(self.latencies), 'p50_ms': round(percentile(self.latencies, 50), 2),
+                'p99_ms': round(percentile(self.latencies, 99), 2),
+                'max_ms': round(max(self.latencies, default=0.0), 2)}
+
+
+def mismatched() -> int:
+    return db.session.execute(text('SELECT count(*) FROM arguments '
+                                   'WHERE content_length IS NULL OR content_length != length(content)')).scalar()
+
+
+def reset():
+    """清除進度重新登記（不清除欄位的值：回填結果與既有值相同，重寫成本一樣）"""
+    schedule(JOB, inline_max_rows=0, replace=True)
+    db.session.commit()
+
+
+def measured(path: str, interval: float, fn):
+    writer = Writer(path, interval)
+    writer.start()
+    started = time.perf_counter()
+    try:
+        value = fn()
+    finally:
+        seconds = time.perf_counter() - started
+        latency = writer.stop()
+    return value, seconds, latency
+
+
+def main(argv=None):
+    global _stop_at
+    parser = argparse.ArgumentParser(description='DSWeb 線上回填基準測試')
+    parser.add_argument('--users', type=int, default=5000)
+    parser.add_argument('--arguments', type=int, default=10_000_000)
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1000, 5000, 20000])
+    parser.add_argument('--sleep', type=float, default=0.01, help='throttle 量測每批之間暫停的秒數')
+    parser.add_argument('--workers', type=int, default=max(os.cpu_count() or 2, 2))
+    parser.add_argument('--write-interval', type=float, default=0.05)
+    parser.add_argument('--output', help='結果 JSON 檔案')
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix='dsweb-backfill-')
+    path = os.path.join(workdir, 'bench.db')
+    app = create_app(make_config(f'sqlite:///{path}'))
+    results = {}
+
+    with app.app_context():
+        started = time.perf_counter()
+        results['seeded'] = seed_database(users=args.users, debates=args.arguments // 6, arguments_per_debate=6,
+                                          hall_messages=0, follows_per_debate=0, argument_words=5,
+                                          batch_size=20000)
+        results['seed_seconds'] = round(time.perf_counter() - started, 1)
+        total = results['seeded']['arguments']
+        db.session.execute(text('ALTER TABLE arguments ADD COLUMN content_length INTEGER'))
+        db.session.commit()
+
+        def backfill_run(batch_size, sleep=0.0, workers=1):
+            reset()
+            result, seconds, latency = measured(
+                path, args.write_interval, lambda: run(JOB, batch_size=batch_size, sleep=sleep, workers=workers))
+            return {'batch_size': batch_size, 'sleep': sleep, 'workers': workers, 'seconds': round(seconds, 2),
+                    'ids_per_sec': round(result['ids_total'] / seconds), 'rows': result['rows'],
+                    'status': result['status'], 'writer': latency}
+
+        results['batch'] = [backfill_run(batch_size) for batch_size in args.batch_sizes]
+        results['correct'] = mismatched() == 0
+        default = sorted(args.batch_sizes)[len(args.batch_sizes) // 2]
+        results['throttle'] = backfill_run(default, sleep=args.sleep)
+        results['workers'] = backfill_run(default, workers=args.workers)
+
+        # resume：在中間中斷，清空欄位確認第二次只需要處理剩下的部分
+        db.session.execute(text('UPDATE arguments SET content_length = NULL'))
+        db.session.commit()
+        reset()
+        _stop_at = total // 2
+        started = time.perf_counter()
+        try:
+            run(JOB, batch_size=default)
+        except Interrupted:
+            pass
+        first = time.perf_counter() - started
+        _stop_at = None
+        remaining = mismatched()
+        result, seconds, latency = measured(path, args.write_interval, lambda: run(JOB, batch_size=default))
+        results['resume'] = {'interrupted_after_seconds': round(first, 2), 'remaining_before_resume': remaining,
+                             'resume_seconds': round(seconds, 2), 'rows': result['rows'],
+                             'status': result['status'], 'correct': mismatched() == 0}
+
+        def single_update():
+            db.session.execute(text('UPDATE arguments SET content_length = length(content)'))
+            db.session.commit()
+
+        _, seconds, latency = measured(path, args.write_interval, single_update)
+        results['single'] = {'seconds': round(seconds, 2), 'ids_per_sec': round(total / seconds), 'writer': latency}
+
+    print(f"{total:,} 則論述（建立資料 {results['seed_seconds']} 秒），回填結果正確：{results['correct']}")
+    for row in (*results['batch'], results['throttle'], results['workers']):
+        w = row['writer']
+        print(f"batch {row['batch_size']:>6} sleep {row['sleep']:<5} workers {row['workers']}："
+              f"{row['seconds']} 秒（{row['ids_per_sec']:,} id/秒）；線上寫入 p99 {w['p99_ms']} ms，"
+              f"最長 {w['max_ms']} ms")
+    r = results['resume']
+    print(f"resume    中斷前 {r['interrupted_after_seconds']} 秒，剩 {r['remaining_before_resume']:,} 列，"
+          f"續跑 {r['resume_seconds']} 秒，結果正確：{r['correct']}")
+    s = results['single']
+    print(f"single    單一 UPDATE {s['seconds']} 秒（{s['ids_per_sec']:,} 列/秒）；線上寫入最長等待 "
+          f"{s['writer']['max_ms']} ms（{s['writer']['writes']} 次寫入）")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    shutil.rmtree(workdir, ignore_errors=True)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
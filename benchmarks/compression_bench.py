@@ -0,0 +1,101 @@
+"""
+回應壓縮基準測試
+
+對 search_debates、debate_detail 與 /api/hall-messages 分別以 identity / gzip / br / zstd
+請求，量測傳輸位元組與每個請求的 CPU 時間（process_time），並比較 cacheable 回應
+命中壓縮快取前後的成本。
+
+使用方式：
+    python -m benchmarks.compression_bench --iterations 200
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+os.environ.setdefault('LINE_CHANNEL_ID', 'bench')
+os.environ.setdefault('LINE_CHANNEL_SECRET', 'bench')
+
+from app import create_app  # noqa: E402
+from app.compression import CompressionMiddleware  # noqa: E402
+from benchmarks.http_bench import make_config  # noqa: E402
+from benchmarks.seed import seed_database  # noqa: E402
+
+ENDPOINTS = {
+    'search': '/search?q=AI&sort=hot',
+    'detail': '/debate/1',
+    'hall_messages': '/api/hall-messages',
+}
+
+
+def measure(client, path: str, encoding: str, iterations: int) -> dict:
+    headers = {'Accept-Encoding': encoding} if encoding else {}
+    client.get(path, headers=headers)  # 暖身
+    sizes = []
+    cpu_started = time.process_time()
+    wall_started = time.perf_counter()
+    for _ in range(iterations):
+        response = client.get(path, headers=headers)
+        sizes.append(len(response.get_data()))
+    return {
+        'bytes': int(sum(sizes) / len(sizes)),
+        'cpu_ms': round((time.process_time() - cpu_started) / iterations * 1000, 3),
+        'wall_ms': round((time.perf_counter() - wall_started) / iterations * 1000, 3),
+        'encoding': response.headers.get('Content-Encoding', 'identity'),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='DSWeb 回應壓縮基準測試')
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--output', help='結果 JSON 檔案')
+    args = parser.parse_args(argv)
+
+    db_path = os.path.join(tempfile.mkdtemp(prefix='dsweb-compress-'), 'bench.db')
+    app = create_app(make_config(f'sqlite:///{db_path}'))
+    with app.app_context():
+        seed_database(users=100, debates=500, arguments_per_debate=40, hall_messages=500)
+
+    middleware = app.wsgi_app
+    if not isinstance(middleware, CompressionMiddleware):
+        print('COMPRESSION_ENABLED 未開啟', file=sys.stderr)
+        return 1
+
+    client = app.test_client()
+    encodings = ['', 'gzip'] + [e for e in ('br', 'zstd') if e in middleware.encodings]
+    results = {}
+    for name, path in ENDPOINTS.items():
+        results[name] = {}
+        for encoding in encodings:
+            results[name][encoding or 'identity'] = measure(client, path, encoding, args.iterations)
+
+    # 壓縮快取：停用快取重新量測 hall_messages，比較 CPU 成本
+    cache_bytes = middleware.cache.max_bytes
+    middleware.cache.max_bytes = 0
+    middleware.cache.clear()
+    uncached = measure(client, ENDPOINTS['hall_messages'], encodings[-1], args.iterations)
+    middleware.cache.max_bytes = cache_bytes
+    cached = measure(client, ENDPOINTS['hall_messages'], encodings[-1], args.iterations)
+    results['hall_messages_cache'] = {'encoding': encodings[-1], 'uncached': uncached, 'cached': cached,
+                                      'hits': middleware.cache.hits, 'misses': middleware.cache.misses}
+
+    print(f"{'endpoint':<16}{'encoding':<10}{'bytes':>10}{'ratio':>8}{'cpu ms':>10}{'wall ms':>10}")
+    for name in ENDPOINTS:
+        identity = results[name]['identity']['bytes']
+        for encoding, stats in results[name].items():
+            print(f"{name:<16}{encoding:<10}{stats['bytes']:>10}{stats['bytes'] / identity:>8.2f}"
+                  f"{stats['cpu_ms']:>10.3f}{stats['wall_ms']:>10.3f}")
+    cache = results['hall_messages_cache']
+    print(f"\nhall_messages ({cache['encoding']}) 壓縮快取：未命中 {cache['uncached']['cpu_ms']:.3f} ms CPU，"
+          f"命中 {cache['cached']['cpu_ms']:.3f} ms CPU")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
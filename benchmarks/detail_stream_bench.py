@@ -0,0 +1,131 @@
+"""
+辯論詳情頁串流渲染基準測試
+
+建立一場含 2,000 則長論述的辯論，分別以
+    buffered  舊做法：.all() 載入所有論述後 render_template 一次輸出
+    streamed  目前的 debate_detail：yield_per + stream_template
+渲染，量測首位元組時間（TTFB）、總時間與峰值 RSS 增量。每種模式在獨立行程中執行，
+避免記憶體峰值互相影響。
+
+使用方式：
+    python -m benchmarks.detail_stream_bench --arguments 2000
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+os.environ.setdefault('LINE_CHANNEL_ID', 'bench')
+os.environ.setdefault('LINE_CHANNEL_SECRET', 'bench')
+
+from werkzeug.test import EnvironBuilder  # noqa: E402
+
+from app import create_app, db  # noqa: E402
+from app.models.debate import Argument, Debate  # noqa: E402
+from benchmarks.http_bench import make_config  # noqa: E402
+from benchmarks.seed import seed_database  # noqa: E402
+
+DEBATE_ID = 1
+
+
+def add_buffered_route(app):
+    """註冊舊版（一次載入、一次渲染）的詳情頁做為對照組"""
+    from flask import render_template
+
+    def buffered_detail(debate_id):
+        debate = Debate.query.get_or_404(debate_id)
+        arguments = debate.arguments.order_by(Argument.created_at.desc()).all()
+        return render_template('debate_detail.html', debate=debate, arguments=arguments,
+                               arguments_count=len(arguments))
+
+    app.add_url_rule('/bench/buffered/<int:debate_id>', view_func=buffered_detail)
+
+
+def rss_kb() -> int:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def request_timings(app, path: str) -> dict:
+    """直接呼叫 WSGI，量測第一塊非空輸出與完整回應的時間"""
+    environ = EnvironBuilder(path=path, headers={'Accept-Encoding': 'identity'}).get_environ()
+    status = {}
+
+    def start_response(code, headers, exc_info=None):
+        status['code'] = code
+
+    started = time.perf_counter()
+    app_iter = app.wsgi_app(environ, start_response)
+    ttfb, size, chunks = None, 0, 0
+    try:
+        for chunk in app_iter:
+            if chunk and ttfb is None:
+                ttfb = time.perf_counter() - started
+            size += len(chunk)
+            chunks += 1
+    finally:
+        if hasattr(app_iter, 'close'):
+            app_iter.close()
+    total = time.perf_counter() - started
+    return {'status': status['code'], 'ttfb_ms': round(ttfb * 1000, 2), 'total_ms': round(total * 1000, 2),
+            'bytes': size, 'chunks': chunks}
+
+
+def child(mode: str, db_path: str) -> dict:
+    app = create_app(make_config(f'sqlite:///{db_path}'))
+    add_buffered_route(app)
+    path = f'/debate/{DEBATE_ID}' if mode == 'streamed' else f'/bench/buffered/{DEBATE_ID}'
+    # 以另一場短辯論暖身，讓模板編譯等一次性成本不計入
+    request_timings(app, path.replace(f'/{DEBATE_ID}', '/2'))
+    before = rss_kb()
+    result = request_timings(app, path)
+    result['peak_rss_delta_mb'] = round((rss_kb() - before) / 1024, 2)
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='DSWeb 詳情頁串流渲染基準測試')
+    parser.add_argument('--arguments', type=int, default=2000, help='辯論的論述數量')
+    parser.add_argument('--words', type=int, default=600, help='每則論述的詞數')
+    parser.add_argument('--child', choices=['buffered', 'streamed'], help=argparse.SUPPRESS)
+    parser.add_argument('--db', help=argparse.SUPPRESS)
+    parser.add_argument('--output', help='結果 JSON 檔案')
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(child(args.child, args.db)))
+        return 0
+
+    db_path = os.path.join(tempfile.mkdtemp(prefix='dsweb-detail-'), 'bench.db')
+    app = create_app(make_config(f'sqlite:///{db_path}'))
+    with app.app_context():
+        seed_database(users=20, debates=1, arguments_per_debate=args.arguments,
+                      argument_words=args.words, hall_messages=0)
+        # 暖身用的短辯論
+        db.session.execute(Debate.__table__.insert(), [{
+            'id': 2, 'title': 'warmup', 'category': '科技', 'creator_id': 1, 'status': 'waiting'
+        }])
+        db.session.commit()
+
+    results = {}
+    for mode in ('buffered', 'streamed'):
+        proc = subprocess.run([sys.executable, '-m', 'benchmarks.detail_stream_bench', '--child', mode,
+                               '--db', db_path], capture_output=True, text=True, check=True)
+        results[mode] = json.loads(proc.stdout.strip().splitlines()[-1])
+
+    print(f"{'mode':<10}{'TTFB ms':>10}{'total ms':>10}{'MB':>8}{'chunks':>8}{'peak RSS +MB':>14}")
+    for mode, stats in results.items():
+        print(f"{mode:<10}{stats['ttfb_ms']:>10.1f}{stats['total_ms']:>10.1f}{stats['bytes'] / 1e6:>8.2f}"
+              f"{stats['chunks']:>8}{stats['peak_rss_delta_mb']:>14.1f}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
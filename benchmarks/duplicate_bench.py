@@ -0,0 +1,246 @@
+"""
+重複辯論偵測的基準測試
+
+以「對象 × 議題 × 問法」組合出 --debates 個互不相同的標題寫入資料庫（議題為 20,000 個隨機兩到三字詞，
+依 Zipf 分布（指數 0.8）取一到兩個；一成標題帶有「請問」「【討論】」之類的前後綴），建立索引後以兩種標題查詢：
+    duplicate  某個現有標題的改寫（標點、空白、語助詞、同義詞替換、前後綴），正確答案只有原標題
+    negative   某個現有標題換成完全不同的議題（對象與問法相同），不應找到任何辯論
+量測：
+    quality    各門檻的 precision / recall（以 DuplicateService.find 的結果計算）
+    latency    LSHIndex.query（只查索引）與 DuplicateService.find（含資料庫驗證）的 p50 / p95，
+               以及在記憶體中對所有標題逐一計算 Jaccard 的做法
+    index      建立、寫入與載入索引檔的時間、檔案大小
+
+使用方式：
+    python -m benchmarks.duplicate_bench --debates 50000 --queries 2000
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from typing import Tuple
+
+os.environ.setdefault('LINE_CHANNEL_ID', 'bench')
+os.environ.setdefault('LINE_CHANNEL_SECRET', 'bench')
+
+from app import create_app, db  # noqa: E402
+from app.minhash import LSHIndex, jaccard, shingles  # noqa: E402
+from app.models.debate import Debate  # noqa: E402
+from app.services import duplicate_service  # noqa: E402
+from app.services.duplicate_service import DuplicateService  # noqa: E402
+from benchmarks.http_bench import make_config, percentile  # noqa: E402
+from benchmarks.seed import CATEGORIES, _bulk_insert, seed_database  # noqa: E402
+
+SUBJECTS = [
+    '台灣', '政府', '大學', '企業', '年輕人', '父母', '中小學', '地方政府', '社群平台', '醫院', '媒體', '科技公司',
+    '立法院', '上班族', '高中生', '銀行', '電商平台', '公共運輸', '觀光產業', '農民', '小店家', '新創公司',
+    '軍隊', '警察', '法院', '博物館', '圖書館', '運動員', '藝術家', '網紅', '遊戲公司', '航空公司', '房東',
+    '外送員', '長照機構', '消費者', '選民', '工會', '研究生', '退休族',
+]
+QUESTIONS = [
+    '{s}是否應該全面禁止{t}？', '{s}應不應該補助{t}？', '{t}會不會被{s}濫用？', '{s}推動{t}是否利大於弊？',
+    '{t}對{s}的影響應該由誰負責？', '{s}是否需要更嚴格地監管{t}？', '{s}應該優先發展{t}嗎？',
+    '{t}是否真的能幫助{s}？', '{s}該不該公開{t}的相關資料？', '{s}是否應該為{t}設立專責機構？',
+    '{t}的成本應該由{s}承擔嗎？', '{s}應該把{t}納入長期規劃嗎？', '{s}是否高估了{t}的效益？',
+    '{t}會讓{s}變得更好還是更糟？', '{s}應該延後實施{t}嗎？', '{s}是否應該以稅收支持{t}？',
+    '{s}應該如何看待{t}的爭議？', '{t}是否該由{s}自行決定？', '{s}需要為{t}立專法嗎？',
+    '{s}是否應該停止{t}的試辦計畫？', '{t}對{s}而言是機會還是威脅？', '{s}應該擴大{t}的適用範圍嗎？',
+    '{s}該為{t}提高預算嗎？', '{t}應該在{s}之間全面推廣嗎？', '{s}是否應該對{t}課徵特別稅？',
+    '{s}應該鼓勵民眾參與{t}嗎？', '{t}是否侵害了{s}的權益？', '{s}是否應該對{t}設下年齡限制？',
+    '{s}應該向國外學習{t}的做法嗎？', '{t}是否已經成為{s}的必需品？', '{s}是否應該暫停{t}？',
+    '{s}能否靠{t}解決人力短缺？', '{t}是否讓{s}承擔過多風險？', '{s}應該怎麼分配{t}的資源？',
+    '{t}會不會改變{s}的未來？', '{s}是否應該承認{t}的合法性？', '{s}該不該退出{t}？',
+    '{t}是否應該列入{s}的考核指標？', '{s}是否該對{t}進行全面檢討？', '{s}應該全面開放{t}嗎？',
+]
+SYNONYMS = [('是否', '是不是'), ('應該', '應當'), ('嗎', '呢'), ('全面', '完全'), ('需要', '必須'),
+            ('會不會', '是否會'), ('該不該', '應不應該'), ('如何', '怎麼')]
+
+
+class Topics:
+    """議題詞彙（Zipf 分布）"""
+
+    def __init__(self, rng: random.Random, size: int = 20000):
+        chars = [chr(c) for c in rng.sample(range(0x4e00, 0x9fa6), 3000)]
+        self.words = [''.join(rng.choices(chars, k=rng.randint(2, 3))) for _ in range(size)]
+        self.weights = [1 / (rank + 1) ** 0.8 for rank in range(size)]
+
+    def pick(self, rng: random.Random) -> Tuple[str, ...]:
+        return tuple(rng.choices(self.words, self.weights, k=rng.choice((1, 2))))
+
+
+def compose(subject: str, topic: Tuple[str, ...], question: int) -> str:
+    return QUESTIONS[question].format(s=subject, t=''.join(topic))
+
+
+PREFIXES = ['【討論】', '請問', '再問一次：', '[辯論]']
+SUFFIXES = ['？大家怎麼看', ' #2', '（續）', ' 第二彈']
+
+
+def rewrite(title: str, rng: random.Random) -> str:
+    """常見的重複發文改寫"""
+    ops = rng.sample(['punct', 'space', 'particle', 'synonym', 'suffix', 'prefix'], rng.randint(1, 3))
+    for op in ops:
+        if op == 'punct':
+            title = title.replace('？', rng.choice(['?', '!?', '？？', '']))
+        elif op == 'space':
+            i = rng.randrange(1, len(title))
+            title = title[:i] + ' ' + title[i:]
+        elif op == 'particle':
+            title = title.rstrip('？?') + rng.choice(['呢？', '…', '啊？'])
+        elif op == 'synonym':
+            pairs = [(a, b) for a, b in SYNONYMS if a in title] or [(None, None)]
+            a, b = rng.choice(pairs)
+            if a:
+                title = title.replace(a, b, 1)
+        elif op == 'suffix':
+            title += rng.choice(SUFFIXES)
+        elif op == 'prefix':
+            title = rng.choice(PREFIXES) + title
+    return title
+
+
+def build_corpus(count: int, topics: Topics, rng: random.Random):
+    """(對象, 議題, 問法, 標題)，標題互不相同"""
+    corpus, seen = [], set()
+    while len(corpus) < count:
+        combo = (rng.choice(SUBJECTS), topics.pick(rng), rng.randrange(len(QUESTIONS)))
+        title = compose(*combo)
+        if rng.random() < 0.1:
+            title = rng.choice(PREFIXES) + title if rng.random() < 0.5 else title + rng.choice(SUFFIXES)
+        if title not in seen:
+            seen.add(title)
+            corpus.append(combo + (title,))
+    return corpus
+
+
+def queries(corpus, count: int, topics: Topics, rng: random.Random):
+    """(標題, 正確答案的 id 或 None)；corpus[i] 的 id 為 i + 1"""
+    existing = {combo[:3] for combo in corpus}
+    result = []
+    for n in range(count):
+        i = rng.randrange(len(corpus))
+        subject, topic, question, title = corpus[i]
+        if n % 2 == 0:
+            result.append((rewrite(title, rng), i + 1))
+            continue
+        while True:  # 換成完全不同的議題，且不是現有的組合
+            other = (subject, topics.pick(rng), question)
+            if other not in existing and not set(other[1]) & set(topic):
+                break
+        result.append((compose(*other), None))
+    return result
+
+
+def quality(results, expected):
+    """results: 每個查詢找到的 id 清單"""
+    true_pos = sum(1 for found, answer in zip(results, expected) if answer in found)
+    reported = sum(len(found) for found in results)
+    duplicates = sum(1 for answer in expected if answer is not None)
+    return {
+        'precision': round(true_pos / reported, 4) if reported else 1.0,
+        'recall': round(true_pos / duplicates, 4),
+        'false_alarms': sum(1 for found, answer in zip(results, expected) if answer is None and found),
+    }
+
+
+def timed(fn, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, (time.perf_counter() - started) * 1000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='DSWeb 重複辯論偵測基準測試')
+    parser.add_argument('--debates', type=int, default=50000)
+    parser.add_argument('--queries', type=int, default=2000)
+    parser.add_argument('--brute-force', type=int, default=100, help='逐一比對的查詢數（很慢）')
+    parser.add_argument('--thresholds', default='0.5,0.6,0.7')
+    parser.add_argument('--output', help='結果 JSON 檔案')
+    args = parser.parse_args(argv)
+
+    rng = random.Random(5)
+    workdir = tempfile.mkdtemp(prefix='dsweb-duplicates-')
+    config = type('DuplicateBenchConfig', (make_config(f"sqlite:///{os.path.join(workdir, 'main.db')}"),), {
+        'DUPLICATE_INDEX_PATH': os.path.join(workdir, 'duplicates.idx'),
+    })
+    app = create_app(config)
+    topics = Topics(rng)
+    corpus = build_corpus(args.debates, topics, rng)
+    titles = [title for *_, title in corpus]
+    probes = queries(corpus, args.queries, topics, rng)
+    expected = [answer for _, answer in probes]
+    results = {'debates': args.debates, 'queries': len(probes)}
+
+    with app.app_context():
+        seed_database(users=100, debates=0, arguments_per_debate=0, hall_messages=0, follows_per_debate=0)
+        _bulk_insert(Debate.__table__, ({
+            'id': i + 1, 'title': title, 'description': '', 'category': CATEGORIES[i % len(CATEGORIES)],
+            'creator_id': i % 100 + 1, 'status': 'waiting', 'time_limit_hours': 24, 'views': 0,
+        } for i, title in enumerate(titles)), 20000)
+
+        built = DuplicateService.build()
+        path = app.config['DUPLICATE_INDEX_PATH']
+        index, load_ms = timed(LSHIndex.load, path)
+        results['index'] = {
+            'build_seconds': round(built['seconds'], 2),
+            'load_ms': round(load_ms, 1),
+            'file_mb': round(os.path.getsize(path) / 1048576, 1),
+        }
+
+        # 只查索引（門檻為 find 使用的候選門檻）
+        margin = app.config['DUPLICATE_THRESHOLD'] - duplicate_service.ESTIMATE_MARGIN
+        samples = [timed(index.query, title, margin)[1] for title, _ in probes]
+        results['index_query'] = {'p50_ms': round(percentile(samples, 50), 3),
+                                  'p95_ms': round(percentile(samples, 95), 3)}
+
+        # 各門檻的 precision / recall 與 find 的延遲
+        results['find'] = {}
+        for threshold in [float(t) for t in args.thresholds.split(',')]:
+            app.config['DUPLICATE_THRESHOLD'] = threshold
+            found, samples = [], []
+            for title, _ in probes:
+                matches, ms = timed(DuplicateService.find, title)
+                found.append([m['id'] for m in matches])
+                samples.append(ms)
+            db.session.remove()
+            results['find'][threshold] = dict(quality(found, expected),
+                                              p50_ms=round(percentile(samples, 50), 3),
+                                              p95_ms=round(percentile(samples, 95), 3))
+
+    # 逐一比對：所有標題的 shingle 先算好放在記憶體
+    brute_threshold = config.DUPLICATE_THRESHOLD
+    grams = [shingles(title) for title in titles]
+    samples, found = [], []
+    for title, _ in probes[:args.brute_force]:
+        started = time.perf_counter()
+        query = shingles(title)
+        found.append([i + 1 for i, g in enumerate(grams) if jaccard(query, g) >= brute_threshold])
+        samples.append((time.perf_counter() - started) * 1000)
+    results['brute_force'] = dict(quality(found, expected[:args.brute_force]),
+                                  p50_ms=round(percentile(samples, 50), 1))
+
+    print(f"{args.debates:,} 個標題，{len(probes):,} 個查詢（一半為改寫、一半為同句型不同主題）")
+    i = results['index']
+    print(f"索引：建立 {i['build_seconds']} 秒，檔案 {i['file_mb']} MB，載入 {i['load_ms']} ms；"
+          f"只查索引 p50 {results['index_query']['p50_ms']} ms / p95 {results['index_query']['p95_ms']} ms")
+    print(f"{'門檻':<8}{'precision':>10}{'recall':>9}{'誤報':>7}{'find p50':>10}{'find p95':>10}   (ms)")
+    for threshold, r in results['find'].items():
+        print(f"{threshold:<8}{r['precision']:>10}{r['recall']:>9}{r['false_alarms']:>7}{r['p50_ms']:>10}{r['p95_ms']:>10}")
+    b = results['brute_force']
+    print(f"逐一比對（門檻 {brute_threshold}，{args.brute_force} 個查詢）：precision {b['precision']}、recall {b['recall']}，"
+          f"p50 {b['p50_ms']} ms")
+    print(f"範例：{probes[0][0]} → {titles[probes[0][1] - 1]}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    shutil.rmtree(workdir, ignore_errors=True)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,175 @@
+"""
+分析用匯出的基準測試
+
+建立 --arguments 則論述（預設 10,000,000 則，分屬 --arguments / 6 場辯論），量測：
+    orm        目前唯一的做法：以 ORM 讀出全部物件再輸出 JSON（只跑前 --orm-rows 則，記憶體隨資料量成長）
+    ndjson     `flask export arguments` 的 NDJSON，單一行程與 --workers 個行程
+    parquet    Parquet（需要 pyarrow）
+    incremental  上次匯出之後修改了 1% 的論述，以 updated_at 水位線增量匯出（使用 ix_arguments_updated_at）
+每種方式都在新的子行程中執行，回報列數/秒、輸出大小與峰值記憶體（子行程與其 process pool 的 ru_maxrss，
+另列出建立應用程式後的基準值，差值即匯出本身使用的記憶體）。
+
+使用方式：
+    python -m benchmarks.export_bench --arguments 10000000
+    python -m benchmarks.export_bench --arguments 1000000 --workers 4
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+os.environ.setdefault('LINE_CHANNEL_ID', 'bench')
+os.environ.setdefault('LINE_CHANNEL_SECRET', 'bench')
+
+from sqlalchemy import text  # noqa: E402
+
+from app import create_app, db  # noqa: E402
+from app.models.debate import Argument  # noqa: E402
+from benchmarks.http_bench import make_config  # noqa: E402
+from benchmarks.seed import _bulk_insert, _text, seed_database  # noqa: E402
+
+
+def argument_rows(count: int, debates: int, users: int, now: datetime):
+    """依 id 順序產生論述；內容取自預先產生的 1,000 段文字，避免產生資料本身成為瓶頸"""
+    rng = random.Random(11)
+    texts = [_text(rng, rng.randint(30, 90)) for _ in range(1000)]
+    span = 365 * 86400
+    for i in range(count):
+        created = now - timedelta(seconds=span * (count - i) / count)
+        yield {
+            'debate_id': i // 6 % debates + 1,
+            'user_id': rng.randint(1, users),
+            'position': 'pro' if i % 2 == 0 else 'con',
+            'round_number': i % 6 // 2 + 1,
+            'content': texts[i % 1000],
+            'sources': '["https://example.org/report"]' if i % 5 == 0 else None,
+            'created_at': created,
+            'updated_at': created,
+        }
+
+
+def _rss_mb(who) -> float:
+    return resource.getrusage(who).ru_maxrss / 1024  # Linux 為 KB
+
+
+def _measure(uri: str, mode: str, options: dict) -> dict:
+    """在新的子行程中執行一種匯出方式"""
+    app = create_app(make_config(uri))
+    with app.app_context():
+        db.session.execute(text('SELECT 1'))
+        baseline = _rss_mb(resource.RUSAGE_SELF)
+        started = time.perf_counter()
+        if mode == 'orm':
+            rows = Argument.query.order_by(Argument.id).limit(options['rows']).all()
+            path = os.path.join(options['directory'], 'orm.json')
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump([{column.name: getattr(row, column.name) for column in Argument.__table__.columns}
+                           for row in rows], f, ensure_ascii=False, default=str)
+            result = {'rows': len(rows), 'bytes': os.path.getsize(path)}
+        else:
+            from app.export import Window, commit_window, export_dataset, incremental_window
+            window, state = incremental_window('arguments') if mode == 'incremental' else (Window(), None)
+            result = export_dataset('arguments', options['directory'], options['format'], window,
+                                    workers=options['workers'], batch_size=options['batch_size'])
+            if state is not None:
+                commit_window(state, window)
+        seconds = time.perf_counter() - started
+    return {
+        'rows': result['rows'],
+        'bytes': result['bytes'],
+        'seconds': round(seconds, 2),
+        'rows_per_sec': round(result['rows'] / seconds),
+        'baseline_rss_mb': round(baseline, 1),
+        'peak_rss_mb': round(_rss_mb(resource.RUSAGE_SELF), 1),
+        'children_peak_rss_mb': round(_rss_mb(resource.RUSAGE_CHILDREN), 1),
+    }
+
+
+def measure(uri: str, mode: str, **options) -> dict:
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as pool:
+        return pool.submit(_measure, uri, mode, options).result()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='DSWeb 分析匯出基準測試')
+    parser.add_argument('--arguments', type=int, default=10_000_000)
+    parser.add_argument('--users', type=int, default=5000)
+    parser.add_argument('--orm-rows', type=int, default=1_000_000)
+    parser.add_argument('--workers', type=int, default=max(2, os.cpu_count() or 1))
+    parser.add_argument('--batch-size', type=int, default=10000)
+    parser.add_argument('--keep', action='store_true', help='保留暫存資料庫與匯出檔案')
+    parser.add_argument('--output', help='結果 JSON 檔案')
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix='dsweb-export-')
+    uri = f"sqlite:///{os.path.join(workdir, 'main.db')}"
+    app = create_app(make_config(uri))
+    debates = max(1, args.arguments // 6)
+    results = {'arguments': args.arguments, 'cpus': os.cpu_count()}
+
+    with app.app_context():
+        started = time.perf_counter()
+        seed_database(users=args.users, debates=debates, arguments_per_debate=0, hall_messages=0,
+                      follows_per_debate=0, batch_size=50000)
+        _bulk_insert(Argument.__table__, argument_rows(args.arguments, debates, args.users, datetime.utcnow()),
+                     50000)
+        results['seed_seconds'] = round(time.perf_counter() - started, 1)
+        results['db_mb'] = round(os.path.getsize(os.path.join(workdir, 'main.db')) / 1048576)
+
+    out = os.path.join(workdir, 'export')
+    common = {'directory': out, 'batch_size': args.batch_size}
+    runs = [
+        ('orm', dict(common, rows=args.orm_rows)),
+        ('ndjson', dict(common, format='ndjson', workers=1)),
+        (f'ndjson x{args.workers}', dict(common, format='ndjson', workers=args.workers)),
+    ]
+    try:
+        import pyarrow  # noqa: F401
+        runs += [('parquet', dict(common, format='parquet', workers=1)),
+                 (f'parquet x{args.workers}', dict(common, format='parquet', workers=args.workers))]
+    except ImportError:
+        print('未安裝 pyarrow，略過 Parquet')
+
+    os.makedirs(out, exist_ok=True)
+    for label, options in runs:
+        mode = label.split()[0] if label.startswith('orm') else 'full'
+        results[label] = measure(uri, mode, **options)
+        shutil.rmtree(out, ignore_errors=True)  # 每次只保留一份輸出，避免占滿磁碟
+        os.makedirs(out, exist_ok=True)
+
+    # 增量：上次匯出在一小時前，之後有 1% 的論述被修改
+    with app.app_context():
+        from app.models.job import JobState
+        now = datetime.utcnow()
+        JobState.get('export:arguments').watermark = now - timedelta(hours=1)
+        db.session.execute(text('UPDATE arguments SET updated_at = :at WHERE id % 100 = 0'),
+                           {'at': now - timedelta(minutes=30)})
+        db.session.commit()
+    results['incremental'] = measure(uri, 'incremental', **dict(common, format='ndjson', workers=1))
+
+    print(f"{args.arguments:,} 則論述（資料庫 {results['db_mb']:,} MB，產生資料 {results['seed_seconds']} 秒，"
+          f"{results['cpus']} 顆 CPU）")
+    print(f"{'方式':<14}{'列數':>12}{'秒':>9}{'列/秒':>11}{'輸出 MB':>10}{'基準 MB':>9}{'峰值 MB':>9}{'子行程 MB':>10}")
+    for label, _ in runs + [('incremental', None)]:
+        r = results[label]
+        print(f"{label:<14}{r['rows']:>12,}{r['seconds']:>9}{r['rows_per_sec']:>11,}{r['bytes'] / 1048576:>10,.0f}"
+              f"{r['baseline_rss_mb']:>9}{r['peak_rss_mb']:>9}{r['children_peak_rss_mb']:>10}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    if not args.keep:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
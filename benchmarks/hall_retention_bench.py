@@ -0,0 +1,151 @@
+"""
+大廳訊息保留工作的基準測試
+
+建立 --messages 則橫跨 --history-days 天的大廳訊息（預設 50,000,000 則、365 天，
+約 10% 為挑戰訊息，其中一部分連結到未完成的辯論），量測：
+    大廳最新 20 則查詢：有無 created_at 索引（無索引時為全表掃描排序）
+    HallRetentionService 以排程方式（每次 --batches-per-run 批）清除超過 --keep-days 天的訊息，
+    每批交易耗時（鎖定時間的上限）、總清除速度（列/秒）與清除期間最新 20 則查詢的延遲
+    清除後仍保留的挑戰訊息數
+
+使用方式：
+    python -m benchmarks.hall_retention_bench --messages 50000000 --keep-days 30
+    python -m benchmarks.hall_retention_bench --messages 1000000 --mode archive
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+os.environ.setdefault('LINE_CHANNEL_ID', 'bench')
+os.environ.setdefault('LINE_CHANNEL_SECRET', 'bench')
+
+from sqlalchemy import desc, func, select, text  # noqa: E402
+
+from app import create_app, db  # noqa: E402
+from app.models.debate import Debate, HallMessage  # noqa: E402
+from app.services.hall_retention import HallRetentionService  # noqa: E402
+from benchmarks.http_bench import make_config, percentile  # noqa: E402
+from benchmarks.seed import _bulk_insert, _text, seed_database  # noqa: E402
+
+
+def hall_rows(rng: random.Random, count: int, users: int, debates: int, history_days: int, now: datetime):
+    """依時間先後產生訊息（與實際寫入順序相同，id 與 created_at 同向遞增）"""
+    span = history_days * 86400
+    for i in range(count):
+        challenge = rng.random() < 0.1
+        yield {
+            'user_id': rng.randint(1, users),
+            'content': _text(rng, 15),
+            'message_type': 'challenge' if challenge else 'general',
+            'debate_id': rng.randint(1, debates) if challenge and rng.random() < 0.2 else None,
+            'created_at': now - timedelta(seconds=span * (count - i) / count),
+        }
+
+
+def head_ms(runs: int) -> float:
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        HallMessage.query.order_by(desc(HallMessage.created_at)).limit(20).all()
+        samples.append((time.perf_counter() - started) * 1000)
+        db.session.remove()
+    return round(statistics.median(samples), 3)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='DSWeb 大廳訊息保留基準測試')
+    parser.add_argument('--messages', type=int, default=50_000_000)
+    parser.add_argument('--history-days', type=int, default=365)
+    parser.add_argument('--keep-days', type=int, default=30)
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--debates', type=int, default=5000)
+    parser.add_argument('--mode', choices=['delete', 'archive'], default='delete')
+    parser.add_argument('--batch-size', type=int, default=5000)
+    parser.add_argument('--batches-per-run', type=int, default=20, help='每次排程執行的批數')
+    parser.add_argument('--runs', type=int, default=9)
+    parser.add_argument('--output', help='結果 JSON 檔案')
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix='dsweb-hall-')
+    config = make_config(f"sqlite:///{os.path.join(workdir, 'main.db')}")
+    config.ARCHIVE_DATABASE_URL = f"sqlite:///{os.path.join(workdir, 'archive.db')}"
+    app = create_app(config)
+    results = {'messages': args.messages, 'keep_days': args.keep_days, 'mode': args.mode,
+               'batch_size': args.batch_size}
+
+    with app.app_context():
+        seed_database(users=args.users, debates=args.debates, arguments_per_debate=0, hall_messages=0,
+                      follows_per_debate=0)
+        started = time.perf_counter()
+        rng = random.Random(7)
+        now = datetime.utcnow()
+        _bulk_insert(HallMessage.__table__,
+                     hall_rows(rng, args.messages, args.users, args.debates, args.history_days, now), 50000)
+        results['seed_seconds'] = round(time.perf_counter() - started, 1)
+
+        results['head_ms'] = {'indexed': head_ms(args.runs)}
+        db.session.execute(text('DROP INDEX ix_hall_messages_created_at'))
+        db.session.commit()
+        results['head_ms']['no_index'] = head_ms(max(3, args.runs // 3))
+        db.session.execute(text('CREATE INDEX ix_hall_messages_created_at ON hall_messages (created_at)'))
+        db.session.commit()
+
+        # 模擬排程器：每次執行最多 --batches-per-run 批，期間量測最新 20 則查詢
+        batch_ms, head_during, runs = [], [], 0
+        purged, elapsed = 0, 0.0
+        while True:
+            result = HallRetentionService.run(args.keep_days, batch_size=args.batch_size, mode=args.mode,
+                                              max_batches=args.batches_per_run, now=now)
+            runs += 1
+            purged += result['rows']
+            elapsed += result['seconds']
+            if result['batches']:
+                batch_ms.append(result['seconds'] * 1000 / result['batches'])
+            head_during.append(head_ms(1))
+            if result['done']:
+                break
+
+        cutoff = now - timedelta(days=args.keep_days)
+        old_left = db.session.execute(select(func.count()).select_from(HallMessage)
+                                      .where(HallMessage.created_at < cutoff)).scalar()
+        live_challenges = db.session.execute(
+            select(func.count()).select_from(HallMessage).join(Debate, Debate.id == HallMessage.debate_id)
+            .where(HallMessage.created_at < cutoff, Debate.status != 'completed')).scalar()
+        results.update({
+            'purged': purged,
+            'scheduler_runs': runs,
+            'seconds': round(elapsed, 2),
+            'rows_per_sec': round(purged / elapsed) if elapsed else 0,
+            'batch_ms': {'p50': round(percentile(batch_ms, 50), 1), 'max': round(max(batch_ms or [0]), 1)},
+            'head_ms_during': {'p50': round(percentile(head_during, 50), 3),
+                               'max': round(max(head_during), 3)},
+            'remaining': db.session.execute(select(func.count()).select_from(HallMessage)).scalar(),
+            'old_kept': old_left,
+            'old_kept_live_challenges': live_challenges,
+        })
+        results['head_ms']['after'] = head_ms(args.runs)
+
+    print(f"產生 {args.messages:,} 則訊息：{results['seed_seconds']} 秒")
+    print(f"最新 20 則查詢：索引 {results['head_ms']['indexed']} ms，無索引 {results['head_ms']['no_index']} ms，"
+          f"清除後 {results['head_ms']['after']} ms")
+    print(f"清除（{args.mode}）{purged:,} 則，{runs} 次排程執行，{results['seconds']} 秒"
+          f"（{results['rows_per_sec']:,} 列/秒）")
+    print(f"每批交易 p50 {results['batch_ms']['p50']} ms，最長 {results['batch_ms']['max']} ms；"
+          f"清除期間最新 20 則查詢 p50 {results['head_ms_during']['p50']} ms")
+    print(f"剩餘 {results['remaining']:,} 則，其中保留期外 {old_left} 則"
+          f"（連結到未完成辯論的挑戰訊息 {live_challenges} 則）")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
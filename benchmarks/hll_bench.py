@@ -0,0 +1,131 @@
+"""
+HyperLogLog 不重複觀看者準確度與記憶體基準測試
+
+模擬數百萬次觀看（觀看者依 Zipf 分佈重複造訪），在不同不重複人數下比較：
+    exact   Python set 精確計數（tracemalloc 量測記憶體）
+    hll     HyperLogLog 草圖：相對誤差、記憶體（暫存器）與序列化後大小
+並量測加入速度、草圖合併與估計的耗時，以及每日草圖合併為 7 日草圖的誤差。
+
+使用方式：
+    python -m benchmarks.hll_bench --views 5000000 --precision 12
+"""
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+from app.hll import HyperLogLog
+
+
+def viewer_stream(rng: random.Random, unique: int, views: int):
+    """以冪次分佈重複造訪的觀看者序列；確保每位觀看者至少出現一次"""
+    for i in range(unique):
+        yield f'user:{i}'
+    for _ in range(views - unique):
+        yield f'user:{min(unique - 1, int(rng.paretovariate(1.2)) - 1)}'
+
+
+def exact_memory(unique: int) -> int:
+    tracemalloc.start()
+    viewers = {f'user:{i}' for i in range(unique)}
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del viewers
+    return peak
+
+
+def measure(unique: int, views: int, precision: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    sketch = HyperLogLog(precision)
+    started = time.perf_counter()
+    sketch.update(viewer_stream(rng, unique, views))
+    add_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    estimate = sketch.count()
+    count_ms = (time.perf_counter() - started) * 1000
+    serialized = sketch.to_bytes()
+
+    return {
+        'unique': unique,
+        'views': views,
+        'estimate': estimate,
+        'error_pct': round((estimate - unique) / unique * 100, 3),
+        'hll_bytes': sketch.size,
+        'hll_serialized_bytes': len(serialized),
+        'exact_set_bytes': exact_memory(unique),
+        'adds_per_sec': round(views / add_seconds),
+        'count_ms': round(count_ms, 3),
+    }
+
+
+def weekly_merge(daily_unique: int, overlap: float, precision: int, seed: int) -> dict:
+    """7 份每日草圖合併後的誤差：每天有 overlap 比例的回訪者"""
+    rng = random.Random(seed)
+    everyone, days, next_id = set(), [], 0
+    for _ in range(7):
+        returning = rng.sample(sorted(everyone), min(len(everyone), int(daily_unique * overlap))) if everyone else []
+        fresh = [f'user:{next_id + i}' for i in range(daily_unique - len(returning))]
+        next_id += len(fresh)
+        viewers = returning + fresh
+        everyone.update(viewers)
+        day = HyperLogLog(precision)
+        day.update(viewers)
+        days.append(day)
+
+    started = time.perf_counter()
+    week = HyperLogLog.union(days, precision)
+    merge_ms = (time.perf_counter() - started) * 1000
+    estimate = week.count()
+    return {'daily_unique': daily_unique, 'week_unique': len(everyone), 'estimate': estimate,
+            'error_pct': round((estimate - len(everyone)) / len(everyone) * 100, 3),
+            'merge_7_ms': round(merge_ms, 3)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='DSWeb HyperLogLog 基準測試')
+    parser.add_argument('--views', type=int, default=5_000_000, help='每個情境的總觀看次數')
+    parser.add_argument('--unique', type=int, nargs='+', default=[1_000, 10_000, 100_000, 1_000_000])
+    parser.add_argument('--precision', type=int, default=12)
+    parser.add_argument('--trials', type=int, default=20, help='估計誤差分佈的試驗次數（小基數）')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='結果 JSON 檔案')
+    args = parser.parse_args(argv)
+
+    results = {'precision': args.precision,
+               'expected_std_error_pct': round(104 / (1 << args.precision) ** 0.5, 3),
+               'scenarios': [measure(u, max(u, args.views), args.precision, args.seed) for u in args.unique]}
+
+    # 多次試驗的誤差分佈
+    errors = []
+    for trial in range(args.trials):
+        sketch = HyperLogLog(args.precision)
+        sketch.update(f'trial{trial}:{i}' for i in range(50_000))
+        errors.append((sketch.count() - 50_000) / 50_000 * 100)
+    results['trial_error_pct'] = {'unique': 50_000, 'trials': args.trials,
+                                  'mean_abs': round(statistics.mean(map(abs, errors)), 3),
+                                  'stdev': round(statistics.pstdev(errors), 3)}
+    results['weekly_merge'] = weekly_merge(20_000, 0.3, args.precision, args.seed)
+
+    print(f"precision={args.precision}（理論標準誤差 {results['expected_std_error_pct']}%）")
+    print(f"{'unique':>10}{'views':>10}{'estimate':>10}{'err %':>8}{'hll B':>8}{'stored B':>10}"
+          f"{'set B':>12}{'adds/s':>10}")
+    for r in results['scenarios']:
+        print(f"{r['unique']:>10}{r['views']:>10}{r['estimate']:>10}{r['error_pct']:>8.2f}{r['hll_bytes']:>8}"
+              f"{r['hll_serialized_bytes']:>10}{r['exact_set_bytes']:>12}{r['adds_per_sec']:>10}")
+    t = results['trial_error_pct']
+    print(f"\n{t['trials']} 次試驗（{t['unique']} 人）：平均絕對誤差 {t['mean_abs']}%，標準差 {t['stdev']}%")
+    w = results['weekly_merge']
+    print(f"7 日合併：實際 {w['week_unique']}，估計 {w['estimate']}（{w['error_pct']}%），合併 {w['merge_7_ms']} ms")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
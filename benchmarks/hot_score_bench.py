@@ -0,0 +1,133 @@
+"""
+熱門分數重算成本基準測試
+
+建立大量辯論（預設 1,000,000 場）後量測：
+    full_refresh         flask hot refresh --full：從頭重算所有辯論
+    incremental_idle     沒有新活動時的增量重算（只掃 last_activity_at 索引）
+    incremental_active   --active 比例的辯論有新觀看／論述／關注後的增量重算
+以及看板熱門榜的查詢延遲：
+    views_order          舊做法 ORDER BY views DESC LIMIT 4（全表排序）
+    hot_score_index      ORDER BY hot_score DESC LIMIT 4（索引）
+    top_k_memory         記憶體內 top-K
+
+使用方式：
+    python -m benchmarks.hot_score_bench --debates 1000000 --active 0.01
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+os.environ.setdefault('LINE_CHANNEL_ID', 'bench')
+os.environ.setdefault('LINE_CHANNEL_SECRET', 'bench')
+
+from sqlalchemy import desc, select, update  # noqa: E402
+
+from app import create_app, db  # noqa: E402
+from app.models.debate import Argument, Debate, DebateFollow  # noqa: E402
+from app.services.hot_ranking import HotRankingService, hot_top_k  # noqa: E402
+from benchmarks.http_bench import make_config  # noqa: E402
+from benchmarks.seed import seed_database  # noqa: E402
+
+
+def timed_query(fn, runs: int) -> float:
+    """回傳中位數延遲（毫秒）"""
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return round(statistics.median(samples), 3)
+
+
+def simulate_activity(debates: int, fraction: float, users: int, seed: int) -> dict:
+    """讓部分辯論產生新觀看、論述與關注"""
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    active_ids = rng.sample(range(1, debates + 1), max(1, int(debates * fraction)))
+    arguments, follows = [], []
+    for debate_id in active_ids:
+        for _ in range(rng.randint(0, 2)):
+            arguments.append({'debate_id': debate_id, 'user_id': rng.randint(1, users), 'position': 'pro',
+                              'round_number': 1, 'content': '新論述', 'created_at': now, 'updated_at': now})
+        if rng.random() < 0.3:
+            follows.append({'user_id': rng.randint(1, users), 'debate_id': debate_id, 'created_at': now})
+
+    for offset in range(0, len(active_ids), 5000):
+        chunk = active_ids[offset:offset + 5000]
+        db.session.execute(update(Debate.__table__).where(Debate.__table__.c.id.in_(chunk)).values(
+            views=Debate.__table__.c.views + rng.randint(1, 50), last_activity_at=now))
+    if arguments:
+        db.session.execute(Argument.__table__.insert(), arguments)
+    if follows:
+        db.session.execute(DebateFollow.__table__.insert().prefix_with('OR IGNORE'), follows)
+    db.session.commit()
+    return {'debates': len(active_ids), 'arguments': len(arguments), 'follows': len(follows)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='DSWeb 熱門分數重算成本基準測試')
+    parser.add_argument('--debates', type=int, default=1_000_000)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--arguments-per-debate', type=int, default=2)
+    parser.add_argument('--active', type=float, default=0.01, help='有新活動的辯論比例')
+    parser.add_argument('--batch-size', type=int, default=2000)
+    parser.add_argument('--query-runs', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='結果 JSON 檔案')
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix='dsweb-hot-')
+    app = create_app(make_config(f"sqlite:///{os.path.join(workdir, 'hot.db')}"))
+    results = {'debates': args.debates, 'active_fraction': args.active}
+
+    with app.app_context():
+        started = time.perf_counter()
+        results['seed'] = seed_database(users=args.users, debates=args.debates,
+                                        arguments_per_debate=args.arguments_per_debate, hall_messages=0,
+                                        follows_per_debate=1, argument_words=5, seed=args.seed,
+                                        batch_size=20000)
+        results['seed_seconds'] = round(time.perf_counter() - started, 2)
+
+        # 全量重算後水位線落在現在，之後的活動才會被增量工作處理
+        full = HotRankingService.refresh(full=True, batch_size=args.batch_size,
+                                         now=datetime.utcnow() - timedelta(seconds=1))
+        idle = HotRankingService.refresh(batch_size=args.batch_size)
+        results['activity'] = simulate_activity(args.debates, args.active, args.users, args.seed)
+        active = HotRankingService.refresh(batch_size=args.batch_size)
+        results['refresh'] = {
+            name: {'debates': r['debates'], 'events': r['events'], 'seconds': round(r['seconds'], 3),
+                   'debates_per_sec': round(r['debates'] / r['seconds']) if r['seconds'] else None}
+            for name, r in (('full_refresh', full), ('incremental_idle', idle), ('incremental_active', active))
+        }
+
+        hot_top_k.clear()
+        HotRankingService.top_ids(4)
+        results['query_ms'] = {
+            'views_order': timed_query(lambda: db.session.execute(
+                select(Debate.id).order_by(desc(Debate.views)).limit(4)).all(), args.query_runs),
+            'hot_score_index': timed_query(lambda: db.session.execute(
+                select(Debate.id).order_by(desc(Debate.hot_score)).limit(4)).all(), args.query_runs),
+            'top_k_memory': timed_query(lambda: HotRankingService.top_ids(4), args.query_runs),
+        }
+
+    print(f"{'refresh':<22}{'debates':>10}{'events':>14}{'seconds':>10}{'debates/s':>12}")
+    for name, r in results['refresh'].items():
+        print(f"{name:<22}{r['debates']:>10}{r['events']:>14}{r['seconds']:>10.3f}{r['debates_per_sec'] or 0:>12}")
+    print(f"\n{'hot widget query':<22}{'median ms':>10}")
+    for name, ms in results['query_ms'].items():
+        print(f"{name:<22}{ms:>10.3f}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
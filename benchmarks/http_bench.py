@@ -0,0 +1,347 @@
+"""
+主藍圖端對端 HTTP 基準測試
+
+以 create_app 啟動應用程式並連到種子資料庫，使用多執行緒 test client 執行混合負載
+（看板、搜尋、詳情頁、大廳輪詢、發表論述、加入辯論），並將每個端點的吞吐量、
+延遲百分位數與每個請求的 SQL 數量寫入 JSON，方便在不同 commit 之間比較。
+
+LINE 登入以 test client 的 session 取代，整個流程不需要網路。
+
+使用方式：
+    python -m benchmarks.http_bench --requests 2000 --concurrency 8 --output bench.json
+    python -m benchmarks.http_bench --compare before.json after.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+# 基準測試完全離線：提供假的 LINE 設定，避免載入 .env 時驗證失敗
+os.environ.setdefault('LINE_CHANNEL_ID', 'bench')
+os.environ.setdefault('LINE_CHANNEL_SECRET', 'bench')
+os.environ.setdefault('LINE_REDIRECT_URI', 'http://localhost:5000/auth/callback')
+
+from sqlalchemy import event  # noqa: E402
+
+from app import create_app, db  # noqa: E402
+from app.config import Config  # noqa: E402
+from app.models.debate import Debate  # noqa: E402
+from app.stats import percentile as nearest_rank  # noqa: E402
+from benchmarks.seed import CATEGORIES, STATUSES, TOPICS, seed_database  # noqa: E402
+
+# 端點權重：大致對應實際流量比例
+WORKLOAD = {
+    'board': 10,
+    'search': 20,
+    'detail': 30,
+    'hall_page': 5,
+    'hall_poll': 25,
+    'post_argument': 6,
+    'join_debate': 4,
+}
+
+
+class SQLCounter:
+    """以執行緒區域變數計算單一請求期間執行的 SQL 數量"""
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def start(self):
+        self._local.count = 0
+        self._local.active = True
+
+    def stop(self) -> int:
+        self._local.active = False
+        return getattr(self._local, 'count', 0)
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        if getattr(self._local, 'active', False):
+            self._local.count += 1
+
+
+def make_config(database_uri: str):
+    """建立基準測試用設定類別"""
+    return type('BenchConfig', (Config,), {
+        'SQLALCHEMY_DATABASE_URI': database_uri,
+        'SQLALCHEMY_ENGINE_OPTIONS': {'connect_args': {'timeout': 30}},
+        'SECRET_KEY': 'bench-secret',
+        'TASK_ALWAYS_EAGER': True,  # 不需要另外執行 worker
+    })
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """最近秩法百分位數（與 app.stats.percentile 相同，沒有資料時為 0）"""
+    value = nearest_rank(values, pct)
+    return 0.0 if value is None else value
+
+
+class Workload:
+    """產生混合負載請求"""
+
+    def __init__(self, app, rng: random.Random, users: int):
+        self.app = app
+        self.rng = rng
+        self.users = users
+        with app.app_context():
+            self.debate_ids = [row[0] for row in db.session.query(Debate.id).all()]
+        self._names = list(WORKLOAD)
+        self._weights = [WORKLOAD[name] for name in self._names]
+
+    def pick(self) -> str:
+        return self.rng.choices(self._names, weights=self._weights)[0]
+
+    def _random_debate(self, status: Optional[str] = None):
+        """取得指定狀態的隨機辯論（在計時範圍外執行）"""
+        with self.app.app_context():
+            query = db.session.query(
+                Debate.id, Debate.current_turn, Debate.pro_participant_id, Debate.con_participant_id
+            )
+            if status:
+                query = query.filter(Debate.status == status)
+            offset = self.rng.randint(0, 50)
+            return query.order_by(Debate.id).offset(offset).first()
+
+    def build(self, name: str) -> Tuple[str, str, Optional[int], Dict[str, Any]]:
+        """回傳 (method, url, 登入用戶 id, 請求參數)"""
+        rng = self.rng
+        user_id = rng.randint(1, self.users)
+
+        if name == 'board':
+            return 'GET', '/debate-board', None, {}
+
+        if name == 'search':
+            params = [('sort', rng.choice(['newest', 'hot', 'urgent']))]
+            if rng.random() < 0.6:
+                params.append(('q', rng.choice(TOPICS)[:4]))
+            if rng.random() < 0.5:
+                params.append(('status', rng.choice(STATUSES)))
+            if rng.random() < 0.5:
+                params.append(('category', rng.choice(CATEGORIES)))
+            params.append(('page', rng.randint(1, 3)))
+            return 'GET', '/search', None, {'query_string': params}
+
+        if name == 'detail':
+            return 'GET', f'/debate/{rng.choice(self.debate_ids)}', user_id, {}
+
+        if name == 'hall_page':
+            return 'GET', '/debate-hall', user_id, {}
+
+        if name == 'hall_poll':
+            return 'GET', '/api/hall-messages', None, {}
+
+        if name == 'post_argument':
+            row = self._random_debate('ongoing')
+            if row is not None:
+                debate_id = row.id
+                user_id = row.pro_participant_id if row.current_turn == 'pro' else row.con_participant_id
+            else:
+                debate_id = rng.choice(self.debate_ids)
+            data = {
+                'debate_id': debate_id,
+                'content': '基準測試論述內容 ' * rng.randint(5, 40),
+                'sources': 'https://example.com/bench',
+            }
+            return 'POST', '/api/add-argument', user_id, {'data': data}
+
+        if name == 'join_debate':
+            row = self._random_debate('waiting')
+            debate_id = row.id if row is not None else rng.choice(self.debate_ids)
+            payload = {'debate_id': debate_id, 'position': rng.choice(['pro', 'con'])}
+            return 'POST', '/api/join-debate', user_id, {'json': payload}
+
+        raise ValueError(f'未知的端點: {name}')
+
+
+def run_benchmark(app, total_requests: int, concurrency: int, users: int,
+                  seed: int, warmup: int) -> Dict[str, Any]:
+    """執行負載並彙整結果"""
+    counter = SQLCounter()
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', counter)
+
+    samples = defaultdict(list)
+    lock = threading.Lock()
+
+    def worker(worker_id: int, count: int):
+        workload = Workload(app, random.Random(seed + worker_id), users)
+        client = app.test_client()
+        for i in range(count):
+            name = workload.pick()
+            method, url, user_id, kwargs = workload.build(name)
+            with client.session_transaction() as sess:
+                if user_id:
+                    sess['user_id'] = user_id
+                else:
+                    sess.pop('user_id', None)
+
+            counter.start()
+            started = time.perf_counter()
+            response = client.open(url, method=method, **kwargs)
+            body = response.get_data()
+            elapsed = time.perf_counter() - started
+            statements = counter.stop()
+
+            if i < warmup:
+                continue
+            with lock:
+                samples[name].append((elapsed, statements, len(body), response.status_code))
+
+    per_worker = [total_requests // concurrency] * concurrency
+    for i in range(total_requests % concurrency):
+        per_worker[i] += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = [pool.submit(worker, i, n + warmup) for i, n in enumerate(per_worker)]
+        for future in futures:
+            future.result()
+    wall = time.perf_counter() - started
+
+    with app.app_context():
+        event.remove(db.engine, 'before_cursor_execute', counter)
+
+    endpoints = {}
+    for name in sorted(samples):
+        rows = samples[name]
+        latencies = [row[0] * 1000 for row in rows]
+        statements = [row[1] for row in rows]
+        endpoints[name] = {
+            'requests': len(rows),
+            'errors': sum(1 for row in rows if row[3] >= 500),
+            'throughput_rps': round(len(rows) / wall, 2),
+            'latency_ms': {
+                'mean': round(sum(latencies) / len(latencies), 3),
+                'p50': round(percentile(latencies, 50), 3),
+                'p90': round(percentile(latencies, 90), 3),
+                'p99': round(percentile(latencies, 99), 3),
+                'max': round(max(latencies), 3),
+            },
+            'sql_per_request': {
+                'mean': round(sum(statements) / len(statements), 2),
+                'max': max(statements),
+            },
+            'bytes_mean': int(sum(row[2] for row in rows) / len(rows)),
+        }
+
+    measured = sum(len(rows) for rows in samples.values())
+    return {
+        'total': {
+            'requests': measured,
+            'elapsed_s': round(wall, 3),
+            'throughput_rps': round(measured / wall, 2),
+        },
+        'endpoints': endpoints,
+    }
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(before_path: str, after_path: str):
+    """比較兩份結果檔並輸出差異"""
+    with open(before_path, encoding='utf-8') as f:
+        before = json.load(f)
+    with open(after_path, encoding='utf-8') as f:
+        after = json.load(f)
+
+    def delta(old, new):
+        if not old:
+            return 'n/a'
+        return f'{(new - old) / old * 100:+.1f}%'
+
+    print(f"{'endpoint':<16}{'p50 ms':>20}{'p99 ms':>20}{'sql/req':>18}")
+    for name in sorted(set(before['endpoints']) | set(after['endpoints'])):
+        old = before['endpoints'].get(name)
+        new = after['endpoints'].get(name)
+        if not old or not new:
+            print(f'{name:<16}{"(僅存在於其中一份結果)":>20}')
+            continue
+        p50 = f"{new['latency_ms']['p50']:.2f} ({delta(old['latency_ms']['p50'], new['latency_ms']['p50'])})"
+        p99 = f"{new['latency_ms']['p99']:.2f} ({delta(old['latency_ms']['p99'], new['latency_ms']['p99'])})"
+        sql = f"{new['sql_per_request']['mean']:.1f} ({delta(old['sql_per_request']['mean'], new['sql_per_request']['mean'])})"
+        print(f'{name:<16}{p50:>20}{p99:>20}{sql:>18}')
+    print(f"throughput: {before['total']['throughput_rps']} -> {after['total']['throughput_rps']} req/s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='DSWeb 主藍圖 HTTP 基準測試')
+    parser.add_argument('--requests', type=int, default=2000, help='量測的請求總數')
+    parser.add_argument('--concurrency', type=int, default=8, help='並行執行緒數')
+    parser.add_argument('--warmup', type=int, default=10, help='每個執行緒不列入統計的暖身請求數')
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--debates', type=int, default=2000)
+    parser.add_argument('--arguments-per-debate', type=int, default=6)
+    parser.add_argument('--hall-messages', type=int, default=5000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--db', help='SQLite 檔案路徑（預設使用暫存檔）')
+    parser.add_argument('--output', default='bench_results.json', help='結果 JSON 檔案')
+    parser.add_argument('--compare', nargs=2, metavar=('BEFORE', 'AFTER'), help='比較兩份結果檔')
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        compare(*args.compare)
+        return 0
+
+    tmpdir = None
+    db_path = args.db
+    if not db_path:
+        tmpdir = tempfile.mkdtemp(prefix='dsweb-bench-')
+        db_path = os.path.join(tmpdir, 'bench.db')
+    fresh = not os.path.exists(db_path)
+
+    app = create_app(make_config(f'sqlite:///{os.path.abspath(db_path)}'))
+    with app.app_context():
+        if fresh:
+            print('建立種子資料...', file=sys.stderr)
+            seeded = seed_database(
+                users=args.users,
+                debates=args.debates,
+                arguments_per_debate=args.arguments_per_debate,
+                hall_messages=args.hall_messages,
+                seed=args.seed,
+            )
+        else:
+            seeded = {'reused': db_path}
+
+    results = run_benchmark(app, args.requests, args.concurrency, args.users, args.seed, args.warmup)
+    results['meta'] = {
+        'revision': git_revision(),
+        'timestamp': datetime.utcnow().isoformat(timespec='seconds') + 'Z',
+        'python': platform.python_version(),
+        'params': {
+            'requests': args.requests,
+            'concurrency': args.concurrency,
+            'seed': args.seed,
+            'workload': WORKLOAD,
+        },
+        'dataset': seeded,
+    }
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2, sort_keys=True)
+
+    print(json.dumps(results['total'], ensure_ascii=False))
+    for name, stats in results['endpoints'].items():
+        print(f"{name:<16} p50={stats['latency_ms']['p50']:.2f}ms p99={stats['latency_ms']['p99']:.2f}ms "
+              f"sql/req={stats['sql_per_request']['mean']:.1f} errors={stats['errors']}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
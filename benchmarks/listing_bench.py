@@ -0,0 +1,140 @@
+"""
+列表頁唯讀查詢的基準測試
+
+以 seed.py 建立 --debates 場辯論，比較兩種取出列表的方式：
+    orm    Debate.query + joinedload(creator / pro_participant / con_participant)，並讀取模板用到的屬性
+    core   ListingService.debates（Core 只查需要的欄位，轉成 DebateRow）
+每種方式各取 --rows 列重複 --repeat 次，量測每秒處理的列數，以及以 tracemalloc 量測每 1,000 列結果佔用的記憶體
+（ORM 的數字包含 identity map 中的物件，取出後才從 session 移除）。
+另外以 test client 量測 /debate-board、/search、/debate-hall 的延遲與 SQL 數量。
+
+使用方式：
+    python -m benchmarks.listing_bench --debates 50000
+    python -m benchmarks.listing_bench --rows 1000 --repeat 50 --requests 300
+"""
+import argparse
+import gc
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+os.environ.setdefault('LINE_CHANNEL_ID', 'bench')
+os.environ.setdefault('LINE_CHANNEL_SECRET', 'bench')
+
+from sqlalchemy import desc, event  # noqa: E402
+from sqlalchemy.orm import joinedload  # noqa: E402
+
+from app import create_app, db  # noqa: E402
+from app.models.debate import Debate  # noqa: E402
+from app.services.listing_service import ListingService  # noqa: E402
+from benchmarks.http_bench import SQLCounter, make_config, percentile  # noqa: E402
+from benchmarks.seed import seed_database  # noqa: E402
+
+PAGES = ['/debate-board', '/search', '/search?sort=hot&status=ongoing', '/debate-hall']
+
+
+def orm_rows(limit: int):
+    debates = (Debate.query
+               .options(joinedload(Debate.creator), joinedload(Debate.pro_participant),
+                        joinedload(Debate.con_participant))
+               .order_by(desc(Debate.created_at)).limit(limit).all())
+    for debate in debates:  # 模板會讀取的屬性
+        debate.title, debate.category, debate.status, debate.views, debate.creator.username
+        debate.pro_participant and debate.pro_participant.username
+        debate.time_remaining, debate.is_urgent
+    return debates
+
+
+def core_rows(limit: int):
+    rows = ListingService.debates(order_by=desc(Debate.created_at), limit=limit)
+    for row in rows:
+        row.title, row.category, row.status, row.views, row.creator.username
+        row.pro_participant and row.pro_participant.username
+        row.time_remaining, row.is_urgent
+    return rows
+
+
+def measure(fn, rows: int, repeat: int):
+    fn(rows)  # 預熱（編譯快取、連線）
+    db.session.remove()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn(rows)
+        db.session.remove()
+    elapsed = time.perf_counter() - started
+
+    gc.collect()
+    tracemalloc.start()
+    result = fn(rows)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    db.session.remove()
+    return {'rows_per_sec': round(rows * repeat / elapsed), 'ms_per_query': round(elapsed / repeat * 1000, 2),
+            'kb_per_1000_rows': round(retained / 1024 * 1000 / rows, 1),
+            'peak_kb_per_1000_rows': round(peak / 1024 * 1000 / rows, 1)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='DSWeb 列表頁唯讀查詢基準測試')
+    parser.add_argument('--debates', type=int, default=50_000)
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--rows', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=30)
+    parser.add_argument('--requests', type=int, default=200, help='每個頁面的請求數')
+    parser.add_argument('--output', help='結果 JSON 檔案')
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix='dsweb-listing-')
+    app = create_app(make_config(f"sqlite:///{os.path.join(workdir, 'bench.db')}"))
+    results = {'debates': args.debates, 'rows': args.rows}
+    with app.app_context():
+        seed_database(users=args.users, debates=args.debates, arguments_per_debate=2, hall_messages=2000,
+                      follows_per_debate=2)
+        for name, fn in (('orm', orm_rows), ('core', core_rows)):
+            results[name] = measure(fn, args.rows, args.repeat)
+        counter = SQLCounter()
+        event.listen(db.engine, 'before_cursor_execute', counter)
+
+    client = app.test_client()
+    rng = random.Random(1)
+    results['pages'] = {}
+    for url in PAGES:
+        samples, statements = [], []
+        for i in range(args.requests + 5):
+            counter.start()
+            started = time.perf_counter()
+            page = f"{'&' if '?' in url else '?'}page={rng.randint(1, 20)}" if url.startswith('/search') else ''
+            client.get(url + page)
+            elapsed = (time.perf_counter() - started) * 1000
+            count = counter.stop()
+            if i >= 5:
+                samples.append(elapsed)
+                statements.append(count)
+        results['pages'][url] = {'p50_ms': round(percentile(samples, 50), 2), 'p99_ms': round(percentile(samples, 99), 2),
+                                 'sql': round(sum(statements) / len(statements), 1)}
+
+    orm, core = results['orm'], results['core']
+    print(f"{args.rows} 列 × {args.repeat} 次（{args.debates:,} 場辯論）")
+    for name, stats in (('orm', orm), ('core', core)):
+        print(f"{name:<5} {stats['rows_per_sec']:>9,} 列/秒  {stats['ms_per_query']:>7} ms/查詢  "
+              f"每 1,000 列 {stats['kb_per_1000_rows']:>8} KB（峰值 {stats['peak_kb_per_1000_rows']} KB）")
+    print(f"core 快 {core['rows_per_sec'] / orm['rows_per_sec']:.1f} 倍，"
+          f"記憶體為 ORM 的 {core['kb_per_1000_rows'] / orm['kb_per_1000_rows']:.0%}")
+    for url, stats in results['pages'].items():
+        print(f"{url:<34} p50 {stats['p50_ms']:>7} ms  p99 {stats['p99_ms']:>7} ms  SQL {stats['sql']}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    shutil.rmtree(workdir, ignore_errors=True)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,183 @@
+"""
+內容審查的基準測試
+
+以 related_bench 的 Zipf 詞彙產生訊息（40–120 字，--hit-rate 比例的訊息混入一個字詞表中的字詞，
+並以全形、空白或繁簡寫法變形），字詞表為 --patterns 個隨機 2–4 字的中文字詞與少量英文字詞。量測：
+    fold      第一次正規化時建立 BMP 對照表的時間
+    compile   編譯字詞表（Moderator）的時間、狀態數與行程 RSS 增加量
+    review    Moderator.review 的吞吐量（訊息/秒、MB/秒），另外統計沒有命中與有命中的訊息
+    naive     逐一以 `字詞 in 內容` 比對的吞吐量（只取 --naive-messages 則），並確認兩者找到的字詞相同
+    rescan    以 --rows 則大廳訊息執行 ModerationService.rescan（dry run），比較 1 個與 --workers 個行程
+
+使用方式：
+    python -m benchmarks.moderation_bench --patterns 50000
+    python -m benchmarks.moderation_bench --patterns 50000 --rows 500000 --workers 4
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+os.environ.setdefault('LINE_CHANNEL_ID', 'bench')
+os.environ.setdefault('LINE_CHANNEL_SECRET', 'bench')
+
+from app import create_app  # noqa: E402
+from app import moderation  # noqa: E402
+from app.models.debate import HallMessage  # noqa: E402
+from app.moderation import ACTIONS, Moderator, fold  # noqa: E402
+from app.services.moderation_service import ModerationService  # noqa: E402
+from benchmarks.http_bench import make_config  # noqa: E402
+from benchmarks.related_bench import Corpus  # noqa: E402
+from benchmarks.seed import _bulk_insert, seed_database  # noqa: E402
+
+LATIN = ['baka', 'idiot', 'stupid', 'scam', 'spam', 'loser', 'moron', 'trash']
+PUNCTUATION = '，。！？、 '
+
+
+def wordlist(count: int, rng: random.Random):
+    """字詞 → 動作；大約 5% block、80% mask、15% flag"""
+    words = {}
+    for word in LATIN:
+        words[word] = 'block'
+    while len(words) < count:
+        word = ''.join(chr(rng.randint(0x4e00, 0x9fa5)) for _ in range(rng.randint(2, 4)))
+        words[word] = rng.choices(ACTIONS, weights=(5, 80, 15))[0]
+    return words
+
+
+def disguise(word: str, rng: random.Random) -> str:
+    """發表者常見的規避寫法：字間插入空白或標點、全形英數字、簡體字寫成繁體字"""
+    traditional = {s: t for t, s in zip(moderation._TRADITIONAL, moderation._SIMPLIFIED)}
+    choice = rng.random()
+    if choice < 0.3:
+        return rng.choice(' ．。*').join(word)
+    if choice < 0.5 and word.isascii():
+        return ''.join(chr(ord(c) + 0xFEE0) for c in word.upper())
+    if choice < 0.7:
+        return ''.join(traditional.get(c, c) for c in word)
+    return word
+
+
+def messages(corpus: Corpus, count: int, terms, hit_rate: float, rng: random.Random):
+    for _ in range(count):
+        length = rng.randint(40, 120)
+        parts = []
+        while sum(map(len, parts)) < length:
+            parts.append(''.join(corpus.words[w] for w in corpus._background(rng.randint(2, 5)).tolist()))
+            parts.append(rng.choice(PUNCTUATION))
+        if rng.random() < hit_rate:
+            parts.insert(rng.randrange(len(parts)), disguise(rng.choice(terms), rng))
+        yield ''.join(parts)[:length + 8]
+
+
+def _rss_mb() -> float:
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * resource.getpagesize() / 1048576
+
+
+def throughput(fn, items):
+    started = time.perf_counter()
+    for item in items:
+        fn(item)
+    elapsed = time.perf_counter() - started
+    size = sum(len(item.encode('utf-8')) for item in items)
+    return {'messages': len(items), 'seconds': round(elapsed, 3),
+            'messages_per_sec': round(len(items) / elapsed), 'mb_per_sec': round(size / 1048576 / elapsed, 2)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='DSWeb 內容審查基準測試')
+    parser.add_argument('--patterns', type=int, default=50_000)
+    parser.add_argument('--messages', type=int, default=50_000)
+    parser.add_argument('--naive-messages', type=int, default=200)
+    parser.add_argument('--hit-rate', type=float, default=0.02)
+    parser.add_argument('--rows', type=int, default=200_000, help='重新掃描用的大廳訊息數（0 表示略過）')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 2)
+    parser.add_argument('--output', help='結果 JSON 檔案')
+    args = parser.parse_args(argv)
+
+    rng = random.Random(3)
+    corpus = Corpus()
+    words = wordlist(args.patterns, rng)
+    terms = list(words)
+    results = {'patterns': len(words)}
+
+    started = time.perf_counter()
+    fold('')
+    results['fold_table_ms'] = round((time.perf_counter() - started) * 1000, 1)
+
+    before = _rss_mb()
+    started = time.perf_counter()
+    moderator = Moderator(words)
+    results['compile'] = {'seconds': round(time.perf_counter() - started, 3), 'states': len(moderator.automaton),
+                          'rss_delta_mb': round(_rss_mb() - before, 1)}
+
+    texts = list(messages(corpus, args.messages, terms, args.hit_rate, rng))
+    verdicts = [moderator.review(text) for text in texts]
+    clean = [text for text, verdict in zip(texts, verdicts) if not verdict.matches]
+    dirty = [text for text, verdict in zip(texts, verdicts) if verdict.matches]
+    results['review'] = throughput(moderator.review, texts)
+    results['review']['matched'] = len(dirty)
+    results['review_clean'] = throughput(moderator.review, clean)
+    results['review_matched'] = throughput(moderator.review, dirty) if dirty else None
+
+    folded_terms = [(term, fold(term)) for term in terms]
+
+    def naive(text):
+        folded = fold(text)
+        return {term for term, key in folded_terms if key in folded}
+
+    sample = texts[:args.naive_messages]
+    results['naive'] = throughput(naive, sample)
+    results['naive']['agrees'] = all(naive(text) == {m.term for m in moderator.scan(text)} for text in sample)
+    results['speedup'] = round(results['review']['messages_per_sec'] / results['naive']['messages_per_sec'])
+
+    if args.rows:
+        workdir = tempfile.mkdtemp(prefix='dsweb-moderation-')
+        path = os.path.join(workdir, 'words.txt')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.writelines(f'{word} {action}\n' for word, action in words.items())
+        base = make_config(f"sqlite:///{os.path.join(workdir, 'main.db')}")
+        app = create_app(type('ModerationBenchConfig', (base,), {'MODERATION_WORDLIST_PATH': path,
+                                                                 'MODERATION_RELOAD_SECONDS': 3600}))
+        with app.app_context():
+            seed_database(users=1000, debates=0, arguments_per_debate=0, hall_messages=0, follows_per_debate=0)
+            now = datetime.utcnow()
+            rows = ({'user_id': rng.randint(1, 1000), 'content': text, 'message_type': 'general', 'created_at': now}
+                    for text in messages(corpus, args.rows, terms, args.hit_rate, rng))
+            _bulk_insert(HallMessage.__table__, rows, 20000)
+            ModerationService.moderator()
+            results['rescan'] = {}
+            for workers in sorted({1, args.workers}):
+                result = ModerationService.rescan('hall_messages', workers=workers, apply=False)
+                results['rescan'][workers] = {'seconds': round(result['seconds'], 2), 'matched': result['matched'],
+                                              'rows_per_sec': round(result['scanned'] / result['seconds'])}
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    c, r, n = results['compile'], results['review'], results['naive']
+    print(f"{results['patterns']:,} 個字詞：編譯 {c['seconds']} 秒，{c['states']:,} 個狀態（RSS +{c['rss_delta_mb']} MB），"
+          f"正規化對照表 {results['fold_table_ms']} ms")
+    print(f"review    {r['messages']:,} 則（命中 {r['matched']:,}）：{r['messages_per_sec']:,} 則/秒，{r['mb_per_sec']} MB/秒")
+    for name in ('review_clean', 'review_matched'):
+        if results[name]:
+            print(f"{name:<14} {results[name]['messages_per_sec']:,} 則/秒，{results[name]['mb_per_sec']} MB/秒")
+    print(f"naive     {n['messages']} 則：{n['messages_per_sec']:,} 則/秒（結果一致：{n['agrees']}，"
+          f"自動機快 {results['speedup']} 倍）")
+    for workers, stats in results.get('rescan', {}).items():
+        print(f"rescan    {workers} 個行程：{args.rows:,} 則 {stats['seconds']} 秒（{stats['rows_per_sec']:,} 則/秒，"
+              f"命中 {stats['matched']:,}）")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,136 @@
+"""
+關注通知展開的基準測試
+
+建立一場有 --followers 位關注者（預設 100,000）的辯論，分別以兩種方式發布 --events 個事件：
+    write  寫入時展開（暫時把 NOTIFY_FANOUT_LIMIT 調到關注者數以上）：每個事件寫入每位關注者的收件匣
+    read   讀取時展開（預設門檻）：每個事件只寫一列，讀取時合併
+比較每個事件的發布時間（即發言請求多出的延遲）、寫入的資料列數，
+以及關注者讀取收件匣第一頁、翻頁與未讀數的延遲；另外量測小型辯論（--small-followers）的寫入展開延遲。
+
+使用方式：
+    python -m benchmarks.notification_bench --followers 100000 --events 15
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+os.environ.setdefault('LINE_CHANNEL_ID', 'bench')
+os.environ.setdefault('LINE_CHANNEL_SECRET', 'bench')
+
+from sqlalchemy import delete, func, select  # noqa: E402
+
+from app import create_app, db  # noqa: E402
+from app.models.debate import Debate, DebateFollow  # noqa: E402
+from app.models.notification import Notification  # noqa: E402
+from app.services.notification_service import NotificationService  # noqa: E402
+from benchmarks.http_bench import make_config  # noqa: E402
+from benchmarks.seed import _bulk_insert, seed_database  # noqa: E402
+
+
+def follow(debate_id: int, user_ids, batch_size: int = 20000):
+    """讓 user_ids 關注 debate_id（一小時前開始關注）"""
+    since = datetime.utcnow() - timedelta(hours=1)
+    db.session.execute(delete(DebateFollow.__table__).where(DebateFollow.__table__.c.debate_id == debate_id))
+    db.session.commit()
+    _bulk_insert(DebateFollow.__table__,
+                 ({'user_id': user_id, 'debate_id': debate_id, 'created_at': since} for user_id in user_ids),
+                 batch_size)
+
+
+def publish_ms(debate_id: int, events: int) -> list:
+    samples = []
+    for _ in range(events):
+        debate = db.session.get(Debate, debate_id)
+        started = time.perf_counter()
+        NotificationService.publish(debate, 'argument_posted', actor_id=debate.pro_participant_id)
+        db.session.commit()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def read_ms(user_id: int, runs: int) -> dict:
+    first, second, unread = [], [], []
+    for _ in range(runs):
+        started = time.perf_counter()
+        page = NotificationService.inbox(user_id, limit=20)
+        first.append((time.perf_counter() - started) * 1000)
+        if page['next_cursor']:
+            started = time.perf_counter()
+            NotificationService.inbox(user_id, before=int(page['next_cursor']), limit=20)
+            second.append((time.perf_counter() - started) * 1000)
+        started = time.perf_counter()
+        NotificationService.unread_count(user_id)
+        unread.append((time.perf_counter() - started) * 1000)
+        db.session.remove()
+    return {
+        'inbox_first_ms': round(statistics.median(first), 3),
+        'inbox_next_ms': round(statistics.median(second), 3) if second else None,
+        'unread_ms': round(statistics.median(unread), 3),
+        'unread': page['unread'],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='DSWeb 關注通知展開基準測試')
+    parser.add_argument('--followers', type=int, default=100_000)
+    parser.add_argument('--events', type=int, default=15)
+    parser.add_argument('--small-followers', type=int, default=200)
+    parser.add_argument('--runs', type=int, default=9)
+    parser.add_argument('--output', help='結果 JSON 檔案')
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix='dsweb-notify-')
+    app = create_app(make_config(f"sqlite:///{os.path.join(workdir, 'main.db')}"))
+    results = {'followers': args.followers, 'events': args.events}
+
+    with app.app_context():
+        seed_database(users=args.followers + 1, debates=3, arguments_per_debate=0, hall_messages=0,
+                      follows_per_debate=0, batch_size=20000)
+        followers = range(2, args.followers + 2)
+        reader = args.followers // 2
+        limit = app.config['NOTIFY_FANOUT_LIMIT']
+
+        for mode, debate_id in (('write', 1), ('read', 2)):
+            follow(debate_id, followers)
+            app.config['NOTIFY_FANOUT_LIMIT'] = args.followers + 1 if mode == 'write' else limit
+            rows_before = db.session.execute(select(func.count()).select_from(Notification)).scalar()
+            samples = publish_ms(debate_id, args.events)
+            rows = db.session.execute(select(func.count()).select_from(Notification)).scalar() - rows_before
+            results[mode] = {
+                'publish_ms_p50': round(statistics.median(samples), 2),
+                'publish_ms_max': round(max(samples), 2),
+                'inbox_rows': rows,
+                'rows_per_sec': round(rows / (sum(samples) / 1000)) if rows else 0,
+            }
+        app.config['NOTIFY_FANOUT_LIMIT'] = limit
+
+        # 關注者同時收到兩場辯論的通知：寫入展開的列與讀取展開的事件合併分頁
+        results['reader'] = read_ms(reader, args.runs)
+
+        follow(3, range(2, args.small_followers + 2))
+        samples = publish_ms(3, max(args.events, 20))
+        results['small'] = {'followers': args.small_followers,
+                            'publish_ms_p50': round(statistics.median(samples), 2)}
+
+    for mode in ('write', 'read'):
+        r = results[mode]
+        print(f"{mode:<6} 每個事件 p50 {r['publish_ms_p50']:>10.2f} ms，最長 {r['publish_ms_max']:>10.2f} ms，"
+              f"寫入收件匣 {r['inbox_rows']:,} 列（{r['rows_per_sec']:,} 列/秒）")
+    r = results['reader']
+    print(f"關注者讀取：第一頁 {r['inbox_first_ms']} ms，下一頁 {r['inbox_next_ms']} ms，"
+          f"未讀數 {r['unread_ms']} ms（未讀 {r['unread']}）")
+    print(f"小型辯論（{args.small_followers} 位關注者）寫入展開 p50 {results['small']['publish_ms_p50']} ms")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,213 @@
+"""
+相關辯論的基準測試
+
+建立 --debates 場辯論（預設 1,000,000 場）。seed.py 的詞彙太少，這裡另外產生約 20,000 個兩到三字的中文詞，
+依 Zipf 分布出現；辯論分屬 --debates / 25 個主題，每個主題有自己的 12 個關鍵詞，讓相關辯論有意義。量測：
+    rebuild   `flask related rebuild`：向量化、相似度與寫入的時間，子行程峰值記憶體
+    refresh   新增 0.1%、修改 100 場、刪除 100 場辯論後 `flask related refresh` 的時間
+    request   詳情頁取得相關辯論（RelatedService.related，一次主鍵查詢）的 p50 / p95，
+              以及整個詳情頁的 p50 / p95
+rebuild 與 refresh 都在新的子行程中執行，峰值記憶體為 ru_maxrss。
+
+使用方式：
+    python -m benchmarks.related_bench --debates 1000000
+    python -m benchmarks.related_bench --debates 100000 --batch-size 1024
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+os.environ.setdefault('LINE_CHANNEL_ID', 'bench')
+os.environ.setdefault('LINE_CHANNEL_SECRET', 'bench')
+
+import numpy as np  # noqa: E402
+from sqlalchemy import delete, func, select, update  # noqa: E402
+
+from app import create_app, db  # noqa: E402
+from app.models.debate import Debate  # noqa: E402
+from app.models.related import DebateNeighbor  # noqa: E402
+from app.services.related_service import RelatedService  # noqa: E402
+from benchmarks.http_bench import make_config, percentile  # noqa: E402
+from benchmarks.seed import CATEGORIES, STATUSES, _bulk_insert, seed_database  # noqa: E402
+
+VOCABULARY = 20000
+TOPIC_SIZE = 25
+
+
+class Corpus:
+    """以固定亂數種子產生標題與說明"""
+
+    def __init__(self, seed: int = 7):
+        self.rng = np.random.default_rng(seed)
+        chars = [chr(c) for c in self.rng.choice(np.arange(0x4e00, 0x9fa6), 3000, replace=False)]
+        self.words = [''.join(self.rng.choice(chars, self.rng.integers(2, 4))) for _ in range(VOCABULARY)]
+        weights = 1 / np.arange(1, VOCABULARY + 1) ** 1.05
+        self.cumulative = np.cumsum(weights / weights.sum())
+
+    def _background(self, count: int):
+        return np.searchsorted(self.cumulative, self.rng.random(count))
+
+    def document(self, topic: int):
+        keywords = random.Random(topic).sample(range(VOCABULARY), 12)
+        picks = self.rng.integers(0, 12, 14)
+        title = self._background(self.rng.integers(2, 5)).tolist() + [keywords[i] for i in picks[:3]]
+        description = self._background(self.rng.integers(15, 40)).tolist() + [keywords[i] for i in picks[3:]]
+        self.rng.shuffle(title)
+        self.rng.shuffle(description)
+        return (''.join(self.words[w] for w in title) + '？',
+                '，'.join(self.words[w] for w in description) + '。')
+
+
+def debate_rows(corpus: Corpus, start: int, count: int, users: int, now: datetime):
+    rng = random.Random(start)
+    for i in range(start, start + count):
+        topic = rng.randrange(max(1, (start + count) // TOPIC_SIZE))
+        title, description = corpus.document(topic)
+        yield {
+            'id': i,
+            'title': title[:200],
+            'description': description,
+            'category': CATEGORIES[topic % len(CATEGORIES)] if rng.random() < 0.8 else rng.choice(CATEGORIES),
+            'creator_id': rng.randint(1, users),
+            'pro_participant_id': None,
+            'status': rng.choice(STATUSES),
+            'time_limit_hours': 24,
+            'created_at': now - timedelta(minutes=count + start - i),
+            'views': 0,
+        }
+
+
+def bench_config(workdir: str):
+    base = make_config(f"sqlite:///{os.path.join(workdir, 'main.db')}")
+    return type('RelatedBenchConfig', (base,), {'RELATED_DIR': os.path.join(workdir, 'related'),
+                                                'SNAPSHOTS_ENABLED': False})
+
+
+def _rss_mb(who) -> float:
+    return resource.getrusage(who).ru_maxrss / 1024  # Linux 為 KB
+
+
+def _measure(workdir: str, mode: str, options: dict) -> dict:
+    """在新的子行程中執行 rebuild 或 refresh"""
+    app = create_app(bench_config(workdir))
+    with app.app_context():
+        baseline = _rss_mb(resource.RUSAGE_SELF)
+        if mode == 'rebuild':
+            result = RelatedService.rebuild(batch_size=options['batch_size'])
+        else:
+            result = RelatedService.refresh(options['edited'], batch_size=options['batch_size'])
+    result['baseline_rss_mb'] = round(baseline, 1)
+    result['peak_rss_mb'] = round(_rss_mb(resource.RUSAGE_SELF), 1)
+    return result
+
+
+def measure(workdir: str, mode: str, **options) -> dict:
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as pool:
+        return pool.submit(_measure, workdir, mode, options).result()
+
+
+def request_latency(app, debate_ids, pages: int) -> dict:
+    samples, page_samples, found = [], [], 0
+    with app.app_context():
+        for debate_id in debate_ids:
+            started = time.perf_counter()
+            found += len(RelatedService.related(debate_id))
+            samples.append((time.perf_counter() - started) * 1000)
+            db.session.remove()
+    client = app.test_client()
+    for debate_id in debate_ids[:pages]:
+        started = time.perf_counter()
+        response = client.get(f'/debate/{debate_id}')
+        response.get_data()
+        page_samples.append((time.perf_counter() - started) * 1000)
+    return {
+        'related_p50_ms': round(percentile(samples, 50), 3),
+        'related_p95_ms': round(percentile(samples, 95), 3),
+        'page_p50_ms': round(percentile(page_samples, 50), 2),
+        'page_p95_ms': round(percentile(page_samples, 95), 2),
+        'avg_neighbors': round(found / len(debate_ids), 2),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='DSWeb 相關辯論基準測試')
+    parser.add_argument('--debates', type=int, default=1_000_000)
+    parser.add_argument('--users', type=int, default=5000)
+    parser.add_argument('--batch-size', type=int, default=512)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--pages', type=int, default=200)
+    parser.add_argument('--keep', action='store_true', help='保留暫存資料庫與索引')
+    parser.add_argument('--output', help='結果 JSON 檔案')
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix='dsweb-related-')
+    app = create_app(bench_config(workdir))
+    corpus = Corpus()
+    now = datetime.utcnow()
+    results = {'debates': args.debates, 'batch_size': args.batch_size}
+
+    with app.app_context():
+        started = time.perf_counter()
+        seed_database(users=args.users, debates=0, arguments_per_debate=0, hall_messages=0,
+                      follows_per_debate=0)
+        _bulk_insert(Debate.__table__, debate_rows(corpus, 1, args.debates, args.users, now), 20000)
+        results['seed_seconds'] = round(time.perf_counter() - started, 1)
+
+    results['rebuild'] = measure(workdir, 'rebuild', batch_size=args.batch_size)
+
+    # 新增 0.1%、修改 100 場（換成另一個主題的內容）、刪除 100 場
+    rng = random.Random(3)
+    added = max(1, args.debates // 1000)
+    edited = rng.sample(range(1, args.debates + 1), 100)
+    removed = rng.sample(sorted(set(range(1, args.debates + 1)) - set(edited)), 100)
+    with app.app_context():
+        _bulk_insert(Debate.__table__, debate_rows(corpus, args.debates + 1, added, args.users, now), 20000)
+        for debate_id in edited:
+            title, description = corpus.document(rng.randrange(args.debates // TOPIC_SIZE or 1))
+            db.session.execute(update(Debate).where(Debate.id == debate_id)
+                               .values(title=title[:200], description=description))
+        db.session.execute(delete(DebateNeighbor).where(DebateNeighbor.debate_id.in_(removed)))
+        db.session.execute(delete(Debate).where(Debate.id.in_(removed)))
+        db.session.commit()
+    results['refresh'] = measure(workdir, 'refresh', batch_size=args.batch_size, edited=edited)
+
+    with app.app_context():
+        results['neighbor_rows'] = db.session.execute(select(func.count()).select_from(DebateNeighbor)).scalar()
+        sample = db.session.execute(select(Debate.title, Debate.id).order_by(Debate.id).limit(1)).first()
+        results['example'] = {'title': sample.title,
+                              'related': [r.title for r in RelatedService.related(sample.id)]}
+    ids = [i for i in rng.sample(range(1, args.debates + 1), args.requests) if i not in set(removed)]
+    results['request'] = request_latency(app, ids, args.pages)
+    results['db_mb'] = round(os.path.getsize(os.path.join(workdir, 'main.db')) / 1048576)
+    results['index_mb'] = round(os.path.getsize(os.path.join(workdir, 'related', 'index.npz')) / 1048576)
+
+    r, f, q = results['rebuild'], results['refresh'], results['request']
+    print(f"{args.debates:,} 場辯論（資料庫 {results['db_mb']:,} MB，索引 {results['index_mb']:,} MB，"
+          f"產生資料 {results['seed_seconds']} 秒）")
+    print(f"rebuild   向量化 {r['vectorize_seconds']:.1f} 秒 + 相似度與寫入 {r['neighbor_seconds']:.1f} 秒"
+          f" = {r['seconds']:.1f} 秒（{r['nnz']:,} 個非零值，{r['neighbors']:,} 筆鄰居，峰值 {r['peak_rss_mb']:,} MB）")
+    print(f"refresh   新增或修改 {f['changed']} 場、刪除 {f['removed']} 場、連帶重算 {f['affected']} 場："
+          f"{f['seconds']:.2f} 秒（峰值 {f['peak_rss_mb']:,} MB）")
+    print(f"request   related() p50 {q['related_p50_ms']} ms / p95 {q['related_p95_ms']} ms（平均 {q['avg_neighbors']} 筆），"
+          f"詳情頁 p50 {q['page_p50_ms']} ms / p95 {q['page_p95_ms']} ms")
+    print(f"範例：{results['example']['title']} → {results['example']['related'][:3]}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    if not args.keep:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,119 @@
+"""
+搜尋頁的基準測試
+
+以 seed.py 建立 --debates 場辯論，依 http_bench 的搜尋請求分布（關鍵字、狀態、分類、排序、頁碼隨機組合）
+送出 --requests 個 /search 請求，量測每個請求的延遲與 SQL 數量；另外分別統計有無關鍵字的請求。
+結果格式與 http_bench 相同，可在不同 commit 上各執行一次後比較：
+    python -m benchmarks.search_bench --debates 200000 --output before.json
+    python -m benchmarks.search_bench --debates 200000 --output after.json
+    python -m benchmarks.http_bench --compare before.json after.json
+
+使用方式：
+    python -m benchmarks.search_bench --debates 200000 --requests 1000
+    python -m benchmarks.search_bench --db /tmp/search.db   # 重複使用種子資料庫
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime
+
+os.environ.setdefault('LINE_CHANNEL_ID', 'bench')
+os.environ.setdefault('LINE_CHANNEL_SECRET', 'bench')
+
+from sqlalchemy import event  # noqa: E402
+
+from app import create_app, db  # noqa: E402
+from benchmarks.http_bench import SQLCounter, Workload, git_revision, make_config, percentile  # noqa: E402
+from benchmarks.seed import seed_database  # noqa: E402
+
+
+def summarize(rows, wall: float):
+    latencies = [row[0] * 1000 for row in rows]
+    statements = [row[1] for row in rows]
+    return {
+        'requests': len(rows),
+        'errors': sum(1 for row in rows if row[2] >= 500),
+        'throughput_rps': round(len(rows) / wall, 2),
+        'latency_ms': {
+            'mean': round(sum(latencies) / len(latencies), 3),
+            'p50': round(percentile(latencies, 50), 3),
+            'p90': round(percentile(latencies, 90), 3),
+            'p99': round(percentile(latencies, 99), 3),
+            'max': round(max(latencies), 3),
+        },
+        'sql_per_request': {'mean': round(sum(statements) / len(statements), 2), 'max': max(statements)},
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='DSWeb 搜尋頁基準測試')
+    parser.add_argument('--debates', type=int, default=200_000)
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--warmup', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--db', help='SQLite 檔案路徑（預設使用暫存檔；已存在時直接使用）')
+    parser.add_argument('--output', help='結果 JSON 檔案')
+    args = parser.parse_args(argv)
+
+    tmpdir = None
+    db_path = args.db
+    if not db_path:
+        tmpdir = tempfile.mkdtemp(prefix='dsweb-search-')
+        db_path = os.path.join(tmpdir, 'bench.db')
+    fresh = not os.path.exists(db_path)
+    app = create_app(make_config(f'sqlite:///{os.path.abspath(db_path)}'))
+    with app.app_context():
+        if fresh:
+            print('建立種子資料...', file=sys.stderr)
+            seed_database(users=args.users, debates=args.debates, arguments_per_debate=0, hall_messages=0,
+                          follows_per_debate=0, seed=args.seed)
+        counter = SQLCounter()
+        event.listen(db.engine, 'before_cursor_execute', counter)
+
+    workload = Workload(app, random.Random(args.seed), args.users)
+    client = app.test_client()
+    samples = defaultdict(list)
+    started = time.perf_counter()
+    for i in range(args.requests + args.warmup):
+        _, url, _, kwargs = workload.build('search')
+        keyword = any(name == 'q' for name, _ in kwargs['query_string'])
+        counter.start()
+        request_started = time.perf_counter()
+        response = client.get(url, **kwargs)
+        response.get_data()
+        elapsed = time.perf_counter() - request_started
+        statements = counter.stop()
+        if i >= args.warmup:
+            samples['search'].append((elapsed, statements, response.status_code))
+            samples['search_keyword' if keyword else 'search_browse'].append((elapsed, statements, response.status_code))
+    wall = time.perf_counter() - started
+
+    results = {
+        'total': {'requests': args.requests, 'elapsed_s': round(wall, 3),
+                  'throughput_rps': round(args.requests / wall, 2)},
+        'endpoints': {name: summarize(rows, wall) for name, rows in sorted(samples.items())},
+        'meta': {'revision': git_revision(), 'debates': args.debates,
+                 'timestamp': datetime.utcnow().isoformat(timespec='seconds') + 'Z'},
+    }
+    for name, stats in results['endpoints'].items():
+        print(f"{name:<16} {stats['requests']:>5} 次  p50 {stats['latency_ms']['p50']:>8.2f} ms  "
+              f"p90 {stats['latency_ms']['p90']:>8.2f} ms  p99 {stats['latency_ms']['p99']:>8.2f} ms  "
+              f"SQL {stats['sql_per_request']['mean']:.1f}（最多 {stats['sql_per_request']['max']}）")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    if tmpdir:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,143 @@
+"""
+基準測試資料產生器 - 以固定亂數種子建立可重現的辯論資料
+"""
+import random
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List
+
+from app import db
+from app.models.user import User
+from app.models.debate import Debate, Argument, HallMessage, DebateFollow
+
+CATEGORIES = ['科技', '社會', '環境', '政治', '教育', '經濟', '文化', '健康']
+STATUSES = ['waiting', 'ongoing', 'judging', 'completed']
+TOPICS = [
+    'AI是否會取代人類工作？',
+    '遠距工作是否比實體辦公更有效率？',
+    '電動車是否真的比燃油車環保？',
+    '線上教育能否完全取代傳統教育？',
+    '台灣應該加速廢核還是延役核電？',
+    '社群媒體對青少年弊大於利嗎？',
+    '基本收入制度是否可行？',
+    '大學學費應該全面免費嗎？',
+]
+WORDS = ['數據', '研究', '顯示', '政策', '社會', '成本', '效益', '長期', '影響', '證據', '民眾', '產業']
+
+
+def _chunks(rows: Iterator[Dict], size: int) -> Iterator[List[Dict]]:
+    """將資料列切成固定大小的批次"""
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _bulk_insert(table, rows: Iterator[Dict], batch_size: int) -> int:
+    """以 Core executemany 批次寫入，避免 ORM 物件化成本"""
+    total = 0
+    for batch in _chunks(rows, batch_size):
+        db.session.execute(table.insert(), batch)
+        db.session.commit()
+        total += len(batch)
+    return total
+
+
+def _text(rng: random.Random, words: int) -> str:
+    return ''.join(rng.choice(WORDS) for _ in range(words))
+
+
+def seed_database(users: int = 200, debates: int = 2000, arguments_per_debate: int = 6,
+                  hall_messages: int = 5000, follows_per_debate: int = 3, argument_words: int = 80,
+                  seed: int = 42, batch_size: int = 5000, status_weights: List[float] = None,
+                  history_days: int = 180) -> Dict[str, int]:
+    """
+    建立基準測試資料（需在 app context 中呼叫）
+
+    status_weights 依 STATUSES 順序指定各狀態比例（預設均分），history_days 為資料橫跨的天數。
+    回傳各資料表寫入的列數。
+    """
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    db.create_all()
+
+    def user_rows():
+        for i in range(1, users + 1):
+            yield {
+                'id': i,
+                'username': f'bench_user_{i}',
+                'email': None,
+                'line_user_id': f'bench-{i}',
+                'created_at': now - timedelta(days=rng.randint(0, 365)),
+            }
+
+    def debate_rows():
+        for i in range(1, debates + 1):
+            status = rng.choices(STATUSES, status_weights)[0] if status_weights else rng.choice(STATUSES)
+            created_at = now - timedelta(minutes=rng.randint(0, 60 * 24 * history_days))
+            pro = rng.randint(1, users)
+            con = None if status == 'waiting' else rng.randint(1, users)
+            started = created_at + timedelta(hours=1) if con else None
+            yield {
+                'id': i,
+                'title': f'{rng.choice(TOPICS)} #{i}',
+                'description': _text(rng, 30),
+                'category': rng.choice(CATEGORIES),
+                'creator_id': pro,
+                'pro_participant_id': pro,
+                'con_participant_id': con,
+                'status': status,
+                'time_limit_hours': 24,
+                'created_at': created_at,
+                'started_at': started,
+                'current_deadline': now + timedelta(hours=rng.randint(1, 24)) if status == 'ongoing' else None,
+                'completed_at': now - timedelta(days=rng.randint(0, history_days // 2)) if status == 'completed' else None,
+                'current_round': rng.randint(1, 3) if con else 0,
+                'current_turn': 'pro' if con else None,
+                'need_sources': rng.random() < 0.5,
+                'allow_audience': True,
+                'level_limit': None,
+                'views': rng.randint(0, 5000),
+            }
+
+    def argument_rows():
+        for debate_id in range(1, debates + 1):
+            created_at = now - timedelta(days=rng.randint(0, 180))
+            for n in range(arguments_per_debate):
+                position = 'pro' if n % 2 == 0 else 'con'
+                created_at += timedelta(minutes=rng.randint(5, 600))
+                yield {
+                    'debate_id': debate_id,
+                    'user_id': rng.randint(1, users),
+                    'position': position,
+                    'round_number': n // 2 + 1,
+                    'content': _text(rng, argument_words),
+                    'sources': 'https://example.com/source/%d' % rng.randint(1, 500),
+                    'created_at': created_at,
+                    'updated_at': created_at,
+                }
+
+    def hall_rows():
+        for i in range(hall_messages):
+            yield {
+                'user_id': rng.randint(1, users),
+                'content': _text(rng, 15),
+                'message_type': 'challenge' if rng.random() < 0.1 else 'general',
+                'created_at': now - timedelta(seconds=rng.randint(0, 86400 * 30)),
+            }
+
+    def follow_rows():
+        for debate_id in range(1, debates + 1):
+            for user_id in rng.sample(range(1, users + 1), min(follows_per_debate, users)):
+                yield {'user_id': user_id, 'debate_id': debate_id, 'created_at': now}
+
+    return {
+        'users': _bulk_insert(User.__table__, user_rows(), batch_size),
+        'debates': _bulk_insert(Debate.__table__, debate_rows(), batch_size),
+        'arguments': _bulk_insert(Argument.__table__, argument_rows(), batch_size),
+        'hall_messages': _bulk_insert(HallMessage.__table__, hall_rows(), batch_size),
+        'debate_follows': _bulk_insert(DebateFollow.__table__, follow_rows(), batch_size),
+    }
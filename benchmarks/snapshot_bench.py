@@ -0,0 +1,139 @@
+"""
+已完成辯論靜態快照的基準測試
+
+建立以已完成辯論為主的資料集，分別以單一行程與 --workers 個行程產生快照，
+再以多執行緒對隨機的已完成辯論詳情頁發出 GET（Accept-Encoding: br, gzip），比較：
+    快照（SNAPSHOTS_ENABLED=True，匿名訪客走快照路徑）
+    動態渲染（SNAPSHOTS_ENABLED=False，同一個資料庫）
+的每秒請求數、p50/p95 延遲與回應大小。
+
+使用方式：
+    python -m benchmarks.snapshot_bench --debates 5000 --requests 2000 --concurrency 8
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+os.environ.setdefault('LINE_CHANNEL_ID', 'bench')
+os.environ.setdefault('LINE_CHANNEL_SECRET', 'bench')
+
+from sqlalchemy import select  # noqa: E402
+
+from app import create_app, db  # noqa: E402
+from app.models.debate import Debate  # noqa: E402
+from app.snapshots import build_snapshots, stale_ids  # noqa: E402
+from benchmarks.http_bench import make_config, percentile  # noqa: E402
+from benchmarks.seed import seed_database  # noqa: E402
+
+# 依 STATUSES 順序：waiting, ongoing, judging, completed
+STATUS_WEIGHTS = [0.05, 0.08, 0.02, 0.85]
+
+
+def run_requests(app, debate_ids, total: int, concurrency: int, seed: int) -> dict:
+    """以 concurrency 個執行緒各自的 test client 發出 total 個 GET"""
+    latencies, sizes, errors = [], [], []
+    lock = threading.Lock()
+
+    def worker(worker_id: int, count: int):
+        rng = random.Random(seed + worker_id)
+        client = app.test_client()
+        local_latencies, local_sizes, local_errors = [], [], 0
+        for _ in range(count):
+            started = time.perf_counter()
+            response = client.get(f'/debate/{rng.choice(debate_ids)}',
+                                  headers={'Accept-Encoding': 'br, gzip'})
+            body = response.get_data()
+            local_latencies.append((time.perf_counter() - started) * 1000)
+            local_sizes.append(len(body))
+            if response.status_code != 200:
+                local_errors += 1
+        with lock:
+            latencies.extend(local_latencies)
+            sizes.extend(local_sizes)
+            errors.append(local_errors)
+
+    per_worker = [total // concurrency + (1 if n < total % concurrency else 0) for n in range(concurrency)]
+    threads = [threading.Thread(target=worker, args=(n, count)) for n, count in enumerate(per_worker)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    return {
+        'requests': total,
+        'errors': sum(errors),
+        'rps': round(total / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 50), 2),
+        'p95_ms': round(percentile(latencies, 95), 2),
+        'avg_bytes': round(sum(sizes) / len(sizes)),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='DSWeb 靜態快照基準測試')
+    parser.add_argument('--debates', type=int, default=5000)
+    parser.add_argument('--arguments-per-debate', type=int, default=6)
+    parser.add_argument('--users', type=int, default=500)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='產生快照的行程數')
+    parser.add_argument('--build-sample', type=int, default=500, help='量測產生速度的辯論數')
+    parser.add_argument('--output', help='結果 JSON 檔案')
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix='dsweb-snapshot-')
+    config = make_config(f"sqlite:///{os.path.join(workdir, 'main.db')}")
+    config.ARCHIVE_DATABASE_URL = f"sqlite:///{os.path.join(workdir, 'archive.db')}"
+    config.SNAPSHOT_DIR = os.path.join(workdir, 'snapshots')
+    config.SNAPSHOTS_ENABLED = True
+    app = create_app(config)
+    results = {'debates': args.debates, 'requests': args.requests, 'concurrency': args.concurrency}
+
+    with app.app_context():
+        results['seed'] = seed_database(users=args.users, debates=args.debates,
+                                        arguments_per_debate=args.arguments_per_debate, hall_messages=0,
+                                        status_weights=STATUS_WEIGHTS)
+        completed = list(db.session.execute(
+            select(Debate.id).where(Debate.status == 'completed')).scalars())
+
+        # 產生速度：同一批樣本分別以 1 個與 --workers 個行程產生
+        sample = stale_ids(completed[:args.build_sample], rebuild_all=True)
+        results['build'] = {'single': build_snapshots(sample, workers=1)}
+        if args.workers > 1:
+            results['build']['parallel'] = build_snapshots(sample, workers=args.workers, chunk_size=50)
+        rest = stale_ids(completed)
+        results['build']['rest'] = build_snapshots(rest, workers=args.workers)
+
+    results['snapshot'] = run_requests(app, completed, args.requests, args.concurrency, seed=1)
+
+    dynamic_config = type('DynamicConfig', (config,), {'SNAPSHOTS_ENABLED': False})
+    dynamic_app = create_app(dynamic_config)
+    results['dynamic'] = run_requests(dynamic_app, completed, args.requests, args.concurrency, seed=1)
+
+    for mode, build in results['build'].items():
+        rate = build['built'] / build['seconds'] if build['seconds'] else 0
+        print(f"產生快照（{mode}）：{build['built']} 份，{build['workers']} 個行程，"
+              f"{build['seconds']:.2f} 秒（{rate:.1f} 份/秒）")
+    print(f"\n{'mode':<10}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'bytes':>10}{'errors':>8}")
+    for mode in ('dynamic', 'snapshot'):
+        r = results[mode]
+        print(f"{mode:<10}{r['rps']:>10}{r['p50_ms']:>10}{r['p95_ms']:>10}{r['avg_bytes']:>10}{r['errors']:>8}")
+    if results['dynamic']['rps']:
+        print(f"\n快照 / 動態：{results['snapshot']['rps'] / results['dynamic']['rps']:.1f}x")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    shutil.rmtree(workdir, ignore_errors=True)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,163 @@
+"""
+引用來源的基準測試
+
+以 seed.py 建立辯論後寫入 --arguments 則論述，sources 原文為 JSON 陣列或一行一個的純文字，
+引用對象依 Zipf 分布取自 --urls 個網址與少量書目，並混入常見的寫法差異（http/https、www.、
+utm 追蹤參數、結尾的 /）。量測：
+    backfill   CitationService.backfill 的時間與每秒論述數（與回填工作 argument_sources 相同的解析）
+    top        最常被引用的 20 個來源：sources.citation_count 索引 vs 每次解析所有論述原文（JSON scan）
+    citing     引用某個中等熱門網址的論述：argument_sources 索引 vs LIKE '%網址%' 掃描
+並比較原文字串與正規化後的不重複來源數。
+
+使用方式：
+    python -m benchmarks.sources_bench --arguments 1000000
+    python -m benchmarks.sources_bench --arguments 200000 --repeat 50
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime
+
+os.environ.setdefault('LINE_CHANNEL_ID', 'bench')
+os.environ.setdefault('LINE_CHANNEL_SECRET', 'bench')
+
+import numpy as np  # noqa: E402
+from sqlalchemy import select  # noqa: E402
+
+from app import create_app, db  # noqa: E402
+from app.citations import parse  # noqa: E402
+from app.models.debate import Argument  # noqa: E402
+from app.services.citation_service import CitationService  # noqa: E402
+from benchmarks.http_bench import make_config, percentile  # noqa: E402
+from benchmarks.seed import _bulk_insert, seed_database  # noqa: E402
+
+DOMAINS = ['news.gov.tw', 'www.stat.gov.tw', 'udn.com', 'www.cna.com.tw', 'en.wikipedia.org', 'www.who.int',
+           'data.worldbank.org', 'www.nature.com', 'arxiv.org', 'www.twreporter.org']
+BOOKS = ['行政院主計總處，2023 年家庭收支調查報告', '國家發展委員會，中華民國人口推估（2022 至 2070 年）',
+         'OECD (2023). Education at a Glance.', 'IPCC (2021). Climate Change 2021: The Physical Science Basis.']
+
+
+def variant(url: str, rng: random.Random) -> str:
+    """同一個網址的常見寫法差異"""
+    if rng.random() < 0.2:
+        url = url.replace('https://', 'http://')
+    if rng.random() < 0.15:
+        url += ('&' if '?' in url else '?') + f'utm_source=line&utm_medium={rng.choice(["social", "share"])}'
+    if rng.random() < 0.1:
+        url = url.replace('://www.', '://') if '://www.' in url else url.replace('://', '://www.')
+    if rng.random() < 0.1 and '?' not in url:
+        url += '/'
+    return url
+
+
+def argument_rows(count: int, debates: int, urls, now: datetime, seed: int = 3):
+    rng = random.Random(seed)
+    weights = 1 / np.arange(1, len(urls) + 1) ** 1.1
+    picks = iter(np.random.default_rng(seed).choice(len(urls), count * 3, p=weights / weights.sum()).tolist())
+    for i in range(1, count + 1):
+        cited = [variant(urls[next(picks)], rng) for _ in range(rng.randint(0, 3))]
+        if rng.random() < 0.1:
+            cited.append(rng.choice(BOOKS))
+        if not cited:
+            sources = None
+        elif rng.random() < 0.5:
+            sources = json.dumps(cited, ensure_ascii=False)
+        else:
+            sources = '\n'.join(f'{n}. {item}' for n, item in enumerate(cited, 1))
+        yield {'id': i, 'debate_id': rng.randint(1, debates), 'user_id': rng.randint(1, 1000),
+               'position': rng.choice(('pro', 'con')), 'round_number': rng.randint(1, 3), 'content': '論述',
+               'sources': sources, 'created_at': now, 'updated_at': now}
+
+
+def timed(fn, repeat: int):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return {'p50_ms': round(percentile(samples, 50), 3), 'p99_ms': round(percentile(samples, 99), 3)}
+
+
+def json_scan_top(limit: int = 20):
+    """沒有來源資料表時的做法：讀出所有原文、逐筆解析後計數"""
+    counts = Counter()
+    for (raw,) in db.session.execute(select(Argument.sources).where(Argument.sources.isnot(None))).yield_per(10000):
+        counts.update(c.canonical for c in parse(raw))
+    return counts.most_common(limit)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='DSWeb 引用來源基準測試')
+    parser.add_argument('--arguments', type=int, default=1_000_000)
+    parser.add_argument('--debates', type=int, default=50_000)
+    parser.add_argument('--urls', type=int, default=20_000)
+    parser.add_argument('--repeat', type=int, default=100)
+    parser.add_argument('--scan-repeat', type=int, default=3, help='JSON scan 與 LIKE 掃描的重複次數')
+    parser.add_argument('--output', help='結果 JSON 檔案')
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix='dsweb-sources-')
+    app = create_app(make_config(f"sqlite:///{os.path.join(workdir, 'bench.db')}"))
+    rng = random.Random(1)
+    urls = [f'https://{rng.choice(DOMAINS)}/article/{i}' + (f'?id={i}&lang=zh' if i % 3 == 0 else '')
+            for i in range(args.urls)]
+    results = {'arguments': args.arguments}
+
+    with app.app_context():
+        seed_database(users=1000, debates=args.debates, arguments_per_debate=0, hall_messages=0, follows_per_debate=0)
+        _bulk_insert(Argument.__table__, argument_rows(args.arguments, args.debates, urls, datetime.utcnow()), 20000)
+
+        connection = db.session.connection()
+        results['backfill'] = CitationService.backfill(connection, batch_size=5000)
+        db.session.commit()
+        b = results['backfill']
+        b['arguments_per_sec'] = round(b['arguments'] / b['seconds'])
+        raw_distinct = set()
+        for (raw,) in db.session.execute(select(Argument.sources).where(Argument.sources.isnot(None))).yield_per(10000):
+            items = json.loads(raw) if raw.startswith('[') else [line.split('. ', 1)[1] for line in raw.split('\n')]
+            raw_distinct.update(items)
+        results['distinct'] = {'raw': len(raw_distinct), 'canonical': b['sources']}
+
+        indexed = CitationService.top_sources(20)
+        scanned = json_scan_top(20)
+        results['top'] = {
+            'index': timed(lambda: CitationService.top_sources(20), args.repeat),
+            'json_scan': timed(json_scan_top, args.scan_repeat),
+            'same_counts': [s['citation_count'] for s in indexed] == [count for _, count in scanned],
+        }
+
+        # 中等熱門的網址：LIKE 要掃過大部分的表才湊得到 50 筆
+        target = CitationService.top_sources(1000, kind='url')[-1]
+        source_id = target['id']
+        path = target['canonical'].split('://', 1)[1]
+        results['citing_target'] = {'canonical': target['canonical'], 'citations': target['citation_count']}
+        results['citing'] = {
+            'index': timed(lambda: CitationService.citing_arguments(source_id, 50), args.repeat),
+            'like_scan': timed(lambda: db.session.execute(
+                select(Argument.id).where(Argument.sources.contains(path)).order_by(Argument.id).limit(50)).all(),
+                args.scan_repeat),
+        }
+
+    print(f"{args.arguments:,} 則論述")
+    print(f"backfill   {b['seconds']:.1f} 秒（{b['arguments_per_sec']:,} 則/秒），{b['links']:,} 筆引用")
+    print(f"distinct   原文 {results['distinct']['raw']:,} 種寫法 → 正規化後 {results['distinct']['canonical']:,} 個來源")
+    t, c = results['top'], results['citing']
+    print(f"top 20     索引 p50 {t['index']['p50_ms']} ms；JSON scan p50 {t['json_scan']['p50_ms']:,} ms"
+          f"（結果一致：{t['same_counts']}）")
+    print(f"citing     索引 p50 {c['index']['p50_ms']} ms；LIKE 掃描 p50 {c['like_scan']['p50_ms']:,} ms")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    shutil.rmtree(workdir, ignore_errors=True)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
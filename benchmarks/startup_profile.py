@@ -0,0 +1,162 @@
+"""
+Worker 冷啟動分析
+
+每個情境都在全新的 Python 直譯器中執行，量測：
+    ready_ms         匯入 + 建立應用程式，直到 worker 可以接受請求
+    first_request_ms 第一個請求（含延遲初始化與模板編譯）的延遲
+    total_ms         從直譯器啟動到第一個回應完成的總時間（由父行程量測）
+
+情境：
+    eager       原本的 create_app：無模板快取
+    eager_cache create_app + 預先編譯的 Jinja 位元組碼快取
+    lazy        wsgi.application（位元組碼快取），第一個請求才建立 app
+
+另外以 `-X importtime` 列出 eager 模式下最耗時的匯入。
+
+使用方式：
+    python -m benchmarks.startup_profile --runs 5 --output startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD_EAGER = r'''
+import json, time
+t0 = time.perf_counter()
+from app import create_app
+app = create_app()
+t1 = time.perf_counter()
+response = app.test_client().get(PATH)
+response.get_data()
+t2 = time.perf_counter()
+print(json.dumps({"ready_ms": (t1 - t0) * 1000, "first_request_ms": (t2 - t1) * 1000, "status": response.status_code}))
+'''
+
+CHILD_LAZY = r'''
+import json, time
+t0 = time.perf_counter()
+from wsgi import application
+from werkzeug.test import Client
+t1 = time.perf_counter()
+response = Client(application).get(PATH)
+response.get_data()
+t2 = time.perf_counter()
+print(json.dumps({"ready_ms": (t1 - t0) * 1000, "first_request_ms": (t2 - t1) * 1000, "status": response.status_code}))
+'''
+
+CHILD_PRECOMPILE = r'''
+from app import create_app
+result = create_app().test_cli_runner().invoke(args=["precompile-templates"])
+print(result.output.strip())
+'''
+
+
+def child_env(database_url: str, cache_dir: str = None) -> dict:
+    env = dict(os.environ)
+    env.update({
+        'DATABASE_URL': database_url,
+        'LINE_CHANNEL_ID': env.get('LINE_CHANNEL_ID', 'bench'),
+        'LINE_CHANNEL_SECRET': env.get('LINE_CHANNEL_SECRET', 'bench'),
+    })
+    env.pop('TEMPLATE_CACHE_DIR', None)
+    if cache_dir:
+        env['TEMPLATE_CACHE_DIR'] = cache_dir
+    return env
+
+
+def run_child(code: str, path: str, env: dict, extra_args=()) -> subprocess.CompletedProcess:
+    source = f'PATH = {path!r}\n' + code
+    return subprocess.run([sys.executable, *extra_args, '-c', source], cwd=ROOT, env=env,
+                          capture_output=True, text=True, check=True)
+
+
+def measure(code: str, path: str, env: dict, runs: int) -> dict:
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        proc = run_child(code, path, env)
+        total = (time.perf_counter() - started) * 1000
+        result = json.loads(proc.stdout.strip().splitlines()[-1])
+        result['total_ms'] = total
+        samples.append(result)
+
+    return {
+        key: round(statistics.median(s[key] for s in samples), 2)
+        for key in ('ready_ms', 'first_request_ms', 'total_ms')
+    } | {'status': samples[-1]['status'], 'runs': runs}
+
+
+def slowest_imports(path: str, env: dict, limit: int = 10) -> list:
+    """解析 -X importtime 輸出，回傳累計時間最長的頂層匯入"""
+    proc = run_child(CHILD_EAGER, path, env, extra_args=('-X', 'importtime'))
+    entries = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip())) // 2
+        if depth <= 1:
+            entries.append({'module': name.strip(), 'cumulative_ms': round(int(cumulative_us) / 1000, 2)})
+    entries.sort(key=lambda e: e['cumulative_ms'], reverse=True)
+    return entries[:limit]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='DSWeb worker 冷啟動分析')
+    parser.add_argument('--runs', type=int, default=5, help='每個情境的執行次數（取中位數）')
+    parser.add_argument('--path', default='/debate-board', help='第一個請求的路徑')
+    parser.add_argument('--output', help='結果 JSON 檔案')
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix='dsweb-startup-')
+    database_url = f"sqlite:///{os.path.join(workdir, 'startup.db')}"
+    cache_dir = os.path.join(workdir, 'jinja_cache')
+
+    # 建立資料表與少量資料，讓第一個請求走完整的查詢與渲染
+    subprocess.run([sys.executable, '-c',
+                    'from app import create_app\n'
+                    'from benchmarks.seed import seed_database\n'
+                    'app = create_app()\n'
+                    'with app.app_context():\n'
+                    '    seed_database(users=50, debates=200, hall_messages=200)\n'],
+                   cwd=ROOT, env=child_env(database_url), check=True, capture_output=True)
+    precompiled = run_child(CHILD_PRECOMPILE, args.path, child_env(database_url, cache_dir=cache_dir))
+
+    results = {
+        'path': args.path,
+        'precompile': precompiled.stdout.strip(),
+        'scenarios': {
+            'eager': measure(CHILD_EAGER, args.path, child_env(database_url), args.runs),
+            'eager_cache': measure(CHILD_EAGER, args.path,
+                                   child_env(database_url, cache_dir=cache_dir), args.runs),
+            'lazy': measure(CHILD_LAZY, args.path,
+                            child_env(database_url, cache_dir=cache_dir), args.runs),
+        },
+        'slowest_imports': slowest_imports(args.path, child_env(database_url)),
+    }
+
+    baseline = results['scenarios']['eager']
+    print(f"{'scenario':<14}{'ready ms':>12}{'first req ms':>15}{'total ms':>12}{'vs eager':>10}")
+    for name, stats in results['scenarios'].items():
+        change = (stats['total_ms'] - baseline['total_ms']) / baseline['total_ms'] * 100
+        print(f"{name:<14}{stats['ready_ms']:>12.1f}{stats['first_request_ms']:>15.1f}"
+              f"{stats['total_ms']:>12.1f}{change:>+9.1f}%")
+    print('\n最耗時的匯入（eager）：')
+    for entry in results['slowest_imports']:
+        print(f"  {entry['cumulative_ms']:>8.1f} ms  {entry['module']}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,187 @@
+"""
+搜尋自動完成的基準測試
+
+建立 --debates 場辯論（預設 1,000,000 場），標題由 related_bench 的 Zipf 詞彙組成，
+部分標題以英數字開頭（AI、5G…）或中間有逗號，hot_score 為隨機值。量測：
+    build     SuggestService.rebuild 的時間、鍵數、索引大小與行程 RSS 增加量；再以 --budget-mb 的上限建立一次
+    load      從索引檔載入的時間
+    top       只查索引（PrefixIndex.top）的 p50 / p95 / p99，依輸入字數 1–4 分開統計
+    suggest   SuggestService.suggest（索引 + 一次主鍵查詢）與 /api/search/suggest 的 p50 / p95 / p99
+    baseline  以 LIKE '%q%' 依 hot_score 取前 8 筆（目前搜尋頁的做法）的 p50
+
+使用方式：
+    python -m benchmarks.suggest_bench --debates 1000000
+    python -m benchmarks.suggest_bench --debates 100000 --queries 5000
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+os.environ.setdefault('LINE_CHANNEL_ID', 'bench')
+os.environ.setdefault('LINE_CHANNEL_SECRET', 'bench')
+
+from sqlalchemy import desc, select  # noqa: E402
+
+from app import create_app, db  # noqa: E402
+from app.models.debate import Debate  # noqa: E402
+from app.services import suggest_service  # noqa: E402
+from app.services.suggest_service import SuggestService  # noqa: E402
+from app.suggest import PrefixIndex, prefix_keys  # noqa: E402
+from benchmarks.http_bench import make_config, percentile  # noqa: E402
+from benchmarks.related_bench import Corpus  # noqa: E402
+from benchmarks.seed import CATEGORIES, STATUSES, _bulk_insert, seed_database  # noqa: E402
+
+LATIN = ['AI', '5G', 'ESG', 'NFT', 'GDP', 'COVID', 'iPhone', 'YouTube', 'EV', 'MRT', 'LGBT', 'PM2.5']
+
+
+def bench_config(workdir: str):
+    base = make_config(f"sqlite:///{os.path.join(workdir, 'main.db')}")
+    return type('SuggestBenchConfig', (base,), {'SUGGEST_INDEX_PATH': os.path.join(workdir, 'suggest.idx'),
+                                                'SUGGEST_MEMORY_MB': 1024,
+                                                'SUGGEST_REFRESH_SECONDS': 3600})
+
+
+def title_for(corpus: Corpus, rng: random.Random) -> str:
+    words = [corpus.words[w] for w in corpus._background(rng.randint(3, 6)).tolist()]
+    if rng.random() < 0.3:
+        words.insert(rng.randint(1, len(words) - 1), '，')
+    if rng.random() < 0.2:
+        words.insert(0, rng.choice(LATIN) + ' ')
+    return ''.join(words) + '？'
+
+
+def debate_rows(corpus: Corpus, count: int, users: int, now: datetime):
+    rng = random.Random(11)
+    for i in range(1, count + 1):
+        yield {
+            'id': i,
+            'title': title_for(corpus, rng)[:200],
+            'description': '',
+            'category': rng.choice(CATEGORIES),
+            'creator_id': rng.randint(1, users),
+            'pro_participant_id': None,
+            'status': rng.choice(STATUSES),
+            'time_limit_hours': 24,
+            'created_at': now,
+            'views': 0,
+            'hot_score': rng.expovariate(1.0),
+        }
+
+
+def _rss_mb() -> float:
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * resource.getpagesize() / 1048576
+
+
+def sample_queries(titles, count: int, rng: random.Random):
+    """從現有標題的鍵取前 1–4 個字，模擬輸入到一半的關鍵字"""
+    queries = {length: [] for length in (1, 2, 3, 4)}
+    for title in rng.sample(titles, min(count, len(titles))):
+        key = rng.choice(prefix_keys(title)).decode('utf-8')
+        length = rng.randint(1, 4)
+        queries[length].append(key[:length])
+    return queries
+
+
+def timed(fn, items):
+    samples = []
+    for item in items:
+        started = time.perf_counter()
+        fn(item)
+        samples.append((time.perf_counter() - started) * 1000)
+    return {'p50_ms': round(percentile(samples, 50), 3), 'p95_ms': round(percentile(samples, 95), 3),
+            'p99_ms': round(percentile(samples, 99), 3)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='DSWeb 搜尋自動完成基準測試')
+    parser.add_argument('--debates', type=int, default=1_000_000)
+    parser.add_argument('--users', type=int, default=5000)
+    parser.add_argument('--queries', type=int, default=4000)
+    parser.add_argument('--baseline-queries', type=int, default=20)
+    parser.add_argument('--budget-mb', type=int, default=64, help='第二次建立時的記憶體上限')
+    parser.add_argument('--keep', action='store_true', help='保留暫存資料庫與索引')
+    parser.add_argument('--output', help='結果 JSON 檔案')
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix='dsweb-suggest-')
+    app = create_app(bench_config(workdir))
+    results = {'debates': args.debates}
+    rng = random.Random(5)
+
+    with app.app_context():
+        started = time.perf_counter()
+        seed_database(users=args.users, debates=0, arguments_per_debate=0, hall_messages=0, follows_per_debate=0)
+        _bulk_insert(Debate.__table__, debate_rows(Corpus(), args.debates, args.users, datetime.utcnow()), 20000)
+        results['seed_seconds'] = round(time.perf_counter() - started, 1)
+
+        before = _rss_mb()
+        results['build'] = SuggestService.rebuild()
+        results['build']['rss_delta_mb'] = round(_rss_mb() - before, 1)
+        results['index_file_mb'] = round(os.path.getsize(app.config['SUGGEST_INDEX_PATH']) / 1048576, 1)
+
+        app.config['SUGGEST_MEMORY_MB'] = args.budget_mb
+        budget = SuggestService._build()
+        results['budget'] = {'memory_mb': args.budget_mb, 'debates': len(budget), 'skipped': budget.skipped,
+                             'mb': round(budget.nbytes() / 1048576, 1)}
+        del budget
+        app.config['SUGGEST_MEMORY_MB'] = 1024
+
+        started = time.perf_counter()
+        index = PrefixIndex.load(app.config['SUGGEST_INDEX_PATH'])
+        results['load_ms'] = round((time.perf_counter() - started) * 1000, 1)
+        suggest_service._index, suggest_service._checked_at = index, time.monotonic()
+
+        titles = db.session.execute(select(Debate.title).where(Debate.id <= 200000)).scalars().all()
+        queries = sample_queries(titles, args.queries, rng)
+        del titles
+        results['top'] = {length: dict(timed(lambda q: index.top(q, 12), items),
+                                       avg_matches=round(sum(index.count(q) for q in items) / len(items)))
+                          for length, items in queries.items()}
+        mixed = [q for items in queries.values() for q in items]
+        rng.shuffle(mixed)
+        results['suggest'] = timed(SuggestService.suggest, mixed)
+        db.session.remove()
+
+        baseline_stmt = lambda q: db.session.execute(  # noqa: E731
+            select(Debate.id, Debate.title).where(Debate.title.contains(q))
+            .order_by(desc(Debate.hot_score)).limit(8)).all()
+        results['baseline'] = timed(baseline_stmt, mixed[:args.baseline_queries])
+        example = next(q for q in queries[2])
+        results['example'] = {'query': example,
+                              'debates': [d['title'] for d in SuggestService.suggest(example)['debates'][:3]]}
+
+    client = app.test_client()
+    results['endpoint'] = timed(lambda q: client.get('/api/search/suggest', query_string={'q': q}).get_data(),
+                                mixed[:1000])
+
+    b, g = results['build'], results['budget']
+    print(f"{args.debates:,} 場辯論（產生資料 {results['seed_seconds']} 秒）")
+    print(f"build     {b['seconds']:.1f} 秒，{b['keys']:,} 個鍵，索引 {b['mb']} MB（RSS +{b['rss_delta_mb']} MB，"
+          f"檔案 {results['index_file_mb']} MB，載入 {results['load_ms']} ms）")
+    print(f"budget    上限 {g['memory_mb']} MB：收錄 {g['debates']:,} 場、略過 {g['skipped']:,} 場（{g['mb']} MB）")
+    for length, stats in results['top'].items():
+        print(f"top       {length} 個字（平均 {stats['avg_matches']:,} 個符合的鍵）："
+              f"p50 {stats['p50_ms']} / p95 {stats['p95_ms']} / p99 {stats['p99_ms']} ms")
+    for name in ('suggest', 'endpoint', 'baseline'):
+        stats = results[name]
+        print(f"{name:<9} p50 {stats['p50_ms']} / p95 {stats['p95_ms']} / p99 {stats['p99_ms']} ms")
+    print(f"範例：{results['example']['query']} → {results['example']['debates']}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    if not args.keep:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,159 @@
+"""
+背景工作佇列的基準測試
+
+建立 --debates 場辯論（每場 --followers 位關注者），依序執行建立辯論、加入、每場 6 則論述與 --hall 則大廳訊息，
+比較副作用（關注通知展開、活動統計）在請求內執行（TASK_ALWAYS_EAGER）與排入佇列時的請求延遲 p50 / p95，
+並量測：
+    backlog  請求全部完成後以 `flask worker --burst` 的方式清空佇列，batch size 1 與 --batch-size 的處理速度
+    live     另一個 worker 行程同時處理時，TaskQueue.stats() 的等待與完成延遲 p50 / p95
+
+使用方式：
+    python -m benchmarks.task_queue_bench --debates 30 --followers 300
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+os.environ.setdefault('LINE_CHANNEL_ID', 'bench')
+os.environ.setdefault('LINE_CHANNEL_SECRET', 'bench')
+
+from sqlalchemy import func, select  # noqa: E402
+
+from app import create_app, db  # noqa: E402
+from app.models.debate import DebateFollow  # noqa: E402
+from app.models.notification import Notification  # noqa: E402
+from app.services.debate_service import DebateService, HallService  # noqa: E402
+from app.tasks import TaskQueue, _worker_process, work  # noqa: E402
+from benchmarks.http_bench import make_config, percentile  # noqa: E402
+from benchmarks.seed import CATEGORIES, _bulk_insert, _text, seed_database  # noqa: E402
+
+OPERATIONS = ('create_debate', 'join_debate', 'add_argument', 'post_message')
+
+
+def bench_config(workdir: str, eager: bool):
+    base = make_config(f"sqlite:///{os.path.join(workdir, 'main.db')}")
+    return type('TaskBenchConfig', (base,), {
+        'TASK_ALWAYS_EAGER': eager,
+        'TASK_QUEUE_URL': f"sqlite:///{os.path.join(workdir, 'tasks.db')}",
+    })
+
+
+def timed(samples: dict, op: str, fn, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    samples[op].append((time.perf_counter() - started) * 1000)
+    db.session.remove()
+    return result
+
+
+def run_requests(args) -> dict:
+    """依序送出請求，回傳各操作的延遲樣本（毫秒）"""
+    samples = {op: [] for op in OPERATIONS}
+    since = datetime.utcnow() - timedelta(hours=1)
+    followers = range(3, args.followers + 3)
+    for n in range(args.debates):
+        debate_id = timed(samples, 'create_debate', lambda data: DebateService.create_debate(1, data).id, {
+            'title': f'基準測試辯論 {n}', 'description': _text(random.Random(n), 30),
+            'category': CATEGORIES[n % len(CATEGORIES)], 'position': 'pro'})
+        _bulk_insert(DebateFollow.__table__, ({'user_id': user_id, 'debate_id': debate_id, 'created_at': since}
+                                              for user_id in followers), 5000)
+        timed(samples, 'join_debate', DebateService.join_debate, debate_id, 2, 'con')
+        for turn in range(6):
+            timed(samples, 'add_argument', DebateService.add_argument, debate_id, 1 if turn % 2 == 0 else 2,
+                  f'第 {turn} 則論述 ' + '內容' * 40)
+    for n in range(args.hall):
+        timed(samples, 'post_message', HallService.post_message, 3 + n % args.followers, f'大廳訊息 {n}')
+    return samples
+
+
+def summary(samples: dict) -> dict:
+    return {op: {'p50_ms': round(percentile(values, 50), 2), 'p95_ms': round(percentile(values, 95), 2)}
+            for op, values in samples.items()}
+
+
+def scenario(args, eager: bool, drain_batch: int = None, live: bool = False) -> dict:
+    workdir = tempfile.mkdtemp(prefix='dsweb-tasks-')
+    config = bench_config(workdir, eager)
+    app = create_app(config)
+    result = {}
+    with app.app_context():
+        seed_database(users=args.followers + 2, debates=0, arguments_per_debate=0, hall_messages=0,
+                      follows_per_debate=0)
+        worker = None
+        if live:
+            TaskQueue.engine()  # 先建立佇列資料表
+            overrides = {key: app.config[key] for key in ('SQLALCHEMY_DATABASE_URI', 'SQLALCHEMY_ENGINE_OPTIONS',
+                                                         'TASK_QUEUE_URL', 'SECRET_KEY')}
+            worker = multiprocessing.get_context('spawn').Process(
+                target=_worker_process,
+                args=(overrides, 'bench-live', {'batch_size': args.batch_size, 'poll_interval': 0.02}))
+            worker.start()
+            time.sleep(2)  # 等待子行程啟動
+
+        result['requests'] = summary(run_requests(args))
+
+        if drain_batch:
+            queued = sum(s['ready'] for s in TaskQueue.stats().values())
+            drained = work('bench-drain', batch_size=drain_batch, burst=True)
+            result['drain'] = {'tasks': queued, 'batch_size': drain_batch, 'batches': drained['batches'],
+                               'seconds': round(drained['seconds'], 3),
+                               'tasks_per_sec': round(drained['processed'] / drained['seconds'])}
+        if worker is not None:
+            deadline = time.time() + 120
+            while time.time() < deadline:
+                pending = TaskQueue.stats(window=3600).values()
+                if all(s['ready'] + s['running'] == 0 for s in pending):
+                    break
+                time.sleep(0.1)
+            worker.terminate()  # SIGTERM：處理完目前這批才結束
+            worker.join()
+            result['queue'] = TaskQueue.stats(window=3600)
+        result['inbox_rows'] = db.session.execute(select(func.count()).select_from(Notification)).scalar()
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='DSWeb 背景工作佇列基準測試')
+    parser.add_argument('--debates', type=int, default=30)
+    parser.add_argument('--followers', type=int, default=300)
+    parser.add_argument('--hall', type=int, default=200)
+    parser.add_argument('--batch-size', type=int, default=100)
+    parser.add_argument('--output', help='結果 JSON 檔案')
+    args = parser.parse_args(argv)
+
+    results = {
+        'eager': scenario(args, eager=True),
+        'queued_batch_1': scenario(args, eager=False, drain_batch=1),
+        'queued_batch_n': scenario(args, eager=False, drain_batch=args.batch_size),
+        'live': scenario(args, eager=False, live=True),
+    }
+
+    print(f"{'請求':<14}{'同步 p50':>10}{'同步 p95':>10}{'佇列 p50':>10}{'佇列 p95':>10}   (ms)")
+    for op in OPERATIONS:
+        eager, queued = results['eager']['requests'][op], results['queued_batch_n']['requests'][op]
+        print(f"{op:<14}{eager['p50_ms']:>10}{eager['p95_ms']:>10}{queued['p50_ms']:>10}{queued['p95_ms']:>10}")
+    for key in ('queued_batch_1', 'queued_batch_n'):
+        d = results[key]['drain']
+        print(f"清空佇列 batch size {d['batch_size']:>4}：{d['tasks']:,} 筆工作 {d['seconds']} 秒"
+              f"（{d['tasks_per_sec']:,} 筆/秒，{d['batches']} 批）")
+    for name, s in sorted(results['live']['queue'].items()):
+        print(f"同時處理 {name:<16} 完成 {s['done']:>5}，等待 p50/p95 "
+              f"{(s['wait_p50'] or 0) * 1000:.1f}/{(s['wait_p95'] or 0) * 1000:.1f} ms，"
+              f"完成 p50/p95 {(s['latency_p50'] or 0) * 1000:.1f}/{(s['latency_p95'] or 0) * 1000:.1f} ms")
+    rows = {key: results[key]['inbox_rows'] for key in results}
+    print(f"收件匣列數（應相同）：{rows}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
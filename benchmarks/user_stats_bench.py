@@ -0,0 +1,174 @@
+"""
+使用者統計的基準測試
+
+以 seed.py 建立 --debates 場辯論（每場 --arguments-per-debate 則論述）後量測：
+    recompute   UserStatsService.recompute（numpy 逐批，含寫回）vs 同樣逐批讀取、以 Python 迴圈逐列計算
+                （不寫回），兩者結果必須一致
+    write       每則論述的統計更新：argument_posted（一個 MAX + 一次 upsert）
+                vs 每次從該使用者的歷史重算平均（不維護累加欄位時的做法）
+
+使用方式：
+    python -m benchmarks.user_stats_bench --debates 200000
+    python -m benchmarks.user_stats_bench --debates 20000 --writes 200
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime
+
+os.environ.setdefault('LINE_CHANNEL_ID', 'bench')
+os.environ.setdefault('LINE_CHANNEL_SECRET', 'bench')
+
+import numpy as np  # noqa: E402
+from sqlalchemy import select  # noqa: E402
+
+from app import create_app, db  # noqa: E402
+from app.models.debate import Argument, Debate, UserStats  # noqa: E402
+from app.services.user_stats_service import COUNTERS, UserStatsService, _average_minutes  # noqa: E402
+from benchmarks.http_bench import make_config, percentile  # noqa: E402
+from benchmarks.seed import seed_database  # noqa: E402
+
+arguments = Argument.__table__
+debates = Debate.__table__
+
+
+def python_recompute(chunk_size: int):
+    """逐列計算的對照組：讀取方式與 recompute 相同，回應時間以字典記錄每場辯論雙方的上一則"""
+    totals = defaultdict(lambda: dict.fromkeys(COUNTERS, 0))
+    columns = (debates.c.id, debates.c.status, debates.c.pro_participant_id, debates.c.con_participant_id,
+               debates.c.started_at, debates.c.completed_at)
+    last_id = 0
+    while True:
+        rows = db.session.execute(
+            select(*columns).where(debates.c.id > last_id).order_by(debates.c.id).limit(chunk_size)).all()
+        if not rows:
+            return totals
+        last_id = rows[-1].id
+        for row in rows:
+            for user_id in (row.pro_participant_id, row.con_participant_id):
+                if user_id is not None:
+                    totals[user_id]['total_debates'] += 1
+            if row.status == 'completed' and row.started_at and row.completed_at:
+                minutes = max(int((row.completed_at - row.started_at).total_seconds() // 60), 0)
+                for user_id in (row.pro_participant_id, row.con_participant_id):
+                    if user_id is not None:
+                        totals[user_id]['total_time_debating'] += minutes
+        stmt = (select(arguments.c.debate_id, arguments.c.user_id, arguments.c.position, arguments.c.created_at)
+                .where(arguments.c.debate_id.between(rows[0].id, rows[-1].id))
+                .order_by(arguments.c.debate_id, arguments.c.round_number, arguments.c.created_at, arguments.c.id))
+        starts = {row.id: row.started_at for row in rows}
+        last = {}
+        for debate_id, user_id, position, created_at in db.session.execute(stmt):
+            reference = last.get((debate_id, 'con' if position == 'pro' else 'pro'), starts[debate_id])
+            last[(debate_id, position)] = created_at
+            if reference is None or created_at is None:
+                continue
+            totals[user_id]['response_count'] += 1
+            totals[user_id]['response_seconds'] += max(int((created_at - reference).total_seconds()), 0)
+
+
+def history_average(user_id: int) -> int:
+    """對照組：每次寫入都從該使用者參與過的辯論重算平均回應時間"""
+    involved = select(arguments.c.debate_id).where(arguments.c.user_id == user_id).distinct()
+    rows = db.session.execute(
+        select(arguments.c.debate_id, arguments.c.user_id, arguments.c.position, arguments.c.created_at,
+               debates.c.started_at)
+        .join(debates, debates.c.id == arguments.c.debate_id).where(arguments.c.debate_id.in_(involved))
+        .order_by(arguments.c.debate_id, arguments.c.round_number, arguments.c.created_at, arguments.c.id)).all()
+    if not rows:
+        return 0
+    debate_ids, user_ids, positions, created_at, started_at = zip(*rows)
+    valid, seconds = UserStatsService.response_times(
+        np.array(debate_ids), np.array(positions), np.array(created_at, dtype='datetime64[us]'),
+        np.array(started_at, dtype='datetime64[us]'))
+    mine = np.array(user_ids)[valid] == user_id
+    return _average_minutes(int(mine.sum()), int(seconds[mine].sum()))
+
+
+def timed(fn, samples: int):
+    times = []
+    for i in range(samples):
+        started = time.perf_counter()
+        fn(i)
+        times.append((time.perf_counter() - started) * 1000)
+    return {'p50_ms': round(percentile(times, 50), 3), 'p99_ms': round(percentile(times, 99), 3)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='DSWeb 使用者統計基準測試')
+    parser.add_argument('--users', type=int, default=5000)
+    parser.add_argument('--debates', type=int, default=200_000)
+    parser.add_argument('--arguments-per-debate', type=int, default=6)
+    parser.add_argument('--chunk-size', type=int, default=2000)
+    parser.add_argument('--writes', type=int, default=500, help='量測單則更新的次數')
+    parser.add_argument('--output', help='結果 JSON 檔案')
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix='dsweb-stats-')
+    app = create_app(make_config(f"sqlite:///{os.path.join(workdir, 'bench.db')}"))
+    results = {}
+
+    with app.app_context():
+        results['seeded'] = seed_database(users=args.users, debates=args.debates,
+                                          arguments_per_debate=args.arguments_per_debate, hall_messages=0,
+                                          follows_per_debate=0, argument_words=5)
+        total_arguments = args.debates * args.arguments_per_debate
+
+        # 交替執行兩次取較快的一次，避免第一次讀取時頁面快取尚未暖機的影響
+        numpy_runs, loop_runs = [], []
+        for _ in range(2):
+            numpy_runs.append(UserStatsService.recompute(chunk_size=args.chunk_size)['seconds'])
+            started = time.perf_counter()
+            expected = python_recompute(args.chunk_size)
+            loop_runs.append(time.perf_counter() - started)
+        numpy_seconds, loop_seconds = min(numpy_runs), min(loop_runs)
+        stored = {row.user_id: row for row in db.session.execute(select(UserStats.__table__))}
+        same = all(all(getattr(stored[user_id], name) == value[name] for name in COUNTERS)
+                   for user_id, value in expected.items() if any(value.values()))
+        results['recompute'] = {
+            'numpy_seconds': round(numpy_seconds, 2),
+            'numpy_arguments_per_sec': round(total_arguments / numpy_seconds),
+            'python_loop_seconds': round(loop_seconds, 2),
+            'python_loop_arguments_per_sec': round(total_arguments / loop_seconds),
+            'users': len(stored),
+            'identical': same,
+        }
+
+        ongoing = list(db.session.execute(
+            select(debates.c.id, debates.c.pro_participant_id, debates.c.started_at)
+            .where(debates.c.status == 'ongoing').limit(args.writes)))
+        now = datetime.utcnow()
+
+        def post(i):
+            row = ongoing[i % len(ongoing)]
+            argument = Argument(debate_id=row.id, user_id=row.pro_participant_id, position='pro', created_at=now)
+            UserStatsService.argument_posted(argument, Debate(id=row.id, started_at=row.started_at))
+
+        results['write'] = {
+            'incremental': timed(post, args.writes),
+            'history_recompute': timed(lambda i: history_average(ongoing[i % len(ongoing)].pro_participant_id),
+                                       min(args.writes, 100)),
+        }
+        db.session.rollback()
+
+    r, w = results['recompute'], results['write']
+    print(f"{args.debates:,} 場辯論、{total_arguments:,} 則論述、{args.users:,} 位使用者")
+    print(f"recompute  numpy {r['numpy_seconds']} 秒（{r['numpy_arguments_per_sec']:,} 則/秒）；"
+          f"Python 迴圈 {r['python_loop_seconds']} 秒（{r['python_loop_arguments_per_sec']:,} 則/秒）；結果一致：{r['identical']}")
+    print(f"write      累加 p50 {w['incremental']['p50_ms']} ms（p99 {w['incremental']['p99_ms']}）；"
+          f"從歷史重算 p50 {w['history_recompute']['p50_ms']} ms（p99 {w['history_recompute']['p99_ms']}）")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    shutil.rmtree(workdir, ignore_errors=True)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
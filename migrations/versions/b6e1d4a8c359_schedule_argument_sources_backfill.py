@@ -0,0 +1,65 @@
+"""schedule argument sources backfill
+
+Revision ID: b6e1d4a8c359
+Revises: c254fa88268b
+Create Date: 2026-10-19 15:32:40.118254
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b6e1d4a8c359'
+down_revision = 'c254fa88268b'
+branch_labels = None
+depends_on = None
+
+JOB = 'argument_sources'
+RANGES = 8
+
+backfill_jobs = sa.table(
+    'backfill_jobs',
+    sa.column('name', sa.String), sa.column('table_name', sa.String), sa.column('id_min', sa.Integer),
+    sa.column('id_max', sa.Integer), sa.column('status', sa.String), sa.column('rows', sa.BigInteger),
+    sa.column('created_at', sa.DateTime), sa.column('finished_at', sa.DateTime),
+)
+backfill_ranges = sa.table(
+    'backfill_ranges',
+    sa.column('job', sa.String), sa.column('range_start', sa.Integer), sa.column('range_end', sa.Integer),
+    sa.column('next_id', sa.Integer), sa.column('rows', sa.BigInteger), sa.column('updated_at', sa.DateTime),
+)
+arguments = sa.table('arguments', sa.column('id', sa.Integer))
+
+
+def upgrade():
+    # 既有論述的 sources 原文交給回填工作 argument_sources 解析：這裡只登記工作與 id 範圍
+    # （與 app.backfill.schedule 寫入相同的列，但不匯入應用程式程式碼），
+    # 部署後以 `flask db backfill argument_sources` 分批執行
+    connection = op.get_bind()
+    if connection.execute(sa.select(backfill_jobs.c.name).where(backfill_jobs.c.name == JOB)).first() is not None:
+        return
+
+    low, high = connection.execute(sa.select(sa.func.min(arguments.c.id), sa.func.max(arguments.c.id))).one()
+    low, high = (low, high) if low is not None else (0, -1)
+    now = datetime.utcnow()
+    # 沒有論述（新安裝）時沒有東西要回填，直接標記完成
+    done = low > high
+    op.bulk_insert(backfill_jobs, [{'name': JOB, 'table_name': 'arguments', 'id_min': low, 'id_max': high,
+                                    'status': 'done' if done else 'pending', 'rows': 0, 'created_at': now,
+                                    'finished_at': now if done else None}])
+    span = high - low + 1
+    parts = min(RANGES, span) if span > 0 else 0
+    bounds = [low + span * i // parts for i in range(parts + 1)] if parts else []
+    if parts:
+        op.bulk_insert(backfill_ranges, [
+            {'job': JOB, 'range_start': start, 'range_end': end, 'next_id': start, 'rows': 0, 'updated_at': now}
+            for start, end in zip(bounds, bounds[1:])])
+
+
+def downgrade():
+    # 只移除登記與進度；已建立的來源對應由 2d8f4b6a9e13 的 downgrade 移除
+    op.execute(sa.text("DELETE FROM backfill_ranges WHERE job = 'argument_sources'"))
+    op.execute(sa.text("DELETE FROM backfill_jobs WHERE name = 'argument_sources'"))
@@ -3,4 +3,8 @@ from app import create_app
 app = create_app()
 
 if __name__ == "__main__":
+    if app.config['TASK_ALWAYS_EAGER'] is False:
+        # 通知、活動彙總等副作用只寫入背景工作佇列，沒有 worker 時不會被處理
+        app.logger.warning("TASK_ALWAYS_EAGER 已關閉：請另外執行 `flask worker`，"
+                           "或移除這個設定讓開發伺服器直接在請求內執行背景工作")
     app.run(debug=True)
@@ -0,0 +1,76 @@
+"""
+測試共用設定
+
+每個測試使用 tmp_path 下獨立的主資料庫、封存資料庫、佇列與索引檔，背景工作預設直接在請求內執行。
+"""
+import os
+from datetime import datetime
+
+import pytest
+
+os.environ.setdefault('LINE_CHANNEL_ID', 'test')
+os.environ.setdefault('LINE_CHANNEL_SECRET', 'test')
+
+from app import create_app, db  # noqa: E402
+from app.config import Config  # noqa: E402
+from app.models.debate import Debate  # noqa: E402
+from app.models.user import User  # noqa: E402
+
+
+def make_config(tmp_path, **overrides):
+    return type('TestConfig', (Config,), {
+        'TESTING': True,
+        'SECRET_KEY': 'test-secret',
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'main.db'}",
+        'ARCHIVE_DATABASE_URL': f"sqlite:///{tmp_path / 'archive.db'}",
+        'TASK_QUEUE_URL': f"sqlite:///{tmp_path / 'tasks.db'}",
+        'SNAPSHOT_DIR': str(tmp_path / 'snapshots'),
+        'RELATED_DIR': str(tmp_path / 'related'),
+        'SUGGEST_INDEX_PATH': str(tmp_path / 'suggest.idx'),
+        'DUPLICATE_INDEX_PATH': str(tmp_path / 'duplicates.idx'),
+        'TEMPLATE_CACHE_DIR': None,
+        'TASK_ALWAYS_EAGER': True,
+        **overrides,
+    })
+
+
+@pytest.fixture
+def test_config(tmp_path):
+    return make_config(tmp_path)
+
+
+@pytest.fixture
+def app(test_config):
+    app = create_app(test_config)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def users(app):
+    rows = [User(username=f'user{i}', line_user_id=f'line-{i}') for i in range(1, 4)]
+    db.session.add_all(rows)
+    db.session.commit()
+    return rows
+
+
+@pytest.fixture
+def make_debate(users):
+    def make(status='waiting', **fields):
+        debate = Debate(title=fields.pop('title', '是否應該全面實施四天工作制'), category=fields.pop('category', '社會'),
+                        creator_id=users[0].id, status=status, time_limit_hours=24,
+                        created_at=fields.pop('created_at', datetime.utcnow()), views=fields.pop('views', 0),
+                        **fields)
+        db.session.add(debate)
+        db.session.commit()
+        return debate
+    return make
@@ -0,0 +1,71 @@
+"""冷封存：封存後經 load_debate 與辯論頁讀回"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import db
+from app.models.debate import Argument, Debate, DebateFollow
+from app.services.archive_service import ArchiveService
+from app.services.citation_service import CitationService
+
+
+def test_archived_debate_round_trips_through_load_debate(app, client, make_debate, users):
+    finished = datetime.utcnow() - timedelta(days=120)
+    debate = make_debate('completed', title='城市是否應該禁止燃油機車', created_at=finished - timedelta(days=2),
+                         completed_at=finished, pro_participant_id=users[1].id, con_participant_id=users[2].id,
+                         views=42)
+    debate_id = debate.id
+    db.session.add_all([
+        Argument(debate_id=debate_id, user_id=users[1].id, position='pro', round_number=1,
+                 content='空污改善', created_at=finished - timedelta(hours=2)),
+        Argument(debate_id=debate_id, user_id=users[2].id, position='con', round_number=1,
+                 content='通勤成本', created_at=finished - timedelta(hours=1)),
+        DebateFollow(user_id=users[0].id, debate_id=debate_id),
+    ])
+    active = make_debate('completed', completed_at=datetime.utcnow() - timedelta(days=1))
+    db.session.commit()
+
+    totals = ArchiveService.archive(older_than_days=30)
+    assert totals['debates'] == 1 and totals['arguments'] == 2
+    db.session.expire_all()
+    assert db.session.get(Debate, debate_id) is None
+    assert db.session.get(Debate, active.id) is not None
+    assert Argument.query.filter_by(debate_id=debate_id).count() == 0
+
+    loaded, arguments = ArchiveService.load_debate(debate_id)
+    assert (loaded.title, loaded.status, loaded.views) == ('城市是否應該禁止燃油機車', 'completed', 42)
+    assert loaded.completed_at == finished
+    assert loaded.creator.username == users[0].username
+    assert (loaded.pro_participant.id, loaded.con_participant.id) == (users[1].id, users[2].id)
+    assert [argument.content for argument in arguments] == ['通勤成本', '空污改善']
+    assert arguments[0].user.id == users[2].id
+    assert [follow.user_id for follow in loaded.followers_rel] == [users[0].id]
+    assert ArchiveService.load_debate(active.id) is None
+
+    response = client.get(f'/debate/{debate_id}')
+    assert response.status_code == 200
+    assert '城市是否應該禁止燃油機車' in response.get_data(as_text=True)
+
+
+def test_batch_failing_midway_can_be_rerun(app, make_debate, users, monkeypatch):
+    debate = make_debate('completed', completed_at=datetime.utcnow() - timedelta(days=120))
+    db.session.add(Argument(debate_id=debate.id, user_id=users[0].id, position='pro', round_number=1,
+                            content='論點', created_at=datetime.utcnow() - timedelta(days=121)))
+    db.session.commit()
+    debate_id = debate.id
+    ArchiveService.ensure_tables()
+
+    # 封存端已提交、主資料庫的刪除失敗
+    def fail(connection, source_ids=None):
+        raise RuntimeError('主資料庫寫入失敗')
+    monkeypatch.setattr(CitationService, 'refresh_counts', staticmethod(fail))
+    with pytest.raises(RuntimeError):
+        ArchiveService.archive_batch([debate_id])
+    db.session.rollback()
+    assert db.session.get(Debate, debate_id) is not None
+    monkeypatch.undo()
+
+    ArchiveService.archive_batch([debate_id])
+    assert db.session.get(Debate, debate_id) is None
+    _, arguments = ArchiveService.load_debate(debate_id)
+    assert len(arguments) == 1
@@ -0,0 +1,41 @@
+"""重複辯論偵測：索引檔不存在時在背景建立"""
+import os
+import threading
+import time
+
+from app.services import duplicate_service
+from app.services.duplicate_service import DuplicateService
+
+
+def wait_for_build(timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if not any(t.name == 'duplicates-build' for t in threading.enumerate()):
+            return
+        time.sleep(0.01)
+    raise AssertionError('背景建立索引逾時')
+
+
+def test_missing_index_is_built_in_background(app, make_debate, monkeypatch):
+    monkeypatch.setattr(duplicate_service, '_index', None)
+    app.config['DUPLICATE_REFRESH_SECONDS'] = 0
+    existing = make_debate(title='台灣是否應該全面禁止死刑')
+    path = app.config['DUPLICATE_INDEX_PATH']
+    assert not os.path.exists(path)
+
+    DuplicateService.find('台灣是否應該全面禁止死刑？')  # 建好之前使用空索引，不等待
+    wait_for_build()
+
+    assert os.path.exists(path)
+    assert not os.path.exists(path + '.building')
+    assert [m['id'] for m in DuplicateService.find('台灣是否應該全面禁止死刑？')] == [existing.id]
+
+
+def test_new_debate_is_found_without_rebuild(app, make_debate, monkeypatch):
+    monkeypatch.setattr(duplicate_service, '_index', None)
+    make_debate(title='電動車是否真的比燃油車環保')
+    DuplicateService.build()
+    created = make_debate(title='遠距工作是否應該成為常態')
+    DuplicateService.debate_created(created)
+
+    assert [m['id'] for m in DuplicateService.find('遠距工作是否應該成為常態？')] == [created.id]
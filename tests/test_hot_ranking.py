@@ -0,0 +1,60 @@
+"""熱門度：增量重算的水位線與新辯論的初始分數"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import db
+from app.models.debate import Argument, Debate
+from app.models.job import JobState
+from app.services.hot_ranking import JOB_NAME, HotRankingService
+
+
+def score(debate_id):
+    db.session.expire_all()
+    return db.session.get(Debate, debate_id).hot_score
+
+
+def test_event_committed_after_refresh_is_counted_next_time(app, make_debate, users):
+    now = datetime.utcnow()
+    debate = make_debate('ongoing', created_at=now - timedelta(hours=1), last_activity_at=now - timedelta(hours=1))
+    HotRankingService.refresh(now=now)
+    assert JobState.get(JOB_NAME).watermark == now - timedelta(seconds=app.config['HOT_WATERMARK_LAG'])
+
+    # 時間戳記在上一次重算之前、提交在之後的論述
+    stamped = now - timedelta(seconds=10)
+    db.session.add(Argument(debate_id=debate.id, user_id=users[0].id, position='pro', round_number=1,
+                            content='論點', created_at=stamped))
+    db.session.get(Debate, debate.id).last_activity_at = stamped
+    db.session.commit()
+
+    later = now + timedelta(minutes=5)
+    HotRankingService.refresh(now=later)
+    incremental = score(debate.id)
+    HotRankingService.refresh(full=True, now=later)
+    assert incremental == pytest.approx(score(debate.id))
+
+
+def test_events_inside_lag_are_left_for_next_run(app, make_debate, users):
+    now = datetime.utcnow()
+    debate = make_debate('ongoing', created_at=now - timedelta(hours=1), last_activity_at=now)
+    db.session.add(Argument(debate_id=debate.id, user_id=users[0].id, position='pro', round_number=1,
+                            content='論點', created_at=now - timedelta(seconds=5)))
+    db.session.commit()
+
+    HotRankingService.refresh(now=now)
+    without_argument = score(debate.id)
+    HotRankingService.refresh(now=now + timedelta(minutes=5))
+
+    assert score(debate.id) > without_argument
+
+
+def test_new_debate_starts_with_creation_score(app, users):
+    from app.services.debate_service import DebateService
+
+    debate = DebateService.create_debate(users[0].id, {'title': '是否應該廢除死刑', 'category': '社會',
+                                                       'position': 'pro'})
+    initial = debate.hot_score
+    assert initial == pytest.approx(HotRankingService.initial_score(debate.created_at))
+
+    HotRankingService.refresh(now=debate.created_at + timedelta(minutes=5))
+    assert score(debate.id) == pytest.approx(initial)
@@ -0,0 +1,52 @@
+"""活動彙總：狀態計數隨轉換增減、migration 以既有資料填入累計值"""
+import os
+
+from flask_migrate import upgrade
+from sqlalchemy import text
+
+from app import create_app, db
+from app.services.debate_service import DebateService
+from app.services.rollup_service import RollupService
+
+MIGRATIONS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'migrations')
+
+
+def test_status_counts_follow_transitions(app, users):
+    debate = DebateService.create_debate(users[0].id, {'title': '核能是否應該延役', 'category': '環境',
+                                                       'position': 'pro'})
+    assert RollupService.status_counts()['waiting'] == 1
+
+    assert DebateService.join_debate(debate.id, users[1].id, 'con')
+
+    counts = RollupService.status_counts()
+    assert counts['waiting'] == 0
+    assert counts['ongoing'] == 1
+    assert RollupService.total('debate_created') == 1
+    assert RollupService.total('participant_joined') == 2
+    assert RollupService.total('debate_started') == 1
+
+
+def test_migration_seeds_totals_from_existing_rows(test_config):
+    app = create_app(test_config)
+    with app.app_context():
+        upgrade(directory=MIGRATIONS, revision='c4d8a1f06e27')
+        db.session.execute(text("INSERT INTO users (id, username) VALUES (1, 'a'), (2, 'b')"))
+        db.session.execute(text(
+            "INSERT INTO debates (id, title, category, creator_id, pro_participant_id, con_participant_id, status, "
+            "started_at, hot_score, hot_views_counted) VALUES "
+            "(1, 't1', '科技', 1, 1, 2, 'ongoing', CURRENT_TIMESTAMP, 0, 0), "
+            "(2, 't2', '科技', 1, 1, NULL, 'waiting', NULL, 0, 0), "
+            "(3, 't3', '社會', 1, NULL, 2, 'waiting', NULL, 0, 0)"))
+        db.session.execute(text("INSERT INTO hall_messages (user_id, content, message_type) "
+                                "VALUES (1, 'hi', 'general'), (2, 'go', 'challenge')"))
+        db.session.commit()
+
+        upgrade(directory=MIGRATIONS, revision='e5a2b7d90c14')
+
+        assert RollupService.status_counts()['waiting'] == 2
+        assert RollupService.status_counts()['ongoing'] == 1
+        assert RollupService.by_category('debate_created') == {'科技': 2, '社會': 1}
+        assert RollupService.total('participant_joined') == 4
+        assert RollupService.total('debate_started') == 1
+        assert RollupService.total('hall_message') == 2
+        db.session.remove()
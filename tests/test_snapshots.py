@@ -0,0 +1,46 @@
+"""已完成辯論快照的回應標頭"""
+from datetime import datetime
+
+from app.snapshots import build_snapshot
+
+
+def completed(make_debate, users):
+    return make_debate('completed', pro_participant_id=users[0].id, con_participant_id=users[1].id,
+                       completed_at=datetime.utcnow(), current_round=4)
+
+
+def test_snapshot_for_cookieless_visitor_is_public_without_cookie(client, make_debate, users):
+    debate = completed(make_debate, users)
+    assert build_snapshot(debate.id) > 0
+
+    response = client.get(f'/debate/{debate.id}', headers={'Accept-Encoding': 'gzip'})
+
+    assert response.status_code == 200
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.cache_control.public
+    assert 'Set-Cookie' not in response.headers
+    assert 'Accept-Encoding' in response.vary
+
+
+def test_snapshot_conditional_request(client, make_debate, users):
+    debate = completed(make_debate, users)
+    build_snapshot(debate.id)
+    etag = client.get(f'/debate/{debate.id}').headers['ETag']
+
+    response = client.get(f'/debate/{debate.id}', headers={'If-None-Match': etag})
+
+    assert response.status_code == 304
+    assert 'Set-Cookie' not in response.headers
+
+
+def test_logged_in_user_gets_dynamic_page(client, make_debate, users):
+    debate = completed(make_debate, users)
+    build_snapshot(debate.id)
+    with client.session_transaction() as session:
+        session['user_id'] = users[2].id
+
+    response = client.get(f'/debate/{debate.id}')
+    response.get_data()
+
+    assert response.status_code == 200
+    assert not response.cache_control.public
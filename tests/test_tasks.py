@@ -0,0 +1,127 @@
+"""背景工作佇列：直接執行的預設值、去重、租約與重試"""
+import time
+
+import pytest
+from sqlalchemy import select, update
+
+from app import db
+from app.models.task import tasks
+from app.stats import percentile
+from app.tasks import TaskQueue, always_eager, enqueue, process_batch, task
+
+calls = []
+
+
+@task('tests.record')
+def _record(payload):
+    calls.append(payload)
+
+
+@task('tests.flaky', max_attempts=2)
+def _flaky(payload):
+    raise RuntimeError('boom')
+
+
+@pytest.fixture
+def test_config(test_config):
+    return type('QueueConfig', (test_config,), {'TASK_ALWAYS_EAGER': False})
+
+
+@pytest.fixture(autouse=True)
+def reset_calls():
+    calls.clear()
+
+
+def rows():
+    with TaskQueue.engine().connect() as conn:
+        return conn.execute(select(tasks).order_by(tasks.c.id)).all()
+
+
+def make_visible():
+    with TaskQueue.engine().begin() as conn:
+        conn.execute(update(tasks).values(visible_at=time.time()))
+
+
+def test_eager_defaults_to_debug_or_testing(app):
+    app.config['TASK_ALWAYS_EAGER'] = None
+    assert always_eager(app)  # testing
+    app.testing = False
+    assert not always_eager(app)
+    app.debug = True  # run.py / `flask run --debug`
+    assert always_eager(app)
+    app.config['TASK_ALWAYS_EAGER'] = False
+    assert not always_eager(app)
+
+
+def test_deferred_enqueue_waits_for_commit(app):
+    enqueue('tests.record', {'n': 1})
+    assert rows() == []
+    db.session.rollback()
+    assert rows() == []
+
+    enqueue('tests.record', {'n': 2})
+    db.session.commit()
+    assert [row.payload for row in rows()] == ['{"n":2}']
+
+
+def test_dedup_key_collapses_queued_tasks_only(app):
+    enqueue('tests.record', {'n': 1}, dedup_key='k', defer=False)
+    enqueue('tests.record', {'n': 2}, dedup_key='k', defer=False)
+    assert len(rows()) == 1
+
+    # 已開始執行的工作不再佔用去重鍵，新的變更要再排一次
+    token, claimed = TaskQueue.claim('w1', 10, visibility_timeout=60)
+    assert len(claimed) == 1
+    enqueue('tests.record', {'n': 3}, dedup_key='k', defer=False)
+    assert [row.state for row in rows()] == ['running', 'queued']
+
+
+def test_expired_lease_is_reclaimed_and_stale_worker_cannot_complete(app):
+    enqueue('tests.record', {'n': 1}, defer=False)
+    stale, first = TaskQueue.claim('w1', 10, visibility_timeout=60)
+    assert TaskQueue.claim('w2', 10, visibility_timeout=60)[1] == []  # 租約期間不會被重複取出
+
+    make_visible()  # 租約到期
+    token, second = TaskQueue.claim('w2', 10, visibility_timeout=60)
+    assert [row.id for row in second] == [row.id for row in first]
+    assert second[0].attempts == 2
+
+    TaskQueue.complete([first[0].id], stale)
+    assert rows()[0].state == 'running'
+    TaskQueue.complete([second[0].id], token)
+    assert rows()[0].state == 'done'
+
+
+def test_failed_task_backs_off_then_goes_dead(app):
+    enqueue('tests.flaky', {}, defer=False)
+    before = time.time()
+    assert process_batch('w1', 10, visibility_timeout=60) == 1
+    row = rows()[0]
+    assert (row.state, row.attempts) == ('queued', 1)
+    assert row.visible_at >= before + app.config['TASK_RETRY_BASE']
+    assert 'boom' in row.last_error
+    assert process_batch('w1', 10, visibility_timeout=60) == 0  # 退避期間不會被取出
+
+    make_visible()
+    process_batch('w1', 10, visibility_timeout=60)
+    row = rows()[0]
+    assert (row.state, row.attempts) == ('dead', 2)
+
+    assert TaskQueue.retry_dead('tests.flaky') == 1
+    assert rows()[0].state == 'queued'
+
+
+def test_worker_runs_handler_and_reports_latency(app):
+    enqueue('tests.record', {'n': 1}, defer=False)
+    enqueue('tests.record', {'n': 2}, defer=False)
+    assert process_batch('w1', 10, visibility_timeout=60) == 2
+    assert calls == [{'n': 1}, {'n': 2}]
+    assert TaskQueue.stats()['tests.record']['done'] == 2
+
+
+def test_percentile_is_nearest_rank():
+    values = list(range(1, 21))
+    assert percentile(values, 50) == 10
+    assert percentile(values, 95) == 19
+    assert percentile(values, 100) == 20
+    assert percentile([], 95) is None
@@ -0,0 +1,27 @@
+"""不重複觀看者：worker 結束時寫回緩衝的草圖"""
+import atexit
+
+from app import db
+from app.models.debate import Debate, DebateViewSketch
+from app.services import view_counter
+from app.services.view_counter import ViewCounter, pending_views
+
+
+def test_buffered_views_are_flushed_at_exit(app, make_debate, monkeypatch):
+    hooks = []
+    monkeypatch.setattr(atexit, 'register', lambda fn, *args: hooks.append((fn, args)))
+    monkeypatch.setattr(view_counter, '_exit_hook_registered', False)
+    pending_views.take()
+    debate = make_debate('ongoing')
+
+    ViewCounter.record(debate.id, 'user:1')
+    ViewCounter.record(debate.id, 'user:2')
+    assert db.session.query(DebateViewSketch).count() == 0  # 尚未到寫回間隔
+    assert len(hooks) == 1
+
+    fn, args = hooks[0]
+    fn(*args)
+    assert pending_views.take() == {}
+    db.session.expire_all()
+    assert db.session.query(DebateViewSketch).filter_by(debate_id=debate.id, bucket='all').count() == 1
+    assert db.session.get(Debate, debate.id).views == 2
@@ -0,0 +1,35 @@
+"""
+WSGI 進入點（延遲初始化）
+
+worker 啟動時只載入這個模組，應用程式在第一個請求到達時才建立，
+讓自動擴展或短命 worker 能立即就緒：
+
+    TEMPLATE_CACHE_DIR=instance/jinja_cache gunicorn wsgi:application
+
+初始化成本沒有消失，只是移到第一個請求：每個 worker 的第一個請求要等 create_app 完成
+（benchmarks/startup_profile.py 量測約 0.6 秒，之後的請求不受影響）。
+不希望使用者遇到這段延遲時，請在 worker 加入負載平衡前先送一個暖機請求（例如健康檢查）。
+"""
+import threading
+
+
+class LazyApplication:
+    """第一次被呼叫時才執行 create_app 的 WSGI 包裝"""
+
+    def __init__(self):
+        self._app = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        if self._app is None:
+            with self._lock:
+                if self._app is None:
+                    from app import create_app
+                    self._app = create_app()
+        return self._app
+
+    def __call__(self, environ, start_response):
+        return self.load()(environ, start_response)
+
+
+application = LazyApplication()